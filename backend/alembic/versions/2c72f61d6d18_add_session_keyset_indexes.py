@@ -0,0 +1,69 @@
+"""add session keyset indexes
+
+Revision ID: 2c72f61d6d18
+Revises: 6c7c48a406db
+Create Date: 2026-10-17 06:12:33.540871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c72f61d6d18'
+down_revision: Union[str, Sequence[str], None] = '6c7c48a406db'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # セッション一覧のカーソル（updated_at, id）でそのまま範囲検索できるよう、idまで含めたインデックスに置き換える
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sessions_name_updated_at_id',
+            'sessions',
+            ['name', sa.text('updated_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        # ユーザー名で絞り込まない一覧用
+        op.create_index(
+            'ix_sessions_updated_at_id',
+            'sessions',
+            [sa.text('updated_at DESC'), sa.text('id DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index(
+            'ix_sessions_name_updated_at',
+            table_name='sessions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_sessions_name_updated_at',
+            'sessions',
+            ['name', sa.text('updated_at DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.drop_index(
+            'ix_sessions_updated_at_id',
+            table_name='sessions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+        op.drop_index(
+            'ix_sessions_name_updated_at_id',
+            table_name='sessions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
@@ -0,0 +1,119 @@
+"""add hot path indexes and constraints
+
+Revision ID: 6c7c48a406db
+Revises: d53d02b68c18
+Create Date: 2026-10-17 05:02:47.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6c7c48a406db'
+down_revision: Union[str, Sequence[str], None] = 'd53d02b68c18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # 一意制約を張る前に、同時実行で重複した会話番号をセッションのカウンタの後ろへ振り直す
+    op.execute(
+        """
+        WITH duplicated AS (
+            SELECT id, session_id,
+                   ROW_NUMBER() OVER (PARTITION BY session_id, conversation_number ORDER BY created_at, id) AS rn
+            FROM conversations
+        ), renumbered AS (
+            SELECT d.id, s.last_conversation_number + ROW_NUMBER() OVER (PARTITION BY d.session_id ORDER BY d.id) AS new_number
+            FROM duplicated AS d
+            JOIN sessions AS s ON s.id = d.session_id
+            WHERE d.rn > 1
+        )
+        UPDATE conversations AS c
+        SET conversation_number = r.new_number
+        FROM renumbered AS r
+        WHERE c.id = r.id
+        """
+    )
+    op.execute(
+        """
+        UPDATE sessions AS s
+        SET last_conversation_number = c.max_number
+        FROM (
+            SELECT session_id, MAX(conversation_number) AS max_number
+            FROM conversations
+            GROUP BY session_id
+        ) AS c
+        WHERE c.session_id = s.id AND c.max_number > s.last_conversation_number
+        """
+    )
+
+    # 親の削除で会話も削除されるようにする
+    # NOT VALIDで張るだけならACCESS EXCLUSIVEロックは一瞬で済む。検証は別のトランザクションで行い、
+    # 既存行の走査中は書き込みを止めないSHARE UPDATE EXCLUSIVEロックだけを保持する
+    op.drop_constraint('conversations_session_id_fkey', 'conversations', type_='foreignkey')
+    op.execute(
+        "ALTER TABLE conversations ADD CONSTRAINT conversations_session_id_fkey "
+        "FOREIGN KEY (session_id) REFERENCES sessions (id) ON DELETE CASCADE NOT VALID"
+    )
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE conversations VALIDATE CONSTRAINT conversations_session_id_fkey")
+
+    # インデックスは書き込みを止めないようCONCURRENTLYで作成する（トランザクション外で実行）
+    with op.get_context().autocommit_block():
+        # 前回の作成が失敗して残ったINVALIDなインデックスは、if_not_existsで作成が飛ばされないよう先に削除する
+        # （重複除去の後に重複した会話番号が挿入されると一意インデックスの作成は失敗するので、再実行で除去からやり直す）
+        for index_name in ('uq_conversations_session_id_conversation_number', 'ix_sessions_name_updated_at'):
+            _drop_invalid_index(index_name)
+        op.create_index(
+            'uq_conversations_session_id_conversation_number',
+            'conversations',
+            ['session_id', 'conversation_number'],
+            unique=True,
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+        op.create_index(
+            'ix_sessions_name_updated_at',
+            'sessions',
+            ['name', sa.text('updated_at DESC')],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+    # 作成済みの一意インデックスを制約として登録する（テーブルの再スキャンは発生しない）
+    op.execute(
+        "ALTER TABLE conversations ADD CONSTRAINT uq_conversations_session_id_conversation_number "
+        "UNIQUE USING INDEX uq_conversations_session_id_conversation_number"
+    )
+
+
+def _drop_invalid_index(index_name: str) -> None:
+    """CREATE INDEX CONCURRENTLY の失敗で残ったINVALIDなインデックスを削除する"""
+    invalid = op.get_bind().execute(
+        sa.text(
+            "SELECT 1 FROM pg_index AS i JOIN pg_class AS c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": index_name}
+    ).scalar()
+    if invalid:
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_conversations_session_id_conversation_number', 'conversations', type_='unique')
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_sessions_name_updated_at',
+            table_name='sessions',
+            postgresql_concurrently=True,
+            if_exists=True
+        )
+    op.drop_constraint('conversations_session_id_fkey', 'conversations', type_='foreignkey')
+    op.create_foreign_key('conversations_session_id_fkey', 'conversations', 'sessions', ['session_id'], ['id'])
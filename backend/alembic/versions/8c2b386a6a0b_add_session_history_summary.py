@@ -0,0 +1,33 @@
+"""add history summary to sessions
+
+Revision ID: 8c2b386a6a0b
+Revises: 2c72f61d6d18
+Create Date: 2026-10-17 06:48:05.127734
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c2b386a6a0b'
+down_revision: Union[str, Sequence[str], None] = '2c72f61d6d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sessions', sa.Column('history_summary', sa.Text(), nullable=True))
+    op.add_column(
+        'sessions',
+        sa.Column('history_summary_turns', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sessions', 'history_summary_turns')
+    op.drop_column('sessions', 'history_summary')
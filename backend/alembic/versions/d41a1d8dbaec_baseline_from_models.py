@@ -9,6 +9,7 @@ from typing import Sequence, Union
 
 from alembic import op
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 
 
 # revision identifiers, used by Alembic.
@@ -21,12 +22,36 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade() -> None:
     """Upgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.create_table('sessions',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=True),
+    sa.Column('title', sa.Text(), nullable=False),
+    sa.Column('url', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('conversations',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('session_id', sa.UUID(), nullable=False),
+    sa.Column('conversation_number', sa.Integer(), nullable=False),
+    sa.Column('transcription', sa.Text(), nullable=True),
+    sa.Column('analysis_type', sa.String(length=20), nullable=False),
+    sa.Column('advice', sa.Text(), nullable=True),
+    sa.Column('speechflaws', sa.Text(), nullable=True),
+    sa.Column('nuanceinquiry', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('alternativeexpressions', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('suggestion', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['sessions.id'], name='conversations_session_id_fkey'),
+    sa.PrimaryKeyConstraint('id')
+    )
     # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
     # ### commands auto generated by Alembic - please adjust! ###
-    pass
+    op.drop_table('conversations')
+    op.drop_table('sessions')
     # ### end Alembic commands ###
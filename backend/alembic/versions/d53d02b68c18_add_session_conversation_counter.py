@@ -0,0 +1,44 @@
+"""add conversation counter to sessions
+
+Revision ID: d53d02b68c18
+Revises: d41a1d8dbaec
+Create Date: 2026-10-17 04:40:12.418203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd53d02b68c18'
+down_revision: Union[str, Sequence[str], None] = 'd41a1d8dbaec'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'sessions',
+        sa.Column('last_conversation_number', sa.Integer(), server_default='0', nullable=False)
+    )
+    # 既存セッションのカウンタを現在の最大の会話番号に合わせる
+    op.execute(
+        """
+        UPDATE sessions AS s
+        SET last_conversation_number = c.max_number
+        FROM (
+            SELECT session_id, MAX(conversation_number) AS max_number
+            FROM conversations
+            GROUP BY session_id
+        ) AS c
+        WHERE c.session_id = s.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sessions', 'last_conversation_number')
@@ -0,0 +1,65 @@
+"""add webpage documents
+
+Revision ID: d6022530bd5a
+Revises: 8c2b386a6a0b
+Create Date: 2026-10-17 07:21:40.662318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6022530bd5a'
+down_revision: Union[str, Sequence[str], None] = '8c2b386a6a0b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'webpage_documents',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('url', sa.Text(), nullable=False),
+        sa.Column('title', sa.Text(), nullable=True),
+        sa.Column('content', sa.LargeBinary(), nullable=False),
+        sa.Column('content_length', sa.Integer(), nullable=False),
+        sa.Column('content_type', sa.String(length=100), nullable=True),
+        sa.Column('etag', sa.Text(), nullable=True),
+        sa.Column('last_modified', sa.Text(), nullable=True),
+        sa.Column('fetched_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('content_hash', name='uq_webpage_documents_content_hash')
+    )
+    # アプリ側でzlib圧縮済みなので、TOASTでの再圧縮は行わない
+    op.execute("ALTER TABLE webpage_documents ALTER COLUMN content SET STORAGE EXTERNAL")
+    op.create_index(
+        'ix_webpage_documents_url_fetched_at',
+        'webpage_documents',
+        ['url', sa.text('fetched_at DESC')]
+    )
+
+    # 追加する列はすべてNULLなので、外部キーの検証はすぐに終わる
+    op.add_column('sessions', sa.Column('webpage_document_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key(
+        'sessions_webpage_document_id_fkey',
+        'sessions',
+        'webpage_documents',
+        ['webpage_document_id'],
+        ['id'],
+        ondelete='SET NULL'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('sessions_webpage_document_id_fkey', 'sessions', type_='foreignkey')
+    op.drop_column('sessions', 'webpage_document_id')
+    op.drop_index('ix_webpage_documents_url_fetched_at', table_name='webpage_documents')
+    op.drop_table('webpage_documents')
@@ -0,0 +1,108 @@
+from fastapi import APIRouter
+from app.core.clients import get_client_registry
+from app.core.analysis_scheduler import get_analysis_scheduler
+from app.core.analysis_notifier import get_analysis_listener, get_analysis_notifier
+from app.core.db_pool import get_pool_stats
+from app.config.database import async_engine
+from app.services.tts_cache import get_tts_cache
+from app.services.session_context_cache import get_session_context_cache
+from app.services.history_summarizer import get_history_summarizer
+from app.services.audio_preprocessing_service import AudioPreprocessingServiceFactory
+from app.services.web_scraper_service import WebScraperServiceFactory
+from app.services.webpage_retrieval import get_webpage_retriever
+from app.services.gemini_context_cache import get_gemini_context_cache
+from app.prompts.registry import get_prompt_registry
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/clients")
+async def get_client_stats():
+    """共有クライアント（Gemini / TTS / Speech）の生存チャネル数と利用状況を取得"""
+    return get_client_registry().get_stats()
+
+
+@router.get("/tts_cache")
+async def get_tts_cache_stats():
+    """音声合成キャッシュのヒット数・ミス数と保持サイズを取得"""
+    cache = get_tts_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.get_stats()}
+
+
+@router.get("/audio_preprocessing")
+async def get_audio_preprocessing_stats():
+    """音声前処理で削減したバイト数・秒数の累計を取得"""
+    service = AudioPreprocessingServiceFactory.create()
+    return {"enabled": service.enabled, **service.get_stats()}
+
+
+@router.get("/web_scraper")
+async def get_web_scraper_stats():
+    """Webページの取得件数・条件付きGETで再利用した件数と、再検証用に保持しているページ数を取得"""
+    return WebScraperServiceFactory.create().get_stats()
+
+
+@router.get("/webpage_retrieval")
+async def get_webpage_retrieval_stats():
+    """Webページのインデックスに保存したページ数・チャンク数と検索回数を取得"""
+    retriever = get_webpage_retriever()
+    if retriever is None:
+        return {"enabled": False}
+    return {"enabled": True, **retriever.get_stats()}
+
+
+@router.get("/gemini_cache")
+async def get_gemini_cache_stats():
+    """Geminiのコンテキストキャッシュの保持数と、ヒット・作成・延長の回数を取得"""
+    context_cache = get_gemini_context_cache()
+    if context_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **context_cache.get_stats()}
+
+
+@router.get("/prompts")
+async def get_prompt_registry_stats():
+    """読み込み済みのプロンプトテンプレート数と、ホットリロードで読み直した回数を取得"""
+    return get_prompt_registry().get_stats()
+
+
+@router.get("/analysis_scheduler")
+async def get_analysis_scheduler_stats():
+    """文法分析キューの滞留数・ワーカー数と累計の処理件数を取得"""
+    return get_analysis_scheduler().get_stats()
+
+
+@router.get("/analysis_notifier")
+async def get_analysis_notifier_stats():
+    """分析完了を待っているリクエスト数と累計の通知数、LISTEN/NOTIFYのリスナーの接続状態を取得"""
+    listener = get_analysis_listener()
+    return {
+        **get_analysis_notifier().get_stats(),
+        "listener": listener.get_stats() if listener is not None else None
+    }
+
+
+@router.get("/session_cache")
+async def get_session_cache_stats():
+    """セッションコンテキストキャッシュのヒット率と保持サイズを取得"""
+    cache = get_session_context_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.get_stats()}
+
+
+@router.get("/history_summarizer")
+async def get_history_summarizer_stats():
+    """会話履歴の要約の実行中の数と累計の更新数を取得"""
+    summarizer = get_history_summarizer()
+    if summarizer is None:
+        return {"enabled": False}
+    return {"enabled": True, **summarizer.get_stats()}
+
+
+@router.get("/db_pool")
+async def get_db_pool_stats():
+    """DBコネクションプールの使用中・待機中・オーバーフローの接続数と、接続の取得にかかった時間を取得"""
+    return get_pool_stats(async_engine.pool)
@@ -1,21 +1,37 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
 from typing import List, Optional
+import uuid
 from app.config.database import get_async_db
 from app.services.database_service import DatabaseService
+from app.services.session_context_cache import get_session_context_cache
+from app.services.webpage_retrieval import get_webpage_retriever
+from app.services.gemini_context_cache import get_gemini_context_cache
+from app.core.pagination import decode_cursor, encode_cursor, parse_fields
 from app.models.schemas import (
-    SessionCreate, SessionUpdate, SessionResponse, SessionListResponse,
-    ConversationCreate, ConversationResponse, ConversationListResponse
+    SessionCreate, SessionUpdate, SessionResponse, SessionListItem, SessionListResponse,
+    ConversationCreate, ConversationResponse, ConversationListItem, ConversationListResponse
 )
 from loguru import logger
 
 router = APIRouter(prefix="/sessions", tags=["sessions"])
 
+SESSION_LIST_FIELDS = tuple(SessionListItem.model_fields)
+CONVERSATION_LIST_FIELDS = tuple(ConversationListItem.model_fields)
+
 
 async def get_database_service(db: AsyncSession = Depends(get_async_db)) -> DatabaseService:
     return DatabaseService(db)
 
 
+def _invalidate_session_cache(session_id: str) -> None:
+    """セッション管理サービスを経由しない更新の後、キャッシュされたコンテキストを破棄する"""
+    cache = get_session_context_cache()
+    if cache is not None:
+        cache.invalidate(session_id)
+
+
 @router.post("/", response_model=SessionResponse)
 async def create_session(
     session_data: SessionCreate,
@@ -34,17 +50,36 @@ async def create_session(
         raise HTTPException(status_code=500, detail="Failed to create session")
 
 
-@router.get("/", response_model=SessionListResponse)
+@router.get("/", response_model=SessionListResponse, response_model_exclude_unset=True)
 async def get_sessions(
     name: Optional[str] = Query(None, description="ユーザー名でフィルタ"),
+    limit: int = Query(50, ge=1, le=200, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+    fields: Optional[str] = Query(None, description="取得する項目（カンマ区切り。idは常に含まれる）"),
+    include_total: bool = Query(True, description="総数を数えるか"),
     db_service: DatabaseService = Depends(get_database_service)
 ):
-    """セッション一覧を取得"""
+    """セッション一覧を更新日時の新しい順に取得（カーソルによるキーセットページング）"""
+    try:
+        columns = parse_fields(fields, SESSION_LIST_FIELDS, required=("id", "updated_at"))
+        after = None
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            after = (datetime.fromisoformat(values["u"]), uuid.UUID(values["i"]))
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        sessions = await db_service.get_all_sessions(name=name)
+        # 次のページの有無を知るために1件多く取得する
+        rows = await db_service.list_sessions(name=name, limit=limit + 1, after=after, fields=columns)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"u": rows[-1]["updated_at"].isoformat(), "i": str(rows[-1]["id"])})
         return SessionListResponse(
-            sessions=[SessionResponse.model_validate(session) for session in sessions],
-            total=len(sessions)
+            sessions=[SessionListItem.model_validate(row) for row in rows],
+            total=await db_service.count_sessions(name=name) if include_total else None,
+            next_cursor=next_cursor
         )
     except Exception as e:
         logger.error(f"Failed to get sessions: {e}")
@@ -83,6 +118,7 @@ async def update_session(
             name=session_data.name,
             url=session_data.url
         )
+        _invalidate_session_cache(session_id)
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         
@@ -103,6 +139,13 @@ async def delete_session(
     """セッションを削除"""
     try:
         success = await db_service.delete_session(session_id)
+        _invalidate_session_cache(session_id)
+        webpage_retriever = get_webpage_retriever()
+        if webpage_retriever is not None:
+            await webpage_retriever.delete(session_id)
+        context_cache = get_gemini_context_cache()
+        if context_cache is not None:
+            await context_cache.invalidate(f"session:{session_id}:")
         if not success:
             raise HTTPException(status_code=404, detail="Session not found")
         return {"message": "Session deleted successfully"}
@@ -113,22 +156,37 @@ async def delete_session(
         raise HTTPException(status_code=500, detail="Failed to delete session")
 
 
-@router.post("/{session_id}/conversations", response_model=ConversationListResponse)
+@router.post("/{session_id}/conversations", response_model=ConversationListResponse, response_model_exclude_unset=True)
 async def get_conversations(
     session_id: str,
+    limit: int = Query(100, ge=1, le=500, description="1ページの件数"),
+    cursor: Optional[str] = Query(None, description="前のページのnext_cursor"),
+    fields: Optional[str] = Query(None, description="取得する項目（カンマ区切り。id・conversation_numberは常に含まれる）"),
+    include_total: bool = Query(True, description="総数を数えるか"),
     db_service: DatabaseService = Depends(get_database_service)
 ):
-    """指定セッションの会話履歴を取得"""
+    """指定セッションの会話履歴を会話番号順に取得（カーソルによるキーセットページング）"""
+    try:
+        columns = parse_fields(fields, CONVERSATION_LIST_FIELDS, required=("id", "conversation_number"))
+        after = int(decode_cursor(cursor)["n"]) if cursor is not None else None
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         # セッションの存在確認
         session = await db_service.get_session(session_id)
         if not session:
             raise HTTPException(status_code=404, detail="Session not found")
-        
-        conversations = await db_service.get_conversations(session_id)
+
+        rows = await db_service.list_conversations(session_id, limit=limit + 1, after=after, fields=columns)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"n": rows[-1]["conversation_number"]})
         return ConversationListResponse(
-            conversations=[ConversationResponse.model_validate(conv) for conv in conversations],
-            total=len(conversations)
+            conversations=[ConversationListItem.model_validate(row) for row in rows],
+            total=await db_service.count_conversations(session_id) if include_total else None,
+            next_cursor=next_cursor
         )
     except HTTPException:
         raise
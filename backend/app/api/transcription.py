@@ -1,16 +1,27 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, BackgroundTasks, Query, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Form, Request, Header
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from loguru import logger
 from ..services.speech_service import SpeechService, SpeechServiceFactory
 from ..services.gemini_service import GeminiService, GeminiServiceFactory
-from ..services.gemini_audio_service import GeminiAudioService, GeminiAudioServiceFactory
-from ..services.text2speech_service import TextToSpeechService, TextToSpeechServiceFactory
+from ..services.gemini_audio_service import GeminiAudioService, GeminiAudioServiceFactory, ImmediateResponseSchema
+from ..services.text2speech_service import TextToSpeechService, TextToSpeechServiceFactory, SentenceSplitter
 from ..services.postgres_session_manager import PostgresSessionManagerService, PostgresSessionManagerServiceFactory
 from ..services.web_scraper_service import WebScraperService, WebScraperServiceFactory
+from ..services.webpage_retrieval import get_webpage_retriever
+from ..services.gemini_context_cache import get_gemini_context_cache
+from ..services.audio_store import AudioStore, AudioStoreFactory
+from ..services.audio_preprocessing_service import AudioPreprocessingService, AudioPreprocessingServiceFactory
 from ..config.settings import Settings, get_settings
-import tempfile
-import os
+from ..config.database import unit_of_work
+from ..core.audio_upload import AUDIO_UPLOAD_OPENAPI, AudioUpload, ingest_audio_upload
+from ..core.pipeline import StagePipeline
+from ..core.analysis_scheduler import STATUS_DONE, STATUS_FAILED, AnalysisScheduler, get_analysis_scheduler
+from ..core.analysis_notifier import AnalysisNotifier, get_analysis_notifier
+from typing import Any, Dict, List, Literal, Optional, Tuple
+import asyncio
 import base64
+import json
 
 
 class WebpageUrlRequest(BaseModel):
@@ -18,40 +29,103 @@ class WebpageUrlRequest(BaseModel):
 
 router = APIRouter()
 
-@router.post("/transcribe")
+
+AudioMode = Literal["base64", "url"]
+
+
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Server-Sent Events形式の1イベントを組み立てる"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def _audio_payload(audio_content: bytes, audio_mode: str, audio_store: AudioStore, request: Request) -> Dict[str, str]:
+    """
+    レスポンスに含める音声部分を組み立てる
+
+    base64モードでは音声をJSONに埋め込み、urlモードではストアに保存して
+    GET /audio/{audio_id} から取得するためのIDとURLを返す
+    """
+    if audio_mode == "url":
+        audio_id = audio_store.put(audio_content, media_type="audio/mpeg")
+        return {
+            "audio_id": audio_id,
+            "audio_url": str(request.url_for("get_audio", audio_id=audio_id))
+        }
+    return {"audio_content": base64.b64encode(audio_content).decode('utf-8')}
+
+
+def _schedule_analysis(
+    analysis_scheduler: AnalysisScheduler,
+    gemini_audio_service: GeminiAudioService,
+    session_manager_service: PostgresSessionManagerService,
+    audio_content: bytes,
+    session_id: str,
+    conversation_id: str
+) -> str:
+    """音声の文法分析をスケジューラに登録し、受け付け後の状態を返す"""
+    async def analyze():
+        async with unit_of_work():
+            await gemini_audio_service.analyze_audio(audio_content, session_id, conversation_id, session_manager_service)
+
+    async def on_failure(_):
+        # リトライしても失敗した場合は空の結果を保存する
+        async with unit_of_work():
+            await gemini_audio_service.save_empty_audio_analysis(session_id, conversation_id, session_manager_service)
+
+    return analysis_scheduler.submit(session_id, conversation_id, analyze, on_failure=on_failure)
+
+
+def _parse_range(range_header: str, size: int) -> Tuple[int, int]:
+    """
+    Rangeヘッダー（単一範囲のみ対応）を解析して (開始, 終了) を返す（終了位置を含む）
+
+    Raises:
+        HTTPException: 範囲が不正または満たせない場合（416）
+    """
+    unit, _, spec = range_header.partition("=")
+    if unit.strip() != "bytes" or "," in spec or "-" not in spec:
+        raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{size}"})
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text:
+            start = int(start_text)
+            end = int(end_text) if end_text else size - 1
+        else:
+            # bytes=-N は末尾Nバイト
+            start = max(size - int(end_text), 0)
+            end = size - 1
+    except ValueError:
+        raise HTTPException(status_code=416, detail="Invalid range", headers={"Content-Range": f"bytes */{size}"})
+    end = min(end, size - 1)
+    if start > end or start >= size:
+        raise HTTPException(status_code=416, detail="Range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+@router.post("/transcribe", openapi_extra=AUDIO_UPLOAD_OPENAPI)
 async def transcribe_audio(
-    audio_file: UploadFile = File(...),
+    audio: AudioUpload = Depends(ingest_audio_upload),
     speech_service: SpeechService = Depends(SpeechServiceFactory.create),
     gemini_service: GeminiService = Depends(GeminiServiceFactory.create),
     settings: Settings = Depends(get_settings)
 ):
     try:
-        # 一時ファイルとして保存
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        try:
-            # 音声認識の実行
-            transcript = await speech_service.transcribe_audio(
-                audio_content=content,
-                sample_rate=settings.AUDIO_SAMPLE_RATE,
-                encoding=settings.AUDIO_ENCODING,
-                language_code=settings.LANGUAGE_CODE
-            )
+        content = audio.content
 
-            # Gemini APIに送信
-            gemini_response = gemini_service.generate_text(transcript)
+        # 音声認識の実行
+        transcript = await speech_service.transcribe_audio(
+            audio_content=content,
+            sample_rate=settings.AUDIO_SAMPLE_RATE,
+            encoding=settings.AUDIO_ENCODING,
+            language_code=settings.LANGUAGE_CODE
+        )
 
-            return {
-                "transcript": transcript,
-                "gemini_response": gemini_response
-            }
+        # Gemini APIに送信
+        gemini_response = await gemini_service.generate_text(transcript)
 
-        finally:
-            # 一時ファイルの削除
-            os.unlink(temp_file_path)
+        return {
+            "transcript": transcript,
+            "gemini_response": gemini_response
+        }
 
     except Exception as e:
         logger.error(f"Error processing audio file: {str(e)}")
@@ -80,7 +154,8 @@ async def add_webpage_to_session(
     session_id: str,
     webpage_request: WebpageUrlRequest,
     session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create),
-    web_scraper_service: WebScraperService = Depends(WebScraperServiceFactory.create)
+    web_scraper_service: WebScraperService = Depends(WebScraperServiceFactory.create),
+    settings: Settings = Depends(get_settings)
 ):
     """
     WebページのURLをPOSTし、内容をセッションのhistoryに追加するエンドポイント
@@ -90,6 +165,7 @@ async def add_webpage_to_session(
         webpage_request (WebpageUrlRequest): WebページURLリクエスト
         session_manager_service (PostgresSessionManagerService): セッション管理サービス
         web_scraper_service (WebScraperService): Webスクレイピングサービス
+        settings (Settings): アプリケーション設定
         
     Returns:
         dict: 処理結果を含むレスポンス
@@ -105,8 +181,12 @@ async def add_webpage_to_session(
                 detail="Invalid URL format"
             )
         
-        # Webページのスクレイピング
-        webpage_data = web_scraper_service.scrape_url(webpage_request.url)
+        # 同じURLを最近取得していれば保存済みの本文を使い、なければスクレイピングする
+        webpage_data = await session_manager_service.find_recent_webpage(
+            webpage_request.url, settings.WEBPAGE_REFETCH_AFTER_SECONDS
+        )
+        if webpage_data is None:
+            webpage_data = await web_scraper_service.scrape_url(webpage_request.url)
         if not webpage_data:
             raise HTTPException(
                 status_code=500,
@@ -115,11 +195,17 @@ async def add_webpage_to_session(
         
         # セッションにWebページデータを保存
         await session_manager_service.save_webpage_data(session_id, webpage_data)
+
+        # 本文をチャンクに分割してセッションのインデックスに保存（失敗した場合は本文の先頭を使う）
+        webpage_retriever = get_webpage_retriever()
+        if webpage_retriever is not None:
+            try:
+                await webpage_retriever.ingest(session_id, webpage_data['content'])
+            except Exception as e:
+                logger.warning(f"Failed to index webpage for session {session_id}: {e}")
         
-        # 会話履歴にWebページの内容を追加
-        webpage_content = f"Webpage: {webpage_data['title']}\nContent: {webpage_data['content']}..."  # 最初の1000文字のみ
-        conversation = [f'"user":I have loaded the webpage content. Let\'s talk about it. If user asks about the content, please tell them the content. # loaded webpage content{webpage_content}']
-        print(conversation)
+        # 本文は毎ターンWebページのコンテキストとして渡されるため、会話履歴には読み込んだことだけを残す
+        conversation = [f'"user":I have loaded the webpage "{webpage_data["title"]}" ({webpage_data["url"]}). Let\'s talk about it. If user asks about the content, please tell them the content.']
         await session_manager_service.add_to_history(session_id, conversation)
         logger.info(f"Successfully added webpage content to session: {session_id}, url: {webpage_request.url}")
         
@@ -144,137 +230,345 @@ async def add_webpage_to_session(
 
 
     
-@router.post("/gemini_audio/{session_id}")
+@router.post("/gemini_audio/{session_id}", openapi_extra=AUDIO_UPLOAD_OPENAPI)
 async def gemini_audio(
     session_id: str,
-    background_tasks: BackgroundTasks,
-    audio_file: UploadFile = File(...),
+    request: Request,
+    audio: AudioUpload = Depends(ingest_audio_upload),
+    audio_mode: AudioMode = Query(default="base64", description="音声の返し方（base64: JSONに埋め込む / url: GET /audio/{audio_id} で取得）"),
     gemini_audio_service: GeminiAudioService = Depends(GeminiAudioServiceFactory.create),
     text_to_speech_service: TextToSpeechService = Depends(TextToSpeechServiceFactory.create),
     session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create),
+    audio_store: AudioStore = Depends(AudioStoreFactory.create),
+    audio_preprocessing_service: AudioPreprocessingService = Depends(AudioPreprocessingServiceFactory.create),
+    analysis_scheduler: AnalysisScheduler = Depends(get_analysis_scheduler),
     settings: Settings = Depends(get_settings)
 ):
     """
     音声ファイルをGemini APIに送信し、即座のレスポンス（書き起こしと返事）を返すエンドポイント
-    文法分析はバックグラウンドで非同期実行される
+    文法分析は分析スケジューラのワーカーで非同期実行される
     
     Args:
         session_id (str): セッションID
-        audio_file (UploadFile): アップロードされた音声ファイル
-        background_tasks (BackgroundTasks): FastAPIのバックグラウンドタスク
+        request (Request): リクエスト（音声URLの組み立てに使用）
+        audio (AudioUpload): 取り込み済みの音声アップロード
+        audio_mode (str): 音声の返し方（base64 / url）
         gemini_audio_service (GeminiAudioService): 音声処理サービス
         text_to_speech_service (TextToSpeechService): 音声合成サービス
         session_manager_service (PostgresSessionManagerService): セッション管理サービス
+        audio_store (AudioStore): urlモードで音声を保持するストア
+        audio_preprocessing_service (AudioPreprocessingService): 音声前処理サービス
+        analysis_scheduler (AnalysisScheduler): 文法分析のスケジューラ
         settings (Settings): アプリケーション設定
         
     Returns:
-        dict: 即座のレスポンス（書き起こし、返事、音声データ）を含むレスポンス
+        dict: 即座のレスポンス（書き起こし、返事、音声データまたは音声ID）を含むレスポンス
         
     Raises:
         HTTPException: 処理中にエラーが発生した場合
     """
     try:
-        # 一時ファイルとして保存
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        content = audio.content
 
-        try:
-            # 即座のレスポンス（書き起こしと返事）を生成
-            immediate_response = await gemini_audio_service.generate_immediate_response(
-                audio_content=content,
+        # ターンを依存関係付きのステージとして組み立てる
+        #   preprocess ── generate ─┬─ tts ── encode
+        #                           └─ history（履歴の追加と会話IDの採番）
+        # 履歴の書き込みと会話IDの採番は音声合成と並行して実行される
+        async def preprocess(_):
+            # リサンプリングと無音除去はCPU処理なのでスレッドで実行する
+            return await asyncio.to_thread(audio_preprocessing_service.preprocess, content)
+
+        async def generate(results):
+            return await gemini_audio_service.generate_immediate_response(
+                audio_content=results["preprocess"].content,
                 session_id=session_id,
-                session_manager=session_manager_service
+                session_manager=session_manager_service,
+                save_history=False
             )
 
-            # バックグラウンドで文法分析を実行
-            # background_tasks.add_task(
-            #     gemini_audio_service.analyze_transcription_background,
-            #     transcription=immediate_response.transcription,
-            #     session_id=session_id,
-            #     session_manager=session_manager_service
-            # )
-
-            # 書き起こし用のIDを生成
-            transcription_id = await session_manager_service.get_next_conversation_id(session_id)
-            print(f'transcription_id: {transcription_id}')
-            
-            # 応答用のIDを生成（書き起こしID + 1）
-            response_id = str(int(transcription_id) + 1)
-            print(f'response_id: {response_id}')
-            print(f"transcription: {immediate_response.transcription}")
-            
-            # バックグラウンドで文法分析を実行（書き起こしIDを使用）
-            background_tasks.add_task(
-                gemini_audio_service.analyze_audio_background,
-                audio_content=content,
-                session_id=session_id,
-                conversation_id=transcription_id,
-                session_manager=session_manager_service
+        async def synthesize(results):
+            # 音声合成は同期APIなのでスレッドで実行し、イベントループを塞がない
+            return await asyncio.to_thread(
+                text_to_speech_service.text_to_speech,
+                text=results["generate"].response,
+                language_code=settings.LANGUAGE_CODE
             )
 
-            # テキストを音声に変換
-            audio_content = text_to_speech_service.text_to_speech(
-                text=immediate_response.response,
+        async def save_history(results):
+            # 履歴の追加と採番だけを1つのトランザクションで行う
+            # （Geminiや音声合成の呼び出し中に接続・行ロックを保持しない）
+            async with unit_of_work():
+                await gemini_audio_service.add_turn_to_history(
+                    session_id, results["generate"], session_manager_service
+                )
+                # 書き起こし用のIDは履歴の追加後に採番する
+                return await session_manager_service.get_next_conversation_id(session_id)
+
+        async def encode(results):
+            return _audio_payload(results["tts"], audio_mode, audio_store, request)
+
+        pipeline = (
+            StagePipeline(name="gemini_audio")
+            .add_stage("preprocess", preprocess)
+            .add_stage("generate", generate, depends_on=("preprocess",))
+            .add_stage("tts", synthesize, depends_on=("generate",))
+            .add_stage("history", save_history, depends_on=("generate",))
+            .add_stage("encode", encode, depends_on=("tts",))
+        )
+        results = await pipeline.run()
+
+        immediate_response = results["generate"]
+        transcription_id = results["history"]
+        preprocessed = results["preprocess"]
+
+        # 応答用のIDを生成（書き起こしID + 1）
+        response_id = str(int(transcription_id) + 1)
+        
+        # 文法分析をスケジューラに登録（書き起こしIDを使用）
+        analysis_status = _schedule_analysis(
+            analysis_scheduler, gemini_audio_service, session_manager_service,
+            preprocessed.content, session_id, transcription_id
+        )
+
+        response = {
+            "transcription": {
+                "id": transcription_id,
+                "content": immediate_response.transcription
+            },
+            "response": {
+                "id": response_id,
+                "content": immediate_response.response
+            },
+            **results["encode"],
+            "analysis_status": analysis_status  # queued（キューが満杯の場合はfailed）
+        }
+        if settings.DEBUG:
+            # ステージごとの所要時間（デバッグ用）
+            response["timings"] = pipeline.timings
+            response["preprocessing"] = preprocessed.summary()
+        return response
+
+    except Exception as e:
+        logger.error(f"Error processing audio file: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing audio file: {str(e)}"
+        ) 
+
+@router.post("/gemini_audio/{session_id}/stream", openapi_extra=AUDIO_UPLOAD_OPENAPI)
+async def gemini_audio_stream(
+    session_id: str,
+    audio: AudioUpload = Depends(ingest_audio_upload),
+    gemini_audio_service: GeminiAudioService = Depends(GeminiAudioServiceFactory.create),
+    text_to_speech_service: TextToSpeechService = Depends(TextToSpeechServiceFactory.create),
+    session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create),
+    audio_preprocessing_service: AudioPreprocessingService = Depends(AudioPreprocessingServiceFactory.create),
+    analysis_scheduler: AnalysisScheduler = Depends(get_analysis_scheduler),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    gemini_audioのストリーミング版エンドポイント（Server-Sent Events）
+    書き起こしが確定次第transcriptionイベントを送り、返事はGeminiの生成に合わせて
+    responseイベントで逐次送信する。音声は文単位で合成し、audioイベントとして送信する
+
+    イベント:
+        transcription: {"content": 書き起こし}
+        response: {"content": 返事の断片}
+        audio: {"index": 連番, "audio_content": base64エンコードされたMP3}
+        done: gemini_audioと同じ形式のtranscription / response / analysis_status
+        error: {"detail": エラー内容}
+
+    Args:
+        session_id (str): セッションID
+        audio (AudioUpload): 取り込み済みの音声アップロード
+        gemini_audio_service (GeminiAudioService): 音声処理サービス
+        text_to_speech_service (TextToSpeechService): 音声合成サービス
+        session_manager_service (PostgresSessionManagerService): セッション管理サービス
+        audio_preprocessing_service (AudioPreprocessingService): 音声前処理サービス
+        analysis_scheduler (AnalysisScheduler): 文法分析のスケジューラ
+        settings (Settings): アプリケーション設定
+
+    Returns:
+        StreamingResponse: text/event-streamのレスポンス
+
+    Raises:
+        HTTPException: 音声データが空・上限超過の場合（ingest_audio_uploadで検証）
+    """
+    content = audio.content
+
+    async def event_stream():
+        splitter = SentenceSplitter()
+        pending: List[asyncio.Task] = []
+        audio_index = 0
+        transcription = ""
+        response_text = ""
+
+        def synthesize(sentence: str) -> None:
+            # 文ごとの音声合成はGeminiのストリーミングと並行して進める
+            pending.append(asyncio.create_task(asyncio.to_thread(
+                text_to_speech_service.text_to_speech,
+                text=sentence,
                 language_code=settings.LANGUAGE_CODE
+            )))
+
+        def audio_event(audio_content: bytes) -> str:
+            nonlocal audio_index
+            event = _format_sse("audio", {
+                "index": audio_index,
+                "audio_content": base64.b64encode(audio_content).decode('utf-8')
+            })
+            audio_index += 1
+            return event
+
+        try:
+            preprocessed = await asyncio.to_thread(audio_preprocessing_service.preprocess, content)
+            async for event in gemini_audio_service.generate_immediate_response_stream(
+                audio_content=preprocessed.content,
+                session_id=session_id,
+                session_manager=session_manager_service,
+                save_history=False
+            ):
+                if event["type"] == "transcription":
+                    transcription = event["content"]
+                    yield _format_sse("transcription", {"content": transcription})
+                    continue
+
+                response_text += event["content"]
+                yield _format_sse("response", {"content": event["content"]})
+                for sentence in splitter.feed(event["content"]):
+                    synthesize(sentence)
+
+                # 合成済みの音声は順序を保ったまま即座に送信
+                while pending and pending[0].done():
+                    yield audio_event(pending.pop(0).result())
+
+            remaining = splitter.flush()
+            if remaining:
+                synthesize(remaining)
+
+            # 履歴の追加と採番だけを1つのトランザクションで行う（gemini_audioと同じ）
+            async with unit_of_work():
+                await gemini_audio_service.add_turn_to_history(
+                    session_id,
+                    ImmediateResponseSchema(transcription=transcription, response=response_text),
+                    session_manager_service
+                )
+                # 書き起こし用のIDは履歴の追加後に採番する
+                transcription_id = await session_manager_service.get_next_conversation_id(session_id)
+            response_id = str(int(transcription_id) + 1)
+
+            # 文法分析をスケジューラに登録
+            analysis_status = _schedule_analysis(
+                analysis_scheduler, gemini_audio_service, session_manager_service,
+                preprocessed.content, session_id, transcription_id
             )
 
-            # Base64エンコード
-            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
+            while pending:
+                yield audio_event(await pending.pop(0))
 
-            return {
+            yield _format_sse("done", {
                 "transcription": {
                     "id": transcription_id,
-                    "content": immediate_response.transcription
+                    "content": transcription
                 },
                 "response": {
                     "id": response_id,
-                    "content": immediate_response.response
+                    "content": response_text
                 },
-                "audio_content": audio_base64,
-                "analysis_status": "processing"  # 文法分析が進行中であることを示す
-            }
+                "analysis_status": analysis_status
+            })
 
-        finally:
-            # 一時ファイルの削除
-            os.unlink(temp_file_path)
+        except Exception as e:
+            for task in pending:
+                task.cancel()
+            logger.error(f"Error streaming audio response: {str(e)}")
+            yield _format_sse("error", {"detail": f"Error processing audio file: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/audio/{audio_id}", name="get_audio")
+async def get_audio(
+    audio_id: str,
+    range_header: Optional[str] = Header(default=None, alias="Range"),
+    audio_store: AudioStore = Depends(AudioStoreFactory.create)
+):
+    """
+    audio_mode=urlで保存された音声を返すエンドポイント
+    HTTP Range（単一範囲）に対応し、シークや分割取得ができる
+
+    Args:
+        audio_id (str): 音声ID
+        range_header (Optional[str]): Rangeヘッダー
+        audio_store (AudioStore): 音声ストア
+
+    Returns:
+        Response: 音声データ（Range指定時は206 Partial Content）
+
+    Raises:
+        HTTPException: 音声が存在しないか期限切れの場合（404）、範囲が不正な場合（416）
+    """
+    stored = audio_store.get(audio_id)
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+
+    size = len(stored.content)
+    headers = {"Accept-Ranges": "bytes", "Cache-Control": "private, max-age=300"}
+    if not range_header:
+        return Response(content=stored.content, media_type=stored.media_type, headers=headers)
+
+    start, end = _parse_range(range_header, size)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(
+        content=stored.content[start:end + 1],
+        status_code=206,
+        media_type=stored.media_type,
+        headers=headers
+    )
 
-    except Exception as e:
-        logger.error(f"Error processing audio file: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Error processing audio file: {str(e)}"
-        ) 
 
 @router.get("/analysis/{session_id}")
 async def get_analysis_results(
     session_id: str,
     session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create),
+    analysis_scheduler: AnalysisScheduler = Depends(get_analysis_scheduler),
     conversation_id: str = Query(default="", description="特定の会話ID（指定しない場合は全て取得）")
 ):
     """
     文法分析結果を取得するエンドポイント
+    結果がまだ保存されていない場合は、スケジューラ上の状態（queued / running / failed）を返す
     
     Args:
         session_id (str): セッションID
-        transcription (str, optional): 特定の書き起こしテキスト（指定しない場合は全て取得）
         session_manager_service (PostgresSessionManagerService): セッション管理サービス
+        analysis_scheduler (AnalysisScheduler): 文法分析のスケジューラ
+        conversation_id (str, optional): 特定の会話ID（指定しない場合は全て取得）
         
     Returns:
-        dict: 文法分析結果を含むレスポンス
+        dict: 文法分析結果と分析状態を含むレスポンス
     """
     try:
         if conversation_id:
             # 特定の書き起こしテキストの分析結果を取得
             analysis_result = await session_manager_service.get_analysis_result(session_id, conversation_id)
+            job_status = analysis_scheduler.get_status(session_id, conversation_id)
             if analysis_result is None:
+                if job_status is not None:
+                    return {
+                        "status": job_status["status"],
+                        "analysis_status": job_status
+                    }
                 return {
                     "status": "not_found",
                     "message": "Analysis result not found for the specified transcription"
                 }
             return {
                 "status": "completed",
+                "analysis_status": job_status or {"status": STATUS_DONE},
                 "analysis_result": analysis_result
             }
         else:
@@ -282,7 +576,8 @@ async def get_analysis_results(
             all_results = await session_manager_service.get_all_analysis_results(session_id)
             return {
                 "status": "completed",
-                "all_analysis_results": all_results
+                "all_analysis_results": all_results,
+                "analysis_statuses": analysis_scheduler.get_session_statuses(session_id)
             }
             
     except Exception as e:
@@ -298,15 +593,25 @@ async def finish_session(
     session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create)
 ):
     await session_manager_service.delete_session(session_id)
+    webpage_retriever = get_webpage_retriever()
+    if webpage_retriever is not None:
+        await webpage_retriever.delete(session_id)
+    context_cache = get_gemini_context_cache()
+    if context_cache is not None:
+        await context_cache.invalidate(f"session:{session_id}:")
     return {"message": "Session finished"}
 
-@router.post("/gemini_audio_legacy/{session_id}")
+@router.post("/gemini_audio_legacy/{session_id}", openapi_extra=AUDIO_UPLOAD_OPENAPI)
 async def gemini_audio_legacy(
     session_id: str,
-    audio_file: UploadFile = File(...),
+    request: Request,
+    audio: AudioUpload = Depends(ingest_audio_upload),
+    audio_mode: AudioMode = Query(default="base64", description="音声の返し方（base64: JSONに埋め込む / url: GET /audio/{audio_id} で取得）"),
     gemini_audio_service: GeminiAudioService = Depends(GeminiAudioServiceFactory.create),
     text_to_speech_service: TextToSpeechService = Depends(TextToSpeechServiceFactory.create),
     session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create),
+    audio_store: AudioStore = Depends(AudioStoreFactory.create),
+    audio_preprocessing_service: AudioPreprocessingService = Depends(AudioPreprocessingServiceFactory.create),
     settings: Settings = Depends(get_settings)
 ):
     """
@@ -315,10 +620,14 @@ async def gemini_audio_legacy(
     
     Args:
         session_id (str): セッションID
-        audio_file (UploadFile): アップロードされた音声ファイル
+        request (Request): リクエスト（音声URLの組み立てに使用）
+        audio (AudioUpload): 取り込み済みの音声アップロード
+        audio_mode (str): 音声の返し方（base64 / url）
         gemini_audio_service (GeminiAudioService): 音声処理サービス
         text_to_speech_service (TextToSpeechService): 音声合成サービス
         session_manager_service (PostgresSessionManagerService): セッション管理サービス
+        audio_store (AudioStore): urlモードで音声を保持するストア
+        audio_preprocessing_service (AudioPreprocessingService): 音声前処理サービス
         settings (Settings): アプリケーション設定
         
     Returns:
@@ -328,37 +637,26 @@ async def gemini_audio_legacy(
         HTTPException: 処理中にエラーが発生した場合
     """
     try:
-        # 一時ファイルとして保存
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as temp_file:
-            content = await audio_file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-
-        try:
-            # 統合版の処理を実行
-            gemini_response = await gemini_audio_service.generate_text(
-                audio_content=content,
-                session_id=session_id,
-                session_manager=session_manager_service
-            )
-
-            # テキストを音声に変換
-            audio_content = text_to_speech_service.text_to_speech(
-                text=gemini_response[0].response,
-                language_code=settings.LANGUAGE_CODE
-            )
+        preprocessed = await asyncio.to_thread(audio_preprocessing_service.preprocess, audio.content)
 
-            # Base64エンコード
-            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
+        # 統合版の処理を実行
+        gemini_response = await gemini_audio_service.generate_text(
+            audio_content=preprocessed.content,
+            session_id=session_id,
+            session_manager=session_manager_service
+        )
 
-            return {
-                "gemini_response": gemini_response,
-                "audio_content": audio_base64
-            }
+        # テキストを音声に変換（合成とキャッシュのファイル読み書きはブロッキングなのでスレッドで実行）
+        audio_content = await asyncio.to_thread(
+            text_to_speech_service.text_to_speech,
+            text=gemini_response[0].response,
+            language_code=settings.LANGUAGE_CODE
+        )
 
-        finally:
-            # 一時ファイルの削除
-            os.unlink(temp_file_path)
+        return {
+            "gemini_response": gemini_response,
+            **_audio_payload(audio_content, audio_mode, audio_store, request)
+        }
 
     except Exception as e:
         logger.error(f"Error processing audio file: {str(e)}")
@@ -368,6 +666,57 @@ async def gemini_audio_legacy(
         )
     
 
+@router.get("/analysis/{session_id}/{conversation_id}/wait")
+async def wait_for_analysis_result(
+    session_id: str,
+    conversation_id: str,
+    timeout: Optional[float] = Query(default=None, ge=0, le=60, description="最大待機時間（秒）。省略時は設定値"),
+    session_manager_service: PostgresSessionManagerService = Depends(PostgresSessionManagerServiceFactory.create),
+    analysis_scheduler: AnalysisScheduler = Depends(get_analysis_scheduler),
+    analysis_notifier: AnalysisNotifier = Depends(get_analysis_notifier),
+    settings: Settings = Depends(get_settings)
+):
+    """
+    文法分析結果をロングポーリングで取得するエンドポイント
+    結果が保存済みであれば即座に返し、未保存であれば保存されるかタイムアウトするまで待機する
+    タイムアウトした場合は分析状態（queued / running / pending）を返すので、クライアントは再度リクエストする
+
+    Args:
+        session_id (str): セッションID
+        conversation_id (str): 会話ID
+        timeout (Optional[float]): 最大待機時間（秒）
+        session_manager_service (PostgresSessionManagerService): セッション管理サービス
+        analysis_scheduler (AnalysisScheduler): 文法分析のスケジューラ
+        analysis_notifier (AnalysisNotifier): 分析完了の通知レジストリ
+        settings (Settings): アプリケーション設定
+
+    Returns:
+        dict: status（completed / queued / running / failed / pending）と分析結果（未完了の場合はNone）
+    """
+    wait_seconds = settings.ANALYSIS_WAIT_TIMEOUT if timeout is None else timeout
+
+    # 確認と待機の間に保存されても取りこぼさないよう、先に待機を登録する
+    with analysis_notifier.subscribe(session_id, conversation_id) as ready:
+        analysis_result = await session_manager_service.get_analysis_result(session_id, conversation_id)
+        job_status = analysis_scheduler.get_status(session_id, conversation_id)
+        # 受け付けられなかった分析（failedで結果なし）は待っても保存されない
+        if analysis_result is None and not (job_status and job_status["status"] == STATUS_FAILED):
+            try:
+                await asyncio.wait_for(ready, timeout=wait_seconds)
+            except asyncio.TimeoutError:
+                # 通知を取りこぼしても（リスナーの切断中に保存された場合など）結果を返せるよう、タイムアウト後も確認し直す
+                pass
+            analysis_result = await session_manager_service.get_analysis_result(session_id, conversation_id)
+
+    if analysis_result is not None:
+        return {"status": "completed", "analysis_result": analysis_result}
+    job_status = analysis_scheduler.get_status(session_id, conversation_id)
+    return {
+        "status": job_status["status"] if job_status else "pending",
+        "analysis_result": None
+    }
+
+
 @router.get("/get_analysis_result/{session_id}/{conversation_id}")
 async def get_analysis_result(
     session_id: str,
@@ -1,28 +1,61 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+import asyncio
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from app.config.settings import get_settings
+from app.config.settings import Settings, get_settings
+from app.core.db_pool import InstrumentedAsyncPool
 
 settings = get_settings()
 
 # 同期用エンジン（Alembicマイグレーション用）
 SQLALCHEMY_DATABASE_URL = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
 # 非同期用エンジン（FastAPI用）
 ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
 
-async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL)
+
+def async_engine_options(settings: Settings) -> Dict[str, Any]:
+    """非同期エンジンのプールと接続の設定"""
+    return {
+        "poolclass": InstrumentedAsyncPool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "connect_args": {
+            # asyncpgのprepared statementキャッシュ（PgBouncerのtransactionモードでは0にする）
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            # SQLAlchemy側で保持するprepared statementのキャッシュも合わせる
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE
+        }
+    }
+
+
+async_engine = create_async_engine(ASYNC_SQLALCHEMY_DATABASE_URL, **async_engine_options(settings))
 AsyncSessionLocal = sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
 
+SessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+
+@lru_cache()
+def get_sync_engine() -> Engine:
+    """同期用エンジンを取得する（psycopg2を使うため、必要になるまで作成しない）"""
+    return create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=settings.DB_POOL_PRE_PING, pool_recycle=settings.DB_POOL_RECYCLE)
+
+
 Base = declarative_base()
 
 # データベースセッションの依存性注入
 def get_db():
-    db = SessionLocal()
+    db = SessionLocal(bind=get_sync_engine())
     try:
         yield db
     finally:
@@ -33,4 +66,89 @@ async def get_async_db():
         try:
             yield session
         finally:
-            await session.close() 
\ No newline at end of file
+            await session.close() 
+
+
+class UnitOfWork:
+    """
+    リクエスト（またはバックグラウンドジョブ）内の複数のDB操作で共有するセッションとトランザクション
+    並行するタスクから同じセッションを同時に使わないよう、操作はロックで直列化します
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.lock = asyncio.Lock()
+        self.closed = False
+        self._after_commit: List[Callable[[], None]] = []
+
+    def after_commit(self, callback: Callable[[], None]) -> None:
+        """コミット後に実行する処理を登録する（キャッシュの更新や待機中のリクエストへの通知など）"""
+        self._after_commit.append(callback)
+
+    def discard_after_commit(self) -> None:
+        self._after_commit.clear()
+
+    def run_after_commit(self) -> None:
+        callbacks, self._after_commit = self._after_commit, []
+        for callback in callbacks:
+            callback()
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("unit_of_work", default=None)
+
+
+@asynccontextmanager
+async def unit_of_work() -> AsyncIterator[AsyncSession]:
+    """
+    ブロック内のDB操作を1つのセッション・トランザクションにまとめ、終了時に1回だけコミットする
+    内側で作成したタスクにも引き継がれる。既に作業単位の中にいる場合は外側のものをそのまま使う
+    """
+    current = _current_unit_of_work.get()
+    if current is not None and not current.closed:
+        yield current.session
+        return
+
+    async with AsyncSessionLocal() as session:
+        uow = UnitOfWork(session)
+        session.info["unit_of_work"] = uow
+        token = _current_unit_of_work.set(uow)
+        try:
+            yield session
+            async with uow.lock:
+                await session.commit()
+        except BaseException:
+            await session.rollback()
+            raise
+        finally:
+            # ブロックの外に引き継がれたタスクは、以降は個別のセッションを使う
+            uow.closed = True
+            _current_unit_of_work.reset(token)
+        uow.run_after_commit()
+
+
+def in_unit_of_work() -> bool:
+    """作業単位の中で実行されているか"""
+    uow = _current_unit_of_work.get()
+    return uow is not None and not uow.closed
+
+
+@asynccontextmanager
+async def db_session() -> AsyncIterator[AsyncSession]:
+    """作業単位の中ではそのセッションを、外では操作ごとのセッションを取得する"""
+    uow = _current_unit_of_work.get()
+    if uow is not None and not uow.closed:
+        async with uow.lock:
+            yield uow.session
+        return
+
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """作業単位の中ではコミット後に、外ではすぐに callback を実行する"""
+    uow = session.info.get("unit_of_work")
+    if uow is None:
+        callback()
+    else:
+        uow.after_commit(callback)
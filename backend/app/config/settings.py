@@ -17,9 +17,87 @@ class Settings(BaseSettings):
     GOOGLE_APPLICATION_CREDENTIALS: str = ""
     AUDIO_SAMPLE_RATE: int = 48000
     AUDIO_ENCODING: str = "MP3"
+    MAX_AUDIO_UPLOAD_BYTES: int = 10 * 1024 * 1024  # 音声アップロードの上限
     LANGUAGE_CODE: str = "en-US"
+    TTS_VOICE_NAME: str = ""  # 空の場合は言語コードとNEUTRALの性別から自動選択
     GEMINI_MODEL_NAME: str = "gemini-2.5-flash-lite"
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MAX_CONCURRENCY: int = 8  # プロセス内でのGemini API同時呼び出し数の上限
+
+    # プロンプトの先頭部分（システムプロンプトとセッションのWebページ）のコンテキストキャッシュ
+    GEMINI_CACHE_ENABLED: bool = True
+    GEMINI_CACHE_TTL_SECONDS: int = 900  # 使われるたびに延長する
+    GEMINI_CACHE_MIN_TOKENS: int = 1024  # これより短い先頭部分はキャッシュしない（モデルのキャッシュの下限に合わせる。テンプレートだけでは届かないため、既定の設定でキャッシュされるのは全文を含める短いWebページのセッションのみ）
+    GEMINI_CACHE_MAX_ENTRIES: int = 500
+
+    # プロンプトテンプレートの設定
+    PROMPT_HOT_RELOAD: bool = True  # DEBUG時はテンプレートファイルの変更を再起動せずに反映する
+
+    # 共有クライアントの設定
+    CLIENT_WARMUP_ON_STARTUP: bool = True
+    CLIENT_WARMUP_TIMEOUT: float = 5.0  # gRPCチャネルの接続待ち（秒）
+
+    # 音声合成キャッシュの設定
+    TTS_CACHE_ENABLED: bool = True
+    TTS_CACHE_MEMORY_MAX_ITEMS: int = 256
+    TTS_CACHE_MEMORY_MAX_BYTES: int = 32 * 1024 * 1024
+    TTS_CACHE_DIR: str = ".cache/tts"  # 空の場合はディスク層を使わない
+    TTS_CACHE_DISK_MAX_BYTES: int = 512 * 1024 * 1024
+    TTS_CACHE_PREWARM_FILE: str = ""  # 起動時に合成しておくフレーズ（1行1フレーズ）
+
+    # 音声配信（audio_mode=url）用ストアの設定
+    AUDIO_STORE_TTL_SECONDS: int = 300
+    AUDIO_STORE_MAX_ITEMS: int = 1000
+    AUDIO_STORE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Geminiへ送る前の音声前処理（PCMのWAVのみ対象）
+    AUDIO_PREPROCESS_ENABLED: bool = True
+    AUDIO_PREPROCESS_TARGET_SAMPLE_RATE: int = 16000
+    AUDIO_PREPROCESS_SILENCE_THRESHOLD_DB: float = -40.0
+    AUDIO_PREPROCESS_FRAME_MS: int = 20
+    AUDIO_PREPROCESS_PADDING_MS: int = 200
+
+    # バックグラウンドの文法分析
+    ANALYSIS_WORKERS: int = 2
+    ANALYSIS_QUEUE_MAX_SIZE: int = 100  # 上限を超えた分析は受け付けずfailedとする
+    ANALYSIS_MAX_RETRIES: int = 2
+    ANALYSIS_RETRY_BASE_DELAY: float = 1.0  # 秒（試行ごとに2倍）
+    ANALYSIS_SHUTDOWN_TIMEOUT: float = 30.0  # 終了時に残りの分析を待つ最大時間（秒）
+    ANALYSIS_NOTIFY_BACKEND: str = "memory"  # 分析完了の通知方法（memory: プロセス内 / postgres: LISTEN/NOTIFY）
+    ANALYSIS_WAIT_TIMEOUT: float = 25.0  # ロングポーリングの既定の待機時間（秒）
+
+    # Geminiに送る会話履歴（直近の会話をそのまま送り、それより古い会話は要約にまとめる）
+    HISTORY_MAX_TURNS: int = 20  # そのまま送る会話の最大件数
+    HISTORY_TOKEN_BUDGET: int = 1500  # そのまま送る会話のトークン数の上限（概算）
+    HISTORY_SUMMARY_ENABLED: bool = True
+    HISTORY_SUMMARY_BATCH_TURNS: int = 6  # 要約に含まれていない古い会話がこの件数たまったら要約を更新する
+
+    # スクレイピングしたWebページ（同じURLはこの時間内であれば保存済みの本文を再利用する）
+    WEBPAGE_REFETCH_AFTER_SECONDS: int = 86400
+    WEB_SCRAPER_TIMEOUT: float = 10.0  # 秒
+    WEB_SCRAPER_MAX_BYTES: int = 2 * 1024 * 1024  # 読み込む本文の上限（超えた分は切り捨てる）
+    WEB_SCRAPER_MAX_CONNECTIONS: int = 20
+    WEB_SCRAPER_HTTP2: bool = True  # h2がインストールされている場合のみ有効
+    WEB_SCRAPER_CACHE_MAX_ITEMS: int = 256  # ETag / Last-Modified で再検証するために保持するページ数
+    WEB_SCRAPER_EXTRACTOR: str = "auto"  # 本文の抽出エンジン（auto: lxmlがあればlxml / lxml / html.parser）
+    WEB_SCRAPER_MAX_CONTENT_BYTES: int = 200 * 1024  # 抽出する本文の上限（超えた時点で打ち切る）
+
+    # Webページの関連部分の検索（本文をチャンクに分割して埋め込み、直近の会話に関連するチャンクだけをプロンプトに含める）
+    WEBPAGE_RETRIEVAL_ENABLED: bool = True  # chromadb と sentence-transformers がない場合は本文の先頭を含める
+    WEBPAGE_RETRIEVAL_DIR: str = ".cache/webpage_index"  # 空の場合はメモリ上
+    WEBPAGE_RETRIEVAL_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    WEBPAGE_RETRIEVAL_CHUNK_CHARS: int = 800
+    WEBPAGE_RETRIEVAL_CHUNK_OVERLAP: int = 150
+    WEBPAGE_RETRIEVAL_TOP_K: int = 3
+    WEBPAGE_RETRIEVAL_BATCH_SIZE: int = 32
+    WEBPAGE_RETRIEVAL_MIN_CHARS: int = 2000  # これより短いページは検索せずに全文を含める
+    WEBPAGE_RETRIEVAL_QUERY_TURNS: int = 2  # 検索クエリにする直近の会話の件数
+
+    # セッションの会話履歴・Webページ情報のキャッシュ（プロセス内）
+    SESSION_CACHE_ENABLED: bool = True
+    SESSION_CACHE_MAX_SESSIONS: int = 1000
+    SESSION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    SESSION_CACHE_TTL_SECONDS: int = 1800
     
     # Database settings
     DB_HOST: str = "localhost"
@@ -27,6 +105,17 @@ class Settings(BaseSettings):
     DB_NAME: str = "english_db"
     DB_USER: str = "minamikouji"
     DB_PASSWORD: str = ""
+    DB_POOL_SIZE: int = 10  # 常時保持する接続数
+    DB_MAX_OVERFLOW: int = 10  # 混雑時に DB_POOL_SIZE を超えて作成する接続数
+    DB_POOL_TIMEOUT: float = 30.0  # 空きの接続を待つ最大時間（秒）
+    DB_POOL_RECYCLE: int = 1800  # 接続を作り直すまでの時間（秒、-1で無効）
+    DB_POOL_PRE_PING: bool = True  # 取り出した接続が切れていないか確認してから使う
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpgのprepared statementキャッシュ（PgBouncerのtransactionモードでは0）
+
+    # ハイブリッドセッション管理（データベースの障害中はメモリで動作し、復旧後に書き込みを反映する）
+    HYBRID_DB_FAILURE_THRESHOLD: int = 3  # 連続でこの回数失敗したらデータベースを使わない
+    HYBRID_DB_PROBE_INTERVAL: float = 10.0  # 使わない間、この間隔でデータベースの復旧を確認する（秒）
+    HYBRID_WRITE_BEHIND_MAX_ENTRIES: int = 10000  # 復旧後に反映する書き込みの上限（超えた書き込みは反映しない）
 
     class Config:
         env_file = ".env"
@@ -0,0 +1,235 @@
+"""
+文法分析の完了通知
+
+分析結果の保存を待っているリクエスト（ロングポーリング）に完了を知らせる。
+プロセス内ではイベントレジストリで通知し、複数ワーカー構成では
+PostgresのLISTEN/NOTIFYで他のプロセスの保存も受け取る
+"""
+
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+import asyncio
+import json
+
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+ANALYSIS_READY_CHANNEL = "analysis_ready"
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class AnalysisNotifier:
+    """
+    会話ごとの分析完了を待ち合わせるレジストリ
+    取りこぼしを防ぐため、待機側は結果を確認する前に subscribe しておきます
+    """
+
+    def __init__(self):
+        self._waiters: Dict[Tuple[str, str], Set[asyncio.Future]] = {}
+        self._notified = 0
+
+    @contextmanager
+    def subscribe(self, session_id: str, conversation_id: str) -> Iterator[asyncio.Future]:
+        """
+        分析の完了を待つFutureを登録するコンテキストマネージャ
+
+        Yields:
+            asyncio.Future: 完了が通知されると結果がセットされるFuture
+        """
+        key = (session_id, conversation_id)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(key, set()).add(future)
+        try:
+            yield future
+        finally:
+            waiters = self._waiters.get(key)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[key]
+
+    def notify(self, session_id: str, conversation_id: str) -> int:
+        """
+        分析の完了を待機中のリクエストに通知する
+
+        Returns:
+            int: 通知した待機数
+        """
+        waiters = self._waiters.pop((session_id, conversation_id), set())
+        for future in waiters:
+            loop = future.get_loop()
+            if loop.is_closed():
+                continue
+            # LISTEN/NOTIFYのコールバックなど別スレッドから呼ばれても安全にする
+            loop.call_soon_threadsafe(_resolve, future)
+        self._notified += len(waiters)
+        return len(waiters)
+
+    def notify_all(self) -> int:
+        """
+        待機中のすべてのリクエストに通知する
+        通知を取りこぼした可能性がある場合（リスナーの再接続後など）に、待機側に結果を確認し直させます
+
+        Returns:
+            int: 通知した待機数
+        """
+        return sum(self.notify(session_id, conversation_id) for session_id, conversation_id in list(self._waiters))
+
+    def get_stats(self) -> Dict[str, int]:
+        """待機中のリクエスト数と累計の通知数を取得する"""
+        return {
+            "waiting": sum(len(waiters) for waiters in self._waiters.values()),
+            "notified": self._notified
+        }
+
+
+class PostgresAnalysisListener:
+    """
+    PostgresのNOTIFYを受け取り、プロセス内の AnalysisNotifier に転送するクラス
+    接続はプールとは別に1本だけ保持し、接続に失敗・切断した場合はバックグラウンドで再接続します
+    """
+
+    def __init__(
+        self,
+        notifier: AnalysisNotifier,
+        dsn: str,
+        channel: str = ANALYSIS_READY_CHANNEL,
+        reconnect_delay: float = 1.0,
+        max_reconnect_delay: float = 60.0,
+        health_check_interval: float = 30.0
+    ):
+        """
+        Args:
+            notifier (AnalysisNotifier): 通知の転送先
+            dsn (str): 接続先
+            channel (str): LISTENするチャネル
+            reconnect_delay (float): 最初の再接続までの待機時間（秒、失敗ごとに2倍）
+            max_reconnect_delay (float): 再接続までの最大の待機時間（秒）
+            health_check_interval (float): 切断が通知されない場合に備えて接続を確認する間隔（秒）
+        """
+        self.notifier = notifier
+        self.dsn = dsn
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.health_check_interval = health_check_interval
+        self._connection = None
+        self._lost: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"connects": 0, "failures": 0}
+
+    @property
+    def connected(self) -> bool:
+        return self._connection is not None and not self._connection.is_closed()
+
+    async def start(self) -> None:
+        """
+        接続を維持するタスクを開始する
+        接続できなくても例外にはせず、再接続を続けます（その間ロングポーリングはタイムアウト後にDBを確認します）
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                await self._connect()
+            except Exception as e:
+                self._stats["failures"] += 1
+                logger.warning(f"Failed to start analysis listener: {e}; retrying in {delay:.1f}s")
+                await self._close()
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+                continue
+
+            delay = self.reconnect_delay
+            if self._stats["connects"] > 1:
+                # 切断中の通知は届かないため、待機中のリクエストに結果を確認し直させる
+                self.notifier.notify_all()
+            await self._wait_until_lost()
+            logger.warning(f"Analysis listener connection lost, reconnecting to channel: {self.channel}")
+            await self._close()
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self._lost = asyncio.Event()
+        self._connection = await asyncpg.connect(self.dsn)
+        self._connection.add_termination_listener(self._on_termination)
+        await self._connection.add_listener(self.channel, self._on_notification)
+        self._stats["connects"] += 1
+        logger.info(f"Listening for analysis notifications on channel: {self.channel}")
+
+    async def _wait_until_lost(self) -> None:
+        """切断が通知されるか、定期的な確認に失敗するまで待機する"""
+        while True:
+            try:
+                await asyncio.wait_for(self._lost.wait(), timeout=self.health_check_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self._connection.execute("SELECT 1", timeout=self.health_check_interval)
+            except Exception as e:
+                logger.warning(f"Analysis listener health check failed: {e}")
+                return
+
+    async def _close(self) -> None:
+        connection, self._connection = self._connection, None
+        if connection is None or connection.is_closed():
+            return
+        try:
+            await connection.remove_listener(self.channel, self._on_notification)
+            await connection.close(timeout=5)
+        except Exception as e:
+            logger.warning(f"Failed to close analysis listener: {e}")
+            connection.terminate()
+
+    def _on_termination(self, connection) -> None:
+        if self._lost is not None:
+            self._lost.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """接続状態と接続・接続失敗の回数を取得する"""
+        return {"connected": self.connected, **self._stats}
+
+    def _on_notification(self, connection, pid: int, channel: str, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+            self.notifier.notify(data["session_id"], data["conversation_id"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring malformed analysis notification: {e}")
+
+
+@lru_cache()
+def get_analysis_notifier() -> AnalysisNotifier:
+    """プロセス共通の分析完了通知レジストリを取得する"""
+    return AnalysisNotifier()
+
+
+@lru_cache()
+def get_analysis_listener() -> Optional[PostgresAnalysisListener]:
+    """LISTEN/NOTIFYのリスナーを取得する（ANALYSIS_NOTIFY_BACKENDがpostgresでない場合はNone）"""
+    settings = get_settings()
+    if settings.ANALYSIS_NOTIFY_BACKEND != "postgres":
+        return None
+    dsn = f"postgresql://{settings.DB_USER}:{settings.DB_PASSWORD}@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    return PostgresAnalysisListener(get_analysis_notifier(), dsn)
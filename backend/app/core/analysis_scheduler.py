@@ -0,0 +1,267 @@
+"""
+文法分析のスケジューラ
+
+バックグラウンドの文法分析を上限付きのキューと固定数のワーカーで実行する
+失敗した分析はバックオフ付きでリトライし、会話ごとの状態（queued / running / done / failed）を保持する
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import itertools
+import time
+
+from loguru import logger
+
+from app.config.settings import get_settings
+from app.core.concurrency import PRIORITY_BACKGROUND
+
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+AnalysisJobFunc = Callable[[], Awaitable[Any]]
+AnalysisFailureFunc = Callable[[Exception], Awaitable[Any]]
+
+
+@dataclass
+class AnalysisJob:
+    session_id: str
+    conversation_id: str
+    func: AnalysisJobFunc
+    on_failure: Optional[AnalysisFailureFunc] = None
+    attempts: int = 0
+
+
+@dataclass
+class AnalysisStatus:
+    status: str
+    attempts: int = 0
+    error: Optional[str] = None
+    updated_at: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "updated_at": self.updated_at
+        }
+
+
+class AnalysisScheduler:
+    """
+    文法分析を専用のワーカーで実行するクラス
+    キューが上限に達した場合は新しい分析を受け付けず（バックプレッシャー）、failedとして記録します
+    ワーカーは最初に使われたイベントループ上で起動します
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue_size: int = 100,
+        max_retries: int = 2,
+        retry_base_delay: float = 1.0,
+        max_status_entries: int = 10000
+    ):
+        """
+        Args:
+            workers (int): ワーカー数
+            max_queue_size (int): キューに積める分析の上限
+            max_retries (int): 失敗時のリトライ回数
+            retry_base_delay (float): リトライ間隔の基準（秒）。試行ごとに2倍になる
+            max_status_entries (int): 保持する状態の上限（古いものから破棄）
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.max_queue_size = max_queue_size
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.max_status_entries = max_status_entries
+        self._statuses: "OrderedDict[Tuple[str, str], AnalysisStatus]" = OrderedDict()
+        self._counter = itertools.count()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._accepting = False
+        self._stats = {"submitted": 0, "rejected": 0, "retried": 0, "done": 0, "failed": 0}
+
+    def start(self) -> None:
+        """現在のイベントループでワーカーを起動する（起動済みの場合は何もしない）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        self._loop = loop
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_queue_size)
+        self._tasks = [
+            loop.create_task(self._worker(index), name=f"analysis-worker-{index}")
+            for index in range(self.workers)
+        ]
+        self._accepting = True
+        logger.info(f"Started {self.workers} analysis workers (queue size: {self.max_queue_size})")
+
+    def submit(
+        self,
+        session_id: str,
+        conversation_id: str,
+        func: AnalysisJobFunc,
+        on_failure: Optional[AnalysisFailureFunc] = None,
+        priority: int = PRIORITY_BACKGROUND
+    ) -> str:
+        """
+        分析をキューに積むメソッド
+
+        Args:
+            session_id (str): セッションID
+            conversation_id (str): 書き起こしの会話ID
+            func (AnalysisJobFunc): 分析を実行して結果を保存するコルーチン関数（失敗時は例外を送出する）
+            on_failure (Optional[AnalysisFailureFunc]): リトライ後も失敗した場合に呼ばれるコルーチン関数
+            priority (int): キュー内の優先度（値が小さいほど先に実行される）
+
+        Returns:
+            str: 受け付け後の状態（queued、またはキューが満杯・停止中の場合はfailed）
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # ワーカーが別のイベントループで起動されている（テストなど）場合は作り直す
+            self.start()
+
+        key = (session_id, conversation_id)
+        job = AnalysisJob(session_id=session_id, conversation_id=conversation_id, func=func, on_failure=on_failure)
+        if not self._accepting:
+            self._set_status(key, STATUS_FAILED, error="Analysis scheduler is shutting down")
+            self._stats["rejected"] += 1
+            return STATUS_FAILED
+        try:
+            self._queue.put_nowait((priority, next(self._counter), job))
+        except asyncio.QueueFull:
+            logger.warning(f"Analysis queue is full, dropping analysis for session: {session_id}, conversation_id: {conversation_id}")
+            self._set_status(key, STATUS_FAILED, error="Analysis queue is full")
+            self._stats["rejected"] += 1
+            return STATUS_FAILED
+
+        self._set_status(key, STATUS_QUEUED)
+        self._stats["submitted"] += 1
+        return STATUS_QUEUED
+
+    def get_status(self, session_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """会話の分析状態を取得する（記録がない場合はNone）"""
+        status = self._statuses.get((session_id, conversation_id))
+        return status.to_dict() if status else None
+
+    def get_session_statuses(self, session_id: str) -> Dict[str, Dict[str, Any]]:
+        """セッション内の会話ごとの分析状態を取得する"""
+        return {
+            conversation_id: status.to_dict()
+            for (sid, conversation_id), status in self._statuses.items()
+            if sid == session_id
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """キューの滞留数・ワーカー数と累計の処理件数を取得する"""
+        counts = {STATUS_QUEUED: 0, STATUS_RUNNING: 0}
+        for status in self._statuses.values():
+            if status.status in counts:
+                counts[status.status] += 1
+        return {
+            "workers": len([task for task in self._tasks if not task.done()]),
+            "queue_size": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.max_queue_size,
+            "queued": counts[STATUS_QUEUED],
+            "running": counts[STATUS_RUNNING],
+            **self._stats
+        }
+
+    async def shutdown(self, timeout: float = 30.0) -> None:
+        """
+        新規の受け付けを止め、キューに残っている分析を待ってからワーカーを停止する
+
+        Args:
+            timeout (float): 残りの分析を待つ最大時間（秒）。超えた分はfailedとして記録する
+        """
+        self._accepting = False
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Timed out draining analysis queue ({self._queue.qsize()} pending)")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while not self._queue.empty():
+            _, _, job = self._queue.get_nowait()
+            self._set_status((job.session_id, job.conversation_id), STATUS_FAILED, job.attempts, "Analysis scheduler shut down")
+        for key, status in list(self._statuses.items()):
+            if status.status in (STATUS_QUEUED, STATUS_RUNNING):
+                self._set_status(key, STATUS_FAILED, status.attempts, "Analysis scheduler shut down")
+        logger.info("Stopped analysis workers")
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logger.error(f"Unexpected error in analysis worker {index}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: AnalysisJob) -> None:
+        key = (job.session_id, job.conversation_id)
+        while True:
+            job.attempts += 1
+            self._set_status(key, STATUS_RUNNING, job.attempts)
+            try:
+                await job.func()
+            except Exception as e:
+                if job.attempts <= self.max_retries:
+                    delay = self.retry_base_delay * (2 ** (job.attempts - 1))
+                    logger.warning(
+                        f"Analysis failed for session {job.session_id}, conversation_id {job.conversation_id} "
+                        f"(attempt {job.attempts}), retrying in {delay:.1f}s: {e}"
+                    )
+                    self._stats["retried"] += 1
+                    self._set_status(key, STATUS_QUEUED, job.attempts, str(e))
+                    await asyncio.sleep(delay)
+                    continue
+
+                logger.error(f"Analysis failed for session {job.session_id}, conversation_id {job.conversation_id}: {e}")
+                self._stats["failed"] += 1
+                try:
+                    if job.on_failure is not None:
+                        # 失敗時の保存が終わってから状態を更新する（待機中のクライアントが結果を取り損ねないように）
+                        await job.on_failure(e)
+                finally:
+                    self._set_status(key, STATUS_FAILED, job.attempts, str(e))
+                return
+
+            self._stats["done"] += 1
+            self._set_status(key, STATUS_DONE, job.attempts)
+            return
+
+    def _set_status(self, key: Tuple[str, str], status: str, attempts: int = 0, error: Optional[str] = None) -> None:
+        self._statuses[key] = AnalysisStatus(status=status, attempts=attempts, error=error)
+        self._statuses.move_to_end(key)
+        while len(self._statuses) > self.max_status_entries:
+            self._statuses.popitem(last=False)
+
+
+@lru_cache()
+def get_analysis_scheduler() -> AnalysisScheduler:
+    """プロセス共通の分析スケジューラを取得する"""
+    settings = get_settings()
+    return AnalysisScheduler(
+        workers=settings.ANALYSIS_WORKERS,
+        max_queue_size=settings.ANALYSIS_QUEUE_MAX_SIZE,
+        max_retries=settings.ANALYSIS_MAX_RETRIES,
+        retry_base_delay=settings.ANALYSIS_RETRY_BASE_DELAY
+    )
@@ -0,0 +1,233 @@
+"""
+音声アップロードの取り込み
+
+multipartのリクエストボディを1回だけ読み、音声パートをメモリ上に取り込む。
+読み込みと同時にサイズ上限の確認・SHA-256の計算・WAVヘッダーからの長さ算出を行い、
+一時ファイルを経由せずに単一のバッファを後段のサービスへ渡す
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional
+import hashlib
+import struct
+
+from fastapi import Depends, HTTPException, Request
+
+from app.config.settings import Settings, get_settings
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+AUDIO_FIELD_NAME = "audio_file"
+
+# multipartの境界やパートヘッダーの分だけ音声本体より大きくなることを許容する
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+# OpenAPIにファイルアップロードの形式を示すための定義（Dependsで受け取るため自動生成されない）
+AUDIO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": [AUDIO_FIELD_NAME],
+                    "properties": {AUDIO_FIELD_NAME: {"type": "string", "format": "binary"}}
+                }
+            }
+        }
+    }
+}
+
+
+class UploadTooLargeError(Exception):
+    """アップロードが上限サイズを超えた場合の例外"""
+
+
+@dataclass(frozen=True)
+class AudioUpload:
+    """取り込み済みの音声アップロード"""
+    content: bytes
+    size: int
+    sha256: str
+    filename: Optional[str] = None
+    content_type: Optional[str] = None
+    duration_seconds: Optional[float] = None
+    sample_rate: Optional[int] = None
+    channels: Optional[int] = None
+
+
+class AudioUploadAccumulator:
+    """
+    音声データを逐次受け取り、上限確認・ハッシュ計算・WAVヘッダー解析を行うクラス
+    """
+    _HEADER_PROBE_BYTES = 4096
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._hash = hashlib.sha256()
+        self._header = bytearray()
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        データを追加するメソッド
+
+        Raises:
+            UploadTooLargeError: 上限サイズを超えた場合
+        """
+        if not chunk:
+            return
+        self._size += len(chunk)
+        if self._size > self.max_bytes:
+            raise UploadTooLargeError(f"Audio upload exceeds {self.max_bytes} bytes")
+        self._hash.update(chunk)
+        if len(self._header) < self._HEADER_PROBE_BYTES:
+            self._header.extend(chunk[:self._HEADER_PROBE_BYTES - len(self._header)])
+        self._chunks.append(chunk)
+
+    def finish(self, filename: Optional[str] = None, content_type: Optional[str] = None) -> AudioUpload:
+        """取り込んだデータをAudioUploadとして返すメソッド"""
+        content = self._chunks[0] if len(self._chunks) == 1 else b"".join(self._chunks)
+        self._chunks = []
+        sample_rate, channels, duration = probe_wav(bytes(self._header), self._size)
+        return AudioUpload(
+            content=content,
+            size=self._size,
+            sha256=self._hash.hexdigest(),
+            filename=filename,
+            content_type=content_type,
+            duration_seconds=duration,
+            sample_rate=sample_rate,
+            channels=channels
+        )
+
+
+def probe_wav(header: bytes, total_size: int):
+    """
+    WAV（RIFF）ヘッダーからサンプルレート・チャンネル数・長さを求める
+
+    Args:
+        header (bytes): ファイル先頭のバイト列
+        total_size (int): ファイル全体のサイズ
+
+    Returns:
+        tuple: (sample_rate, channels, duration_seconds)。WAVでない場合は全てNone
+    """
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None, None, None
+
+    sample_rate = channels = byte_rate = None
+    offset = 12
+    while offset + 8 <= len(header):
+        chunk_id = header[offset:offset + 4]
+        chunk_size = struct.unpack("<I", header[offset + 4:offset + 8])[0]
+        body = offset + 8
+        if chunk_id == b"fmt " and body + 16 <= len(header):
+            _, channels, sample_rate, byte_rate = struct.unpack("<HHII", header[body:body + 12])
+        elif chunk_id == b"data":
+            if not byte_rate:
+                break
+            # ストリーミング録音ではdataチャンクのサイズが未確定（0や0xFFFFFFFF）のことがある
+            available = total_size - body
+            data_size = chunk_size if 0 < chunk_size <= available else available
+            return sample_rate, channels, data_size / byte_rate
+        offset = body + chunk_size + (chunk_size & 1)
+    return sample_rate, channels, None
+
+
+async def read_audio_upload(request: Request, max_bytes: int, field_name: str = AUDIO_FIELD_NAME) -> AudioUpload:
+    """
+    リクエストボディをストリーミングで読み、指定フィールドの音声を取り込む
+
+    Args:
+        request (Request): multipart/form-dataのリクエスト
+        max_bytes (int): 音声データの上限バイト数
+        field_name (str): 音声ファイルのフィールド名
+
+    Returns:
+        AudioUpload: 取り込んだ音声
+
+    Raises:
+        UploadTooLargeError: 上限サイズを超えた場合
+        ValueError: multipartでない場合、または音声フィールドが無い・空の場合
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise ValueError("Expected multipart/form-data request")
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        # ボディを読む前に拒否する
+        raise UploadTooLargeError(f"Audio upload exceeds {max_bytes} bytes")
+
+    accumulator = AudioUploadAccumulator(max_bytes)
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "is_audio": False, "found": False}
+    meta = {"filename": None, "content_type": None}
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["is_audio"] = False
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        if disposition.get(b"name", b"").decode("latin-1") == field_name and not state["found"]:
+            state["is_audio"] = True
+            state["found"] = True
+            filename = disposition.get(b"filename")
+            meta["filename"] = filename.decode("utf-8", "replace") if filename else None
+            part_type = state["headers"].get(b"content-type")
+            meta["content_type"] = part_type.decode("latin-1") if part_type else None
+
+    def on_part_data(data, start, end):
+        if state["is_audio"]:
+            accumulator.feed(bytes(data[start:end]))
+
+    parser = MultipartParser(params[b"boundary"], callbacks={
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+    async for chunk in request.stream():
+        parser.write(chunk)
+    parser.finalize()
+
+    if not state["found"]:
+        raise ValueError(f"Missing '{field_name}' field")
+    upload = accumulator.finish(filename=meta["filename"], content_type=meta["content_type"])
+    if upload.size == 0:
+        raise ValueError("Empty audio data")
+    return upload
+
+
+async def ingest_audio_upload(request: Request, settings: Settings = Depends(get_settings)) -> AudioUpload:
+    """
+    音声アップロードを取り込むFastAPIの依存関数
+
+    Raises:
+        HTTPException: 上限超過の場合は413、形式が不正な場合は400
+    """
+    try:
+        return await read_audio_upload(request, max_bytes=settings.MAX_AUDIO_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,101 @@
+"""
+サーキットブレーカー
+
+依存先（データベースなど）の呼び出しが続けて失敗したときに呼び出しを止め、一定間隔で1件だけ試して復旧を確認する
+    closed: 通常どおり呼び出す
+    open: 呼び出さない（probe_interval 経過後、次の呼び出しを試行としてhalf_openに移る）
+    half_open: 試行中の1件の結果を待つ（成功すればclosed、失敗すればopenに戻る）
+"""
+
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+import time
+
+from loguru import logger
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    連続した失敗の回数で開閉するサーキットブレーカー
+    イベントループ内で使う前提のため、ロックは使いません
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        probe_interval: float = 10.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            name (str): ログに出す依存先の名前
+            failure_threshold (int): openにする連続失敗回数
+            probe_interval (float): openの間、復旧を試すまでの間隔（秒）
+            clock (Callable[[], float]): 現在時刻（テスト用）
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval = probe_interval
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def state(self) -> CircuitState:
+        return self._state
+
+    def allow_request(self) -> bool:
+        """
+        呼び出してよいか判定する
+        openで probe_interval が経過している場合はhalf_openに移り、その呼び出しだけを許可する
+        """
+        if self._state is CircuitState.CLOSED:
+            return True
+        if self._state is CircuitState.OPEN and self._clock() - self._opened_at >= self.probe_interval:
+            self._state = CircuitState.HALF_OPEN
+            self._stats["probes"] += 1
+            logger.info(f"Circuit {self.name} is half-open, probing")
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def record_success(self) -> None:
+        if self._state is not CircuitState.CLOSED:
+            logger.info(f"Circuit {self.name} closed")
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state is CircuitState.HALF_OPEN or (
+            self._state is CircuitState.CLOSED and self._failures >= self.failure_threshold
+        ):
+            self._state = CircuitState.OPEN
+            self._opened_at = self._clock()
+            self._stats["opened"] += 1
+            logger.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+        elif self._state is CircuitState.OPEN:
+            # open中に他の経路で失敗した場合も、次の試行までの間隔を延ばす
+            self._opened_at = self._clock()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """状態と連続失敗回数、open・拒否・試行の回数を取得する"""
+        retry_in = None
+        if self._state is CircuitState.OPEN:
+            retry_in = max(0.0, self.probe_interval - (self._clock() - self._opened_at))
+        return {
+            "state": self._state.value,
+            "consecutive_failures": self._failures,
+            "retry_in_seconds": retry_in,
+            **self._stats
+        }
@@ -0,0 +1,185 @@
+"""
+外部APIクライアントのレジストリ
+
+Gemini / Cloud Text-to-Speech / Cloud Speech-to-Text のクライアントをプロセスごとに1つだけ作成し、
+リクエスト間で共有する。チャネル確立・TLSハンドシェイク・認証情報の読み込みをリクエストごとに
+繰り返さないようにするためのもの
+"""
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Optional
+import threading
+import time
+
+import grpc
+from google import genai
+from google.cloud import speech, texttospeech
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+GEMINI = "gemini"
+TEXT_TO_SPEECH = "text_to_speech"
+SPEECH = "speech"
+
+
+def _grpc_channel(client: Any) -> Optional[grpc.Channel]:
+    """クライアントが保持するgRPCチャネル（HTTPで通信するクライアントの場合はNone）"""
+    channel = getattr(getattr(client, "transport", None), "grpc_channel", None)
+    return channel if isinstance(channel, grpc.Channel) else None
+
+
+class ClientRegistry:
+    """
+    クライアントを遅延生成して共有するレジストリ
+    生成はスレッドセーフで、同じ名前のクライアントは1度しか作成されません
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], Any]] = {
+            GEMINI: lambda: genai.Client(api_key=get_settings().GEMINI_API_KEY),
+            TEXT_TO_SPEECH: lambda: texttospeech.TextToSpeechClient(),
+            SPEECH: lambda: speech.SpeechClient(),
+        }
+        self._clients: Dict[str, Any] = {}
+        self._channels: Dict[str, grpc.Channel] = {}
+        self._created_at: Dict[str, float] = {}
+        self._acquisitions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Any:
+        """
+        名前に対応するクライアントを取得する（未作成の場合は作成する）
+
+        Args:
+            name (str): クライアント名（gemini / text_to_speech / speech）
+
+        Returns:
+            Any: 共有クライアント
+
+        Raises:
+            KeyError: 未知のクライアント名の場合
+        """
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    started = time.perf_counter()
+                    client = self._factories[name]()
+                    self._clients[name] = client
+                    channel = _grpc_channel(client)
+                    if channel is not None:
+                        self._channels[name] = channel
+                    self._created_at[name] = time.time()
+                    logger.info(f"Created shared {name} client in {(time.perf_counter() - started) * 1000:.1f} ms")
+        self._acquisitions[name] = self._acquisitions.get(name, 0) + 1
+        return client
+
+    def gemini(self) -> genai.Client:
+        """共有Geminiクライアントを取得する"""
+        return self.get(GEMINI)
+
+    def text_to_speech(self) -> texttospeech.TextToSpeechClient:
+        """共有Text-to-Speechクライアントを取得する"""
+        return self.get(TEXT_TO_SPEECH)
+
+    def speech(self) -> speech.SpeechClient:
+        """共有Speech-to-Textクライアントを取得する"""
+        return self.get(SPEECH)
+
+    def warm_up(self, names: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Dict[str, bool]:
+        """
+        クライアントを事前に作成し、gRPCチャネルの接続を開始する
+        起動時に呼び出すことで、最初のリクエストが接続確立を待たないようにします
+
+        Args:
+            names (Optional[Iterable[str]]): 対象のクライアント名（省略時は全て）
+            timeout (Optional[float]): gRPCチャネルの接続待ちタイムアウト（秒）
+
+        Returns:
+            Dict[str, bool]: クライアント名ごとの成否
+        """
+        if timeout is None:
+            timeout = get_settings().CLIENT_WARMUP_TIMEOUT
+        results = {}
+        for name in names or self._factories.keys():
+            try:
+                client = self.get(name)
+                self._acquisitions[name] -= 1  # ウォームアップは利用回数に含めない
+                channel = self._channels.get(name)
+                if channel is not None:
+                    grpc.channel_ready_future(channel).result(timeout=timeout)
+                results[name] = True
+            except Exception as e:
+                logger.warning(f"Failed to warm up {name} client: {e}")
+                results[name] = False
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        共有クライアントの状態を取得する
+
+        Returns:
+            Dict[str, Any]: 共有クライアント数、開いているgRPCチャネル数とクライアントごとの情報
+        """
+        now = time.time()
+        clients = {
+            name: {
+                "transport": "grpc" if name in self._channels else "http",
+                "created_at": self._created_at[name],
+                "uptime_seconds": round(now - self._created_at[name], 1),
+                "acquisitions": self._acquisitions.get(name, 0),
+            }
+            for name in self._clients
+        }
+        return {"live_clients": len(self._clients), "live_channels": len(self._channels), "clients": clients}
+
+    async def close_all(self) -> None:
+        """全ての共有クライアントのチャネル・HTTPクライアントを閉じる"""
+        with self._lock:
+            clients = list(self._clients.items())
+            self._clients.clear()
+            self._channels.clear()
+            self._created_at.clear()
+            self._acquisitions.clear()
+        for name, client in clients:
+            try:
+                transport = getattr(client, "transport", None)
+                if transport is not None:
+                    transport.close()
+                else:
+                    await self._close_http_client(client)
+                logger.info(f"Closed shared {name} client")
+            except Exception as e:
+                logger.warning(f"Failed to close {name} client: {e}")
+
+    @staticmethod
+    async def _close_http_client(client: Any) -> None:
+        """GeminiクライアントのHTTP接続（同期・非同期の両方）を閉じる"""
+        aio = getattr(client, "aio", None)
+        if callable(getattr(aio, "aclose", None)):
+            await aio.aclose()
+        else:
+            # aclose() がないSDKのバージョンでは、内部の非同期HTTPクライアントを直接閉じる
+            async_httpx_client = getattr(getattr(client, "_api_client", None), "_async_httpx_client", None)
+            if async_httpx_client is not None:
+                await async_httpx_client.aclose()
+        httpx_client = getattr(getattr(client, "_api_client", None), "_httpx_client", None)
+        if httpx_client is not None:
+            httpx_client.close()
+
+    def reset(self) -> None:
+        """チャネルを閉じずに登録済みクライアントを破棄する（テスト用）"""
+        with self._lock:
+            self._clients.clear()
+            self._channels.clear()
+            self._created_at.clear()
+            self._acquisitions.clear()
+
+
+@lru_cache()
+def get_client_registry() -> ClientRegistry:
+    """プロセス共有のクライアントレジストリを取得する"""
+    return ClientRegistry()
@@ -0,0 +1,106 @@
+"""
+同時実行数の制御
+
+外部APIへの同時リクエスト数をイベントループ単位で制限する
+枠が空くのを待っている処理は優先度順（値が小さいほど優先）に実行される
+"""
+
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import AsyncIterator, List
+import asyncio
+import heapq
+import itertools
+import weakref
+
+from app.config.settings import get_settings
+
+
+# 対話中のリクエスト（書き起こし・返事）と、バックグラウンドの文法分析の優先度
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class _PrioritySemaphore:
+    """待機中の処理を優先度順に起こすセマフォ（同じ優先度では先着順）"""
+
+    def __init__(self, limit: int):
+        self._available = limit
+        self._waiters: List[list] = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority: int) -> None:
+        if self._available > 0 and not self._waiters:
+            self._available -= 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [priority, next(self._counter), future])
+        try:
+            await future
+        except asyncio.CancelledError:
+            # 枠を受け取った直後にキャンセルされた場合は次の待機者に譲る
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._available += 1
+
+
+class ConcurrencyLimiter:
+    """
+    同時実行数の上限を管理するクラス
+    セマフォはイベントループごとに作成されるため、テストや複数ループ環境でも安全に使えます
+    """
+
+    def __init__(self, limit: int):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        self.limit = limit
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _PrioritySemaphore]" = weakref.WeakKeyDictionary()
+        self._in_flight = 0
+
+    def _semaphore(self) -> _PrioritySemaphore:
+        loop = asyncio.get_running_loop()
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = _PrioritySemaphore(self.limit)
+            self._semaphores[loop] = semaphore
+        return semaphore
+
+    @property
+    def in_flight(self) -> int:
+        """現在実行中の処理数"""
+        return self._in_flight
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[None]:
+        """
+        実行枠を1つ確保するコンテキストマネージャ
+
+        Args:
+            priority (int): 枠待ちの優先度（値が小さいほど先に実行される）
+
+        Yields:
+            None: 枠を確保している間
+        """
+        semaphore = self._semaphore()
+        await semaphore.acquire(priority)
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            semaphore.release()
+
+
+@lru_cache()
+def get_gemini_limiter() -> ConcurrencyLimiter:
+    """Gemini API呼び出し用のリミッターを取得する"""
+    return ConcurrencyLimiter(get_settings().GEMINI_MAX_CONCURRENCY)
@@ -0,0 +1,110 @@
+"""
+DBコネクションプールの計測
+
+プールからの接続の取得にかかった時間（空きがない場合の待ち時間を含む）とタイムアウトを記録し、
+使用中・待機中・オーバーフローの接続数と合わせて返す。プールサイズを実際の負荷に合わせて調整するためのもの
+"""
+
+from collections import deque
+from functools import lru_cache
+from typing import Any, Deque, Dict, Optional
+import threading
+import time
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.config.settings import get_settings
+
+
+class PoolMetrics:
+    """接続の取得時間を直近の一定件数分保持し、平均・p95・最大を集計するクラス"""
+
+    def __init__(self, window: int = 1000):
+        """
+        Args:
+            window (int): 集計に使う直近の取得件数
+        """
+        self._waits: Deque[float] = deque(maxlen=window)
+        self._checkouts = 0
+        self._timeouts = 0
+        self._max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record_checkout(self, seconds: float) -> None:
+        with self._lock:
+            self._waits.append(seconds)
+            self._checkouts += 1
+            self._max_wait = max(self._max_wait, seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self._timeouts += 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._waits.clear()
+            self._checkouts = 0
+            self._timeouts = 0
+            self._max_wait = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """累計の取得数・タイムアウト数と、直近の取得時間（ミリ秒）を取得する"""
+        with self._lock:
+            waits = sorted(self._waits)
+            checkouts, timeouts, max_wait = self._checkouts, self._timeouts, self._max_wait
+        return {
+            "checkouts": checkouts,
+            "timeouts": timeouts,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 3) if waits else 0.0,
+            "wait_ms_p95": round(waits[min(int(len(waits) * 0.95), len(waits) - 1)] * 1000, 3) if waits else 0.0,
+            "wait_ms_max": round(max_wait * 1000, 3)
+        }
+
+
+@lru_cache()
+def get_pool_metrics() -> PoolMetrics:
+    """プロセス共通のプール計測を取得する"""
+    return PoolMetrics()
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """接続の取得時間とタイムアウトを PoolMetrics に記録する非同期エンジン用のプール"""
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            get_pool_metrics().record_timeout()
+            raise
+        get_pool_metrics().record_checkout(time.perf_counter() - started)
+        return connection
+
+
+def get_pool_stats(pool: Any, max_overflow: Optional[int] = None) -> Dict[str, Any]:
+    """
+    プールの現在の接続数と取得時間の集計を取得する
+
+    Args:
+        pool (Any): エンジンのプール
+        max_overflow (Optional[int]): プールの作成時に指定した max_overflow（省略時は DB_MAX_OVERFLOW）
+
+    Returns:
+        Dict[str, Any]: size（常時保持する数）/ checked_out（使用中）/ idle（プール内で待機中）/
+            overflow（size を超えて作成された数）/ max_overflow と取得時間の集計
+    """
+    stats: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            # 未接続の枠は負の値になるため、実際に作成された分だけを数える
+            "overflow": max(pool.overflow(), 0),
+            # プールは上限を公開していないため、作成時に渡した設定値を返す
+            "max_overflow": get_settings().DB_MAX_OVERFLOW if max_overflow is None else max_overflow,
+            "timeout": pool.timeout()
+        })
+    stats.update(get_pool_metrics().get_stats())
+    return stats
@@ -0,0 +1,101 @@
+"""
+ステージパイプライン
+
+依存関係を明示したステージ群を、依存が解決したものから並行に実行する
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio
+import time
+
+from loguru import logger
+
+
+StageFunc = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+@dataclass
+class Stage:
+    name: str
+    func: StageFunc
+    depends_on: Tuple[str, ...] = field(default_factory=tuple)
+
+
+class StagePipeline:
+    """
+    依存関係グラフに沿ってステージを並行実行するクラス
+    各ステージは依存するステージの結果（ステージ名をキーとした辞書）を受け取ります
+    """
+
+    def __init__(self, name: str = "pipeline"):
+        self.name = name
+        self._stages: Dict[str, Stage] = {}
+        self.timings: Dict[str, Dict[str, float]] = {}
+
+    def add_stage(self, name: str, func: StageFunc, depends_on: Tuple[str, ...] = ()) -> "StagePipeline":
+        """
+        ステージを追加するメソッド
+        依存先は追加済みのステージである必要があるため、循環依存は構造上発生しません
+
+        Args:
+            name (str): ステージ名
+            func (StageFunc): 依存ステージの結果を受け取って実行するコルーチン関数
+            depends_on (Tuple[str, ...]): 依存するステージ名
+
+        Returns:
+            StagePipeline: メソッドチェーン用に自身を返す
+
+        Raises:
+            ValueError: ステージ名が重複している場合、または未登録のステージに依存している場合
+        """
+        if name in self._stages:
+            raise ValueError(f"Duplicate stage: {name}")
+        unknown = [dep for dep in depends_on if dep not in self._stages]
+        if unknown:
+            raise ValueError(f"Stage '{name}' depends on unknown stages: {unknown}")
+        self._stages[name] = Stage(name=name, func=func, depends_on=tuple(depends_on))
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        全てのステージを実行するメソッド
+        いずれかのステージが失敗した場合は残りのステージをキャンセルして例外を送出します
+
+        Returns:
+            Dict[str, Any]: ステージ名をキーとした実行結果
+        """
+        started = time.perf_counter()
+        tasks: Dict[str, asyncio.Task] = {}
+        self.timings = {}
+
+        async def run_stage(stage: Stage) -> Any:
+            if stage.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in stage.depends_on))
+            inputs = {dep: tasks[dep].result() for dep in stage.depends_on}
+            stage_started = time.perf_counter()
+            try:
+                return await stage.func(inputs)
+            finally:
+                stage_finished = time.perf_counter()
+                self.timings[stage.name] = {
+                    "start_ms": round((stage_started - started) * 1000, 1),
+                    "end_ms": round((stage_finished - started) * 1000, 1),
+                    "duration_ms": round((stage_finished - stage_started) * 1000, 1),
+                }
+
+        for stage in self._stages.values():
+            tasks[stage.name] = asyncio.create_task(run_stage(stage), name=f"{self.name}:{stage.name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        self.timings["total"] = {"duration_ms": round((time.perf_counter() - started) * 1000, 1)}
+        logger.debug(f"{self.name} timings: {self.timings}")
+        return {name: task.result() for name, task in tasks.items()}
+
@@ -1,9 +1,29 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 from .api.transcription import router as transcription_router
 from .api.sessions import router as sessions_router
+from .api.internal import router as internal_router
 from .config.settings import Settings, get_settings
+from .config.database import async_engine
+from .core.clients import get_client_registry
+from .core.analysis_scheduler import get_analysis_scheduler
+from .core.analysis_notifier import get_analysis_listener
+from .services.text2speech_service import TextToSpeechServiceFactory
+from .services.history_summarizer import get_history_summarizer
+from .services.web_scraper_service import WebScraperServiceFactory
+from .prompts.registry import get_prompt_registry
+
+def _prewarm_tts_cache(settings: Settings) -> None:
+    """定型フレーズを事前に音声合成してキャッシュに載せる"""
+    try:
+        with open(settings.TTS_CACHE_PREWARM_FILE, "r", encoding="utf-8") as f:
+            phrases = [line.strip() for line in f if line.strip()]
+        TextToSpeechServiceFactory.create().prewarm(phrases, settings.LANGUAGE_CODE)
+    except Exception as e:
+        logger.warning(f"Failed to prewarm TTS cache: {e}")
+
 
 def create_app() -> FastAPI:
     settings = get_settings()
@@ -25,14 +45,39 @@ def create_app() -> FastAPI:
     # ルーターの登録
     app.include_router(transcription_router, prefix="/api/v1")
     app.include_router(sessions_router, prefix="/api/v1")
+    app.include_router(internal_router, prefix="/api/v1")
 
     @app.on_event("startup")
     async def startup_event():
         logger.info(f"Starting {settings.APP_NAME}")
+        # テンプレートは起動時に1度だけ読み込み、リクエストごとにファイルを読まない
+        get_prompt_registry()
+        if settings.CLIENT_WARMUP_ON_STARTUP:
+            # クライアント生成と認証情報の読み込みはブロッキングなのでスレッドで実行
+            results = await asyncio.to_thread(get_client_registry().warm_up)
+            logger.info(f"Warmed up shared clients: {results}")
+        if settings.TTS_CACHE_PREWARM_FILE:
+            await asyncio.to_thread(_prewarm_tts_cache, settings)
+        get_analysis_scheduler().start()
+        listener = get_analysis_listener()
+        if listener is not None:
+            # 接続はバックグラウンドで維持する（接続できない間もロングポーリングはタイムアウト後にDBを確認する）
+            await listener.start()
 
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info(f"Shutting down {settings.APP_NAME}")
+        # 実行中・待機中の文法分析を終えてからクライアントを閉じる
+        await get_analysis_scheduler().shutdown(timeout=settings.ANALYSIS_SHUTDOWN_TIMEOUT)
+        listener = get_analysis_listener()
+        if listener is not None:
+            await listener.stop()
+        summarizer = get_history_summarizer()
+        if summarizer is not None:
+            await summarizer.shutdown()
+        await WebScraperServiceFactory.create().aclose()
+        await get_client_registry().close_all()
+        await async_engine.dispose()
 
     return app
 
@@ -1,3 +1,3 @@
-from .database_models import Session, Conversation
+from .database_models import Session, Conversation, WebpageDocument
 
-__all__ = ["Session", "Conversation"]
+__all__ = ["Session", "Conversation", "WebpageDocument"]
@@ -1,9 +1,10 @@
-from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON
+from sqlalchemy import Column, String, Integer, DateTime, Text, ForeignKey, JSON, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.config.database import Base
 import uuid
+import zlib
 
 
 class Session(Base):
@@ -13,18 +14,29 @@ class Session(Base):
     name = Column(String(100), nullable=True)  # ユーザー名（シンプルな文字列）
     title = Column(Text, nullable=False)
     url = Column(Text, nullable=True)
+    last_conversation_number = Column(Integer, nullable=False, default=0, server_default="0")  # 採番済みの最後の会話番号
+    history_summary = Column(Text, nullable=True)  # 古い会話履歴の要約
+    history_summary_turns = Column(Integer, nullable=False, default=0, server_default="0")  # 要約に含めた履歴の件数
+    webpage_document_id = Column(UUID(as_uuid=True), ForeignKey("webpage_documents.id", ondelete="SET NULL"), nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
-    # リレーションシップ
-    conversations = relationship("Conversation", back_populates="session", cascade="all, delete-orphan")
+    # リレーションシップ（会話の削除はDBのON DELETE CASCADEに任せる）
+    conversations = relationship("Conversation", back_populates="session", cascade="all, delete-orphan", passive_deletes=True)
+    webpage_document = relationship("WebpageDocument")
+
+    __table_args__ = (
+        # セッション一覧（nameで絞り込み、updated_at・idの降順のキーセットページング）用
+        Index("ix_sessions_name_updated_at_id", "name", updated_at.desc(), id.desc()),
+        Index("ix_sessions_updated_at_id", updated_at.desc(), id.desc()),
+    )
 
 
 class Conversation(Base):
     __tablename__ = "conversations"
     
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id"), nullable=False)
+    session_id = Column(UUID(as_uuid=True), ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
     conversation_number = Column(Integer, nullable=False)
     transcription = Column(Text, nullable=True)
     analysis_type = Column(String(20), nullable=False)  # 'transcript' or 'audio'
@@ -39,4 +51,36 @@ class Conversation(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # リレーションシップ
-    session = relationship("Session", back_populates="conversations") 
\ No newline at end of file
+    session = relationship("Session", back_populates="conversations")
+
+    __table_args__ = (
+        # セッション内の会話一覧・会話番号での検索を兼ねる
+        UniqueConstraint("session_id", "conversation_number", name="uq_conversations_session_id_conversation_number"),
+    ) 
+
+
+class WebpageDocument(Base):
+    """スクレイピングしたWebページの本文（同じ内容は複数のセッションで共有する）"""
+    __tablename__ = "webpage_documents"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    content_hash = Column(String(64), nullable=False)  # 本文のSHA-256
+    url = Column(Text, nullable=False)  # 最後に取得したURL
+    title = Column(Text, nullable=True)
+    content = Column(LargeBinary, nullable=False)  # zlibで圧縮した本文（UTF-8）
+    content_length = Column(Integer, nullable=False)  # 圧縮前の文字数
+    content_type = Column(String(100), nullable=True)
+    etag = Column(Text, nullable=True)
+    last_modified = Column(Text, nullable=True)
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("content_hash", name="uq_webpage_documents_content_hash"),
+        # 同じURLを取得済みかの確認（新しいもの優先）用
+        Index("ix_webpage_documents_url_fetched_at", "url", fetched_at.desc()),
+    )
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.content).decode("utf-8")
@@ -52,11 +52,38 @@ class ConversationResponse(BaseModel):
         from_attributes = True
 
 
+class SessionListItem(BaseModel):
+    """一覧用のセッション（fieldsで指定されなかった項目はレスポンスに含めない）"""
+    id: UUID
+    name: Optional[str] = None
+    title: Optional[str] = None
+    url: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class ConversationListItem(BaseModel):
+    """一覧用の会話（fieldsで指定されなかった項目はレスポンスに含めない）"""
+    id: UUID
+    conversation_number: int
+    session_id: Optional[UUID] = None
+    transcription: Optional[str] = None
+    analysis_type: Optional[str] = None
+    advice: Optional[str] = Field(None, description="音声分析用のアドバイス")
+    speechflaws: Optional[str] = Field(None, description="発話の欠点")
+    nuanceinquiry: Optional[Union[List[str], str]] = Field(None, description="ニュアンスの質問")
+    alternativeexpressions: Optional[Union[List[List[str]], str]] = Field(None, description="代替表現")
+    suggestion: Optional[Union[List[str], str]] = Field(None, description="提案")
+    created_at: Optional[datetime] = None
+
+
 class SessionListResponse(BaseModel):
-    sessions: List[SessionResponse] = Field(..., description="セッション一覧")
-    total: int = Field(..., description="総数")
+    sessions: List[SessionListItem] = Field(..., description="セッション一覧")
+    total: Optional[int] = Field(None, description="総数（include_total=falseの場合は省略）")
+    next_cursor: Optional[str] = Field(None, description="次のページのカーソル（最後のページの場合はNone）")
 
 
 class ConversationListResponse(BaseModel):
-    conversations: List[ConversationResponse] = Field(..., description="会話履歴")
-    total: int = Field(..., description="総数") 
\ No newline at end of file
+    conversations: List[ConversationListItem] = Field(..., description="会話履歴")
+    total: Optional[int] = Field(None, description="総数（include_total=falseの場合は省略）")
+    next_cursor: Optional[str] = Field(None, description="次のページのカーソル（最後のページの場合はNone）") 
\ No newline at end of file
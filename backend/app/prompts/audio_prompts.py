@@ -1,149 +1,104 @@
-from pathlib import Path
+from typing import Optional
 from loguru import logger
+from app.prompts.registry import PromptRegistry, get_prompt_registry
 
-class AudioPrompt:
+class RegisteredPrompt:
     """
-    音声用プロンプトクラス
-    音声データの分析に特化したプロンプトを管理します
+    レジストリのテンプレートを使うプロンプトの基底クラス
+    テンプレートは起動時に読み込まれたものを共有し、生成時にファイルを読みません
     """
-    def __init__(self):
+    template_name = ""
+
+    def __init__(self, registry: Optional[PromptRegistry] = None):
         """
         初期化メソッド
-        テンプレートファイルからプロンプトを読み込みます
+
+        Args:
+            registry (Optional[PromptRegistry]): テンプレートのレジストリ（省略時はプロセス共通のもの）
         """
-        try:
-            # テンプレートファイルのパスを取得
-            template_path = Path(__file__).parent / "templates" / "audio.txt"
-            
-            # テンプレートファイルを読み込み
-            with open(template_path, "r", encoding="utf-8") as f:
-                self.template = f.read()
-            
-        except Exception as e:
-            logger.error(f"Error loading prompt template: {e}")
-            raise
+        self.registry = registry or get_prompt_registry()
+
+    @property
+    def template(self) -> str:
+        """テンプレートの本文（ホットリロード時は最新の内容）"""
+        return self.registry.get(self.template_name).text
 
     def format(self, **kwargs) -> str:
         """
         プロンプトをフォーマットするメソッド
-        
+
         Returns:
             str: フォーマットされたプロンプト
         """
         try:
-            return self.template
+            return self.registry.get(self.template_name).format(**kwargs)
         except Exception as e:
-            logger.error(f"Unexpected error formatting prompt: {e}")
+            logger.error(f"Unexpected error formatting {self.template_name} prompt: {e}")
             raise
 
-class AudioImmediatePrompt:
+class AudioPrompt(RegisteredPrompt):
+    """
+    音声用プロンプトクラス
+    音声データの分析に特化したプロンプトを管理します
+    """
+    template_name = "audio"
+
+class AudioImmediatePrompt(RegisteredPrompt):
     """
     即座レスポンス用プロンプトクラス
     書き起こしと返事のみに特化したプロンプトを管理します
     """
-    def __init__(self):
-        """
-        初期化メソッド
-        テンプレートファイルからプロンプトを読み込みます
-        """
-        try:
-            # テンプレートファイルのパスを取得
-            template_path = Path(__file__).parent / "templates" / "audio_immediate.txt"
-            
-            # テンプレートファイルを読み込み
-            with open(template_path, "r", encoding="utf-8") as f:
-                self.template = f.read()
-            
-        except Exception as e:
-            logger.error(f"Error loading immediate prompt template: {e}")
-            raise
+    template_name = "audio_immediate"
 
-    def format(self, **kwargs) -> str:
-        """
-        プロンプトをフォーマットするメソッド
-        
-        Returns:
-            str: フォーマットされたプロンプト
-        """
-        try:
-            return self.template
-        except Exception as e:
-            logger.error(f"Unexpected error formatting immediate prompt: {e}")
-            raise
-
-class TranscriptAnalysisPrompt:
+class TranscriptAnalysisPrompt(RegisteredPrompt):
     """
     文法分析用プロンプトクラス
     書き起こしテキストの分析に特化したプロンプトを管理します
     """
-    def __init__(self):
-        """
-        初期化メソッド
-        テンプレートファイルからプロンプトを読み込みます
-        """
-        try:
-            # テンプレートファイルのパスを取得
-            template_path = Path(__file__).parent / "templates" / "transcript_analysis.txt"
-            
-            # テンプレートファイルを読み込み
-            with open(template_path, "r", encoding="utf-8") as f:
-                self.template = f.read()
-            
-        except Exception as e:
-            logger.error(f"Error loading analysis prompt template: {e}")
-            raise
+    template_name = "transcript_analysis"
 
     def format(self, transcription: str, **kwargs) -> str:
         """
         プロンプトをフォーマットするメソッド
-        
+
         Args:
             transcription (str): 分析対象の書き起こしテキスト
-            
+
         Returns:
             str: フォーマットされたプロンプト
         """
-        try:
-            if not transcription:
-                raise ValueError("transcription parameter is required")
-            
-            return self.template.format(transcription=transcription)
-        except Exception as e:
-            logger.error(f"Unexpected error formatting analysis prompt: {e}")
-            raise
+        if not transcription:
+            logger.error("Unexpected error formatting analysis prompt: transcription parameter is required")
+            raise ValueError("transcription parameter is required")
+        return super().format(transcription=transcription)
 
 
-class AudioAnalysisPrompt:
+class AudioAnalysisPrompt(RegisteredPrompt):
     """
-    即座レスポンス用プロンプトクラス
-    書き起こしと返事のみに特化したプロンプトを管理します
+    音声分析用プロンプトクラス
+    発話の文法・表現のアドバイスに特化したプロンプトを管理します
     """
-    def __init__(self):
-        """
-        初期化メソッド
-        テンプレートファイルからプロンプトを読み込みます
-        """
-        try:
-            # テンプレートファイルのパスを取得
-            template_path = Path(__file__).parent / "templates" / "audio_analysis.txt"
-            
-            # テンプレートファイルを読み込み
-            with open(template_path, "r", encoding="utf-8") as f:
-                self.template = f.read()
-            
-        except Exception as e:
-            logger.error(f"Error loading immediate prompt template: {e}")
-            raise
+    template_name = "audio_analysis"
 
-    def format(self, **kwargs) -> str:
+class HistorySummaryPrompt(RegisteredPrompt):
+    """
+    会話履歴の要約用プロンプトクラス
+    これまでの要約に古くなった会話を畳み込むためのプロンプトを管理します
+    """
+    template_name = "history_summary"
+
+    def format(self, summary: str, turns: str, **kwargs) -> str:
         """
         プロンプトをフォーマットするメソッド
-        
+
+        Args:
+            summary (str): これまでの要約（初回は空文字）
+            turns (str): 要約に畳み込む会話
+
         Returns:
             str: フォーマットされたプロンプト
         """
-        try:
-            return self.template
-        except Exception as e:
-            logger.error(f"Unexpected error formatting immediate prompt: {e}")
-            raise
\ No newline at end of file
+        if not turns:
+            logger.error("Unexpected error formatting history summary prompt: turns parameter is required")
+            raise ValueError("turns parameter is required")
+        return super().format(summary=summary or "(none)", turns=turns)
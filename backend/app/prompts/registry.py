@@ -0,0 +1,143 @@
+"""
+プロンプトテンプレートのレジストリ
+
+templates/*.txt を1度だけ読み込み、差し込むフィールドを事前に解析した変更不可のオブジェクトとして共有する。
+ホットリロードを有効にした場合（DEBUG時）は、取得のたびにファイルの更新時刻を確認し、変更されたテンプレートを読み直す
+"""
+
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from string import Formatter
+from typing import Any, Dict, Tuple
+import os
+import threading
+
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+TEMPLATES_DIR = Path(__file__).parent / "templates"
+
+# str.format でフィールドを差し込むテンプレート（それ以外はファイルの内容をそのまま使う）
+FORMATTED_TEMPLATES = frozenset({"transcript_analysis", "history_summary"})
+
+
+@dataclass(frozen=True)
+class PromptTemplate:
+    """読み込み済みのテンプレート"""
+    name: str
+    text: str
+    fields: Tuple[str, ...]  # 差し込むフィールド（空の場合はテキストをそのまま使う）
+    mtime_ns: int
+    formatted: bool = False
+
+    def format(self, **kwargs) -> str:
+        """
+        フィールドを差し込んだプロンプトを返す
+
+        Raises:
+            ValueError: 必要なフィールドが指定されていない場合
+        """
+        if not self.formatted:
+            return self.text
+        missing = [field for field in self.fields if field not in kwargs]
+        if missing:
+            raise ValueError(f"Missing fields for prompt {self.name}: {', '.join(missing)}")
+        return self.text.format(**kwargs)
+
+
+def parse_fields(text: str) -> Tuple[str, ...]:
+    """str.format で差し込むフィールド名を出現順に取得する"""
+    fields = []
+    for _, field_name, _, _ in Formatter().parse(text):
+        if field_name is not None and field_name not in fields:
+            fields.append(field_name)
+    return tuple(fields)
+
+
+class PromptRegistry:
+    """
+    テンプレートを名前（ファイル名から拡張子を除いたもの）で取得するレジストリ
+    読み直しはロックで保護され、取得側には常に完全に読み込まれたテンプレートが返ります
+    """
+
+    def __init__(self, directory: Path = TEMPLATES_DIR, hot_reload: bool = False):
+        """
+        Args:
+            directory (Path): テンプレートのディレクトリ
+            hot_reload (bool): ファイルの更新時刻が変わったテンプレートを読み直すか
+        """
+        self.directory = Path(directory)
+        self.hot_reload = hot_reload
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "reloads": 0}
+
+    def load_all(self) -> None:
+        """ディレクトリ内の全てのテンプレートを読み込む"""
+        with self._lock:
+            for path in sorted(self.directory.glob("*.txt")):
+                self._templates[path.stem] = self._load(path.stem)
+        logger.info(f"Loaded {len(self._templates)} prompt templates from {self.directory}")
+
+    def get(self, name: str) -> PromptTemplate:
+        """
+        テンプレートを取得する
+
+        Raises:
+            FileNotFoundError: テンプレートが存在しない場合
+        """
+        template = self._templates.get(name)
+        if template is None or (self.hot_reload and self._modified(template)):
+            with self._lock:
+                template = self._templates.get(name)
+                if template is None or (self.hot_reload and self._modified(template)):
+                    if template is not None:
+                        self._stats["reloads"] += 1
+                        logger.info(f"Reloading modified prompt template: {name}")
+                    template = self._load(name)
+                    self._templates[name] = template
+        return template
+
+    def get_stats(self) -> Dict[str, Any]:
+        """読み込んだテンプレート数と、読み込み・読み直しの回数を取得する"""
+        return {"templates": len(self._templates), "hot_reload": self.hot_reload, **self._stats}
+
+    def _path(self, name: str) -> Path:
+        return self.directory / f"{name}.txt"
+
+    def _modified(self, template: PromptTemplate) -> bool:
+        try:
+            return os.stat(self._path(template.name)).st_mtime_ns != template.mtime_ns
+        except OSError:
+            # 編集中に一時的に消えた場合などは読み込み済みのものを使い続ける
+            return False
+
+    def _load(self, name: str) -> PromptTemplate:
+        path = self._path(name)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            text = path.read_text(encoding="utf-8")
+        except Exception as e:
+            logger.error(f"Error loading prompt template {name}: {e}")
+            raise
+        formatted = name in FORMATTED_TEMPLATES
+        self._stats["loads"] += 1
+        return PromptTemplate(
+            name=name,
+            text=text,
+            fields=parse_fields(text) if formatted else (),
+            mtime_ns=mtime_ns,
+            formatted=formatted
+        )
+
+
+@lru_cache()
+def get_prompt_registry() -> PromptRegistry:
+    """プロセス共通のレジストリを取得する（作成時に全てのテンプレートを読み込む）"""
+    settings = get_settings()
+    registry = PromptRegistry(hot_reload=settings.DEBUG and settings.PROMPT_HOT_RELOAD)
+    registry.load_all()
+    return registry
@@ -0,0 +1,247 @@
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import io
+import threading
+import time
+import wave
+
+import numpy as np
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+@dataclass(frozen=True)
+class PreprocessResult:
+    """前処理の結果と削減量"""
+    content: bytes
+    mime_type: str
+    applied: bool
+    original_bytes: int
+    processed_bytes: int
+    original_seconds: Optional[float] = None
+    processed_seconds: Optional[float] = None
+    elapsed_ms: float = 0.0
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+    @property
+    def seconds_saved(self) -> Optional[float]:
+        if self.original_seconds is None or self.processed_seconds is None:
+            return None
+        return self.original_seconds - self.processed_seconds
+
+    def summary(self) -> Dict[str, Any]:
+        """ログやデバッグ用レスポンスに載せる要約"""
+        return {
+            "applied": self.applied,
+            "original_bytes": self.original_bytes,
+            "processed_bytes": self.processed_bytes,
+            "bytes_saved": self.bytes_saved,
+            "original_seconds": self.original_seconds,
+            "processed_seconds": self.processed_seconds,
+            "seconds_saved": self.seconds_saved,
+            "elapsed_ms": self.elapsed_ms,
+        }
+
+
+class AudioPreprocessingService:
+    """
+    Geminiへ送る前に音声を軽量化するサービス
+    PCMのWAVをデコードし、モノラル化・発話向けサンプルレートへのリサンプリング・
+    エネルギーベースのVADによる前後の無音除去を行います
+    WAV以外（ブラウザのWebM/Opusなど）はそのまま通過させます
+    """
+
+    _LOWPASS_TAPS = 63
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        target_sample_rate: int = 16000,
+        silence_threshold_db: float = -40.0,
+        frame_ms: int = 20,
+        padding_ms: int = 200
+    ):
+        """
+        Args:
+            enabled (bool): Falseの場合は常にそのまま返す
+            target_sample_rate (int): リサンプリング後のサンプルレート
+            silence_threshold_db (float): 無音とみなすフレームRMSの閾値（dBFS）
+            frame_ms (int): VADのフレーム長（ミリ秒）
+            padding_ms (int): 発話区間の前後に残す余白（ミリ秒）
+        """
+        self.enabled = enabled
+        self.target_sample_rate = target_sample_rate
+        self.silence_threshold_db = silence_threshold_db
+        self.frame_ms = frame_ms
+        self.padding_ms = padding_ms
+        self._lock = threading.Lock()
+        self._totals = {"turns": 0, "applied": 0, "bytes_saved": 0, "seconds_saved": 0.0}
+
+    def preprocess(self, audio_content: bytes) -> PreprocessResult:
+        """
+        音声データを前処理するメソッド（CPU処理のため、非同期処理からはスレッドで呼び出すこと）
+
+        Args:
+            audio_content (bytes): アップロードされた音声データ
+
+        Returns:
+            PreprocessResult: 前処理後の音声と削減量（前処理できない場合は元の音声）
+        """
+        started = time.perf_counter()
+        result = self._passthrough(audio_content)
+        if self.enabled and audio_content[:4] == b"RIFF" and audio_content[8:12] == b"WAVE":
+            try:
+                result = self._process_wav(audio_content, started)
+            except (wave.Error, EOFError, ValueError) as e:
+                logger.warning(f"Skipping audio preprocessing: {e}")
+        self._record(result)
+        if result.applied:
+            logger.info(
+                f"Audio preprocessing saved {result.bytes_saved} bytes "
+                f"and {result.seconds_saved:.2f} s in {result.elapsed_ms:.1f} ms"
+            )
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """起動後の累計削減量を取得する"""
+        with self._lock:
+            return dict(self._totals)
+
+    def _process_wav(self, audio_content: bytes, started: float) -> PreprocessResult:
+        samples, sample_rate = self._decode(audio_content)
+        original_seconds = len(samples) / sample_rate
+
+        if sample_rate > self.target_sample_rate:
+            samples = self._resample(samples, sample_rate, self.target_sample_rate)
+            sample_rate = self.target_sample_rate
+        samples = self._trim_silence(samples, sample_rate)
+
+        processed = self._encode(samples, sample_rate)
+        if len(processed) >= len(audio_content):
+            return self._passthrough(audio_content, original_seconds)
+
+        return PreprocessResult(
+            content=processed,
+            mime_type="audio/wav",
+            applied=True,
+            original_bytes=len(audio_content),
+            processed_bytes=len(processed),
+            original_seconds=original_seconds,
+            processed_seconds=len(samples) / sample_rate,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 2)
+        )
+
+    @staticmethod
+    def _decode(audio_content: bytes):
+        """PCMのWAVをモノラルのfloat32配列（-1.0〜1.0）に変換する"""
+        with wave.open(io.BytesIO(audio_content), "rb") as wf:
+            channels = wf.getnchannels()
+            sample_width = wf.getsampwidth()
+            sample_rate = wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+
+        if sample_width == 1:
+            samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+        elif sample_width == 2:
+            samples = np.frombuffer(frames, dtype="<i2").astype(np.float32) / 32768.0
+        elif sample_width == 3:
+            raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+            ints = (raw[:, 0].astype(np.int32) | (raw[:, 1].astype(np.int32) << 8) | (raw[:, 2].astype(np.int32) << 16))
+            ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+            samples = ints.astype(np.float32) / 8388608.0
+        elif sample_width == 4:
+            samples = np.frombuffer(frames, dtype="<i4").astype(np.float32) / 2147483648.0
+        else:
+            raise ValueError(f"Unsupported sample width: {sample_width}")
+
+        if channels > 1:
+            samples = samples[:len(samples) - len(samples) % channels].reshape(-1, channels).mean(axis=1)
+        if len(samples) == 0:
+            raise ValueError("No audio frames")
+        return samples, sample_rate
+
+    def _resample(self, samples: np.ndarray, source_rate: int, target_rate: int) -> np.ndarray:
+        """窓付きsincのローパスでエイリアシングを抑えてから線形補間でリサンプリングする"""
+        cutoff = 0.5 * target_rate / source_rate
+        n = np.arange(self._LOWPASS_TAPS) - (self._LOWPASS_TAPS - 1) / 2
+        taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(self._LOWPASS_TAPS)
+        filtered = np.convolve(samples, (taps / taps.sum()).astype(np.float32), mode="same")
+
+        target_length = int(round(len(samples) * target_rate / source_rate))
+        positions = np.arange(target_length, dtype=np.float64) * (source_rate / target_rate)
+        return np.interp(positions, np.arange(len(filtered)), filtered).astype(np.float32)
+
+    def _trim_silence(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """フレームごとのRMS（dBFS）が閾値を超える区間だけを残す"""
+        frame_length = max(int(sample_rate * self.frame_ms / 1000), 1)
+        frame_count = len(samples) // frame_length
+        if frame_count == 0:
+            return samples
+
+        frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        levels_db = 20 * np.log10(rms + 1e-10)
+        voiced = np.flatnonzero(levels_db > self.silence_threshold_db)
+        if len(voiced) == 0:
+            # 全て無音と判定された場合は誤検出の可能性があるので削らない
+            return samples
+
+        padding = int(sample_rate * self.padding_ms / 1000)
+        start = max(voiced[0] * frame_length - padding, 0)
+        end = min((voiced[-1] + 1) * frame_length + padding, len(samples))
+        return samples[start:end]
+
+    @staticmethod
+    def _encode(samples: np.ndarray, sample_rate: int) -> bytes:
+        """16bitモノラルのWAVにエンコードする"""
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm.tobytes())
+        return buffer.getvalue()
+
+    @staticmethod
+    def _passthrough(audio_content: bytes, original_seconds: Optional[float] = None) -> PreprocessResult:
+        return PreprocessResult(
+            content=audio_content,
+            mime_type="audio/wav",
+            applied=False,
+            original_bytes=len(audio_content),
+            processed_bytes=len(audio_content),
+            original_seconds=original_seconds,
+            processed_seconds=original_seconds
+        )
+
+    def _record(self, result: PreprocessResult) -> None:
+        with self._lock:
+            self._totals["turns"] += 1
+            if result.applied:
+                self._totals["applied"] += 1
+                self._totals["bytes_saved"] += result.bytes_saved
+                self._totals["seconds_saved"] += result.seconds_saved or 0.0
+
+
+class AudioPreprocessingServiceFactory:
+    """AudioPreprocessingServiceのファクトリークラス"""
+
+    _instance = None
+
+    @classmethod
+    def create(cls) -> AudioPreprocessingService:
+        if cls._instance is None:
+            settings = get_settings()
+            cls._instance = AudioPreprocessingService(
+                enabled=settings.AUDIO_PREPROCESS_ENABLED,
+                target_sample_rate=settings.AUDIO_PREPROCESS_TARGET_SAMPLE_RATE,
+                silence_threshold_db=settings.AUDIO_PREPROCESS_SILENCE_THRESHOLD_DB,
+                frame_ms=settings.AUDIO_PREPROCESS_FRAME_MS,
+                padding_ms=settings.AUDIO_PREPROCESS_PADDING_MS
+            )
+        return cls._instance
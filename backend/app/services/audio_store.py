@@ -0,0 +1,117 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import threading
+import time
+import uuid
+
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+@dataclass(frozen=True)
+class StoredAudio:
+    audio_id: str
+    content: bytes
+    media_type: str
+    expires_at: float
+
+
+class AudioStore:
+    """
+    合成済み音声を短時間だけ保持するストア
+    件数・合計バイト数の上限とTTLを持ち、古いものから破棄されます
+    """
+
+    def __init__(self, ttl_seconds: float = 300, max_items: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[str, StoredAudio]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def put(self, content: bytes, media_type: str = "audio/mpeg") -> str:
+        """
+        音声データを保存してIDを返す
+
+        Args:
+            content (bytes): 音声データ
+            media_type (str): Content-Type
+
+        Returns:
+            str: 音声ID
+        """
+        audio_id = uuid.uuid4().hex
+        item = StoredAudio(
+            audio_id=audio_id,
+            content=content,
+            media_type=media_type,
+            expires_at=time.monotonic() + self.ttl_seconds
+        )
+        with self._lock:
+            self._purge_expired()
+            self._items[audio_id] = item
+            self._bytes += len(content)
+            while self._items and (len(self._items) > self.max_items or self._bytes > self.max_bytes):
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= len(evicted.content)
+                logger.debug(f"Evicted audio {evicted.audio_id} from audio store")
+        return audio_id
+
+    def get(self, audio_id: str) -> Optional[StoredAudio]:
+        """
+        音声データを取得する
+
+        Args:
+            audio_id (str): 音声ID
+
+        Returns:
+            Optional[StoredAudio]: 保存された音声（存在しないか期限切れの場合はNone）
+        """
+        with self._lock:
+            item = self._items.get(audio_id)
+            if item is None:
+                return None
+            if item.expires_at <= time.monotonic():
+                self._remove(audio_id)
+                return None
+            return item
+
+    def get_stats(self) -> Dict[str, Any]:
+        """保持件数と合計バイト数を取得する"""
+        with self._lock:
+            self._purge_expired()
+            return {"items": len(self._items), "bytes": self._bytes}
+
+    def _purge_expired(self) -> None:
+        # 挿入順 = 期限順なので先頭から見ればよい
+        now = time.monotonic()
+        while self._items:
+            audio_id, item = next(iter(self._items.items()))
+            if item.expires_at > now:
+                break
+            self._remove(audio_id)
+
+    def _remove(self, audio_id: str) -> None:
+        item = self._items.pop(audio_id, None)
+        if item is not None:
+            self._bytes -= len(item.content)
+
+
+class AudioStoreFactory:
+    """AudioStoreのファクトリークラス（プロセス内で1つのストアを共有）"""
+
+    _instance = None
+
+    @classmethod
+    def create(cls) -> AudioStore:
+        if cls._instance is None:
+            settings = get_settings()
+            cls._instance = AudioStore(
+                ttl_seconds=settings.AUDIO_STORE_TTL_SECONDS,
+                max_items=settings.AUDIO_STORE_MAX_ITEMS,
+                max_bytes=settings.AUDIO_STORE_MAX_BYTES
+            )
+        return cls._instance
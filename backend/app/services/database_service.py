@@ -1,33 +1,40 @@
-from typing import List, Optional, Dict, Any
+from datetime import datetime
+from typing import List, Optional, Dict, Any, Sequence, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update, delete
+from sqlalchemy import select, update, delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import selectinload
-from app.models.database_models import Session, Conversation
+from app.models.database_models import Session, Conversation, WebpageDocument
 from app.config.database import get_async_db
 from loguru import logger
+import hashlib
+import json
 import uuid
+import zlib
 
 
 class DatabaseService:
     def __init__(self, db_session: AsyncSession):
         self.db = db_session
 
-    async def create_session(self, title: str, name: Optional[str] = None, url: Optional[str] = None) -> Session:
-        """新しいセッションを作成"""
+    async def create_session(
+        self, title: str, name: Optional[str] = None, url: Optional[str] = None, session_id: Optional[str] = None
+    ) -> Session:
+        """新しいセッションを作成（session_idを省略した場合は採番する）"""
         try:
             session = Session(
-                id=uuid.uuid4(),
+                id=uuid.UUID(session_id) if session_id else uuid.uuid4(),
                 title=title,
                 name=name,
                 url=url
             )
             self.db.add(session)
-            await self.db.commit()
+            await self._commit()
             await self.db.refresh(session)
             logger.debug(f"Created session: {session.id}")
             return session
         except Exception as e:
-            await self.db.rollback()
+            await self._rollback()
             logger.error(f"Failed to create session: {e}")
             raise
 
@@ -39,7 +46,7 @@ class DatabaseService:
             )
             return result.scalar_one_or_none()
         except Exception as e:
-            logger.error(f"Failed to get session: {e}")
+            await self._handle_error("Failed to get session", e)
             return None
 
     async def get_all_sessions(self, name: Optional[str] = None) -> List[Session]:
@@ -53,10 +60,53 @@ class DatabaseService:
             result = await self.db.execute(query)
             return result.scalars().all()
         except Exception as e:
-            logger.error(f"Failed to get all sessions: {e}")
+            await self._handle_error("Failed to get all sessions", e)
             return []
 
-    async def update_session(self, session_id: str, title: Optional[str] = None, name: Optional[str] = None, url: Optional[str] = None) -> bool:
+    async def list_sessions(
+        self,
+        name: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[Tuple[datetime, uuid.UUID]] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        セッションを updated_at・id の降順で1ページ分取得（キーセットページング）
+
+        Args:
+            name (Optional[str]): ユーザー名での絞り込み
+            limit (int): 取得件数
+            after (Optional[Tuple[datetime, uuid.UUID]]): 前のページの最後の (updated_at, id)
+            fields (Optional[Sequence[str]]): 取得するカラム（Noneの場合は全カラム）
+
+        Returns:
+            List[Dict[str, Any]]: カラム名をキーとした行
+        """
+        query = select(*self._columns(Session, fields))
+        if name:
+            query = query.where(Session.name == name)
+        if after is not None:
+            query = query.where(tuple_(Session.updated_at, Session.id) < tuple_(*after))
+        query = query.order_by(Session.updated_at.desc(), Session.id.desc()).limit(limit)
+        result = await self.db.execute(query)
+        return [dict(row) for row in result.mappings()]
+
+    async def count_sessions(self, name: Optional[str] = None) -> int:
+        """セッション数を取得"""
+        query = select(func.count()).select_from(Session)
+        if name:
+            query = query.where(Session.name == name)
+        result = await self.db.execute(query)
+        return result.scalar_one()
+
+    async def update_session(
+        self,
+        session_id: str,
+        title: Optional[str] = None,
+        name: Optional[str] = None,
+        url: Optional[str] = None,
+        webpage_document_id: Optional[uuid.UUID] = None
+    ) -> bool:
         """セッションを更新"""
         try:
             update_data = {}
@@ -66,6 +116,8 @@ class DatabaseService:
                 update_data["name"] = name
             if url is not None:
                 update_data["url"] = url
+            if webpage_document_id is not None:
+                update_data["webpage_document_id"] = webpage_document_id
             
             if update_data:
                 result = await self.db.execute(
@@ -73,43 +125,138 @@ class DatabaseService:
                     .where(Session.id == uuid.UUID(session_id))
                     .values(**update_data)
                 )
-                await self.db.commit()
+                await self._commit()
                 return result.rowcount > 0
             return True
         except Exception as e:
-            await self.db.rollback()
-            logger.error(f"Failed to update session: {e}")
+            await self._handle_error("Failed to update session", e)
             return False
 
-    async def delete_session(self, session_id: str) -> bool:
-        """セッションを削除（関連するconversationsも削除される）"""
+    async def update_history_summary(self, session_id: str, summary: str, turns: int) -> bool:
+        """
+        会話履歴の要約を保存（既に保存されている要約の方が多くの会話を含む場合は更新しない）
+        """
         try:
-            # まず関連するconversationsを削除
-            await self.db.execute(
-                delete(Conversation).where(Conversation.session_id == uuid.UUID(session_id))
+            result = await self.db.execute(
+                update(Session)
+                .where(Session.id == uuid.UUID(session_id), Session.history_summary_turns < turns)
+                # 要約の更新はセッションの更新として扱わない
+                .values(history_summary=summary, history_summary_turns=turns, updated_at=Session.updated_at)
             )
-            
-            # 次にセッションを削除
+            await self._commit()
+            return result.rowcount > 0
+        except Exception as e:
+            await self._handle_error("Failed to update history summary", e)
+            return False
+
+    async def upsert_webpage_document(
+        self,
+        url: str,
+        title: Optional[str],
+        content: str,
+        content_type: Optional[str] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> uuid.UUID:
+        """
+        Webページの本文を保存（同じ本文が保存済みの場合は取得情報だけを更新し、そのIDを返す）
+        本文はSHA-256で重複を判定し、zlibで圧縮して保存する
+        """
+        try:
+            fetch_fields = {
+                "url": url,
+                "title": title,
+                "content_type": content_type,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": func.now()
+            }
+            statement = insert(WebpageDocument).values(
+                id=uuid.uuid4(),
+                content_hash=hashlib.sha256(content.encode("utf-8")).hexdigest(),
+                content=zlib.compress(content.encode("utf-8")),
+                content_length=len(content),
+                **fetch_fields
+            )
+            statement = statement.on_conflict_do_update(
+                index_elements=[WebpageDocument.content_hash],
+                set_={name: statement.excluded[name] for name in fetch_fields}
+            )
+            result = await self.db.execute(statement.returning(WebpageDocument.id))
+            document_id = result.scalar_one()
+            await self._commit()
+            return document_id
+        except Exception as e:
+            await self._rollback()
+            logger.error(f"Failed to upsert webpage document: {e}")
+            raise
+
+    async def get_recent_webpage_document(self, url: str, fetched_after: datetime) -> Optional[WebpageDocument]:
+        """指定時刻以降に同じURLから取得したWebページのうち、最新のものを取得"""
+        try:
+            result = await self.db.execute(
+                select(WebpageDocument)
+                .where(WebpageDocument.url == url, WebpageDocument.fetched_at >= fetched_after)
+                .order_by(WebpageDocument.fetched_at.desc())
+                .limit(1)
+            )
+            return result.scalar_one_or_none()
+        except Exception as e:
+            await self._handle_error("Failed to get webpage document", e)
+            return None
+
+    async def get_session_webpage(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """
+        セッションに紐づくWebページをセッションと合わせて1回のクエリで取得
+
+        Returns:
+            Optional[Dict[str, Any]]: url / title / content（セッションが存在しない場合はNone、本文がない場合はurlのみ）
+        """
+        try:
+            result = await self.db.execute(
+                select(Session.url, WebpageDocument.title, WebpageDocument.content)
+                .select_from(Session)
+                .outerjoin(WebpageDocument, Session.webpage_document_id == WebpageDocument.id)
+                .where(Session.id == uuid.UUID(session_id))
+            )
+            row = result.one_or_none()
+            if row is None:
+                return None
+            webpage = {"url": row.url}
+            if row.content is not None:
+                webpage["title"] = row.title
+                webpage["content"] = zlib.decompress(row.content).decode("utf-8")
+            return webpage
+        except Exception as e:
+            await self._handle_error("Failed to get session webpage", e)
+            return None
+
+    async def delete_session(self, session_id: str) -> bool:
+        """セッションを削除（関連するconversationsはON DELETE CASCADEで削除される）"""
+        try:
             result = await self.db.execute(
                 delete(Session).where(Session.id == uuid.UUID(session_id))
             )
-            await self.db.commit()
+            await self._commit()
             return result.rowcount > 0
         except Exception as e:
-            await self.db.rollback()
-            logger.error(f"Failed to delete session: {e}")
+            await self._handle_error("Failed to delete session", e)
             return False
 
     async def create_conversation(
         self,
         session_id: str,
-        conversation_number: int,
+        conversation_number: Optional[int] = None,
         transcription: Optional[str] = None,
         analysis_type: str = "transcript",
         analysis_result: Optional[Dict[str, Any]] = None
     ) -> Conversation:
-        """新しい会話を作成"""
+        """新しい会話を作成（会話番号を省略した場合は同じトランザクション内で採番する）"""
         try:
+            if conversation_number is None:
+                conversation_number = await self._allocate_conversation_number(session_id)
+                if conversation_number is None:
+                    raise ValueError(f"Session not found: {session_id}")
             conversation = Conversation(
                 id=uuid.uuid4(),
                 session_id=uuid.UUID(session_id),
@@ -119,12 +266,12 @@ class DatabaseService:
                 **self._extract_analysis_fields(analysis_result) if analysis_result else {}
             )
             self.db.add(conversation)
-            await self.db.commit()
+            await self._commit()
             await self.db.refresh(conversation)
             logger.debug(f"Created conversation: {conversation.id}")
             return conversation
         except Exception as e:
-            await self.db.rollback()
+            await self._rollback()
             logger.error(f"Failed to create conversation: {e}")
             raise
 
@@ -138,9 +285,42 @@ class DatabaseService:
             )
             return result.scalars().all()
         except Exception as e:
-            logger.error(f"Failed to get conversations: {e}")
+            await self._handle_error("Failed to get conversations", e)
             return []
 
+    async def list_conversations(
+        self,
+        session_id: str,
+        limit: int = 100,
+        after: Optional[int] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        セッションの会話を会話番号の昇順で1ページ分取得（キーセットページング）
+
+        Args:
+            session_id (str): セッションID
+            limit (int): 取得件数
+            after (Optional[int]): 前のページの最後の会話番号
+            fields (Optional[Sequence[str]]): 取得するカラム（一覧表示ではJSONBの分析結果を省略できる）
+
+        Returns:
+            List[Dict[str, Any]]: カラム名をキーとした行
+        """
+        query = select(*self._columns(Conversation, fields)).where(Conversation.session_id == uuid.UUID(session_id))
+        if after is not None:
+            query = query.where(Conversation.conversation_number > after)
+        query = query.order_by(Conversation.conversation_number).limit(limit)
+        result = await self.db.execute(query)
+        return [dict(row) for row in result.mappings()]
+
+    async def count_conversations(self, session_id: str) -> int:
+        """セッションの会話数を取得"""
+        result = await self.db.execute(
+            select(func.count()).select_from(Conversation).where(Conversation.session_id == uuid.UUID(session_id))
+        )
+        return result.scalar_one()
+
     async def get_conversation(self, conversation_id: str) -> Optional[Conversation]:
         """特定の会話を取得"""
         try:
@@ -149,9 +329,68 @@ class DatabaseService:
             )
             return result.scalar_one_or_none()
         except Exception as e:
-            logger.error(f"Failed to get conversation: {e}")
+            await self._handle_error("Failed to get conversation", e)
+            return None
+
+    async def get_conversation_by_number(self, session_id: str, conversation_number: int) -> Optional[Conversation]:
+        """セッション内の会話番号で会話を取得"""
+        try:
+            result = await self.db.execute(
+                select(Conversation).where(
+                    Conversation.session_id == uuid.UUID(session_id),
+                    Conversation.conversation_number == conversation_number
+                )
+            )
+            return result.scalar_one_or_none()
+        except Exception as e:
+            await self._handle_error("Failed to get conversation by number", e)
             return None
 
+    async def upsert_conversation_analysis(
+        self,
+        session_id: str,
+        conversation_number: int,
+        transcription: Optional[str],
+        analysis_type: str,
+        analysis_result: Dict[str, Any]
+    ) -> Optional[Conversation]:
+        """
+        会話番号を指定して分析結果を保存（INSERT ... ON CONFLICT DO UPDATE の1文）
+        会話が既にある場合は分析結果のカラムだけを更新し、書き起こしなどは変更しない
+        """
+        try:
+            analysis_fields = self._extract_analysis_fields(analysis_result)
+            statement = insert(Conversation).values(
+                id=uuid.uuid4(),
+                session_id=uuid.UUID(session_id),
+                conversation_number=conversation_number,
+                transcription=transcription,
+                analysis_type=analysis_type,
+                **analysis_fields
+            )
+            conflict_target = [Conversation.session_id, Conversation.conversation_number]
+            if analysis_fields:
+                statement = statement.on_conflict_do_update(
+                    index_elements=conflict_target,
+                    set_={name: statement.excluded[name] for name in analysis_fields}
+                )
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=conflict_target)
+            result = await self.db.execute(statement.returning(Conversation))
+            conversation = result.scalar_one_or_none()
+            await self._commit()
+            return conversation
+        except Exception as e:
+            await self._rollback()
+            logger.error(f"Failed to upsert conversation analysis: {e}")
+            raise
+
+    async def notify_analysis_ready(self, channel: str, session_id: str, conversation_id: str) -> None:
+        """分析結果の保存を他のプロセスに通知（pg_notify）"""
+        payload = json.dumps({"session_id": session_id, "conversation_id": conversation_id})
+        await self.db.execute(select(func.pg_notify(channel, payload)))
+        await self._commit()
+
     async def update_conversation_analysis(
         self,
         conversation_id: str,
@@ -165,13 +404,43 @@ class DatabaseService:
                 .where(Conversation.id == uuid.UUID(conversation_id))
                 .values(**update_data)
             )
-            await self.db.commit()
+            await self._commit()
             return result.rowcount > 0
         except Exception as e:
-            await self.db.rollback()
-            logger.error(f"Failed to update conversation analysis: {e}")
+            await self._handle_error("Failed to update conversation analysis", e)
             return False
 
+    @staticmethod
+    def _columns(model, fields: Optional[Sequence[str]]) -> List[Any]:
+        if fields is None:
+            return list(model.__table__.columns)
+        return [model.__table__.columns[name] for name in fields]
+
+    async def _commit(self) -> None:
+        """変更を確定する（作業単位の中ではフラッシュのみ行い、コミットは作業単位の終了時にまとめて行う）"""
+        if "unit_of_work" in self.db.info:
+            await self.db.flush()
+        else:
+            await self.db.commit()
+
+    async def _handle_error(self, message: str, e: Exception) -> None:
+        """
+        エラーを記録して変更を取り消す（呼び出し元は既定値を返す）
+        作業単位の中では同じトランザクションでそれまでにフラッシュした変更も取り消されるため、
+        既定値を返して処理を続けずに例外を送出し、作業単位に判断を任せる
+        """
+        await self._rollback()
+        logger.error(f"{message}: {e}")
+        if "unit_of_work" in self.db.info:
+            raise e
+
+    async def _rollback(self) -> None:
+        await self.db.rollback()
+        uow = self.db.info.get("unit_of_work")
+        if uow is not None:
+            # 取り消した変更に対するコミット後の処理も実行しない
+            uow.discard_after_commit()
+
     def _extract_analysis_fields(self, analysis_result: Dict[str, Any]) -> Dict[str, Any]:
         """分析結果からデータベースフィールドを抽出"""
         fields = {}
@@ -188,16 +457,32 @@ class DatabaseService:
         return fields
 
     async def get_next_conversation_number(self, session_id: str) -> int:
-        """次の会話番号を取得"""
+        """
+        次の会話番号を採番
+        sessionsのカウンタを UPDATE ... RETURNING で進めるため、同時に呼ばれても番号は重複しない
+        """
         try:
-            result = await self.db.execute(
-                select(Conversation.conversation_number)
-                .where(Conversation.session_id == uuid.UUID(session_id))
-                .order_by(Conversation.conversation_number.desc())
-                .limit(1)
-            )
-            last_number = result.scalar_one_or_none()
-            return (last_number or 0) + 1
+            number = await self._allocate_conversation_number(session_id)
+            if number is None:
+                # 存在しないセッションに番号を返すと既存の会話と重複するので採番しない
+                raise ValueError(f"Session not found: {session_id}")
+            await self._commit()
+            return number
         except Exception as e:
+            await self._rollback()
             logger.error(f"Failed to get next conversation number: {e}")
-            return 1 
\ No newline at end of file
+            raise
+
+    async def _allocate_conversation_number(self, session_id: str) -> Optional[int]:
+        """セッションの会話カウンタを1つ進めて新しい番号を返す（コミットは呼び出し側で行う）"""
+        result = await self.db.execute(
+            update(Session)
+            .where(Session.id == uuid.UUID(session_id))
+            # 採番はセッションの更新として扱わない
+            .values(
+                last_conversation_number=Session.last_conversation_number + 1,
+                updated_at=Session.updated_at
+            )
+            .returning(Session.last_conversation_number)
+        )
+        return result.scalar_one_or_none() 
\ No newline at end of file
@@ -1,11 +1,21 @@
 from google import genai
 from google.genai import types
 from app.config.settings import get_settings
+from app.config.database import unit_of_work
+from app.core.clients import get_client_registry
+from app.core.concurrency import PRIORITY_BACKGROUND, get_gemini_limiter
 from app.prompts.audio_prompts import AudioPrompt, AudioImmediatePrompt, AudioAnalysisPrompt, TranscriptAnalysisPrompt
 from app.services.session_manager import SessionManagerService
+from app.services.gemini_context_cache import get_gemini_context_cache, is_cache_unavailable
+from app.services.history_builder import HistoryWindow
+from app.services.history_summarizer import get_history_builder, get_history_summarizer
+from app.services.webpage_retrieval import get_webpage_retriever
 from loguru import logger
 from pydantic import BaseModel
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
 import json
+import re
 from fastapi import Depends 
 
 
@@ -32,18 +42,110 @@ class AudioAnalysisResponseSchema(BaseModel):
     alternativeexpressions: list
     suggestion: str
 
+class ImmediateResponseStreamParser:
+    """
+    ストリーミングされるJSON（list[ImmediateResponseSchema]）を逐次解析するクラス
+    transcriptionが確定した時点と、responseが伸びるたびにイベントを返します
+    """
+    _TRANSCRIPTION_PATTERN = re.compile(r'"transcription"\s*:\s*"((?:[^"\\]|\\.)*)"')
+    _RESPONSE_PATTERN = re.compile(r'"response"\s*:\s*"((?:[^"\\]|\\.)*)')
+    _PARTIAL_UNICODE_ESCAPE = re.compile(r'\\u[0-9a-fA-F]{0,3}$')
+
+    def __init__(self):
+        self._buffer = ""
+        self.transcription: Optional[str] = None
+        self.response = ""
+
+    def feed(self, chunk: str) -> List[Dict[str, str]]:
+        """
+        受信したテキスト断片を追加し、新しく確定したイベントを返すメソッド
+
+        Args:
+            chunk (str): Gemini APIから受信したテキスト断片
+
+        Returns:
+            List[Dict[str, str]]: transcription / response_delta イベントのリスト
+        """
+        events = []
+        self._buffer += chunk
+
+        if self.transcription is None:
+            match = self._TRANSCRIPTION_PATTERN.search(self._buffer)
+            if match:
+                self.transcription = self._decode(match.group(1))
+                events.append({"type": "transcription", "content": self.transcription})
+
+        if self.transcription is not None:
+            match = self._RESPONSE_PATTERN.search(self._buffer)
+            if match:
+                raw = self._PARTIAL_UNICODE_ESCAPE.sub("", match.group(1))
+                decoded = self._decode(raw)
+                if len(decoded) > len(self.response):
+                    events.append({"type": "response_delta", "content": decoded[len(self.response):]})
+                    self.response = decoded
+
+        return events
+
+    def finish(self) -> List[Dict[str, str]]:
+        """
+        ストリーム終了時に全体をJSONとして解析し、未送信のイベントを返すメソッド
+
+        Returns:
+            List[Dict[str, str]]: 残りのイベントのリスト
+
+        Raises:
+            ValueError: レスポンスを解析できない場合
+        """
+        try:
+            parsed = json.loads(self._buffer)
+            item = parsed[0] if isinstance(parsed, list) else parsed
+            transcription = item["transcription"]
+            response = item["response"]
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            raise ValueError(f"Invalid streamed response: {e}")
+
+        events = []
+        if self.transcription is None:
+            self.transcription = transcription
+            events.append({"type": "transcription", "content": transcription})
+        if response.startswith(self.response) and len(response) > len(self.response):
+            events.append({"type": "response_delta", "content": response[len(self.response):]})
+        self.response = response
+        return events
+
+    @staticmethod
+    def _decode(raw: str) -> str:
+        try:
+            return json.loads(f'"{raw}"')
+        except ValueError:
+            return raw
+
+
 class GeminiAudioService:
     """
     Gemini APIを使用して音声データを処理するサービス
     """
-    def __init__(self):
+    def __init__(self, client: Optional[genai.Client] = None):
         """
         初期化メソッド
         Gemini APIクライアントとプロンプトを設定します
+
+        Args:
+            client (Optional[genai.Client]): 使用するクライアント（省略時はプロセス共有のクライアント）
         """
-        # Gemini APIクライアントの初期化
-        self.client = genai.Client(api_key=get_settings().GEMINI_API_KEY)
+        # Gemini APIクライアントの初期化（プロセス内で共有）
+        self.client = client or get_client_registry().gemini()
         self.model_name = get_settings().GEMINI_MODEL_NAME
+
+        # 会話履歴の組み立てと古い履歴の要約
+        self.history_builder = get_history_builder()
+        self.history_summarizer = get_history_summarizer()
+
+        # Webページの関連部分の検索（chromadb / sentence-transformers がない場合はNone）
+        self.webpage_retriever = get_webpage_retriever()
+
+        # プロンプトの先頭部分（システムプロンプトとセッションのWebページ）のコンテキストキャッシュ
+        self.context_cache = get_gemini_context_cache()
             
         # プロンプトの初期化
         self.prompt = AudioPrompt()
@@ -70,24 +172,24 @@ class GeminiAudioService:
             raise ValueError("Empty audio data")
         
         try:
-            history = await session_manager.get_history(session_id)
-            print(history)
+            history = await self._load_history(session_id, session_manager)
             # プロンプトの取得
             prompt = self.prompt.format()
             
             # Gemini APIに音声データとプロンプトを送信
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=[
+            async with get_gemini_limiter().slot():
+                response = await self._generate(
+                    "template:audio",
                     prompt,
-                    str(history),
-                    types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
-                ],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": list[ResponseSchema]
-                }
-            )
+                    [
+                        history,
+                        types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
+                    ],
+                    config={
+                        "response_mime_type": "application/json",
+                        "response_schema": list[ResponseSchema]
+                    }
+                )
             response_json: list[ResponseSchema] = response.parsed
             if not response_json:
                 logger.error("Empty parsed response for generate_text")
@@ -101,7 +203,13 @@ class GeminiAudioService:
             logger.error(f"Error generating text: {e}")
             raise e
 
-    async def generate_immediate_response(self, audio_content: bytes, session_id: str, session_manager: SessionManagerService):
+    async def generate_immediate_response(
+        self,
+        audio_content: bytes,
+        session_id: str,
+        session_manager: SessionManagerService,
+        save_history: bool = True
+    ):
         """
         音声データから即座のレスポンス（書き起こしと返事）を生成するメソッド
         
@@ -109,6 +217,7 @@ class GeminiAudioService:
             audio_content (bytes): 音声データ
             session_id (str): セッションID
             session_manager (SessionManagerService): セッション管理サービス
+            save_history (bool): Falseの場合は履歴への追加を呼び出し側に任せる（add_turn_to_historyを使用）
             
         Returns:
             ImmediateResponseSchema: 書き起こしと返事を含むレスポンス
@@ -122,44 +231,35 @@ class GeminiAudioService:
             raise ValueError("Empty audio data")
         
         try:
-            history = await session_manager.get_history(session_id)
-            print(history)
-            
-            # Webページデータがあるかチェック
-            webpage_data = await session_manager.get_webpage_data(session_id)
-            webpage_context = ""
-            if webpage_data and isinstance(webpage_data, dict):
-                title = webpage_data.get('title', 'Unknown Title')
-                url = webpage_data.get('url', 'Unknown URL')
-                content = webpage_data.get('content', '')
-                webpage_context = f"\n\nReference Webpage:\nTitle: {title}\nURL: {url}\nContent: {content[:2000]}..."  # 最初の2000文字
+            history, webpage_context, webpage_is_static = await self._load_context(session_id, session_manager)
             
             # プロンプトの取得
             prompt = self.immediate_prompt.format()
+            label, contents, cacheable = self._turn_contents(
+                session_id, "audio_immediate", history, webpage_context, webpage_is_static,
+                types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
+            )
             
             # Gemini APIに音声データとプロンプトを送信
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=[
+            async with get_gemini_limiter().slot():
+                response = await self._generate(
+                    label,
                     prompt,
-                    str(history),
-                    webpage_context,  # Webページのコンテキストを追加
-                    types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
-                ],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": list[ImmediateResponseSchema]
-                }
-            )
+                    contents,
+                    config={
+                        "response_mime_type": "application/json",
+                        "response_schema": list[ImmediateResponseSchema]
+                    },
+                    cacheable=cacheable
+                )
             response_json: list[ImmediateResponseSchema] = response.parsed
             if not response_json:
                 logger.error("Empty parsed response for generate_immediate_response")
                 raise ValueError("Empty parsed response")
             
             # セッション履歴に追加
-            conversation = [f'"user":{response_json[0].transcription}', 
-                            f'"model":{response_json[0].response}']
-            await session_manager.add_to_history(session_id, conversation)
+            if save_history:
+                await self.add_turn_to_history(session_id, response_json[0], session_manager)
             
             return response_json[0]
             
@@ -167,6 +267,243 @@ class GeminiAudioService:
             logger.error(f"Error generating immediate response: {e}")
             raise e
 
+    async def _load_history(self, session_id: str, session_manager: SessionManagerService) -> str:
+        """
+        プロンプトに含める会話履歴を組み立てるメソッド
+
+        Returns:
+            str: プロンプトに含める会話履歴
+        """
+        # 読み込みは1つの作業単位で行い、Geminiを呼び出す前にコミットして接続を返す
+        async with unit_of_work():
+            window = await self._load_history_window(session_id, session_manager)
+        return window.to_prompt()
+
+    async def _load_history_window(self, session_id: str, session_manager: SessionManagerService) -> HistoryWindow:
+        """
+        直近の会話をトークン数の上限内でそのまま含め、それより古い会話は要約で置き換えるメソッド
+        要約されていない古い会話がたまった場合は、要約の更新をバックグラウンドで開始します
+
+        Returns:
+            HistoryWindow: そのまま送る会話と要約
+        """
+        history, summary = await asyncio.gather(
+            session_manager.get_history(session_id),
+            session_manager.get_history_summary(session_id)
+        )
+        window = self.history_builder.build(history, summary)
+        if self.history_summarizer is not None and self.history_builder.needs_summary(window):
+            self.history_summarizer.schedule(session_id, session_manager)
+        return window
+
+    async def _load_context(self, session_id: str, session_manager: SessionManagerService) -> Tuple[str, str, bool]:
+        """
+        会話履歴とWebページのコンテキストを取得するメソッド
+
+        Returns:
+            Tuple[str, str, bool]: (プロンプトに含める会話履歴, Webページのコンテキスト, Webページのコンテキストがターンごとに変わらないか)
+        """
+        # 履歴とWebページデータは互いに独立しているので並行して取得
+        # 読み込みは1つの作業単位で行い、Geminiを呼び出す前にコミットして接続を返す
+        async with unit_of_work():
+            window, webpage_data = await asyncio.gather(
+                self._load_history_window(session_id, session_manager),
+                session_manager.get_webpage_data(session_id)
+            )
+
+        # Webページデータがあるかチェック
+        webpage_context = ""
+        webpage_is_static = True
+        if webpage_data and isinstance(webpage_data, dict):
+            title = webpage_data.get('title', 'Unknown Title')
+            url = webpage_data.get('url', 'Unknown URL')
+            content = webpage_data.get('content', '')
+            excerpts = await self._retrieve_webpage_excerpts(session_id, content, window)
+            if excerpts is not None:
+                webpage_context = f"\n\nReference Webpage:\nTitle: {title}\nURL: {url}\nRelevant excerpts:\n" + "\n...\n".join(excerpts)
+                webpage_is_static = False
+            else:
+                webpage_context = f"\n\nReference Webpage:\nTitle: {title}\nURL: {url}\nContent: {content[:2000]}..."  # 最初の2000文字
+        return window.to_prompt(), webpage_context, webpage_is_static
+
+    def _turn_contents(
+        self,
+        session_id: str,
+        template_name: str,
+        history: str,
+        webpage_context: str,
+        webpage_is_static: bool,
+        audio_part: types.Part
+    ) -> Tuple[str, List[Any], int]:
+        """
+        1ターン分のcontentsを組み立てるメソッド
+        ターンごとに変わらないWebページのコンテキストは、システムプロンプトと合わせてキャッシュできるよう会話履歴より前に置きます
+
+        Returns:
+            Tuple[str, List[Any], int]: (キャッシュのラベル, プロンプトに続けて送る内容, そのうちキャッシュできる先頭の件数)
+        """
+        if webpage_context and webpage_is_static:
+            return f"session:{session_id}:{template_name}", [webpage_context, history, audio_part], 1
+        return f"template:{template_name}", [history, webpage_context, audio_part], 0
+
+    async def _generate(
+        self,
+        label: str,
+        prompt: str,
+        contents: List[Any],
+        config: Dict[str, Any],
+        cacheable: int = 0,
+        stream: bool = False
+    ):
+        """
+        Gemini APIを呼び出すメソッド
+        プロンプトはキャッシュの有無にかかわらずシステムプロンプトとして送り、モデルから見た構成を変えません
+        プロンプトとcontentsの先頭 cacheable 件をキャッシュできる場合は、その部分を送らずにキャッシュ名を指定します
+
+        Args:
+            label (str): キャッシュのラベル（テンプレート名・セッション）
+            prompt (str): システムプロンプト
+            contents (List[Any]): プロンプトに続けて送る内容
+            config (Dict[str, Any]): 生成の設定
+            cacheable (int): contentsのうちキャッシュに含められる先頭の件数
+            stream (bool): ストリーミングで生成するか
+
+        Returns:
+            生成結果（streamの場合はチャンクの非同期イテレータ）
+        """
+        models = self.client.aio.models
+        method = models.generate_content_stream if stream else models.generate_content
+        if self.context_cache is not None:
+            cached_content = await self.context_cache.get(label, prompt, contents[:cacheable])
+            if cached_content is not None:
+                try:
+                    return await method(
+                        model=self.model_name,
+                        contents=contents[cacheable:],
+                        config={**config, "cached_content": cached_content}
+                    )
+                except Exception as e:
+                    if not is_cache_unavailable(e):
+                        raise
+                    # 期限切れなどでキャッシュが使えない場合は、次回作り直すことにして全体を送る
+                    logger.warning(f"Context cache {cached_content} is unavailable, sending the full prompt: {e}")
+                    self.context_cache.forget(cached_content)
+        return await method(model=self.model_name, contents=contents, config={**config, "system_instruction": prompt})
+
+    async def _retrieve_webpage_excerpts(self, session_id: str, content: str, window: HistoryWindow) -> Optional[List[str]]:
+        """
+        直近の会話に関連するWebページのチャンクを取得するメソッド
+        書き起こしは応答と同じ呼び出しで得られるため、クエリには直近の会話を使います
+
+        Returns:
+            Optional[List[str]]: チャンク（短いページ、またはインデックスがない場合はNone）
+        """
+        settings = get_settings()
+        if self.webpage_retriever is None or len(content) <= settings.WEBPAGE_RETRIEVAL_MIN_CHARS:
+            return None
+        recent = window.turns[-settings.WEBPAGE_RETRIEVAL_QUERY_TURNS:] if settings.WEBPAGE_RETRIEVAL_QUERY_TURNS > 0 else []
+        texts = (part.split(":", 1)[-1].strip().strip('"') for entry in recent for part in entry)
+        query = " ".join(text for text in texts if text)
+        try:
+            return await self.webpage_retriever.retrieve(session_id, query)
+        except Exception as e:
+            # 検索できなくても本文の先頭で応答を続ける
+            logger.warning(f"Failed to retrieve webpage excerpts for session {session_id}: {e}")
+            return None
+
+    async def add_turn_to_history(
+        self,
+        session_id: str,
+        immediate_response: ImmediateResponseSchema,
+        session_manager: SessionManagerService
+    ) -> None:
+        """
+        書き起こしと返事の1往復を会話履歴に追加するメソッド
+
+        Args:
+            session_id (str): セッションID
+            immediate_response (ImmediateResponseSchema): 書き起こしと返事
+            session_manager (SessionManagerService): セッション管理サービス
+        """
+        conversation = [f'"user":{immediate_response.transcription}',
+                        f'"model":{immediate_response.response}']
+        await session_manager.add_to_history(session_id, conversation)
+
+    async def generate_immediate_response_stream(
+        self,
+        audio_content: bytes,
+        session_id: str,
+        session_manager: SessionManagerService,
+        save_history: bool = True
+    ) -> AsyncIterator[Dict[str, str]]:
+        """
+        音声データから即座のレスポンスをストリーミングで生成するメソッド
+        書き起こしが確定した時点でtranscriptionイベントを、以降は返事の断片を
+        response_deltaイベントとして順次返します
+
+        Args:
+            audio_content (bytes): 音声データ
+            session_id (str): セッションID
+            session_manager (SessionManagerService): セッション管理サービス
+            save_history (bool): Falseの場合は履歴への追加を呼び出し側に任せる（add_turn_to_historyを使用）
+
+        Yields:
+            Dict[str, str]: type（transcription / response_delta）とcontentを含むイベント
+
+        Raises:
+            ValueError: 音声データが空の場合、またはレスポンスが解析できない場合
+            Exception: API呼び出しでエラーが発生した場合
+        """
+        # 入力値のバリデーション
+        if not audio_content:
+            raise ValueError("Empty audio data")
+
+        try:
+            history, webpage_context, webpage_is_static = await self._load_context(session_id, session_manager)
+
+            # プロンプトの取得
+            prompt = self.immediate_prompt.format()
+            label, contents, cacheable = self._turn_contents(
+                session_id, "audio_immediate", history, webpage_context, webpage_is_static,
+                types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
+            )
+
+            # Gemini APIにストリーミングで送信（ストリームを読み切るまで実行枠を保持）
+            parser = ImmediateResponseStreamParser()
+            async with get_gemini_limiter().slot():
+                stream = await self._generate(
+                    label,
+                    prompt,
+                    contents,
+                    config={
+                        "response_mime_type": "application/json",
+                        "response_schema": list[ImmediateResponseSchema]
+                    },
+                    cacheable=cacheable,
+                    stream=True
+                )
+
+                async for chunk in stream:
+                    if not chunk.text:
+                        continue
+                    for event in parser.feed(chunk.text):
+                        yield event
+
+            for event in parser.finish():
+                yield event
+
+            # セッション履歴に追加
+            if save_history:
+                await self.add_turn_to_history(
+                    session_id,
+                    ImmediateResponseSchema(transcription=parser.transcription, response=parser.response),
+                    session_manager
+                )
+
+        except Exception as e:
+            logger.error(f"Error generating streaming response: {e}")
+            raise e
+
     async def generate_transcript_analysis(self, transcription: str):
         """
         書き起こしテキストから文法分析を生成するメソッド
@@ -189,15 +526,16 @@ class GeminiAudioService:
             # プロンプトの取得
             prompt = self.transcript_analysis_prompt.format(transcription=transcription)
             
-            # Gemini APIにプロンプトを送信
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=[prompt],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": list[AnalysisResponseSchema]
-                }
-            )
+            # Gemini APIにプロンプトを送信（対話中のリクエストを優先する）
+            async with get_gemini_limiter().slot(priority=PRIORITY_BACKGROUND):
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=[prompt],
+                    config={
+                        "response_mime_type": "application/json",
+                        "response_schema": list[AnalysisResponseSchema]
+                    }
+                )
             response_json: list[AnalysisResponseSchema] = response.parsed
             if not response_json:
                 logger.error("Empty parsed response for generate_transcript_analysis")
@@ -263,18 +601,19 @@ class GeminiAudioService:
 
             prompt = self.audio_analysis_prompt.format()
             
-            # Gemini APIに音声データとプロンプトを送信
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=[
-                    prompt, 
-                    types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
-                ],
-                config={
-                    "response_mime_type": "application/json",
-                    "response_schema": list[AudioAnalysisResponseSchema]
-                }
-            )
+            # Gemini APIに音声データとプロンプトを送信（対話中のリクエストを優先する）
+            async with get_gemini_limiter().slot(priority=PRIORITY_BACKGROUND):
+                response = await self._generate(
+                    "template:audio_analysis",
+                    prompt,
+                    [
+                        types.Part.from_bytes(data=audio_content, mime_type='audio/wav')
+                    ],
+                    config={
+                        "response_mime_type": "application/json",
+                        "response_schema": list[AudioAnalysisResponseSchema]
+                    }
+                )
             response_json: list[AudioAnalysisResponseSchema] = response.parsed
             if not response_json:
                 logger.error("Empty parsed response for generate_audio_analysis")
@@ -285,43 +624,67 @@ class GeminiAudioService:
         except Exception as e:
             logger.error(f"Error generating immediate response: {e}")
             raise e
+    async def analyze_audio(self, audio_content: bytes, session_id: str, conversation_id: str, session_manager: SessionManagerService):
+        """
+        音声の文法分析を実行し、結果をセッションに保存するメソッド
+        失敗時は例外をそのまま送出する（リトライは呼び出し側で行う）
+
+        Args:
+            audio_content (bytes): 分析対象の音声データ
+            session_id (str): セッションID
+            conversation_id (str): 書き起こしの会話ID
+            session_manager (SessionManagerService): セッション管理サービス
+        """
+        logger.info(f"Starting background analysis for session: {session_id}")
+        analysis_result = await self.generate_audio_analysis(audio_content)
+
+        # 分析結果をセッションに保存
+        await session_manager.save_analysis_result(
+            session_id=session_id,
+            conversation_id=conversation_id,
+            transcription="",  # 音声分析なので空文字列
+            analysis_result=analysis_result.dict()
+        )
+        logger.info(f"Completed background analysis for session: {session_id}")
+
+    async def save_empty_audio_analysis(self, session_id: str, conversation_id: str, session_manager: SessionManagerService):
+        """
+        分析に失敗した会話に空の結果を保存するメソッド
+
+        Args:
+            session_id (str): セッションID
+            conversation_id (str): 書き起こしの会話ID
+            session_manager (SessionManagerService): セッション管理サービス
+        """
+        await session_manager.save_analysis_result(
+            session_id=session_id,
+            conversation_id=conversation_id,
+            transcription="",
+            analysis_result={
+                "advice": "",
+                "speechflaws": "",
+                "nuanceinquiry": [],
+                "alternativeexpressions": [],
+                "suggestion": ""
+            }
+        )
+
     async def analyze_audio_background (self, audio_content: bytes, session_id: str, conversation_id: str, session_manager: SessionManagerService):
         """
         バックグラウンドで文法分析を実行するメソッド
         
         Args:
-            transcription (str): 分析対象の書き起こしテキスト
+            audio_content (bytes): 分析対象の音声データ
             session_id (str): セッションID
+            conversation_id (str): 書き起こしの会話ID
             session_manager (SessionManagerService): セッション管理サービス
         """
         try:
-            logger.info(f"Starting background analysis for session: {session_id}")
-            analysis_result = await self.generate_audio_analysis(audio_content)
-            
-            # 分析結果をセッションに保存
-            await session_manager.save_analysis_result(
-                session_id=session_id,
-                conversation_id=conversation_id,
-                transcription="",  # 音声分析なので空文字列
-                analysis_result=analysis_result.dict()
-            )
-            logger.info(f"Completed background analysis for session: {session_id}")
-            
+            await self.analyze_audio(audio_content, session_id, conversation_id, session_manager)
         except Exception as e:
             logger.error(f"Error in background analysis for session {session_id}: {str(e)}")
             # エラーが発生した場合も空の結果を保存
-            await session_manager.save_analysis_result(
-                session_id=session_id,
-                conversation_id=conversation_id,
-                transcription="",
-                analysis_result={
-                    "advice": "",
-                    "speechflaws": "",
-                    "nuanceinquiry": [],
-                    "alternativeexpressions": [],
-                    "suggestion": ""
-                }
-            )
+            await self.save_empty_audio_analysis(session_id, conversation_id, session_manager)
         
 
 
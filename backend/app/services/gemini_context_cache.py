@@ -0,0 +1,224 @@
+"""
+Geminiのコンテキストキャッシュ
+
+毎回同じ内容を送っているプロンプトの先頭部分（テンプレートのシステムプロンプトと、セッションのWebページ）を
+Geminiのキャッシュ（cachedContents）に保存し、以降のリクエストではキャッシュ名だけを送る。
+キャッシュした部分は課金される入力トークンが割り引かれ、サーバー側の事前計算も省略される。
+
+キャッシュは内容のハッシュで識別するため、テンプレートやWebページが変わると自動的に作り直され、
+同じラベル（テンプレート・セッション）の古いキャッシュは削除される
+
+既定の設定ではほとんどキャッシュされない点に注意する。テンプレートだけでは推定300〜700トークンで
+GEMINI_CACHE_MIN_TOKENS（モデルの下限の1024）に届かず、Webページがターンごとに変わらない（先頭部分に含められる）のは
+Webページの検索を使わない場合（WEBPAGE_RETRIEVAL_MIN_CHARS 以下の短いページ、または検索が無効・依存パッケージがない場合）だけのため、
+キャッシュされるのはその本文とテンプレートを合わせて下限を超えるセッションに限られる（get_stats の skipped で確認できる）
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+import asyncio
+import hashlib
+import time
+
+from google import genai
+from google.genai import errors, types
+from loguru import logger
+
+from app.config.settings import get_settings
+from app.core.clients import get_client_registry
+from app.services.history_builder import estimate_tokens
+
+
+@dataclass
+class CachedPrefix:
+    """作成したキャッシュ（作成できなかった場合は name がNone）"""
+    name: Optional[str]
+    label: str
+    expires_at: float  # time.monotonic() 基準
+
+
+class GeminiContextCache:
+    """
+    プロンプトの先頭部分のキャッシュを管理するクラス
+    同じ内容のキャッシュの作成が同時に要求された場合は、1度だけ作成して結果を共有します
+    """
+
+    def __init__(
+        self,
+        client: Optional[genai.Client] = None,
+        model_name: Optional[str] = None,
+        ttl_seconds: int = 900,
+        min_tokens: int = 1024,
+        max_entries: int = 500
+    ):
+        """
+        Args:
+            client (Optional[genai.Client]): 使用するクライアント（省略時はプロセス共有のクライアント）
+            model_name (Optional[str]): キャッシュを使うモデル（省略時は GEMINI_MODEL_NAME。キャッシュはモデルごと）
+            ttl_seconds (int): キャッシュの有効期間（使われるたびに延長する）
+            min_tokens (int): キャッシュする最小トークン数（Geminiの下限より短い場合は作成しない）
+            max_entries (int): 保持するキャッシュの最大数（超えた場合は古いものから削除する）
+        """
+        self._client = client
+        self.model_name = model_name or get_settings().GEMINI_MODEL_NAME
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedPrefix]" = OrderedDict()
+        self._labels: Dict[str, str] = {}  # ラベル -> 現在のキー
+        self._creating: Dict[str, asyncio.Task] = {}
+        self._extending: Dict[str, asyncio.Task] = {}
+        self._stats = {"hits": 0, "created": 0, "extended": 0, "skipped": 0, "failed": 0, "deleted": 0}
+
+    @property
+    def client(self) -> genai.Client:
+        if self._client is None:
+            self._client = get_client_registry().gemini()
+        return self._client
+
+    async def get(self, label: str, system_instruction: str, documents: Sequence[str] = ()) -> Optional[str]:
+        """
+        プロンプトの先頭部分のキャッシュ名を取得する（なければ作成する）
+
+        Args:
+            label (str): キャッシュの用途（テンプレート名やセッションID。内容が変わったときに古いキャッシュを削除するために使う）
+            system_instruction (str): システムプロンプト
+            documents (Sequence[str]): システムプロンプトに続けてキャッシュする内容（Webページなど）
+
+        Returns:
+            Optional[str]: キャッシュ名（短すぎる・作成に失敗した場合はNone）
+        """
+        key = self._key(system_instruction, documents)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        if entry is not None and entry.expires_at > now:
+            self._entries.move_to_end(key)
+            if entry.name is None:
+                return None
+            self._stats["hits"] += 1
+            # 有効期間が半分を切ったら延長する（使われている間は期限切れにしない）
+            # 延長はリクエストを待たせないようバックグラウンドで行い、同時に要求された場合も1回だけ実行する
+            if entry.expires_at - now < self.ttl_seconds / 2 and key not in self._extending:
+                task = asyncio.ensure_future(self._extend(key, entry))
+                self._extending[key] = task
+                task.add_done_callback(lambda _: self._extending.pop(key, None))
+            return entry.name
+
+        if estimate_tokens(system_instruction) + sum(estimate_tokens(document) for document in documents) < self.min_tokens:
+            self._stats["skipped"] += 1
+            return None
+
+        task = self._creating.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._create(key, label, system_instruction, documents))
+            self._creating[key] = task
+            task.add_done_callback(lambda _: self._creating.pop(key, None))
+        entry = await asyncio.shield(task)
+        return entry.name
+
+    async def invalidate(self, label_prefix: str) -> int:
+        """
+        ラベルが前方一致するキャッシュを削除する（セッションの終了時など）
+
+        Returns:
+            int: 削除したキャッシュ数
+        """
+        keys = [key for key, entry in self._entries.items() if entry.label.startswith(label_prefix)]
+        for key in keys:
+            await self._delete(key)
+        return len(keys)
+
+    def forget(self, name: str) -> None:
+        """サーバー側で使えなくなったキャッシュを破棄する（次回のリクエストで作り直す）"""
+        for key, entry in list(self._entries.items()):
+            if entry.name == name:
+                self._entries.pop(key, None)
+                if self._labels.get(entry.label) == key:
+                    self._labels.pop(entry.label, None)
+
+    def get_stats(self) -> Dict[str, int]:
+        """キャッシュの保持数と、ヒット・作成・延長の累計を取得する"""
+        live = sum(1 for entry in self._entries.values() if entry.name is not None)
+        return {"entries": live, **self._stats}
+
+    def _key(self, system_instruction: str, documents: Sequence[str]) -> str:
+        digest = hashlib.sha256(self.model_name.encode("utf-8"))
+        for part in (system_instruction, *documents):
+            digest.update(b"\x00" + part.encode("utf-8"))
+        return digest.hexdigest()
+
+    async def _create(self, key: str, label: str, system_instruction: str, documents: Sequence[str]) -> CachedPrefix:
+        # 同じラベルの古い内容のキャッシュは使われなくなるので削除する
+        previous = self._labels.get(label)
+        if previous is not None and previous != key:
+            await self._delete(previous)
+        try:
+            cached = await self.client.aio.caches.create(
+                model=self.model_name,
+                config=types.CreateCachedContentConfig(
+                    system_instruction=system_instruction,
+                    contents=list(documents) or None,
+                    ttl=f"{self.ttl_seconds}s",
+                    display_name=label[:128]
+                )
+            )
+            entry = CachedPrefix(name=cached.name, label=label, expires_at=time.monotonic() + self.ttl_seconds)
+            self._stats["created"] += 1
+            logger.info(f"Created Gemini context cache for {label}: {cached.name}")
+        except Exception as e:
+            # 作成できない内容（モデルの下限未満など）を毎ターン試さないよう、有効期間の間は覚えておく
+            entry = CachedPrefix(name=None, label=label, expires_at=time.monotonic() + self.ttl_seconds)
+            self._stats["failed"] += 1
+            logger.warning(f"Failed to create Gemini context cache for {label}: {e}")
+        self._entries[key] = entry
+        self._labels[label] = key
+        while len(self._entries) > self.max_entries:
+            await self._delete(next(iter(self._entries)))
+        return entry
+
+    async def _extend(self, key: str, entry: CachedPrefix) -> None:
+        try:
+            await self.client.aio.caches.update(
+                name=entry.name,
+                config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+            )
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self._stats["extended"] += 1
+        except Exception as e:
+            # 延長できなくても期限まではそのまま使い、期限後に作り直す
+            logger.warning(f"Failed to extend Gemini context cache {entry.name}: {e}")
+
+    async def _delete(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        if self._labels.get(entry.label) == key:
+            self._labels.pop(entry.label, None)
+        if entry.name is None:
+            return
+        try:
+            await self.client.aio.caches.delete(name=entry.name)
+            self._stats["deleted"] += 1
+        except Exception as e:
+            # 削除できなくても有効期間が過ぎればサーバー側で削除される
+            logger.warning(f"Failed to delete Gemini context cache {entry.name}: {e}")
+
+
+def is_cache_unavailable(error: Exception) -> bool:
+    """キャッシュが期限切れ・削除済みで使えないことを示すエラーか"""
+    return isinstance(error, errors.APIError) and error.code in (403, 404)
+
+
+@lru_cache()
+def get_gemini_context_cache() -> Optional[GeminiContextCache]:
+    """プロセス共通のコンテキストキャッシュを取得する（無効化されている場合はNone）"""
+    settings = get_settings()
+    if not settings.GEMINI_CACHE_ENABLED:
+        return None
+    return GeminiContextCache(
+        ttl_seconds=settings.GEMINI_CACHE_TTL_SECONDS,
+        min_tokens=settings.GEMINI_CACHE_MIN_TOKENS,
+        max_entries=settings.GEMINI_CACHE_MAX_ENTRIES
+    )
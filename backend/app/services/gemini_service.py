@@ -1,20 +1,24 @@
 from google import genai
 from app.config.settings import get_settings
+from app.core.clients import get_client_registry
+from app.core.concurrency import get_gemini_limiter
 from loguru import logger
+from typing import Optional
 
 
 class GeminiService:
-    def __init__(self):
-        self.client = genai.Client(api_key=get_settings().GEMINI_API_KEY)
+    def __init__(self, client: Optional[genai.Client] = None):
+        self.client = client or get_client_registry().gemini()
         self.model_name = get_settings().GEMINI_MODEL_NAME
 
-    def generate_text(self, prompt: str) -> str:
+    async def generate_text(self, prompt: str) -> str:
         
         try:
-            response = self.client.models.generate_content(
-                model=self.model_name,
-                contents=prompt
-            )
+            async with get_gemini_limiter().slot():
+                response = await self.client.aio.models.generate_content(
+                    model=self.model_name,
+                    contents=prompt
+                )
             return response.text
         except Exception as e:
             logger.error(f"Error generating text: {e}")
@@ -0,0 +1,102 @@
+"""
+Geminiに送る会話履歴の組み立て
+
+直近の会話はトークン数の上限内でそのまま送り、それより古い会話はセッションに保存された要約で置き換える。
+要約がまだ追いついていない会話は、上限を超えても要約されるまでそのまま送る（どちらにも含まれない会話を作らない）。
+セッションが長くなっても1ターンあたりの入力トークン数（とレイテンシ）が一定以下に収まるようにするためのもの
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+import math
+
+
+@dataclass(frozen=True)
+class HistorySummary:
+    """セッションに保存された要約と、要約に含めた履歴の件数（先頭から）"""
+    text: str
+    turns: int
+
+
+@dataclass(frozen=True)
+class HistoryWindow:
+    """1回のリクエストで送る会話履歴"""
+    turns: List[List[str]] = field(default_factory=list)  # そのまま送る直近の会話
+    summary: Optional[str] = None
+    start: int = 0  # turnsの先頭の、履歴全体での位置
+    unsummarized: int = 0  # turnsの先頭のうち、上限の範囲より古いが要約されていないためにそのまま送る会話の件数
+    tokens: int = 0  # turnsのトークン数（概算）
+
+    def to_prompt(self) -> str:
+        """プロンプトに含める文字列（要約がない場合は従来どおり履歴のリストの文字列表現）"""
+        recent = str(self.turns) if self.turns else ""
+        if not self.summary:
+            return recent
+        return f"Summary of the earlier conversation:\n{self.summary}\n\nRecent conversation:\n{recent}"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    トークン数を概算する（UTF-8で4バイトを1トークンとみなす）
+    英語は1単語あたり1トークン強、日本語は1文字あたり1トークン弱になる
+    """
+    return math.ceil(len(text.encode("utf-8")) / 4)
+
+
+class HistoryBuilder:
+    """
+    会話履歴から送信する範囲を決めるクラス
+    直近 max_turns 件までを、合計が token_budget を超えない範囲で新しい方から採用します（最新の1件は必ず含める）
+    """
+
+    def __init__(self, max_turns: int = 20, token_budget: int = 1500, summary_batch_turns: int = 6):
+        """
+        Args:
+            max_turns (int): そのまま送る会話の最大件数
+            token_budget (int): そのまま送る会話のトークン数の上限
+            summary_batch_turns (int): 要約を更新する目安となる、要約されていない古い会話の件数
+        """
+        self.max_turns = max_turns
+        self.token_budget = token_budget
+        self.summary_batch_turns = summary_batch_turns
+
+    def build(self, history: Sequence[List[str]], summary: Optional[HistorySummary] = None) -> HistoryWindow:
+        """
+        送信する会話履歴を組み立てる
+
+        Args:
+            history (Sequence[List[str]]): セッションの会話履歴（古い順）
+            summary (Optional[HistorySummary]): セッションに保存された要約
+
+        Returns:
+            HistoryWindow: そのまま送る会話と要約
+        """
+        entries = list(history) if history else []
+        budget_start, tokens = self._window_start(entries)
+        summarized = min(summary.turns, len(entries)) if summary else 0
+        # 要約に含まれていない会話は落とさず、上限を超えてもそのまま送る
+        start = min(budget_start, summarized)
+        tokens += sum(estimate_tokens(" ".join(entry)) for entry in entries[start:budget_start])
+        return HistoryWindow(
+            turns=entries[start:],
+            summary=summary.text if summary else None,
+            start=start,
+            unsummarized=budget_start - start,
+            tokens=tokens
+        )
+
+    def needs_summary(self, window: HistoryWindow) -> bool:
+        """要約を更新すべきか（上限を超えてそのまま送っている、要約されていない会話が一定数たまったか）"""
+        return window.unsummarized >= self.summary_batch_turns
+
+    def _window_start(self, entries: List[List[str]]) -> Tuple[int, int]:
+        start = len(entries)
+        tokens = 0
+        lowest = max(len(entries) - self.max_turns, 0)
+        for index in range(len(entries) - 1, lowest - 1, -1):
+            cost = estimate_tokens(" ".join(entries[index]))
+            if start < len(entries) and tokens + cost > self.token_budget:
+                break
+            tokens += cost
+            start = index
+        return start, tokens
@@ -0,0 +1,138 @@
+"""
+会話履歴の要約
+
+そのまま送る範囲から外れた古い会話を、セッションに保存された要約へ少しずつ畳み込む。
+要約はターンごとではなく、要約されていない会話が一定数たまったときにバックグラウンドで更新する
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import asyncio
+import contextvars
+
+from google import genai
+from loguru import logger
+
+from app.config.settings import get_settings
+from app.core.clients import get_client_registry
+from app.core.concurrency import PRIORITY_BACKGROUND, get_gemini_limiter
+from app.prompts.audio_prompts import HistorySummaryPrompt
+from app.services.history_builder import HistoryBuilder, HistorySummary
+
+
+class HistorySummarizer:
+    """
+    古い会話履歴の要約をバックグラウンドで更新するクラス
+    同じセッションの要約は同時に1つしか実行しません
+    """
+
+    def __init__(self, builder: HistoryBuilder, client: Optional[genai.Client] = None, model_name: Optional[str] = None):
+        """
+        Args:
+            builder (HistoryBuilder): そのまま送る範囲を決めるビルダー（要約する範囲の判定に使う）
+            client (Optional[genai.Client]): 使用するクライアント（省略時はプロセス共有のクライアント）
+            model_name (Optional[str]): 使用するモデル（省略時は GEMINI_MODEL_NAME）
+        """
+        self.builder = builder
+        self._client = client
+        self.model_name = model_name or get_settings().GEMINI_MODEL_NAME
+        self.prompt = HistorySummaryPrompt()
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._stats = {"scheduled": 0, "updated": 0, "failed": 0}
+
+    @property
+    def client(self) -> genai.Client:
+        if self._client is None:
+            self._client = get_client_registry().gemini()
+        return self._client
+
+    def schedule(self, session_id: str, session_manager: Any) -> bool:
+        """
+        要約の更新をバックグラウンドで開始する（同じセッションの更新が実行中の場合は何もしない）
+
+        Returns:
+            bool: 新しく開始した場合はTrue
+        """
+        if session_id in self._tasks:
+            return False
+        # リクエストの作業単位などを引き継がないよう、空のコンテキストの中でタスクを作成する
+        # （create_task の context 引数は Python 3.11 以降でしか使えない）
+        task = contextvars.Context().run(
+            asyncio.get_running_loop().create_task,
+            self.summarize(session_id, session_manager),
+            name=f"history-summary-{session_id}"
+        )
+        self._tasks[session_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(session_id, None))
+        self._stats["scheduled"] += 1
+        return True
+
+    async def summarize(self, session_id: str, session_manager: Any) -> Optional[HistorySummary]:
+        """
+        そのまま送る範囲より古く、まだ要約されていない会話を要約に畳み込む
+
+        Returns:
+            Optional[HistorySummary]: 更新した要約（更新しなかった場合はNone）
+        """
+        try:
+            history, summary = await asyncio.gather(
+                session_manager.get_history(session_id),
+                session_manager.get_history_summary(session_id)
+            )
+            entries = list(history) if history else []
+            window = self.builder.build(entries, summary)
+            if window.unsummarized == 0:
+                return None
+
+            summarized = window.start + window.unsummarized
+            new_turns = entries[window.start:summarized]
+            prompt = self.prompt.format(
+                summary=summary.text if summary else "",
+                turns="\n".join(" ".join(entry) for entry in new_turns)
+            )
+            # 要約は応答を待っているリクエストより後回しにする
+            async with get_gemini_limiter().slot(priority=PRIORITY_BACKGROUND):
+                response = await self.client.aio.models.generate_content(model=self.model_name, contents=[prompt])
+            text = (response.text or "").strip()
+            if not text:
+                raise ValueError("Empty summary")
+
+            updated = HistorySummary(text=text, turns=summarized)
+            await session_manager.save_history_summary(session_id, updated)
+            self._stats["updated"] += 1
+            logger.info(f"Folded {len(new_turns)} turns into the history summary for session: {session_id}")
+            return updated
+        except Exception as e:
+            # 要約できなくても、次にたまったときに再度試みる
+            self._stats["failed"] += 1
+            logger.error(f"Failed to summarize history for session {session_id}: {e}")
+            return None
+
+    def get_stats(self) -> Dict[str, int]:
+        """実行中の要約数と累計の件数を取得する"""
+        return {"running": len(self._tasks), **self._stats}
+
+    async def shutdown(self) -> None:
+        """実行中の要約をキャンセルする（要約は次の機会に作り直せるため待たない）"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def get_history_builder() -> HistoryBuilder:
+    """設定に基づいて会話履歴のビルダーを作成する"""
+    settings = get_settings()
+    return HistoryBuilder(
+        max_turns=settings.HISTORY_MAX_TURNS,
+        token_budget=settings.HISTORY_TOKEN_BUDGET,
+        summary_batch_turns=settings.HISTORY_SUMMARY_BATCH_TURNS
+    )
+
+
+@lru_cache()
+def get_history_summarizer() -> Optional[HistorySummarizer]:
+    """プロセス共通の要約サービスを取得する（無効化されている場合はNone）"""
+    if not get_settings().HISTORY_SUMMARY_ENABLED:
+        return None
+    return HistorySummarizer(get_history_builder())
@@ -0,0 +1,175 @@
+"""
+HTMLからのタイトル・本文の抽出
+
+抽出エンジンは差し替え可能で、lxmlがインストールされている場合はCで実装されたパーサーを使う
+（大きなニュースページでは html.parser の数倍速い）。
+本文は上限のバイト数に達した時点で走査を打ち切るので、巨大なページでも抽出時間が一定以下に収まる
+"""
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Tuple, Type
+import importlib.util
+
+from bs4 import BeautifulSoup
+from bs4.dammit import EncodingDetector
+
+
+# 本文に含めない要素
+REMOVED_TAGS = ('script', 'style', 'nav', 'header', 'footer', 'aside')
+
+
+@dataclass(frozen=True)
+class ExtractedPage:
+    """抽出結果"""
+    title: str
+    content: str
+    truncated: bool = False  # 上限に達して本文を打ち切ったか
+
+
+def join_text(fragments: Iterable[str], max_bytes: int) -> Tuple[str, bool]:
+    """
+    テキスト片を連結して空白を正規化する（max_bytes に達した時点で残りの走査をやめる）
+
+    Returns:
+        Tuple[str, bool]: 本文と、打ち切ったかどうか
+    """
+    parts = []
+    size = 0
+    truncated = False
+    for fragment in fragments:
+        parts.append(fragment)
+        size += len(fragment.encode("utf-8"))
+        if size > max_bytes:
+            truncated = True
+            break
+    content = " ".join("".join(parts).split())
+    if truncated:
+        content = content.encode("utf-8")[:max_bytes].decode("utf-8", errors="ignore")
+    return content, truncated
+
+
+class HtmlExtractor(ABC):
+    """抽出エンジンの基底クラス"""
+
+    name = ""
+
+    @abstractmethod
+    def extract(self, body: bytes, encoding: Optional[str] = None, max_bytes: int = 200 * 1024) -> ExtractedPage:
+        """
+        HTMLからタイトルとメインコンテンツのテキストを抽出する
+
+        Args:
+            body (bytes): HTML
+            encoding (Optional[str]): レスポンスヘッダーの文字コード（省略時はHTMLから判定）
+            max_bytes (int): 本文の最大バイト数（UTF-8）
+
+        Returns:
+            ExtractedPage: タイトルと本文
+        """
+
+
+class BeautifulSoupExtractor(HtmlExtractor):
+    """標準ライブラリの html.parser を使う抽出エンジン（追加の依存なし）"""
+
+    name = "html.parser"
+
+    def extract(self, body: bytes, encoding: Optional[str] = None, max_bytes: int = 200 * 1024) -> ExtractedPage:
+        soup = BeautifulSoup(body, 'html.parser', from_encoding=encoding)
+
+        # 不要な要素を削除
+        for element in soup(REMOVED_TAGS):
+            element.decompose()
+
+        # タイトルの取得
+        title = soup.find('title')
+        title_text = title.get_text().strip() if title else "No title"
+
+        # メインコンテンツの抽出
+        main_content = None
+        for selector in ['main', 'article', 'div[role="main"]', 'body']:
+            main_content = soup.select_one(selector)
+            if main_content:
+                break
+        if not main_content:
+            main_content = soup
+
+        content, truncated = join_text(main_content.strings, max_bytes)
+        return ExtractedPage(title=title_text, content=content, truncated=truncated)
+
+
+class LxmlExtractor(HtmlExtractor):
+    """lxml（libxml2）を使う高速な抽出エンジン"""
+
+    name = "lxml"
+
+    def __init__(self):
+        from lxml import etree, html
+        self._etree = etree
+        self._html = html
+
+    def extract(self, body: bytes, encoding: Optional[str] = None, max_bytes: int = 200 * 1024) -> ExtractedPage:
+        parser = self._html.HTMLParser(encoding=encoding or self._detect_encoding(body))
+        document = self._html.document_fromstring(body, parser=parser)
+
+        # 不要な要素とコメントを削除（後ろに続くテキストは残す）
+        self._etree.strip_elements(document, self._etree.Comment, *REMOVED_TAGS, with_tail=False)
+
+        # タイトルの取得
+        title = document.find('.//title')
+        title_text = title.text_content().strip() if title is not None else "No title"
+
+        # メインコンテンツの抽出
+        main_content = None
+        for path in ['.//main', './/article', './/div[@role="main"]', './/body']:
+            main_content = document.find(path)
+            if main_content is not None:
+                break
+        if main_content is None:
+            main_content = document
+
+        content, truncated = join_text(main_content.itertext(), max_bytes)
+        return ExtractedPage(title=title_text, content=content, truncated=truncated)
+
+    @staticmethod
+    def _detect_encoding(body: bytes) -> str:
+        """
+        HTMLで宣言された文字コード、なければUTF-8として読めるかで判定する
+        （libxml2は宣言がないとLatin-1として読むため、html.parser側の判定に合わせる）
+        """
+        declared = EncodingDetector.find_declared_encoding(body, is_html=True)
+        if declared:
+            return declared
+        try:
+            body.decode("utf-8")
+            return "utf-8"
+        except UnicodeDecodeError:
+            return "windows-1252"
+
+
+EXTRACTORS: Dict[str, Type[HtmlExtractor]] = {
+    LxmlExtractor.name: LxmlExtractor,
+    BeautifulSoupExtractor.name: BeautifulSoupExtractor,
+}
+
+
+def lxml_available() -> bool:
+    return importlib.util.find_spec("lxml") is not None
+
+
+def get_html_extractor(name: str = "auto") -> HtmlExtractor:
+    """
+    抽出エンジンを作成する
+
+    Args:
+        name (str): auto / lxml / html.parser（auto の場合はlxmlがあればlxml）
+
+    Raises:
+        ValueError: 未知のエンジン名の場合
+        ImportError: lxml を指定したがインストールされていない場合
+    """
+    if name == "auto":
+        name = LxmlExtractor.name if lxml_available() else BeautifulSoupExtractor.name
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown HTML extractor: {name}")
+    return EXTRACTORS[name]()
@@ -2,216 +2,428 @@
 ハイブリッドセッション管理サービス
 
 メモリとデータベースを並行して管理し、段階的な移行を可能にする
+データベースの障害はサーキットブレーカーで検出し、障害中はメモリで動作する。
+障害中のデータベースへの書き込みは書き込みログに順に積み、復旧を確認したら同じ順序で反映する
+障害中に払い出す会話IDは仮の番号で、反映時にデータベースで採番した番号と異なった場合は対応付けて読み替える
+データベースの呼び出しは作業単位の中で行い、エラーを既定値（空の履歴など）にせず例外として受け取る
 """
 
-from typing import Dict, Optional, List, Any
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, Optional, List, Any, Tuple
+import asyncio
+import time
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError
+from app.config.database import unit_of_work
 from app.config.settings import get_settings
+from app.core.circuit_breaker import CircuitBreaker, CircuitState
 from app.services.session_manager import SessionManagerService
 from app.services.postgres_session_manager import PostgresSessionManagerService
-import uuid
+from app.services.history_builder import HistorySummary
 from loguru import logger
 
 
+# データベースで採番された番号が分からないセッションの仮の会話IDは、この値より大きい範囲から払い出す
+PROVISIONAL_CONVERSATION_BASE = 1_000_000_000
+
+# 書き込みログにだけ積む操作（復旧後にデータベースの会話カウンタを仮の会話IDと同じだけ進める）
+ALLOCATE_CONVERSATION_ID = "allocate_conversation_id"
+
+
+@dataclass
+class PendingWrite:
+    """データベースへの反映を待っている書き込み"""
+    operation: str  # PostgresSessionManagerService のメソッド名
+    args: Tuple[Any, ...]
+    queued_at: float = field(default_factory=time.monotonic)
+
+
+def is_rejected_write(e: Exception) -> bool:
+    """
+    データベースが応答したうえで拒否したエラーか（制約違反や不正なIDなど）
+    再試行しても成功しないので、障害として数えず書き込みログにも積まない
+    """
+    if isinstance(e, (OperationalError, InterfaceError)):
+        return False
+    if isinstance(e, DBAPIError):
+        return not e.connection_invalidated
+    return isinstance(e, (ValueError, LookupError))
+
+
 class HybridSessionManagerService:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super().__new__(cls)
         return cls._instance
-    
+
     def __init__(self):
         if not hasattr(self, '_initialized'):
+            settings = get_settings()
             self._memory_manager = SessionManagerService()
             self._db_manager = PostgresSessionManagerService()
-            self._use_database = True  # データベース使用フラグ
+            self._breaker = CircuitBreaker(
+                "database",
+                failure_threshold=settings.HYBRID_DB_FAILURE_THRESHOLD,
+                probe_interval=settings.HYBRID_DB_PROBE_INTERVAL
+            )
+            self._pending: Deque[PendingWrite] = deque()  # 書き込みログ（古い順）
+            self._max_pending = settings.HYBRID_WRITE_BEHIND_MAX_ENTRIES
+            self._replay_lock = asyncio.Lock()
+            self._stats = {"queued": 0, "replayed": 0, "discarded": 0, "dropped": 0, "remapped": 0}
+            self._db_conversation_numbers: Dict[str, int] = {}  # データベースで最後に採番された会話番号
+            self._provisional_numbers: Dict[str, int] = {}  # 障害中に最後に払い出した仮の会話番号
+            self._conversation_id_map: Dict[Tuple[str, str], str] = {}  # (セッションID, 仮の会話ID) -> 採番された会話ID
             self._initialized = True
             logger.info("HybridSessionManagerService initialized")
-    
+
+    async def _sync_database(self) -> bool:
+        """
+        データベースを使えるか確認し、使える場合は書き込みログを順に反映する
+        openの間は probe_interval ごとに1回だけ接続を確認する（他のリクエストはメモリで処理する）
+
+        Returns:
+            bool: 反映待ちの書き込みがなく、データベースから読み書きできる場合True
+        """
+        if self._breaker.state is CircuitState.CLOSED and not self._pending:
+            return True
+        if self._replay_lock.locked():
+            # 別のリクエストが確認・反映中（反映が終わるまではメモリの内容を使う）
+            return False
+
+        async with self._replay_lock:
+            if self._breaker.state is not CircuitState.CLOSED:
+                if not self._breaker.allow_request():
+                    return False
+                try:
+                    await self._call_database("ping")
+                except Exception as e:
+                    logger.warning(f"Database is still unavailable: {e}")
+                    self._breaker.record_failure()
+                    return False
+                self._breaker.record_success()
+            await self._replay_pending()
+            if not self._pending:
+                # 次の障害では、データベースで最後に採番された番号から仮の番号を払い出す
+                self._provisional_numbers.clear()
+        return self._breaker.state is CircuitState.CLOSED and not self._pending
+
+    async def _replay_pending(self) -> None:
+        """書き込みログを古い順にデータベースへ反映する（失敗した場合は残りを次の機会に反映する）"""
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} queued database writes")
+        while self._pending:
+            entry = self._pending[0]
+            try:
+                await self._apply(entry.operation, entry.args)
+            except Exception as e:
+                if not is_rejected_write(e):
+                    logger.warning(f"Replay of {entry.operation} failed, {len(self._pending)} writes remain queued: {e}")
+                    self._breaker.record_failure()
+                    return
+                # 拒否された書き込みは何度反映しても成功しないので、後続の書き込みを止めないよう捨てる
+                logger.error(f"Discarding queued {entry.operation} rejected by the database: {e}")
+                self._stats["discarded"] += 1
+            else:
+                self._stats["replayed"] += 1
+            self._pending.popleft()
+
+    async def _apply(self, operation: str, args: Tuple[Any, ...]) -> None:
+        """書き込みをデータベースに反映する（仮の会話IDは採番された会話IDに読み替える）"""
+        if operation == ALLOCATE_CONVERSATION_ID:
+            session_id, provisional_id = args
+            conversation_id = await self._call_database("get_next_conversation_id", session_id)
+            self._remember_conversation_id(session_id, conversation_id)
+            if conversation_id != provisional_id:
+                self._conversation_id_map[(session_id, provisional_id)] = conversation_id
+                self._stats["remapped"] += 1
+                logger.warning(f"Provisional conversation id {provisional_id} of session {session_id} was allocated as {conversation_id}")
+            return
+        if operation == "save_analysis_result":
+            session_id, conversation_id, *rest = args
+            resolved = self._resolve_conversation_id(session_id, conversation_id)
+            if resolved.isdigit() and int(resolved) > PROVISIONAL_CONVERSATION_BASE:
+                # 仮の会話IDの採番が反映されていない（捨てられた）場合は、存在しない番号の会話を作らない
+                raise ValueError(f"Conversation id {conversation_id} of session {session_id} was never allocated")
+            args = (session_id, resolved, *rest)
+        if await self._call_database(operation, *args) is False:
+            # 対象のセッションがない（作成が捨てられた場合など）。反映済みとして数えず、拒否として扱う
+            raise LookupError(f"{operation} matched no session: {args[0]}")
+
+    async def _call_database(self, operation: str, *args: Any) -> Any:
+        """
+        PostgresSessionManagerService のメソッドを作業単位の中で呼び出す
+        作業単位の外ではDBのエラーが既定値（空の履歴・Noneなど）として返り、障害を検出できないため
+        """
+        async with unit_of_work():
+            return await getattr(self._db_manager, operation)(*args)
+
+    def _resolve_conversation_id(self, session_id: str, conversation_id: str) -> str:
+        return self._conversation_id_map.get((session_id, conversation_id), conversation_id)
+
+    def _remember_conversation_id(self, session_id: str, conversation_id: str) -> None:
+        try:
+            number = int(conversation_id)
+        except (TypeError, ValueError):
+            return
+        self._db_conversation_numbers[session_id] = max(number, self._db_conversation_numbers.get(session_id, 0))
+
+    def _allocate_provisional_number(self, session_id: str) -> int:
+        """
+        障害中の仮の会話番号を払い出す
+        データベースで最後に採番された番号が分かる場合はその続きから（復旧後の採番と一致する）、
+        分からない場合は既存の会話と重ならない範囲から払い出す
+        """
+        last = self._provisional_numbers.get(session_id)
+        if last is None:
+            last = self._db_conversation_numbers.get(session_id, PROVISIONAL_CONVERSATION_BASE)
+        self._provisional_numbers[session_id] = last + 1
+        return last + 1
+
+    def _enqueue(self, operation: str, *args: Any) -> None:
+        """書き込みログに追加する（上限を超えた場合は反映済みの順序を崩さないよう新しい書き込みを捨てる）"""
+        if len(self._pending) >= self._max_pending:
+            self._stats["dropped"] += 1
+            logger.error(f"Write-behind log is full ({self._max_pending}), dropping {operation}")
+            return
+        self._pending.append(PendingWrite(operation, args))
+        self._stats["queued"] += 1
+
+    def _record_failure(self, operation: str, e: Exception) -> None:
+        if is_rejected_write(e):
+            logger.warning(f"Database {operation} was rejected: {e}")
+        else:
+            logger.warning(f"Database {operation} failed: {e}")
+            self._breaker.record_failure()
+
+    async def _write_to_database(self, operation: str, *args: Any) -> bool:
+        """
+        データベースに書き込む
+        データベースを使えない場合や反映待ちの書き込みがある場合は、順序を保つため書き込みログに追加する
+
+        Returns:
+            bool: 書き込みログに追加した場合True
+        """
+        if await self._sync_database():
+            try:
+                await self._apply(operation, args)
+                self._breaker.record_success()
+                return False
+            except Exception as e:
+                self._record_failure(operation, e)
+                if is_rejected_write(e):
+                    return False
+        self._enqueue(operation, *args)
+        return True
+
     async def create_session(self, title: str = "New Session", name: Optional[str] = None, url: Optional[str] = None) -> str:
-        """セッションを作成（メモリとデータベースの両方に保存）"""
+        """セッションを作成（メモリとデータベースの両方に同じIDで保存）"""
         try:
-            # メモリに作成
-            memory_session_id = self._memory_manager.create_session()
-            
-            # データベースにも作成
-            if self._use_database:
-                db_session_id = await self._db_manager.create_session(title, name, url)
-                logger.info(f"Created session in both memory ({memory_session_id}) and database ({db_session_id})")
-                return db_session_id  # データベースのIDを返す
-            else:
-                logger.info(f"Created session in memory only: {memory_session_id}")
-                return memory_session_id
-                
+            if await self._sync_database():
+                try:
+                    session_id = await self._call_database("create_session", title, name, url)
+                    self._breaker.record_success()
+                    self._memory_manager.create_session(session_id)
+                    logger.info(f"Created session in both memory and database: {session_id}")
+                    return session_id
+                except Exception as e:
+                    self._record_failure("create_session", e)
+
+            # データベースを使えない場合はメモリで採番し、復旧後に同じIDで作成する
+            session_id = self._memory_manager.create_session()
+            self._enqueue("create_session", title, name, url, session_id)
+            logger.info(f"Created session in memory only: {session_id}")
+            return session_id
+
         except Exception as e:
             logger.error(f"Failed to create session: {e}")
-            # データベースが失敗した場合はメモリのみを使用
-            if self._use_database:
-                logger.warning("Falling back to memory-only session creation")
-                self._use_database = False
-                return self._memory_manager.create_session()
             raise
-    
+
     async def get_history(self, session_id: str) -> List[List[str]]:
         """履歴を取得（データベース優先、フォールバックでメモリ）"""
         try:
-            if self._use_database:
+            if await self._sync_database():
                 try:
-                    return await self._db_manager.get_history(session_id)
+                    return await self._call_database("get_history", session_id)
                 except Exception as e:
-                    logger.warning(f"Database get_history failed, falling back to memory: {e}")
-                    self._use_database = False
-            
+                    self._record_failure("get_history", e)
+
             return self._memory_manager.get_history(session_id)
-            
+
         except Exception as e:
             logger.error(f"Failed to get history: {e}")
             return []
-    
+
     async def add_to_history(self, session_id: str, content: List[str]) -> None:
         """履歴を追加（メモリとデータベースの両方に保存）"""
         try:
             # メモリに追加
             self._memory_manager.add_to_history(session_id, content)
-            
+
             # データベースにも追加
-            if self._use_database:
-                try:
-                    await self._db_manager.add_to_history(session_id, content)
-                except Exception as e:
-                    logger.warning(f"Database add_to_history failed: {e}")
-                    self._use_database = False
-                    
+            queued = await self._write_to_database("add_to_history", session_id, list(content))
+            if queued and any(item.startswith('"user":') and item[len('"user":'):].strip() for item in content):
+                # データベースでは書き起こしの追加でも会話番号を採番するので、仮の番号も同じだけ進める
+                self._allocate_provisional_number(session_id)
+
         except Exception as e:
             logger.error(f"Failed to add to history: {e}")
             raise
-    
+
     async def save_analysis_result(self, session_id: str, conversation_id: str, transcription: str, analysis_result: Dict[str, Any]) -> None:
         """分析結果を保存（メモリとデータベースの両方に保存）"""
         try:
             # メモリに保存
             self._memory_manager.save_analysis_result(session_id, conversation_id, transcription, analysis_result)
-            
+
             # データベースにも保存
-            if self._use_database:
-                try:
-                    await self._db_manager.save_analysis_result(session_id, conversation_id, transcription, analysis_result)
-                except Exception as e:
-                    logger.warning(f"Database save_analysis_result failed: {e}")
-                    self._use_database = False
-                    
+            await self._write_to_database("save_analysis_result", session_id, conversation_id, transcription, analysis_result)
+
         except Exception as e:
             logger.error(f"Failed to save analysis result: {e}")
             raise
-    
+
     async def get_analysis_result(self, session_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
         """分析結果を取得（データベース優先、フォールバックでメモリ）"""
         try:
-            if self._use_database:
+            if await self._sync_database():
                 try:
-                    result = await self._db_manager.get_analysis_result(session_id, conversation_id)
+                    result = await self._call_database(
+                        "get_analysis_result", session_id, self._resolve_conversation_id(session_id, conversation_id)
+                    )
                     if result is not None:
                         return result
                 except Exception as e:
-                    logger.warning(f"Database get_analysis_result failed, falling back to memory: {e}")
-                    self._use_database = False
-            
+                    self._record_failure("get_analysis_result", e)
+
             return self._memory_manager.get_analysis_result(session_id, conversation_id)
-            
+
         except Exception as e:
             logger.error(f"Failed to get analysis result: {e}")
             return None
-    
+
     async def get_all_analysis_results(self, session_id: str) -> Dict[str, Any]:
         """全分析結果を取得（データベース優先、フォールバックでメモリ）"""
         try:
-            if self._use_database:
+            if await self._sync_database():
                 try:
-                    return await self._db_manager.get_all_analysis_results(session_id)
+                    return await self._call_database("get_all_analysis_results", session_id)
                 except Exception as e:
-                    logger.warning(f"Database get_all_analysis_results failed, falling back to memory: {e}")
-                    self._use_database = False
-            
+                    self._record_failure("get_all_analysis_results", e)
+
             return self._memory_manager.get_all_analysis_results(session_id)
-            
+
         except Exception as e:
             logger.error(f"Failed to get all analysis results: {e}")
             return {}
-    
+
     async def delete_session(self, session_id: str) -> None:
         """セッションを削除（メモリとデータベースの両方から削除）"""
         try:
             # メモリから削除
             self._memory_manager.delete_session(session_id)
-            
+
             # データベースからも削除
-            if self._use_database:
-                try:
-                    await self._db_manager.delete_session(session_id)
-                except Exception as e:
-                    logger.warning(f"Database delete_session failed: {e}")
-                    self._use_database = False
-                    
+            await self._write_to_database("delete_session", session_id)
+            self._forget_conversation_ids(session_id)
+
         except Exception as e:
             logger.error(f"Failed to delete session: {e}")
             raise
-    
+
     async def save_webpage_data(self, session_id: str, webpage_data: Dict[str, str]) -> None:
         """Webページデータを保存（メモリとデータベースの両方に保存）"""
         try:
             # メモリに保存
             self._memory_manager.save_webpage_data(session_id, webpage_data)
-            
+
             # データベースにも保存
-            if self._use_database:
-                try:
-                    await self._db_manager.save_webpage_data(session_id, webpage_data)
-                except Exception as e:
-                    logger.warning(f"Database save_webpage_data failed: {e}")
-                    self._use_database = False
-                    
+            await self._write_to_database("save_webpage_data", session_id, dict(webpage_data))
+
         except Exception as e:
             logger.error(f"Failed to save webpage data: {e}")
             raise
-    
+
     async def get_webpage_data(self, session_id: str) -> Optional[Dict[str, str]]:
         """Webページデータを取得（データベース優先、フォールバックでメモリ）"""
         try:
-            if self._use_database:
+            if await self._sync_database():
                 try:
-                    result = await self._db_manager.get_webpage_data(session_id)
+                    result = await self._call_database("get_webpage_data", session_id)
                     if result is not None:
                         return result
                 except Exception as e:
-                    logger.warning(f"Database get_webpage_data failed, falling back to memory: {e}")
-                    self._use_database = False
-            
+                    self._record_failure("get_webpage_data", e)
+
             return self._memory_manager.get_webpage_data(session_id)
-            
+
         except Exception as e:
             logger.error(f"Failed to get webpage data: {e}")
             return None
-    
+
+    async def get_history_summary(self, session_id: str) -> Optional[HistorySummary]:
+        """会話履歴の要約を取得（要約はデータベースにのみ保存される）"""
+        if not await self._sync_database():
+            return None
+        try:
+            return await self._call_database("get_history_summary", session_id)
+        except Exception as e:
+            logger.error(f"Failed to get history summary: {e}")
+            self._record_failure("get_history_summary", e)
+            return None
+
+    async def save_history_summary(self, session_id: str, summary: HistorySummary) -> None:
+        """会話履歴の要約を保存（データベースを使えない場合は復旧後に保存する）"""
+        try:
+            await self._write_to_database("save_history_summary", session_id, summary)
+        except Exception as e:
+            logger.error(f"Failed to save history summary: {e}")
+
     async def get_next_conversation_id(self, session_id: str) -> str:
-        """次の会話IDを取得（データベース優先、フォールバックでメモリ）"""
+        """
+        次の会話IDを取得（データベース優先）
+        データベースを使えない場合は仮の会話IDを払い出し、復旧後にデータベースの会話カウンタを同じ順序で進める
+        """
         try:
-            if self._use_database:
+            if await self._sync_database():
                 try:
-                    return await self._db_manager.get_next_conversation_id(session_id)
+                    conversation_id = await self._call_database("get_next_conversation_id", session_id)
+                    self._remember_conversation_id(session_id, conversation_id)
+                    return conversation_id
                 except Exception as e:
-                    logger.warning(f"Database get_next_conversation_id failed, falling back to memory: {e}")
-                    self._use_database = False
-            
-            return self._memory_manager.get_next_conversation_id(session_id)
-            
+                    self._record_failure("get_next_conversation_id", e)
+                    if is_rejected_write(e):
+                        raise
+
+            conversation_id = str(self._allocate_provisional_number(session_id))
+            self._enqueue(ALLOCATE_CONVERSATION_ID, session_id, conversation_id)
+            logger.info(f"Generated provisional conversation_id: {conversation_id} for session: {session_id}")
+            return conversation_id
+
         except Exception as e:
             logger.error(f"Failed to get next conversation id: {e}")
-            return "1"
-    
+            raise
+
+    def _forget_conversation_ids(self, session_id: str) -> None:
+        self._db_conversation_numbers.pop(session_id, None)
+        self._provisional_numbers.pop(session_id, None)
+        for key in [key for key in self._conversation_id_map if key[0] == session_id]:
+            del self._conversation_id_map[key]
+
     def get_status(self) -> Dict[str, Any]:
-        """現在の状態を取得"""
+        """現在の状態（サーキットブレーカーの状態と反映待ちの書き込み数を含む）を取得"""
+        oldest = self._pending[0].queued_at if self._pending else None
         return {
-            "use_database": self._use_database,
+            "use_database": self._breaker.state is CircuitState.CLOSED and not self._pending,
+            "circuit": self._breaker.get_stats(),
+            "write_behind": {
+                "pending": len(self._pending),
+                "max_entries": self._max_pending,
+                "oldest_pending_seconds": time.monotonic() - oldest if oldest is not None else None,
+                "remapped_conversation_ids": len(self._conversation_id_map),
+                **self._stats
+            },
             "memory_sessions_count": len(self._memory_manager._sessions),
             "memory_analysis_results_count": len(self._memory_manager._analysis_results)
         }
@@ -224,4 +436,4 @@ class HybridSessionManagerServiceFactory:
     def create(cls) -> HybridSessionManagerService:
         if cls._instance is None:
             cls._instance = HybridSessionManagerService()
-        return cls._instance 
\ No newline at end of file
+        return cls._instance
@@ -1,7 +1,13 @@
+from datetime import datetime, timedelta, timezone
+from functools import partial
 from typing import Dict, Optional, List, Any
 from app.config.settings import get_settings
 from app.services.database_service import DatabaseService
-from app.config.database import get_async_db
+from app.services.session_context_cache import get_session_context_cache
+from app.services.history_builder import HistorySummary
+from app.core.analysis_notifier import ANALYSIS_READY_CHANNEL, get_analysis_notifier
+from app.config.database import after_commit, db_session, in_unit_of_work
+from sqlalchemy import text
 from loguru import logger
 import uuid
 
@@ -14,22 +20,35 @@ class PostgresSessionManagerService:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    async def create_session(self, title: str = "New Session", name: Optional[str] = None, url: Optional[str] = None) -> str:
-        """新しいセッションを作成"""
+    async def create_session(
+        self, title: str = "New Session", name: Optional[str] = None, url: Optional[str] = None, session_id: Optional[str] = None
+    ) -> str:
+        """新しいセッションを作成（session_idを指定した場合はそのIDで作成する）"""
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
-                session = await db_service.create_session(title=title, name=name, url=url)
+                session = await db_service.create_session(title=title, name=name, url=url, session_id=session_id)
                 logger.debug(f"Created session: {session.id}")
                 return str(session.id)
         except Exception as e:
             logger.error(f"Failed to create session: {e}")
             raise
 
+    async def ping(self) -> None:
+        """データベースに接続できるか確認する（接続できない場合は例外）"""
+        async with db_session() as db:
+            await db.execute(text("SELECT 1"))
+
     async def get_history(self, session_id: str) -> List[List[str]]:
         """セッションの会話履歴を取得（従来の形式に変換）"""
+        cache = get_session_context_cache()
+        if cache is not None:
+            history = cache.get_history(session_id)
+            if history is not None:
+                return history if history else ""
+            version = cache.version(session_id)
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 conversations = await db_service.get_conversations(session_id)
                 
@@ -38,16 +57,21 @@ class PostgresSessionManagerService:
                 for conv in conversations:
                     if conv.transcription:
                         history.append([f'"user":{conv.transcription}', f'"model":""'])
-                
+
+                if cache is not None:
+                    after_commit(db, partial(cache.set_history, session_id, list(history), version))
                 return history if history else ""
         except Exception as e:
             logger.error(f"Failed to get history: {e}")
+            if in_unit_of_work():
+                # 作業単位のトランザクションは取り消されているので、既定値を返さず作業単位に任せる
+                raise
             return []
 
     async def add_to_history(self, session_id: str, content: List[str]) -> None:
         """会話履歴に追加（従来の形式から変換）"""
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 
                 # 従来の形式からtranscriptionを抽出
@@ -58,13 +82,13 @@ class PostgresSessionManagerService:
                         break
                 
                 if transcription:
-                    conversation_number = await db_service.get_next_conversation_number(session_id)
+                    # 会話番号は挿入と同じトランザクションで採番する
                     await db_service.create_conversation(
                         session_id=session_id,
-                        conversation_number=conversation_number,
                         transcription=transcription,
                         analysis_type="transcript"
                     )
+                    after_commit(db, lambda: self._cache_append(session_id, transcription))
                     logger.debug(f"Added to history for session: {session_id}")
         except Exception as e:
             logger.error(f"Failed to add to history: {e}")
@@ -79,44 +103,39 @@ class PostgresSessionManagerService:
     ) -> None:
         """文法分析結果を保存"""
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 
-                # conversation_idが数値の場合は、その番号の会話を更新
+                # conversation_idが数値の場合は、その番号の会話を更新（存在しない場合は新規作成）
                 try:
                     conv_number = int(conversation_id)
-                    conversations = await db_service.get_conversations(session_id)
-                    target_conversation = None
-                    
-                    for conv in conversations:
-                        if conv.conversation_number == conv_number:
-                            target_conversation = conv
-                            break
-                    
-                    if target_conversation:
-                        await db_service.update_conversation_analysis(
-                            conversation_id=str(target_conversation.id),
-                            analysis_result=analysis_result
-                        )
-                        logger.debug(f"Saved analysis result for session: {session_id}, conversation_id: {conversation_id}")
-                    else:
-                        # 会話が存在しない場合は新規作成
-                        await db_service.create_conversation(
-                            session_id=session_id,
-                            conversation_number=conv_number,
-                            transcription=transcription,
-                            analysis_type="audio" if "advice" in analysis_result else "transcript",
-                            analysis_result=analysis_result
-                        )
-                        logger.debug(f"Created conversation with analysis for session: {session_id}, conversation_id: {conversation_id}")
-                        
                 except ValueError:
+                    conv_number = None
+
+                if conv_number is not None:
+                    await db_service.upsert_conversation_analysis(
+                        session_id=session_id,
+                        conversation_number=conv_number,
+                        transcription=transcription,
+                        analysis_type="audio" if "advice" in analysis_result else "transcript",
+                        analysis_result=analysis_result
+                    )
+                    if transcription:
+                        # 履歴に並ぶ会話が増えた可能性があるので、次回はDBから読み直す
+                        after_commit(db, lambda: self._cache_invalidate(session_id))
+                    logger.debug(f"Saved analysis result for session: {session_id}, conversation_id: {conversation_id}")
+                else:
                     # conversation_idがUUIDの場合は直接更新
                     await db_service.update_conversation_analysis(
                         conversation_id=conversation_id,
                         analysis_result=analysis_result
                     )
                     logger.debug(f"Saved analysis result for session: {session_id}, conversation_id: {conversation_id}")
+
+                # 結果を待っているリクエストに通知する（コミット前に通知すると再取得で結果が見えない）
+                after_commit(db, lambda: get_analysis_notifier().notify(session_id, conversation_id))
+                if get_settings().ANALYSIS_NOTIFY_BACKEND == "postgres":
+                    await db_service.notify_analysis_ready(ANALYSIS_READY_CHANNEL, session_id, conversation_id)
                     
         except Exception as e:
             logger.error(f"Failed to save analysis result: {e}")
@@ -125,26 +144,27 @@ class PostgresSessionManagerService:
     async def get_analysis_result(self, session_id: str, conversation_id: str) -> Optional[Dict[str, Any]]:
         """指定された会話IDの文法分析結果を取得"""
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 
                 # conversation_idが数値の場合は、その番号の会話を検索
                 try:
                     conv_number = int(conversation_id)
-                    conversations = await db_service.get_conversations(session_id)
-                    
-                    for conv in conversations:
-                        if conv.conversation_number == conv_number:
-                            return {
-                                "advice": conv.advice,
-                                "speechflaws": conv.speechflaws,
-                                "nuanceinquiry": conv.nuanceinquiry,
-                                "alternativeexpressions": conv.alternativeexpressions,
-                                "suggestion": conv.suggestion
-                            }
-                    return None
-                    
                 except ValueError:
+                    conv_number = None
+
+                if conv_number is not None:
+                    conv = await db_service.get_conversation_by_number(session_id, conv_number)
+                    if conv:
+                        return {
+                            "advice": conv.advice,
+                            "speechflaws": conv.speechflaws,
+                            "nuanceinquiry": conv.nuanceinquiry,
+                            "alternativeexpressions": conv.alternativeexpressions,
+                            "suggestion": conv.suggestion
+                        }
+                    return None
+                else:
                     # conversation_idがUUIDの場合は直接取得
                     conversation = await db_service.get_conversation(conversation_id)
                     if conversation:
@@ -159,12 +179,15 @@ class PostgresSessionManagerService:
                     
         except Exception as e:
             logger.error(f"Failed to get analysis result: {e}")
+            if in_unit_of_work():
+                # 作業単位のトランザクションは取り消されているので、既定値を返さず作業単位に任せる
+                raise
             return None
 
     async def get_all_analysis_results(self, session_id: str) -> Dict[str, Any]:
         """セッションの全ての文法分析結果を取得"""
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 conversations = await db_service.get_conversations(session_id)
                 
@@ -183,62 +206,192 @@ class PostgresSessionManagerService:
                 return results
         except Exception as e:
             logger.error(f"Failed to get all analysis results: {e}")
+            if in_unit_of_work():
+                # 作業単位のトランザクションは取り消されているので、既定値を返さず作業単位に任せる
+                raise
             return {}
 
-    async def delete_session(self, session_id: str) -> None:
-        """セッションを削除"""
+    async def delete_session(self, session_id: str) -> bool:
+        """
+        セッションを削除
+
+        Returns:
+            bool: 削除した場合True（セッションが存在しない場合False）
+        """
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 success = await db_service.delete_session(session_id)
+                after_commit(db, lambda: self._cache_invalidate(session_id))
                 if success:
                     logger.debug(f"Deleted session: {session_id}")
                 else:
                     logger.warning(f"Session {session_id} not found")
+                return success
         except Exception as e:
             logger.error(f"Failed to delete session: {e}")
             raise
 
-    async def save_webpage_data(self, session_id: str, webpage_data: Dict[str, str]) -> None:
-        """Webページデータをセッションに保存"""
+    async def save_webpage_data(self, session_id: str, webpage_data: Dict[str, str]) -> bool:
+        """
+        Webページデータをセッションに保存
+        本文は webpage_documents に内容のハッシュで重複なく保存し、セッションからはIDで参照する
+        （find_recent_webpageで取得した保存済みのページは document_id を含むので、そのまま紐づける）
+
+        Returns:
+            bool: 保存した場合True（セッションが存在しない場合False）
+        """
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
+                document_id = webpage_data.get('document_id')
+                if document_id is None and webpage_data.get('content'):
+                    document_id = await db_service.upsert_webpage_document(
+                        url=webpage_data['url'],
+                        title=webpage_data.get('title'),
+                        content=webpage_data['content'],
+                        content_type=webpage_data.get('content_type'),
+                        etag=webpage_data.get('etag'),
+                        last_modified=webpage_data.get('last_modified')
+                    )
                 success = await db_service.update_session(
                     session_id=session_id,
-                    url=webpage_data.get('url')
+                    url=webpage_data.get('url'),
+                    webpage_document_id=document_id
                 )
                 if success:
+                    cache = get_session_context_cache()
+                    if cache is not None:
+                        # get_webpage_dataが返す内容と同じ形でキャッシュする
+                        cached = self._webpage_context(webpage_data) if document_id else (
+                            {"url": webpage_data['url']} if webpage_data.get('url') else None
+                        )
+                        after_commit(db, lambda: cache.set_webpage_data(session_id, cached))
                     logger.debug(f"Saved webpage data for session: {session_id}, url: {webpage_data.get('url', 'unknown')}")
+                return success
         except Exception as e:
             logger.error(f"Failed to save webpage data: {e}")
             raise
 
     async def get_webpage_data(self, session_id: str) -> Optional[Dict[str, str]]:
-        """セッションのWebページデータを取得"""
+        """セッションのWebページデータ（url / title / content）を取得"""
+        cache = get_session_context_cache()
+        if cache is not None:
+            hit, webpage_data = cache.get_webpage_data(session_id)
+            if hit:
+                return webpage_data
+            version = cache.version(session_id)
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
-                session = await db_service.get_session(session_id)
-                if session and session.url:
-                    return {"url": session.url}
-                return None
+                webpage = await db_service.get_session_webpage(session_id)
+                webpage_data = webpage if webpage and webpage.get('url') else None
+                if cache is not None and webpage is not None:
+                    after_commit(db, lambda: cache.set_webpage_data(session_id, webpage_data, version))
+                return webpage_data
         except Exception as e:
             logger.error(f"Failed to get webpage data: {e}")
+            if in_unit_of_work():
+                # 作業単位のトランザクションは取り消されているので、既定値を返さず作業単位に任せる
+                raise
+            return None
+
+    async def find_recent_webpage(self, url: str, max_age_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        同じURLを最近スクレイピングしたWebページを取得（多くのユーザーが共有する記事を何度も取得しないため）
+
+        Returns:
+            Optional[Dict[str, Any]]: url / title / content / document_id（見つからない場合はNone）
+        """
+        try:
+            async with db_session() as db:
+                db_service = DatabaseService(db)
+                fetched_after = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+                document = await db_service.get_recent_webpage_document(url, fetched_after)
+                if document is None:
+                    return None
+                return {
+                    "url": document.url,
+                    "title": document.title,
+                    "content": document.text,
+                    "document_id": document.id
+                }
+        except Exception as e:
+            logger.error(f"Failed to find recent webpage: {e}")
+            if in_unit_of_work():
+                # 作業単位のトランザクションは取り消されているので、既定値を返さず作業単位に任せる
+                raise
+            return None
+
+    @staticmethod
+    def _webpage_context(webpage_data: Dict[str, Any]) -> Dict[str, str]:
+        return {"url": webpage_data['url'], "title": webpage_data.get('title'), "content": webpage_data['content']}
+
+    async def get_history_summary(self, session_id: str) -> Optional[HistorySummary]:
+        """セッションに保存された古い会話履歴の要約を取得"""
+        cache = get_session_context_cache()
+        if cache is not None:
+            hit, summary = cache.get_summary(session_id)
+            if hit:
+                return summary
+            version = cache.version(session_id)
+        try:
+            async with db_session() as db:
+                db_service = DatabaseService(db)
+                session = await db_service.get_session(session_id)
+                summary = None
+                if session and session.history_summary:
+                    summary = HistorySummary(text=session.history_summary, turns=session.history_summary_turns)
+                if cache is not None and session is not None:
+                    after_commit(db, lambda: cache.set_summary(session_id, summary, version))
+                return summary
+        except Exception as e:
+            logger.error(f"Failed to get history summary: {e}")
+            if in_unit_of_work():
+                # 作業単位のトランザクションは取り消されているので、既定値を返さず作業単位に任せる
+                raise
             return None
 
+    async def save_history_summary(self, session_id: str, summary: HistorySummary) -> None:
+        """古い会話履歴の要約を保存"""
+        try:
+            async with db_session() as db:
+                db_service = DatabaseService(db)
+                updated = await db_service.update_history_summary(session_id, summary.text, summary.turns)
+                if updated:
+                    cache = get_session_context_cache()
+                    if cache is not None:
+                        after_commit(db, lambda: cache.set_summary(session_id, summary))
+                    logger.debug(f"Saved history summary for session: {session_id} ({summary.turns} turns)")
+        except Exception as e:
+            logger.error(f"Failed to save history summary: {e}")
+            raise
+
     async def get_next_conversation_id(self, session_id: str) -> str:
         """次の会話IDを取得"""
         try:
-            async for db in get_async_db():
+            async with db_session() as db:
                 db_service = DatabaseService(db)
                 next_number = await db_service.get_next_conversation_number(session_id)
                 conversation_id = str(next_number)
                 logger.info(f"Generated conversation_id: {conversation_id} for session: {session_id}")
                 return conversation_id
         except Exception as e:
+            # 既定の番号を返すと既存の会話と重複するので、採番できない場合は例外を送出する
             logger.error(f"Failed to get next conversation id: {e}")
-            return "1"
+            raise
+
+    @staticmethod
+    def _cache_append(session_id: str, transcription: str) -> None:
+        cache = get_session_context_cache()
+        if cache is not None:
+            cache.append_history(session_id, [f'"user":{transcription}', f'"model":""'])
+
+    @staticmethod
+    def _cache_invalidate(session_id: str) -> None:
+        cache = get_session_context_cache()
+        if cache is not None:
+            cache.invalidate(session_id)
 
 
 class PostgresSessionManagerServiceFactory:
@@ -0,0 +1,269 @@
+"""
+セッションコンテキストのキャッシュ
+
+セッションごとの会話履歴・Webページ情報・履歴の要約をプロセス内に保持するライトスルーキャッシュ。
+書き込みはDBへの保存後にキャッシュへ反映し、件数・合計バイト数の上限とTTLで古いものから破棄する
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+from loguru import logger
+
+from app.config.settings import get_settings
+from app.services.history_builder import HistorySummary
+
+
+@dataclass
+class SessionContext:
+    history: Optional[List[List[str]]] = None  # Noneは未読み込み
+    webpage_data: Optional[Dict[str, str]] = None
+    webpage_loaded: bool = False
+    summary: Optional[HistorySummary] = None
+    summary_loaded: bool = False
+    size: int = 0
+    expires_at: float = 0.0
+
+
+def _entry_size(entry: List[str]) -> int:
+    return sum(len(item) for item in entry)
+
+
+def _webpage_size(webpage_data: Optional[Dict[str, str]]) -> int:
+    if not webpage_data:
+        return 0
+    return sum(len(str(value)) for value in webpage_data.values())
+
+
+def _summary_size(summary: Optional[HistorySummary]) -> int:
+    return len(summary.text) if summary is not None else 0
+
+
+class SessionContextCache:
+    """
+    セッションの会話履歴とWebページ情報のLRUキャッシュ
+
+    読み込み中に別の書き込みが入った場合に古い内容で上書きしないよう、
+    セッションごとのバージョンを読み込み前に取得し、保存時に一致する場合だけ反映します
+    バージョンはキャッシュ全体で1つのカウンタから払い出すため、セッションごとの記録を間引いても
+    以前の値に戻ることはありません（記録のないセッションは最後に間引いた時点のカウンタの値になります）
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024, ttl_seconds: float = 1800):
+        """
+        Args:
+            max_sessions (int): 保持する最大セッション数
+            max_bytes (int): 保持する文字数の合計の上限（おおよそのメモリ使用量）
+            ttl_seconds (float): 最後の読み書きからの有効期間（秒）
+        """
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._items: "OrderedDict[str, SessionContext]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._version_counter = 0
+        self._version_floor = 0  # 記録のないセッションのバージョン
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def version(self, session_id: str) -> int:
+        """DBから読み込む前に取得しておくバージョン"""
+        with self._lock:
+            return self._current_version(session_id)
+
+    def get_history(self, session_id: str) -> Optional[List[List[str]]]:
+        """
+        会話履歴を取得する
+
+        Returns:
+            Optional[List[List[str]]]: キャッシュされた履歴のコピー（未読み込みの場合はNone）
+        """
+        with self._lock:
+            context = self._touch(session_id)
+            if context is None or context.history is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            return list(context.history)
+
+    def set_history(self, session_id: str, history: List[List[str]], version: int) -> None:
+        """DBから読み込んだ会話履歴を保存する（読み込み中に書き込みがあった場合は保存しない）"""
+        with self._lock:
+            if self._current_version(session_id) != version:
+                return
+            context = self._entry(session_id)
+            context.history = list(history)
+            self._resize(
+                context,
+                _webpage_size(context.webpage_data) + _summary_size(context.summary) + sum(_entry_size(entry) for entry in history)
+            )
+
+    def append_history(self, session_id: str, entry: List[str]) -> None:
+        """DBに保存した会話を履歴の末尾に反映する（履歴が未読み込みの場合は何もしない）"""
+        with self._lock:
+            self._bump(session_id)
+            context = self._touch(session_id)
+            if context is None or context.history is None:
+                return
+            context.history.append(entry)
+            # 履歴全体を数え直さず、追加分だけ加算する
+            self._resize(context, context.size + _entry_size(entry))
+
+    def get_webpage_data(self, session_id: str) -> Tuple[bool, Optional[Dict[str, str]]]:
+        """
+        Webページ情報を取得する
+
+        Returns:
+            Tuple[bool, Optional[Dict[str, str]]]: (キャッシュにあったか, Webページ情報)
+        """
+        with self._lock:
+            context = self._touch(session_id)
+            if context is None or not context.webpage_loaded:
+                self._misses += 1
+                return False, None
+            self._hits += 1
+            return True, context.webpage_data
+
+    def set_webpage_data(self, session_id: str, webpage_data: Optional[Dict[str, str]], version: Optional[int] = None) -> None:
+        """
+        Webページ情報を保存する
+
+        Args:
+            session_id (str): セッションID
+            webpage_data (Optional[Dict[str, str]]): Webページ情報（未登録の場合はNone）
+            version (Optional[int]): 読み込み時のバージョン（書き込み時はNone）
+        """
+        with self._lock:
+            if version is None:
+                self._bump(session_id)
+            elif self._current_version(session_id) != version:
+                return
+            context = self._entry(session_id)
+            size = context.size - _webpage_size(context.webpage_data) + _webpage_size(webpage_data)
+            context.webpage_data = webpage_data
+            context.webpage_loaded = True
+            self._resize(context, size)
+
+    def get_summary(self, session_id: str) -> Tuple[bool, Optional[HistorySummary]]:
+        """
+        会話履歴の要約を取得する
+
+        Returns:
+            Tuple[bool, Optional[HistorySummary]]: (キャッシュにあったか, 要約)
+        """
+        with self._lock:
+            context = self._touch(session_id)
+            if context is None or not context.summary_loaded:
+                self._misses += 1
+                return False, None
+            self._hits += 1
+            return True, context.summary
+
+    def set_summary(self, session_id: str, summary: Optional[HistorySummary], version: Optional[int] = None) -> None:
+        """
+        会話履歴の要約を保存する
+
+        Args:
+            session_id (str): セッションID
+            summary (Optional[HistorySummary]): 要約（未作成の場合はNone）
+            version (Optional[int]): 読み込み時のバージョン（書き込み時はNone）
+        """
+        with self._lock:
+            if version is None:
+                self._bump(session_id)
+            elif self._current_version(session_id) != version:
+                return
+            context = self._entry(session_id)
+            size = context.size - _summary_size(context.summary) + _summary_size(summary)
+            context.summary = summary
+            context.summary_loaded = True
+            self._resize(context, size)
+
+    def invalidate(self, session_id: str) -> None:
+        """セッションのキャッシュを破棄する"""
+        with self._lock:
+            self._bump(session_id)
+            self._remove(session_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._versions.clear()
+            self._version_floor = self._version_counter
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """保持セッション数・サイズとヒット率を取得する"""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "sessions": len(self._items),
+                "bytes": self._bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0
+            }
+
+    def _touch(self, session_id: str) -> Optional[SessionContext]:
+        context = self._items.get(session_id)
+        if context is None:
+            return None
+        now = time.monotonic()
+        if context.expires_at <= now:
+            self._remove(session_id)
+            return None
+        context.expires_at = now + self.ttl_seconds
+        self._items.move_to_end(session_id)
+        return context
+
+    def _entry(self, session_id: str) -> SessionContext:
+        context = self._touch(session_id)
+        if context is None:
+            context = SessionContext(expires_at=time.monotonic() + self.ttl_seconds)
+            self._items[session_id] = context
+        return context
+
+    def _current_version(self, session_id: str) -> int:
+        return self._versions.get(session_id, self._version_floor)
+
+    def _bump(self, session_id: str) -> None:
+        self._version_counter += 1
+        self._versions[session_id] = self._version_counter
+        # バージョン表が無制限に増えないよう、キャッシュにないセッションの分は間引く
+        # 間引いたセッションのバージョンは下限（現在のカウンタ）に進むため、読み込み中の古い値とは一致しない
+        if len(self._versions) > self.max_sessions * 4:
+            for stale in [sid for sid in self._versions if sid not in self._items][:self.max_sessions]:
+                del self._versions[stale]
+            self._version_floor = self._version_counter
+
+    def _resize(self, context: SessionContext, size: int) -> None:
+        self._bytes += size - context.size
+        context.size = size
+        while self._items and (len(self._items) > self.max_sessions or self._bytes > self.max_bytes):
+            evicted_id, _ = next(iter(self._items.items()))
+            self._remove(evicted_id)
+            logger.debug(f"Evicted session context {evicted_id} from cache")
+
+    def _remove(self, session_id: str) -> None:
+        context = self._items.pop(session_id, None)
+        if context is not None:
+            self._bytes -= context.size
+
+
+@lru_cache()
+def get_session_context_cache() -> Optional[SessionContextCache]:
+    """プロセス共有のセッションコンテキストキャッシュを取得する（無効化されている場合はNone）"""
+    settings = get_settings()
+    if not settings.SESSION_CACHE_ENABLED:
+        return None
+    return SessionContextCache(
+        max_sessions=settings.SESSION_CACHE_MAX_SESSIONS,
+        max_bytes=settings.SESSION_CACHE_MAX_BYTES,
+        ttl_seconds=settings.SESSION_CACHE_TTL_SECONDS
+    )
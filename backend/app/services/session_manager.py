@@ -15,9 +15,10 @@ class SessionManagerService:
             cls._instance = super().__new__(cls)
         return cls._instance
 
-    def create_session(self) -> str:
+    def create_session(self, session_id: Optional[str] = None) -> str:
         try:
-            session_id = str(uuid.uuid4())
+            # データベースと併用する場合は、データベースで採番したIDを使う
+            session_id = session_id or str(uuid.uuid4())
             self._sessions[session_id] = []
             self._analysis_results[session_id] = {}
             self._webpage_data[session_id] = {}
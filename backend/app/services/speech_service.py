@@ -1,12 +1,13 @@
 from google.cloud import speech
+from app.core.clients import get_client_registry
 from loguru import logger
 from typing import Optional
 import tempfile
 import os
 
 class SpeechService:
-    def __init__(self):
-        self.client = speech.SpeechClient()
+    def __init__(self, client: Optional[speech.SpeechClient] = None):
+        self.client = client or get_client_registry().speech()
 
     async def transcribe_audio(self, audio_content: bytes, sample_rate: int, encoding: str, language_code: str) -> Optional[str]:
         try:
@@ -1,20 +1,36 @@
 from google.cloud import texttospeech
+from app.config.settings import get_settings
+from app.core.clients import get_client_registry
+from app.services.tts_cache import TTSCache, get_tts_cache
 from loguru import logger
-from typing import Optional
-import tempfile
-import os
+from typing import List, Optional
+import re
 
 class TextToSpeechService:
-    def __init__(self):
-        self.client = texttospeech.TextToSpeechClient()
+    def __init__(
+        self,
+        client: Optional[texttospeech.TextToSpeechClient] = None,
+        cache: Optional[TTSCache] = None
+    ):
+        self.client = client or get_client_registry().text_to_speech()
+        self.cache = cache if cache is not None else get_tts_cache()
+        self.voice_name = get_settings().TTS_VOICE_NAME
 
     def text_to_speech(self, text: str, language_code: str) -> bytes:
         try:
+            voice_key = self.voice_name or "gender:NEUTRAL"
+            cache_key = TTSCache.make_key(text, language_code, voice_key, "MP3")
+            if self.cache is not None:
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
             synthesis_input = texttospeech.SynthesisInput(text=text)
 
             # Build the voice request, select the language code and the ssml voice gender
             voice = texttospeech.VoiceSelectionParams(
                 language_code=language_code,
+                name=self.voice_name or None,
                 ssml_gender=texttospeech.SsmlVoiceGender.NEUTRAL
             )
 
@@ -31,17 +47,80 @@ class TextToSpeechService:
             )
 
             # The response's audio_content is binary.
-            with open("output.mp3", "wb") as out:
-                # Write the response to the output file.
-                out.write(response.audio_content)
-                print('Audio content written to file "output.mp3"')
-                        # Return the audio content directly
+            if self.cache is not None:
+                self.cache.put(cache_key, response.audio_content)
             return response.audio_content
 
         except Exception as e:
             logger.error(f"Error in text to speech: {str(e)}")
             raise
 
+    def prewarm(self, phrases: List[str], language_code: str) -> int:
+        """
+        よく使うフレーズを事前に合成してキャッシュに載せるメソッド
+
+        Args:
+            phrases (List[str]): 事前に合成するフレーズ
+            language_code (str): 言語コード
+
+        Returns:
+            int: 合成に成功したフレーズ数
+        """
+        warmed = 0
+        for phrase in phrases:
+            try:
+                self.text_to_speech(text=phrase, language_code=language_code)
+                warmed += 1
+            except Exception as e:
+                logger.warning(f"Failed to prewarm TTS phrase '{phrase[:30]}': {e}")
+        logger.info(f"Prewarmed {warmed}/{len(phrases)} TTS phrases")
+        return warmed
+
+
+class SentenceSplitter:
+    """
+    ストリーミングで届くテキストを文単位に区切るクラス
+    文が確定するたびに音声合成へ渡せるようにします
+    """
+    _SENTENCE_END_PATTERN = re.compile(r'(?<=[.!?。！？])\s+')
+
+    def __init__(self, min_length: int = 20):
+        self._buffer = ""
+        self.min_length = min_length
+
+    def feed(self, text: str) -> List[str]:
+        """
+        テキスト断片を追加し、確定した文のリストを返すメソッド
+
+        Args:
+            text (str): 追加するテキスト断片
+
+        Returns:
+            List[str]: 確定した文のリスト（短すぎる文は次の文と結合される）
+        """
+        self._buffer += text
+        sentences = []
+        start = 0
+        for match in self._SENTENCE_END_PATTERN.finditer(self._buffer):
+            candidate = self._buffer[start:match.start()].strip()
+            if len(candidate) >= self.min_length:
+                sentences.append(candidate)
+                start = match.end()
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """
+        残っているテキストを返し、バッファを空にするメソッド
+
+        Returns:
+            Optional[str]: 残りのテキスト（空の場合はNone）
+        """
+        remaining = self._buffer.strip()
+        self._buffer = ""
+        return remaining or None
+
+
 class TextToSpeechServiceFactory:
     @staticmethod
     def create() -> TextToSpeechService:
@@ -0,0 +1,260 @@
+"""
+音声合成結果のキャッシュ
+
+(text, language_code, voice, encoding) をキーとしたコンテンツアドレス方式のキャッシュ。
+メモリ上のLRU層とサイズ上限付きのディスク層の2段構成
+"""
+
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+class TTSCache:
+    """
+    音声合成結果の2段キャッシュ
+    合成はスレッドプールからも呼ばれるため、索引の操作はロックで保護されます
+    ディスクの読み書きはロックの外で行い、ディスク層の容量は索引で管理します（ディレクトリを走査しない）
+    """
+
+    def __init__(
+        self,
+        memory_max_items: int = 256,
+        memory_max_bytes: int = 32 * 1024 * 1024,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 512 * 1024 * 1024
+    ):
+        """
+        Args:
+            memory_max_items (int): メモリ層に保持する最大件数
+            memory_max_bytes (int): メモリ層の最大バイト数
+            disk_dir (Optional[str]): ディスク層のディレクトリ（Noneの場合はディスク層を使わない）
+            disk_max_bytes (int): ディスク層の最大バイト数
+        """
+        self.memory_max_items = memory_max_items
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()  # キー → バイト数（古く使われた順）
+        self._disk_writing: Set[str] = set()
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(text: str, language_code: str, voice: str, encoding: str) -> str:
+        """
+        キャッシュキーを作成する
+
+        Args:
+            text (str): 合成するテキスト
+            language_code (str): 言語コード
+            voice (str): 音声の識別子
+            encoding (str): 音声エンコーディング
+
+        Returns:
+            str: SHA-256のキー
+        """
+        payload = json.dumps([text, language_code, voice, encoding], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        キャッシュから音声データを取得する（ディスク層で見つかった場合はメモリ層に昇格）
+
+        Args:
+            key (str): キャッシュキー
+
+        Returns:
+            Optional[bytes]: 音声データ（存在しない場合はNone）
+        """
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return audio
+            on_disk = key in self._disk_index
+            if on_disk:
+                self._disk_index.move_to_end(key)  # ディスク層のLRU順を更新
+
+        # ファイルの読み込みはロックの外で行い、他の参照を待たせない
+        if on_disk:
+            path = self._disk_path(key)
+            try:
+                audio = path.read_bytes()
+                os.utime(path)  # 再起動後もLRU順を引き継げるよう更新時刻を進める
+            except OSError:
+                audio = None
+
+        with self._lock:
+            if audio is not None:
+                self._stats["disk_hits"] += 1
+                self._put_memory(key, audio)
+                return audio
+            if on_disk:
+                self._forget_disk_entry(key)
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, audio: bytes) -> None:
+        """
+        音声データをキャッシュに保存する
+
+        Args:
+            key (str): キャッシュキー
+            audio (bytes): 音声データ
+        """
+        with self._lock:
+            self._put_memory(key, audio)
+            write_to_disk = (
+                self.disk_dir is not None
+                and len(audio) <= self.disk_max_bytes
+                and key not in self._disk_index
+                and key not in self._disk_writing
+            )
+            if write_to_disk:
+                self._disk_writing.add(key)
+        if not write_to_disk:
+            return
+
+        # ファイルの書き込みと削除はロックの外で行う
+        written = self._write_disk_file(key, audio)
+        with self._lock:
+            self._disk_writing.discard(key)
+            evicted = self._add_disk_entry(key, len(audio)) if written else []
+        self._remove_disk_files(evicted)
+
+    def clear(self) -> None:
+        """全ての層のキャッシュと統計を削除する"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            keys = list(self._disk_index)
+            self._disk_index.clear()
+            self._disk_bytes = 0
+            for name in self._stats:
+                self._stats[name] = 0
+        self._remove_disk_files(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        ヒット率などの統計を取得する
+
+        Returns:
+            Dict[str, Any]: 各層のヒット数、ミス数、保持件数とバイト数
+        """
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                **self._stats,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_items": len(self._disk_index),
+                "disk_bytes": self._disk_bytes,
+            }
+
+    def _put_memory(self, key: str, audio: bytes) -> None:
+        if len(audio) > self.memory_max_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = audio
+        self._memory_bytes += len(audio)
+        while len(self._memory) > self.memory_max_items or self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def _write_disk_file(self, key: str, audio: bytes) -> bool:
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # 書き込み途中のファイルを読まれないよう、一時ファイル経由でアトミックに置き換える
+            fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(audio)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write TTS cache entry: {e}")
+            return False
+        return True
+
+    def _add_disk_entry(self, key: str, size: int) -> List[str]:
+        """
+        ディスク層の索引にエントリを追加し、上限を超えた分を古い順に索引から外す（ロック内で呼ぶ）
+
+        Returns:
+            List[str]: ファイルを削除するキー
+        """
+        self._disk_index[key] = size
+        self._disk_bytes += size
+        evicted = []
+        while self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            evicted_key, evicted_size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= evicted_size
+            self._stats["evictions"] += 1
+            evicted.append(evicted_key)
+        return evicted
+
+    def _remove_disk_files(self, keys: List[str]) -> None:
+        for key in keys:
+            try:
+                self._disk_path(key).unlink()
+            except OSError:
+                pass
+
+    def _forget_disk_entry(self, key: str) -> None:
+        size = self._disk_index.pop(key, 0)
+        self._disk_bytes -= size
+
+    def _load_disk_index(self) -> None:
+        # ディレクトリの走査は起動時の1回だけ行い、以降は索引のLRU順で削除する
+        entries = []
+        for path in self.disk_dir.glob("*/*.audio"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.stem, stat.st_size))
+        evicted = []
+        for _, key, size in sorted(entries):
+            evicted.extend(self._add_disk_entry(key, size))
+        self._remove_disk_files(evicted)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / key[:2] / f"{key}.audio"
+
+
+@lru_cache()
+def get_tts_cache() -> Optional[TTSCache]:
+    """プロセス共有のTTSキャッシュを取得する（無効化されている場合はNone）"""
+    settings = get_settings()
+    if not settings.TTS_CACHE_ENABLED:
+        return None
+    return TTSCache(
+        memory_max_items=settings.TTS_CACHE_MEMORY_MAX_ITEMS,
+        memory_max_bytes=settings.TTS_CACHE_MEMORY_MAX_BYTES,
+        disk_dir=settings.TTS_CACHE_DIR or None,
+        disk_max_bytes=settings.TTS_CACHE_DISK_MAX_BYTES
+    )
@@ -1,116 +1,181 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Dict, Optional
-from loguru import logger
-import re
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import asyncio
+import importlib.util
 from urllib.parse import urlparse
 
+import httpx
+from loguru import logger
+
+from app.config.settings import get_settings
+from app.services.html_extraction import HtmlExtractor, get_html_extractor
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    """再検証用に保持するスクレイピング結果"""
+    result: Dict[str, str]
+    etag: Optional[str]
+    last_modified: Optional[str]
+
 
 class WebScraperService:
-    """Webページのスクレイピングを行うサービス"""
-    
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
-    
-    def scrape_url(self, url: str) -> Optional[Dict[str, str]]:
+    """
+    Webページのスクレイピングを行うサービス
+    取得は共有のコネクションプールを使った非同期HTTPで行い、イベントループをブロックしません。
+    ETag / Last-Modified を返したページはURLごとに保持し、次回は条件付きGETで再検証します
+    """
+
+    def __init__(
+        self,
+        timeout: float = 10.0,
+        max_bytes: int = 2 * 1024 * 1024,
+        max_connections: int = 20,
+        http2: bool = True,
+        cache_max_items: int = 256,
+        extractor: Optional[HtmlExtractor] = None,
+        max_content_bytes: int = 200 * 1024
+    ):
+        """
+        Args:
+            timeout (float): 接続・読み込みのタイムアウト（秒）
+            max_bytes (int): 読み込む本文の最大バイト数（超えた分は読まずに切り捨てる）
+            max_connections (int): コネクションプールの最大接続数
+            http2 (bool): HTTP/2を使うか（h2がインストールされている場合のみ有効）
+            cache_max_items (int): 再検証用に保持するページの最大件数（0の場合は保持しない）
+            extractor (Optional[HtmlExtractor]): 本文の抽出エンジン（省略時はlxmlがあればlxml）
+            max_content_bytes (int): 抽出する本文の最大バイト数（超えた時点で抽出を打ち切る）
+        """
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_connections = max_connections
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        self.cache_max_items = cache_max_items
+        self.extractor = extractor or get_html_extractor()
+        self.max_content_bytes = max_content_bytes
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._cache: "OrderedDict[str, CachedPage]" = OrderedDict()
+        self._stats = {"fetched": 0, "not_modified": 0, "truncated": 0, "content_truncated": 0, "failed": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections),
+                headers={'User-Agent': USER_AGENT},
+                follow_redirects=True
+            )
+        return self._client
+
+    async def scrape_url(self, url: str) -> Optional[Dict[str, str]]:
         """
         URLからWebページの内容をスクレイピングする
-        
+
         Args:
             url (str): スクレイピング対象のURL
-            
+
         Returns:
-            Optional[Dict[str, str]]: スクレイピング結果（title, content, url）
+            Optional[Dict[str, str]]: スクレイピング結果（title, content, url とレスポンスヘッダーの content_type, etag, last_modified）
         """
         try:
             logger.info(f"Scraping URL: {url}")
-            
+
             # URLの正規化
             if not url.startswith(('http://', 'https://')):
                 url = 'https://' + url
-            
+
+            # 保持しているページは条件付きGETで再検証する
+            cached = self._cache.get(url)
+            headers = {}
+            if cached is not None:
+                if cached.etag:
+                    headers['If-None-Match'] = cached.etag
+                if cached.last_modified:
+                    headers['If-Modified-Since'] = cached.last_modified
+
             # ページの取得
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            # HTMLの解析
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # 不要な要素を削除
-            for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside']):
-                element.decompose()
-            
-            # タイトルの取得
-            title = soup.find('title')
-            title_text = title.get_text().strip() if title else "No title"
-            
-            # メインコンテンツの抽出
-            main_content = None
-            for selector in ['main', 'article', 'div[role="main"]', 'body']:
-                main_content = soup.select_one(selector)
-                if main_content:
-                    break
-            
-            if not main_content:
-                main_content = soup.body if soup.body else soup
-            
-            # テキストの抽出とクリーニング
-            content = self._extract_clean_text(main_content)
-            
+            async with self.client.stream('GET', url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    self._cache.move_to_end(url)
+                    self._stats["not_modified"] += 1
+                    logger.info(f"Webpage not modified since last fetch: {url}")
+                    return dict(cached.result)
+                response.raise_for_status()
+                body = await self._read_body(response, url)
+                response_headers = response.headers
+                encoding = response.charset_encoding
+            self._stats["fetched"] += 1
+
+            # HTMLの解析はCPUを使うのでスレッドで実行
+            page = await asyncio.to_thread(self.extractor.extract, body, encoding, self.max_content_bytes)
+            title_text, content = page.title, page.content
+            if page.truncated:
+                self._stats["content_truncated"] += 1
+
             # 結果の検証
             if not content or len(content.strip()) < 50:
                 logger.warning(f"Extracted content is too short for URL: {url}")
                 return None
-            
+
             result = {
                 'url': url,
                 'title': title_text,
-                'content': content
+                'content': content,
+                'content_type': response_headers.get('Content-Type'),
+                'etag': response_headers.get('ETag'),
+                'last_modified': response_headers.get('Last-Modified')
             }
-            
+            self._remember(url, result)
+
             logger.info(f"Successfully scraped URL: {url}, content length: {len(content)}")
             return result
-            
-        except requests.RequestException as e:
+
+        except httpx.HTTPError as e:
+            self._stats["failed"] += 1
             logger.error(f"Request error while scraping {url}: {e}")
             return None
         except Exception as e:
+            self._stats["failed"] += 1
             logger.error(f"Error scraping {url}: {e}")
             return None
-    
-    def _extract_clean_text(self, element) -> str:
-        """
-        HTML要素からクリーンなテキストを抽出する
-        
-        Args:
-            element: BeautifulSoup要素
-            
-        Returns:
-            str: クリーンなテキスト
-        """
-        if not element:
-            return ""
-        
-        # テキストの取得
-        text = element.get_text()
-        
-        # テキストのクリーニング
-        text = re.sub(r'\s+', ' ', text)
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        text = text.strip()
-        
-        return text
-    
+
+    async def _read_body(self, response: httpx.Response, url: str) -> bytes:
+        """本文を max_bytes まで読み込む（巨大なページで接続とメモリを占有しないため、超えた分は読まない）"""
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= self.max_bytes:
+                self._stats["truncated"] += 1
+                logger.warning(f"Webpage exceeds {self.max_bytes} bytes, truncating: {url}")
+                break
+        return b"".join(chunks)[:self.max_bytes]
+
+    def _remember(self, url: str, result: Dict[str, str]) -> None:
+        """再検証できるページ（ETag / Last-Modified がある）を保持する"""
+        if self.cache_max_items <= 0 or not (result['etag'] or result['last_modified']):
+            self._cache.pop(url, None)
+            return
+        self._cache[url] = CachedPage(result=dict(result), etag=result['etag'], last_modified=result['last_modified'])
+        self._cache.move_to_end(url)
+        while len(self._cache) > self.cache_max_items:
+            self._cache.popitem(last=False)
+
     def validate_url(self, url: str) -> bool:
         """
         URLの形式を検証する
-        
+
         Args:
             url (str): 検証対象のURL
-            
+
         Returns:
             bool: 有効なURLかどうか
         """
@@ -120,14 +185,33 @@ class WebScraperService:
         except Exception:
             return False
 
+    def get_stats(self) -> Dict[str, Any]:
+        """取得・再検証の件数と保持しているページ数を取得する"""
+        return {"http2": self.http2, "extractor": self.extractor.name, "cached_pages": len(self._cache), **self._stats}
+
+    async def aclose(self) -> None:
+        """コネクションプールを閉じる"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
 
 class WebScraperServiceFactory:
     """WebScraperServiceのファクトリークラス"""
-    
+
     _instance = None
-    
+
     @classmethod
     def create(cls) -> WebScraperService:
         if cls._instance is None:
-            cls._instance = WebScraperService()
-        return cls._instance 
\ No newline at end of file
+            settings = get_settings()
+            cls._instance = WebScraperService(
+                timeout=settings.WEB_SCRAPER_TIMEOUT,
+                max_bytes=settings.WEB_SCRAPER_MAX_BYTES,
+                max_connections=settings.WEB_SCRAPER_MAX_CONNECTIONS,
+                http2=settings.WEB_SCRAPER_HTTP2,
+                cache_max_items=settings.WEB_SCRAPER_CACHE_MAX_ITEMS,
+                extractor=get_html_extractor(settings.WEB_SCRAPER_EXTRACTOR),
+                max_content_bytes=settings.WEB_SCRAPER_MAX_CONTENT_BYTES
+            )
+        return cls._instance
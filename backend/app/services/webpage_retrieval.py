@@ -0,0 +1,240 @@
+"""
+Webページの関連部分の検索
+
+セッションにWebページを読み込んだときに本文をチャンクに分割して埋め込み、セッションごとのベクトルインデックス（chromadb）に保存する。
+各ターンでは直近の会話に関連するチャンクだけをプロンプトに含めるので、長い記事でも1ターンの入力サイズが一定に収まる。
+chromadb / sentence-transformers は読み込みが重いため、最初に使うときに読み込む
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+import asyncio
+import importlib.util
+import re
+import threading
+
+from loguru import logger
+
+from app.config.settings import get_settings
+
+
+# 文の区切り（英語は終止符の後の空白、日本語は句点の直後）
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[。！？])")
+
+
+def chunk_text(text: str, chunk_chars: int = 800, overlap_chars: int = 150) -> List[str]:
+    """
+    本文を文の区切りでチャンクに分割する
+    チャンクの境目で文脈が切れないよう、直前のチャンクの末尾の文（overlap_chars 以内）を次のチャンクの先頭に重ねる
+
+    Args:
+        text (str): 本文
+        chunk_chars (int): チャンクの最大文字数
+        overlap_chars (int): 前のチャンクと重ねる最大文字数
+
+    Returns:
+        List[str]: チャンク（本文の順）
+    """
+    sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        # 区切りのない長い文は文字数で分割する
+        while len(sentence) > chunk_chars:
+            sentences.append(sentence[:chunk_chars])
+            sentence = sentence[chunk_chars:]
+        if sentence:
+            sentences.append(sentence)
+
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for sentence in sentences:
+        if current and size + 1 + len(sentence) > chunk_chars:
+            chunks.append(" ".join(current))
+            overlap: List[str] = []
+            overlap_size = -1
+            for previous in reversed(current):
+                if overlap_size + 1 + len(previous) > overlap_chars:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += 1 + len(previous)
+            current = overlap if overlap_size + 1 + len(sentence) <= chunk_chars else []
+            size = max(overlap_size, 0) if current else 0
+        size += (1 if current else 0) + len(sentence)
+        current.append(sentence)
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+class WebpageRetriever:
+    """
+    セッションごとのWebページのベクトルインデックス
+    chromadb / sentence-transformers の呼び出しはブロッキングなので、スレッドで実行します
+    """
+
+    def __init__(
+        self,
+        persist_dir: Optional[str] = None,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        chunk_chars: int = 800,
+        overlap_chars: int = 150,
+        top_k: int = 3,
+        batch_size: int = 32,
+        client: Optional[Any] = None,
+        embedder: Optional[Any] = None
+    ):
+        """
+        Args:
+            persist_dir (Optional[str]): インデックスの保存先（Noneの場合はメモリ上）
+            model_name (str): 埋め込みに使うsentence-transformersのモデル
+            chunk_chars (int): チャンクの最大文字数
+            overlap_chars (int): 前のチャンクと重ねる最大文字数
+            top_k (int): 1ターンで取り出すチャンク数
+            batch_size (int): 1回に埋め込む・保存するチャンク数
+            client (Optional[Any]): chromadbのクライアント（省略時は最初に使うときに作成）
+            embedder (Optional[Any]): SentenceTransformer互換の埋め込みモデル（省略時は最初に使うときに読み込む）
+        """
+        self.persist_dir = persist_dir
+        self.model_name = model_name
+        self.chunk_chars = chunk_chars
+        self.overlap_chars = overlap_chars
+        self.top_k = top_k
+        self.batch_size = batch_size
+        self._client = client
+        self._embedder = embedder
+        self._lock = threading.Lock()
+        self._stats = {"ingested_pages": 0, "ingested_chunks": 0, "queries": 0, "failed": 0}
+
+    @property
+    def client(self) -> Any:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import chromadb
+                    self._client = (
+                        chromadb.PersistentClient(path=self.persist_dir) if self.persist_dir else chromadb.EphemeralClient()
+                    )
+        return self._client
+
+    @property
+    def embedder(self) -> Any:
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    from sentence_transformers import SentenceTransformer
+                    self._embedder = SentenceTransformer(self.model_name)
+                    logger.info(f"Loaded embedding model: {self.model_name}")
+        return self._embedder
+
+    @staticmethod
+    def collection_name(session_id: str) -> str:
+        return f"session-{session_id}"
+
+    async def ingest(self, session_id: str, text: str) -> int:
+        """
+        Webページの本文をチャンクに分割して埋め込み、セッションのインデックスを作り直す
+
+        Returns:
+            int: 保存したチャンク数
+        """
+        return await asyncio.to_thread(self._ingest, session_id, text)
+
+    async def retrieve(self, session_id: str, query: str, top_k: Optional[int] = None) -> Optional[List[str]]:
+        """
+        クエリに関連するチャンクを本文の順で取得する（クエリが空の場合は先頭のチャンク）
+
+        Returns:
+            Optional[List[str]]: チャンク（セッションのインデックスがない場合はNone）
+        """
+        return await asyncio.to_thread(self._retrieve, session_id, query, top_k or self.top_k)
+
+    async def delete(self, session_id: str) -> None:
+        """セッションのインデックスを削除する"""
+        await asyncio.to_thread(self._delete_collection, session_id)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        embeddings = self.embedder.encode(texts, batch_size=self.batch_size, normalize_embeddings=True)
+        return [list(map(float, embedding)) for embedding in embeddings]
+
+    def _ingest(self, session_id: str, text: str) -> int:
+        chunks = chunk_text(text, self.chunk_chars, self.overlap_chars)
+        # 以前に読み込んだページのチャンクが残らないよう作り直す
+        self._delete_collection(session_id)
+        collection = self.client.create_collection(
+            name=self.collection_name(session_id),
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None
+        )
+        try:
+            for start in range(0, len(chunks), self.batch_size):
+                batch = chunks[start:start + self.batch_size]
+                positions = range(start, start + len(batch))
+                collection.add(
+                    ids=[str(position) for position in positions],
+                    embeddings=self._embed(batch),
+                    documents=batch,
+                    metadatas=[{"position": position} for position in positions]
+                )
+        except Exception:
+            # 途中までのインデックスは使わない（本文の切り詰めにフォールバックさせる）
+            self._stats["failed"] += 1
+            self._delete_collection(session_id)
+            raise
+        self._stats["ingested_pages"] += 1
+        self._stats["ingested_chunks"] += len(chunks)
+        logger.info(f"Indexed {len(chunks)} webpage chunks for session: {session_id}")
+        return len(chunks)
+
+    def _retrieve(self, session_id: str, query: str, top_k: int) -> Optional[List[str]]:
+        try:
+            collection = self.client.get_collection(name=self.collection_name(session_id), embedding_function=None)
+        except Exception:
+            return None
+        count = collection.count()
+        if count == 0:
+            return None
+
+        self._stats["queries"] += 1
+        n_results = min(top_k, count)
+        if query.strip():
+            result = collection.query(
+                query_embeddings=self._embed([query]),
+                n_results=n_results,
+                include=["documents", "metadatas"]
+            )
+            matches = zip(result["metadatas"][0], result["documents"][0])
+        else:
+            result = collection.get(ids=[str(position) for position in range(n_results)], include=["documents", "metadatas"])
+            matches = zip(result["metadatas"], result["documents"])
+        return [document for _, document in sorted(matches, key=lambda match: match[0]["position"])]
+
+    def _delete_collection(self, session_id: str) -> None:
+        try:
+            self.client.delete_collection(name=self.collection_name(session_id))
+        except Exception:
+            pass  # インデックスがない場合
+
+    def get_stats(self) -> Dict[str, int]:
+        """インデックスに保存したページ数・チャンク数と検索回数を取得する"""
+        return dict(self._stats)
+
+
+@lru_cache()
+def get_webpage_retriever() -> Optional[WebpageRetriever]:
+    """プロセス共通の検索サービスを取得する（無効化されている、または依存パッケージがない場合はNone）"""
+    settings = get_settings()
+    if not settings.WEBPAGE_RETRIEVAL_ENABLED:
+        return None
+    missing = [name for name in ("chromadb", "sentence_transformers") if importlib.util.find_spec(name) is None]
+    if missing:
+        logger.warning(f"Webpage retrieval is disabled because {', '.join(missing)} is not installed")
+        return None
+    return WebpageRetriever(
+        persist_dir=settings.WEBPAGE_RETRIEVAL_DIR or None,
+        model_name=settings.WEBPAGE_RETRIEVAL_MODEL,
+        chunk_chars=settings.WEBPAGE_RETRIEVAL_CHUNK_CHARS,
+        overlap_chars=settings.WEBPAGE_RETRIEVAL_CHUNK_OVERLAP,
+        top_k=settings.WEBPAGE_RETRIEVAL_TOP_K,
+        batch_size=settings.WEBPAGE_RETRIEVAL_BATCH_SIZE
+    )
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+音声前処理のベンチマーク
+ブラウザ録音を想定した合成音声（前後に無音を含む）を前処理し、
+所要時間と削減されるバイト数・秒数を表示する
+
+使い方:
+    uv run python benchmarks/bench_audio_preprocessing.py [WAVファイル ...]
+"""
+
+import io
+import statistics
+import sys
+import time
+import wave
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.audio_preprocessing_service import AudioPreprocessingService  # noqa: E402
+
+ITERATIONS = 20
+
+
+def synthetic_recording(sample_rate: int, channels: int, seconds: float, silence_seconds: float) -> bytes:
+    """前後に無音を挟んだ発話相当の信号をWAVで生成する"""
+    rng = np.random.default_rng(0)
+    t = np.arange(int(sample_rate * seconds)) / sample_rate
+    voiced = 0.3 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    silence = 0.001 * rng.standard_normal(int(sample_rate * silence_seconds))
+    signal = np.concatenate([silence, voiced, silence])
+    frames = np.repeat(signal[:, None], channels, axis=1)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((frames * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def bench(label: str, audio_content: bytes) -> None:
+    service = AudioPreprocessingService()
+    result = service.preprocess(audio_content)
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        service.preprocess(audio_content)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    seconds_saved = result.seconds_saved or 0.0
+    print(
+        f"{label:<28} {result.original_bytes / 1024:>9.1f} KiB -> {result.processed_bytes / 1024:>8.1f} KiB "
+        f"({result.bytes_saved / max(result.original_bytes, 1):>5.1%} smaller, {seconds_saved:.2f} s trimmed)  "
+        f"median {statistics.median(timings):.2f} ms / p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.2f} ms"
+    )
+
+
+def main() -> None:
+    cases = [
+        ("48kHz stereo 10s (+1s pad)", synthetic_recording(48000, 2, 10, 1.0)),
+        ("44.1kHz mono 5s (+2s pad)", synthetic_recording(44100, 1, 5, 2.0)),
+        ("16kHz mono 3s (+0.5s pad)", synthetic_recording(16000, 1, 3, 0.5)),
+    ]
+    cases += [(Path(path).name, Path(path).read_bytes()) for path in sys.argv[1:]]
+    for label, audio_content in cases:
+        bench(label, audio_content)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+ホットパスのクエリに対するインデックスのベンチマーク
+専用のスキーマにシードデータを投入し、インデックスの作成前後で
+実行計画（EXPLAIN ANALYZE）と実行時間を比較する。終了時にスキーマは削除される
+
+使い方:
+    uv run python benchmarks/bench_db_indexes.py [--sessions 5000] [--conversations 40] [--runs 50]
+
+接続先は .env の DB_* 設定を使う
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.config.settings import get_settings  # noqa: E402
+
+SCHEMA = "bench_db_indexes"
+
+SCHEMA_SQL = """
+CREATE TABLE sessions (
+    id UUID PRIMARY KEY,
+    name VARCHAR(100),
+    title TEXT NOT NULL,
+    url TEXT,
+    last_conversation_number INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT now(),
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE TABLE conversations (
+    id UUID PRIMARY KEY,
+    session_id UUID NOT NULL REFERENCES sessions (id),
+    conversation_number INTEGER NOT NULL,
+    transcription TEXT,
+    analysis_type VARCHAR(20) NOT NULL,
+    advice TEXT,
+    speechflaws TEXT,
+    nuanceinquiry JSONB,
+    alternativeexpressions JSONB,
+    suggestion JSONB,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+"""
+
+SEED_SQL = """
+INSERT INTO sessions (id, name, title, last_conversation_number, updated_at)
+SELECT md5('session' || i)::uuid, 'user' || (i %% %(users)s), 'Session ' || i, %(conversations)s,
+       now() - (i || ' minutes')::interval
+FROM generate_series(1, %(sessions)s) AS i;
+
+INSERT INTO conversations (id, session_id, conversation_number, transcription, analysis_type, speechflaws)
+SELECT md5('conversation' || i || '-' || n)::uuid, md5('session' || i)::uuid, n,
+       'I have been studying English for ' || n || ' years.', 'audio', 'none'
+FROM generate_series(1, %(sessions)s) AS i, generate_series(1, %(conversations)s) AS n;
+
+ANALYZE sessions;
+ANALYZE conversations;
+"""
+
+# マイグレーション 6c7c48a406db と同じインデックス
+INDEX_SQL = """
+CREATE UNIQUE INDEX uq_conversations_session_id_conversation_number ON conversations (session_id, conversation_number);
+CREATE INDEX ix_sessions_name_updated_at ON sessions (name, updated_at DESC);
+ANALYZE sessions;
+ANALYZE conversations;
+"""
+
+QUERIES = {
+    "get_conversations": "SELECT * FROM conversations WHERE session_id = %(session_id)s ORDER BY conversation_number",
+    "get_analysis_result": "SELECT * FROM conversations WHERE session_id = %(session_id)s AND conversation_number = %(number)s",
+    "get_all_sessions(name)": "SELECT * FROM sessions WHERE name = %(name)s ORDER BY updated_at DESC",
+    # ON DELETE CASCADEで子を探すときと同じ検索
+    "delete_session(children)": "SELECT 1 FROM conversations WHERE session_id = %(session_id)s",
+}
+
+
+def connect():
+    settings = get_settings()
+    connection = psycopg2.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        dbname=settings.DB_NAME,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD
+    )
+    connection.autocommit = True
+    return connection
+
+
+def measure(cursor, runs: int, params: dict) -> dict:
+    results = {}
+    for label, sql in QUERIES.items():
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", params)
+        plan = [row[0] for row in cursor.fetchall()]
+        timings = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            cursor.execute(sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        results[label] = {"plan": plan, "median_ms": statistics.median(timings)}
+    return results
+
+
+def print_results(title: str, results: dict) -> None:
+    print(f"\n{'=' * 20} {title} {'=' * 20}")
+    for label, result in results.items():
+        print(f"\n-- {label}: median {result['median_ms']:.3f} ms")
+        for line in result["plan"]:
+            print(f"   {line}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=5000)
+    parser.add_argument("--conversations", type=int, default=40, help="1セッションあたりの会話数")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    connection = connect()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+        cursor.execute(f"SET search_path TO {SCHEMA}")
+        cursor.execute(SCHEMA_SQL)
+
+        started = time.perf_counter()
+        cursor.execute(SEED_SQL, {"sessions": args.sessions, "conversations": args.conversations, "users": args.users})
+        print(f"Seeded {args.sessions} sessions x {args.conversations} conversations in {time.perf_counter() - started:.1f}s")
+
+        cursor.execute("SELECT id FROM sessions ORDER BY id OFFSET %(offset)s LIMIT 1", {"offset": args.sessions // 2})
+        params = {"session_id": cursor.fetchone()[0], "number": args.conversations // 2, "name": "user1"}
+
+        before = measure(cursor, args.runs, params)
+        cursor.execute(INDEX_SQL)
+        after = measure(cursor, args.runs, params)
+
+        print_results("before indexes", before)
+        print_results("after indexes", after)
+
+        print(f"\n{'query':<28}{'before (ms)':>14}{'after (ms)':>14}{'speedup':>10}")
+        for label in QUERIES:
+            b, a = before[label]["median_ms"], after[label]["median_ms"]
+            print(f"{label:<28}{b:>14.3f}{a:>14.3f}{b / a if a else float('inf'):>9.1f}x")
+    finally:
+        cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+HTML抽出エンジンのベンチマーク
+benchmarks/html_corpus のページ（ニュース記事・ブログ・百科事典を模した、広告スクリプトやナビゲーションを含むページ）を
+利用可能な抽出エンジンごとに処理し、所要時間と抽出した本文のサイズを表示する
+
+使い方:
+    uv run python benchmarks/bench_html_extraction.py [HTMLファイル ...]
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.services.html_extraction import EXTRACTORS  # noqa: E402
+
+ITERATIONS = 20
+CORPUS_DIR = Path(__file__).resolve().parent / "html_corpus"
+BUDGETS = [200 * 1024, 16 * 1024]
+
+
+def available_extractors():
+    extractors = []
+    for name, extractor_class in EXTRACTORS.items():
+        try:
+            extractors.append(extractor_class())
+        except ImportError:
+            print(f"{name}: not installed, skipped")
+    return extractors
+
+
+def bench(label: str, body: bytes, extractor, max_bytes: int) -> None:
+    page = extractor.extract(body, max_bytes=max_bytes)
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        extractor.extract(body, max_bytes=max_bytes)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    print(
+        f"{label:<24} {extractor.name:<12} budget {max_bytes // 1024:>4} KiB  "
+        f"{len(body) / 1024:>7.1f} KiB -> {len(page.content.encode('utf-8')) / 1024:>6.1f} KiB"
+        f"{' (truncated)' if page.truncated else '':<12}  "
+        f"median {statistics.median(timings):>7.2f} ms / p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:>7.2f} ms"
+    )
+
+
+def main() -> None:
+    paths = sorted(CORPUS_DIR.glob("*.html")) + [Path(path) for path in sys.argv[1:]]
+    extractors = available_extractors()
+    for path in paths:
+        body = path.read_bytes()
+        for max_bytes in BUDGETS:
+            for extractor in extractors:
+                bench(path.name, body, extractor, max_bytes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+プロンプト組み立てのベンチマーク
+1ターンで使うプロンプト（GeminiAudioService が生成する4つのプロンプトと文法分析のプロンプト）を組み立てる時間を、
+リクエストごとにテンプレートファイルを読む場合と、レジストリのテンプレートを使う場合（ホットリロードの有無）で比較する
+
+使い方:
+    uv run python benchmarks/bench_prompt_assembly.py
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.prompts.registry import TEMPLATES_DIR, PromptRegistry  # noqa: E402
+from app.prompts.audio_prompts import (  # noqa: E402
+    AudioPrompt,
+    AudioImmediatePrompt,
+    TranscriptAnalysisPrompt,
+    AudioAnalysisPrompt
+)
+
+ITERATIONS = 20000
+TRANSCRIPTION = "I goed to the station yesterday and buyed a ticket for Kyoto."
+
+
+def assemble_from_files() -> None:
+    """以前の実装と同じく、プロンプトを生成するたびにテンプレートファイルを読む"""
+    for name in ("audio", "audio_immediate", "audio_analysis"):
+        with open(TEMPLATES_DIR / f"{name}.txt", "r", encoding="utf-8") as f:
+            f.read()
+    with open(TEMPLATES_DIR / "transcript_analysis.txt", "r", encoding="utf-8") as f:
+        f.read().format(transcription=TRANSCRIPTION)
+
+
+def assemble_from_registry(registry: PromptRegistry) -> None:
+    for prompt_class in (AudioPrompt, AudioImmediatePrompt, AudioAnalysisPrompt):
+        prompt_class(registry).format()
+    TranscriptAnalysisPrompt(registry).format(transcription=TRANSCRIPTION)
+
+
+def bench(label: str, assemble) -> None:
+    assemble()
+    timings = []
+    for _ in range(ITERATIONS):
+        started = time.perf_counter()
+        assemble()
+        timings.append((time.perf_counter() - started) * 1_000_000)
+
+    print(
+        f"{label:<28} median {statistics.median(timings):>7.2f} us / "
+        f"p99 {sorted(timings)[int(len(timings) * 0.99) - 1]:>7.2f} us per turn"
+    )
+
+
+def main() -> None:
+    cached = PromptRegistry()
+    cached.load_all()
+    hot_reload = PromptRegistry(hot_reload=True)
+    hot_reload.load_all()
+
+    bench("file read per request", assemble_from_files)
+    bench("registry", lambda: assemble_from_registry(cached))
+    bench("registry (hot reload)", lambda: assemble_from_registry(hot_reload))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from app.main import app
+from app.core.analysis_notifier import AnalysisNotifier, get_analysis_notifier
+from app.core.analysis_scheduler import AnalysisScheduler, AnalysisStatus, get_analysis_scheduler
+from app.services.postgres_session_manager import PostgresSessionManagerServiceFactory
+
+@pytest.fixture
+def session_manager():
+    manager = Mock()
+    manager.get_analysis_result = AsyncMock(return_value=None)
+    manager.get_all_analysis_results = AsyncMock(return_value={})
+    app.dependency_overrides[PostgresSessionManagerServiceFactory.create] = lambda: manager
+    yield manager
+    app.dependency_overrides.pop(PostgresSessionManagerServiceFactory.create, None)
+
+@pytest.fixture
+def scheduler():
+    scheduler = AnalysisScheduler(workers=1)
+    app.dependency_overrides[get_analysis_scheduler] = lambda: scheduler
+    yield scheduler
+    app.dependency_overrides.pop(get_analysis_scheduler, None)
+
+@pytest.fixture
+def client(session_manager, scheduler):
+    return TestClient(app)
+
+def test_analysis_reports_scheduler_status_while_pending(client, scheduler):
+    """Test that a conversation without a saved result reports its queue status."""
+    scheduler._statuses[("session", "1")] = AnalysisStatus(status="running", attempts=1)
+
+    # テスト実行
+    response = client.get("/api/v1/analysis/session", params={"conversation_id": "1"})
+
+    # 検証
+    assert response.status_code == 200
+    assert response.json()["status"] == "running"
+    assert response.json()["analysis_status"]["attempts"] == 1
+
+def test_analysis_returns_result_when_saved(client, session_manager, scheduler):
+    """Test that a saved result is returned together with its final status."""
+    session_manager.get_analysis_result.return_value = {"advice": "Nice"}
+    scheduler._statuses[("session", "1")] = AnalysisStatus(status="done", attempts=1)
+
+    # テスト実行
+    response = client.get("/api/v1/analysis/session", params={"conversation_id": "1"})
+
+    # 検証
+    body = response.json()
+    assert body["status"] == "completed"
+    assert body["analysis_status"]["status"] == "done"
+    assert body["analysis_result"] == {"advice": "Nice"}
+
+def test_analysis_not_found(client):
+    """Test that unknown conversations are reported as not found."""
+    # テスト実行
+    response = client.get("/api/v1/analysis/session", params={"conversation_id": "9"})
+
+    # 検証
+    assert response.json()["status"] == "not_found"
+
+def test_all_analysis_results_include_statuses(client, scheduler):
+    """Test that the session-wide listing includes per-conversation statuses."""
+    scheduler._statuses[("session", "1")] = AnalysisStatus(status="queued")
+    scheduler._statuses[("other", "1")] = AnalysisStatus(status="done")
+
+    # テスト実行
+    response = client.get("/api/v1/analysis/session")
+
+    # 検証
+    statuses = response.json()["analysis_statuses"]
+    assert list(statuses) == ["1"]
+    assert statuses["1"]["status"] == "queued"
+
+@pytest.fixture
+def notifier():
+    notifier = AnalysisNotifier()
+    app.dependency_overrides[get_analysis_notifier] = lambda: notifier
+    yield notifier
+    app.dependency_overrides.pop(get_analysis_notifier, None)
+
+@pytest.mark.asyncio
+async def test_wait_returns_saved_result_immediately(session_manager, scheduler, notifier):
+    """Test that an already saved analysis is returned without waiting."""
+    session_manager.get_analysis_result.return_value = {"advice": "Nice"}
+
+    # テスト実行
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/analysis/session/1/wait", params={"timeout": 5})
+
+    # 検証
+    assert response.json() == {"status": "completed", "analysis_result": {"advice": "Nice"}}
+
+@pytest.mark.asyncio
+async def test_wait_is_woken_when_analysis_is_saved(session_manager, scheduler, notifier):
+    """Test that a waiting request completes as soon as the analysis is saved."""
+    scheduler._statuses[("session", "1")] = AnalysisStatus(status="running", attempts=1)
+
+    async def save_later():
+        while notifier.get_stats()["waiting"] == 0:
+            await asyncio.sleep(0.01)
+        session_manager.get_analysis_result.return_value = {"advice": "Nice"}
+        notifier.notify("session", "1")
+
+    # テスト実行
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response, _ = await asyncio.gather(
+            client.get("/api/v1/analysis/session/1/wait", params={"timeout": 5}),
+            save_later()
+        )
+
+    # 検証
+    assert response.json()["status"] == "completed"
+    assert session_manager.get_analysis_result.await_count == 2
+
+@pytest.mark.asyncio
+async def test_wait_times_out_with_current_status(session_manager, scheduler, notifier):
+    """Test that a timed-out wait reports the scheduler status."""
+    scheduler._statuses[("session", "1")] = AnalysisStatus(status="queued")
+
+    # テスト実行
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/analysis/session/1/wait", params={"timeout": 0.05})
+
+    # 検証
+    assert response.json() == {"status": "queued", "analysis_result": None}
+
+@pytest.mark.asyncio
+async def test_wait_does_not_block_on_rejected_analysis(session_manager, scheduler, notifier):
+    """Test that analyses that were never accepted are reported without waiting."""
+    scheduler._statuses[("session", "1")] = AnalysisStatus(status="failed", error="Analysis queue is full")
+
+    # テスト実行
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await asyncio.wait_for(
+            client.get("/api/v1/analysis/session/1/wait", params={"timeout": 30}), timeout=2
+        )
+
+    # 検証
+    assert response.json()["status"] == "failed"
+
+@pytest.mark.asyncio
+async def test_wait_rechecks_result_after_timeout(session_manager, scheduler, notifier):
+    """Test that a result saved without a notification is still returned when the wait times out."""
+    session_manager.get_analysis_result.side_effect = [None, {"advice": "Nice"}]
+
+    # テスト実行
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/v1/analysis/session/1/wait", params={"timeout": 0.05})
+
+    # 検証
+    assert response.json() == {"status": "completed", "analysis_result": {"advice": "Nice"}}
@@ -0,0 +1,58 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.audio_store import AudioStore, AudioStoreFactory
+
+@pytest.fixture
+def audio_store():
+    store = AudioStore()
+    app.dependency_overrides[AudioStoreFactory.create] = lambda: store
+    yield store
+    app.dependency_overrides.pop(AudioStoreFactory.create, None)
+
+@pytest.fixture
+def client(audio_store):
+    return TestClient(app)
+
+def test_get_audio_returns_binary(client, audio_store):
+    audio_id = audio_store.put(b"0123456789")
+
+    # テスト実行
+    response = client.get(f"/api/v1/audio/{audio_id}")
+
+    # 検証
+    assert response.status_code == 200
+    assert response.content == b"0123456789"
+    assert response.headers["content-type"] == "audio/mpeg"
+    assert response.headers["accept-ranges"] == "bytes"
+
+@pytest.mark.parametrize("range_header, expected, content_range", [
+    ("bytes=2-5", b"2345", "bytes 2-5/10"),
+    ("bytes=7-", b"789", "bytes 7-9/10"),
+    ("bytes=-3", b"789", "bytes 7-9/10"),
+    ("bytes=8-100", b"89", "bytes 8-9/10"),
+])
+def test_get_audio_supports_range(client, audio_store, range_header, expected, content_range):
+    audio_id = audio_store.put(b"0123456789")
+
+    # テスト実行
+    response = client.get(f"/api/v1/audio/{audio_id}", headers={"Range": range_header})
+
+    # 検証
+    assert response.status_code == 206
+    assert response.content == expected
+    assert response.headers["content-range"] == content_range
+
+def test_get_audio_rejects_unsatisfiable_range(client, audio_store):
+    audio_id = audio_store.put(b"0123456789")
+
+    # テスト実行
+    response = client.get(f"/api/v1/audio/{audio_id}", headers={"Range": "bytes=20-30"})
+
+    # 検証
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */10"
+
+def test_get_audio_not_found(client):
+    response = client.get("/api/v1/audio/missing")
+    assert response.status_code == 404
@@ -0,0 +1,77 @@
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.config.database import _current_unit_of_work
+from app.core.analysis_scheduler import get_analysis_scheduler
+from app.services.audio_preprocessing_service import AudioPreprocessingServiceFactory
+from app.services.gemini_audio_service import GeminiAudioService, GeminiAudioServiceFactory
+from app.services.postgres_session_manager import PostgresSessionManagerServiceFactory
+from app.services.text2speech_service import TextToSpeechServiceFactory
+
+@pytest.fixture
+def db_session():
+    """作業単位が使うセッションを置き換え、コミット回数を確認できるようにする"""
+    session = Mock(info={}, flush=AsyncMock(), commit=AsyncMock(), rollback=AsyncMock())
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    with patch("app.config.database.AsyncSessionLocal", return_value=session):
+        yield session
+
+@pytest.fixture
+def session_manager():
+    manager = Mock()
+    manager.observed = []
+
+    async def add_to_history(session_id, content):
+        manager.observed.append(("add_to_history", _current_unit_of_work.get(), content))
+
+    async def get_next_conversation_id(session_id):
+        manager.observed.append(("get_next_conversation_id", _current_unit_of_work.get()))
+        return "3"
+
+    manager.add_to_history = add_to_history
+    manager.get_next_conversation_id = get_next_conversation_id
+    return manager
+
+@pytest.fixture
+def client(session_manager):
+    gemini_audio_service = GeminiAudioService(client=Mock())
+
+    async def stream(audio_content, session_id, session_manager, save_history=True):
+        assert save_history is False
+        yield {"type": "transcription", "content": "I goed home"}
+        yield {"type": "response_delta", "content": "Welcome back!"}
+
+    gemini_audio_service.generate_immediate_response_stream = stream
+    text_to_speech_service = Mock()
+    text_to_speech_service.text_to_speech = Mock(return_value=b"mp3")
+    preprocessing_service = Mock()
+    preprocessing_service.preprocess = Mock(return_value=Mock(content=b"wav"))
+    scheduler = Mock()
+    scheduler.submit = Mock(return_value="queued")
+    overrides = {
+        GeminiAudioServiceFactory.create: lambda: gemini_audio_service,
+        TextToSpeechServiceFactory.create: lambda: text_to_speech_service,
+        PostgresSessionManagerServiceFactory.create: lambda: session_manager,
+        AudioPreprocessingServiceFactory.create: lambda: preprocessing_service,
+        get_analysis_scheduler: lambda: scheduler,
+    }
+    app.dependency_overrides.update(overrides)
+    yield TestClient(app)
+    for dependency in overrides:
+        app.dependency_overrides.pop(dependency, None)
+
+def test_stream_saves_turn_and_allocates_id_in_one_unit_of_work(client, session_manager, db_session):
+    """Test that the streaming turn adds history and allocates the conversation id in a single transaction."""
+    # テスト実行
+    response = client.post("/api/v1/gemini_audio/s1/stream", files={"audio_file": ("audio.wav", b"RIFF", "audio/wav")})
+
+    # 検証
+    assert response.status_code == 200
+    assert "event: done" in response.text
+    (add_call, add_uow, content), (allocate_call, allocate_uow) = session_manager.observed
+    assert add_call == "add_to_history" and allocate_call == "get_next_conversation_id"
+    assert content == ['"user":I goed home', '"model":Welcome back!']
+    assert add_uow is not None and add_uow is allocate_uow
+    db_session.commit.assert_awaited_once()
@@ -0,0 +1,101 @@
+import uuid
+import pytest
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.sessions import get_database_service
+from app.core.pagination import decode_cursor, encode_cursor
+
+SESSION_ID = str(uuid.uuid4())
+
+def session_row(index):
+    return {
+        "id": uuid.UUID(int=index),
+        "name": "user1",
+        "title": f"Session {index}",
+        "url": None,
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "updated_at": datetime(2026, 1, 1, 0, index, tzinfo=timezone.utc),
+    }
+
+@pytest.fixture
+def db_service():
+    service = Mock()
+    service.list_sessions = AsyncMock(return_value=[session_row(3), session_row(2), session_row(1)])
+    service.count_sessions = AsyncMock(return_value=3)
+    service.get_session = AsyncMock(return_value=SimpleNamespace(id=SESSION_ID))
+    service.list_conversations = AsyncMock(return_value=[
+        {"id": uuid.UUID(int=1), "conversation_number": 1, "transcription": "hello"},
+        {"id": uuid.UUID(int=2), "conversation_number": 3, "transcription": "how are you"},
+    ])
+    service.count_conversations = AsyncMock(return_value=2)
+    app.dependency_overrides[get_database_service] = lambda: service
+    yield service
+    app.dependency_overrides.pop(get_database_service, None)
+
+@pytest.fixture
+def client(db_service):
+    return TestClient(app)
+
+def test_sessions_are_paginated_with_a_cursor(client, db_service):
+    """Test that one extra row is fetched to decide whether a next page exists."""
+    # テスト実行
+    response = client.get("/api/v1/sessions/", params={"name": "user1", "limit": 2})
+
+    # 検証
+    body = response.json()
+    assert response.status_code == 200
+    assert [session["title"] for session in body["sessions"]] == ["Session 3", "Session 2"]
+    assert body["total"] == 3
+    assert decode_cursor(body["next_cursor"]) == {"u": "2026-01-01T00:02:00+00:00", "i": str(uuid.UUID(int=2))}
+    assert db_service.list_sessions.await_args.kwargs["limit"] == 3
+
+def test_sessions_cursor_is_passed_as_keyset(client, db_service):
+    """Test that the cursor resumes after the last (updated_at, id) of the previous page."""
+    db_service.list_sessions.return_value = [session_row(1)]
+    cursor = encode_cursor({"u": "2026-01-01T00:02:00+00:00", "i": str(uuid.UUID(int=2))})
+
+    # テスト実行
+    response = client.get("/api/v1/sessions/", params={"limit": 2, "cursor": cursor, "include_total": "false"})
+
+    # 検証
+    body = response.json()
+    assert body["next_cursor"] is None
+    assert body["total"] is None
+    assert db_service.list_sessions.await_args.kwargs["after"] == (
+        datetime(2026, 1, 1, 0, 2, tzinfo=timezone.utc), uuid.UUID(int=2)
+    )
+    db_service.count_sessions.assert_not_awaited()
+
+def test_invalid_cursor_is_rejected(client):
+    """Test that a malformed cursor is a client error."""
+    # テスト実行
+    response = client.get("/api/v1/sessions/", params={"cursor": "not-a-cursor"})
+
+    # 検証
+    assert response.status_code == 400
+
+def test_conversations_can_skip_analysis_columns(client, db_service):
+    """Test that only the requested fields (plus the keyset columns) are selected and returned."""
+    # テスト実行
+    response = client.post(
+        f"/api/v1/sessions/{SESSION_ID}/conversations",
+        params={"fields": "transcription", "limit": 1}
+    )
+
+    # 検証
+    body = response.json()
+    assert response.status_code == 200
+    assert db_service.list_conversations.await_args.kwargs["fields"] == ("id", "conversation_number", "transcription")
+    assert body["conversations"] == [{"id": str(uuid.UUID(int=1)), "conversation_number": 1, "transcription": "hello"}]
+    assert decode_cursor(body["next_cursor"]) == {"n": 1}
+
+def test_unknown_fields_are_rejected(client):
+    """Test that projecting an unknown column is a client error."""
+    # テスト実行
+    response = client.post(f"/api/v1/sessions/{SESSION_ID}/conversations", params={"fields": "password"})
+
+    # 検証
+    assert response.status_code == 400
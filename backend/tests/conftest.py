@@ -0,0 +1,30 @@
+import pytest
+from app.config.settings import get_settings
+from app.core.clients import get_client_registry
+from app.services.tts_cache import get_tts_cache
+from app.services.session_context_cache import get_session_context_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_client_registry():
+    """テストごとに共有クライアントを破棄し、モックが確実に使われるようにする"""
+    get_client_registry().reset()
+    yield
+    get_client_registry().reset()
+
+
+@pytest.fixture(autouse=True)
+def isolate_tts_cache(tmp_path, monkeypatch):
+    """テストごとに空のTTSキャッシュを使い、ディスク層は一時ディレクトリに置く"""
+    monkeypatch.setattr(get_settings(), "TTS_CACHE_DIR", str(tmp_path / "tts_cache"))
+    get_tts_cache.cache_clear()
+    yield
+    get_tts_cache.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def isolate_session_context_cache():
+    """テストごとに空のセッションコンテキストキャッシュを使う"""
+    get_session_context_cache.cache_clear()
+    yield
+    get_session_context_cache.cache_clear()
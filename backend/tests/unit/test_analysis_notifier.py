@@ -0,0 +1,160 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock
+from app.core.analysis_notifier import AnalysisNotifier, PostgresAnalysisListener
+
+@pytest.mark.asyncio
+async def test_notify_wakes_subscribers():
+    """Test that every waiter on a conversation is woken by a notification."""
+    notifier = AnalysisNotifier()
+
+    async def waiter():
+        with notifier.subscribe("s1", "2") as ready:
+            await asyncio.wait_for(ready, timeout=1)
+            return True
+
+    tasks = [asyncio.create_task(waiter()) for _ in range(3)]
+    await asyncio.sleep(0)
+    assert notifier.get_stats()["waiting"] == 3
+
+    # テスト実行
+    woken = notifier.notify("s1", "2")
+
+    # 検証
+    assert woken == 3
+    assert await asyncio.gather(*tasks) == [True, True, True]
+    assert notifier.get_stats() == {"waiting": 0, "notified": 3}
+
+@pytest.mark.asyncio
+async def test_notify_other_conversation_does_not_wake():
+    """Test that notifications are scoped to one conversation."""
+    notifier = AnalysisNotifier()
+
+    # テスト実行と検証
+    with notifier.subscribe("s1", "2") as ready:
+        assert notifier.notify("s1", "3") == 0
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(ready, timeout=0.05)
+    assert notifier.get_stats()["waiting"] == 0
+
+@pytest.mark.asyncio
+async def test_postgres_listener_forwards_notifications():
+    """Test that NOTIFY payloads are forwarded to the in-process registry."""
+    notifier = AnalysisNotifier()
+    listener = PostgresAnalysisListener(notifier, dsn="postgresql://unused")
+
+    with notifier.subscribe("s1", "2") as ready:
+        # テスト実行
+        listener._on_notification(None, 1, "analysis_ready", json.dumps({"session_id": "s1", "conversation_id": "2"}))
+        listener._on_notification(None, 1, "analysis_ready", "not json")
+
+        # 検証
+        await asyncio.wait_for(ready, timeout=1)
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+        self.on_termination = None
+
+    def add_termination_listener(self, callback):
+        self.on_termination = callback
+
+    async def add_listener(self, channel, callback):
+        pass
+
+    async def remove_listener(self, channel, callback):
+        pass
+
+    async def execute(self, query, timeout=None):
+        pass
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+    def is_closed(self):
+        return self.closed
+
+    def drop(self):
+        self.closed = True
+        self.on_termination(self)
+
+@pytest.fixture
+def fake_connect(monkeypatch):
+    """asyncpg.connect を置き換え、返す接続（Exceptionの場合は送出）を順に指定する"""
+    import asyncpg
+    results = []
+    calls = []
+
+    async def connect(dsn):
+        calls.append(dsn)
+        result = results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+    return results, calls
+
+async def wait_until(condition):
+    for _ in range(200):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition was not met")
+
+@pytest.mark.asyncio
+async def test_listener_retries_when_startup_connection_fails(fake_connect):
+    """Test that a failed initial connection does not raise and is retried in the background."""
+    results, calls = fake_connect
+    connection = FakeConnection()
+    results.extend([OSError("connection refused"), connection])
+    listener = PostgresAnalysisListener(AnalysisNotifier(), dsn="postgresql://unused", reconnect_delay=0.01)
+
+    # テスト実行
+    await listener.start()
+    await wait_until(lambda: listener.connected)
+
+    # 検証
+    assert len(calls) == 2
+    assert listener.get_stats() == {"connected": True, "connects": 1, "failures": 1}
+    await listener.stop()
+    assert connection.closed
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_and_wakes_waiters_after_connection_loss(fake_connect):
+    """Test that a dropped connection is replaced and waiters re-check results missed in between."""
+    results, _ = fake_connect
+    first, second = FakeConnection(), FakeConnection()
+    results.extend([first, second])
+    notifier = AnalysisNotifier()
+    listener = PostgresAnalysisListener(notifier, dsn="postgresql://unused", reconnect_delay=0.01)
+    await listener.start()
+    await wait_until(lambda: listener.connected)
+
+    with notifier.subscribe("s1", "2") as ready:
+        # テスト実行
+        first.drop()
+
+        # 検証
+        await asyncio.wait_for(ready, timeout=1)
+    assert listener._connection is second
+    assert listener.get_stats()["connects"] == 2
+    await listener.stop()
+
+@pytest.mark.asyncio
+async def test_listener_reconnects_when_health_check_fails(fake_connect):
+    """Test that a silently broken connection is detected by the periodic health check."""
+    results, _ = fake_connect
+    first, second = FakeConnection(), FakeConnection()
+    first.execute = AsyncMock(side_effect=OSError("connection reset"))
+    results.extend([first, second])
+    listener = PostgresAnalysisListener(AnalysisNotifier(), dsn="postgresql://unused", health_check_interval=0.01)
+
+    # テスト実行
+    await listener.start()
+    await wait_until(lambda: listener._connection is second)
+
+    # 検証
+    assert first.closed
+    await listener.stop()
@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+from app.core.analysis_scheduler import AnalysisScheduler
+
+@pytest.mark.asyncio
+async def test_scheduler_runs_jobs_and_tracks_status():
+    """Test that a submitted analysis moves from queued to done."""
+    scheduler = AnalysisScheduler(workers=1)
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def job():
+        started.set()
+        await release.wait()
+
+    # テスト実行
+    assert scheduler.submit("session", "1", job) == "queued"
+    assert scheduler.get_status("session", "1")["status"] == "queued"
+    await started.wait()
+    assert scheduler.get_status("session", "1")["status"] == "running"
+    release.set()
+    await scheduler.shutdown(timeout=1)
+
+    # 検証
+    assert scheduler.get_status("session", "1")["status"] == "done"
+    assert scheduler.get_session_statuses("session") == {"1": scheduler.get_status("session", "1")}
+    assert scheduler.get_stats()["done"] == 1
+
+@pytest.mark.asyncio
+async def test_scheduler_caps_concurrency():
+    """Test that no more jobs run at once than there are workers."""
+    scheduler = AnalysisScheduler(workers=2)
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    # テスト実行
+    for conversation_id in range(6):
+        scheduler.submit("session", str(conversation_id), job)
+    await scheduler.shutdown(timeout=1)
+
+    # 検証
+    assert peak == 2
+    assert all(status["status"] == "done" for status in scheduler.get_session_statuses("session").values())
+
+@pytest.mark.asyncio
+async def test_scheduler_retries_with_backoff():
+    """Test that a failing job is retried and succeeds on a later attempt."""
+    scheduler = AnalysisScheduler(workers=1, max_retries=2, retry_base_delay=0.01)
+    attempts = 0
+
+    async def flaky():
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise RuntimeError("temporary error")
+
+    # テスト実行
+    scheduler.submit("session", "1", flaky)
+    await scheduler.shutdown(timeout=1)
+
+    # 検証
+    status = scheduler.get_status("session", "1")
+    assert status["status"] == "done"
+    assert status["attempts"] == 3
+    assert scheduler.get_stats()["retried"] == 2
+
+@pytest.mark.asyncio
+async def test_scheduler_marks_failed_after_retries():
+    """Test that exhausted retries mark the job failed and call on_failure."""
+    scheduler = AnalysisScheduler(workers=1, max_retries=1, retry_base_delay=0.01)
+    failures = []
+
+    async def broken():
+        raise RuntimeError("permanent error")
+
+    async def on_failure(error):
+        failures.append(str(error))
+
+    # テスト実行
+    scheduler.submit("session", "1", broken, on_failure=on_failure)
+    await scheduler.shutdown(timeout=1)
+
+    # 検証
+    status = scheduler.get_status("session", "1")
+    assert status["status"] == "failed"
+    assert status["attempts"] == 2
+    assert status["error"] == "permanent error"
+    assert failures == ["permanent error"]
+
+@pytest.mark.asyncio
+async def test_scheduler_rejects_when_queue_is_full():
+    """Test that submissions beyond the queue bound are rejected instead of piling up."""
+    scheduler = AnalysisScheduler(workers=1, max_queue_size=1)
+    release = asyncio.Event()
+
+    async def job():
+        await release.wait()
+
+    # テスト実行（1件目はワーカーが取り出し、2件目でキューが埋まる）
+    scheduler.submit("session", "1", job)
+    await asyncio.sleep(0)
+    scheduler.submit("session", "2", job)
+    status = scheduler.submit("session", "3", job)
+
+    # 検証
+    assert status == "failed"
+    assert scheduler.get_status("session", "3")["error"] == "Analysis queue is full"
+    assert scheduler.get_stats()["rejected"] == 1
+    release.set()
+    await scheduler.shutdown(timeout=1)
+
+@pytest.mark.asyncio
+async def test_scheduler_shutdown_drains_and_stops_accepting():
+    """Test that shutdown waits for queued work and rejects later submissions."""
+    scheduler = AnalysisScheduler(workers=1)
+    completed = []
+
+    async def job(name):
+        await asyncio.sleep(0.01)
+        completed.append(name)
+
+    scheduler.submit("session", "1", lambda: job("1"))
+    scheduler.submit("session", "2", lambda: job("2"))
+
+    # テスト実行
+    await scheduler.shutdown(timeout=1)
+
+    # 検証
+    assert completed == ["1", "2"]
+    assert scheduler.submit("session", "3", lambda: job("3")) == "failed"
+    assert scheduler.get_stats()["workers"] == 0
+
+@pytest.mark.asyncio
+async def test_scheduler_shutdown_timeout_marks_pending_failed():
+    """Test that work left after the drain timeout is recorded as failed."""
+    scheduler = AnalysisScheduler(workers=1)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    scheduler.submit("session", "1", hang)
+    scheduler.submit("session", "2", hang)
+    await asyncio.sleep(0)
+
+    # テスト実行
+    await scheduler.shutdown(timeout=0.05)
+
+    # 検証
+    assert scheduler.get_status("session", "1")["status"] == "failed"
+    assert scheduler.get_status("session", "2")["status"] == "failed"
@@ -0,0 +1,116 @@
+import io
+import wave
+
+import numpy as np
+import pytest
+from app.services.audio_preprocessing_service import AudioPreprocessingService
+
+def make_wav(samples, sample_rate=48000, channels=1):
+    """Build a 16-bit PCM WAV from float samples (shape: frames or frames x channels)."""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+def speech_with_silence(sample_rate=48000, silence_seconds=1.0, voiced_seconds=1.0):
+    """A tone surrounded by digital silence."""
+    silence = np.zeros(int(sample_rate * silence_seconds), dtype=np.float32)
+    t = np.arange(int(sample_rate * voiced_seconds)) / sample_rate
+    tone = (0.5 * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+    return np.concatenate([silence, tone, silence])
+
+def read_wav(content):
+    with wave.open(io.BytesIO(content), "rb") as wf:
+        return wf.getnchannels(), wf.getframerate(), wf.getnframes()
+
+def test_preprocess_downsamples_and_trims_silence():
+    """Test that a 48 kHz recording is resampled to 16 kHz with the surrounding silence removed."""
+    service = AudioPreprocessingService(target_sample_rate=16000, padding_ms=100)
+    audio = make_wav(speech_with_silence())
+
+    # テスト実行
+    result = service.preprocess(audio)
+
+    # 検証
+    channels, sample_rate, frames = read_wav(result.content)
+    assert result.applied is True
+    assert (channels, sample_rate) == (1, 16000)
+    assert result.original_seconds == pytest.approx(3.0)
+    # 発話1秒 + 前後の余白100ms（フレーム境界分の誤差を許容）
+    assert result.processed_seconds == pytest.approx(1.2, abs=0.05)
+    assert frames == pytest.approx(1.2 * 16000, abs=800)
+    assert result.bytes_saved == len(audio) - len(result.content)
+    assert result.seconds_saved == pytest.approx(1.8, abs=0.05)
+
+def test_preprocess_mixes_stereo_to_mono():
+    """Test that multi-channel input is averaged down to one channel."""
+    service = AudioPreprocessingService(target_sample_rate=16000)
+    mono = speech_with_silence(sample_rate=16000, silence_seconds=0.0)
+    audio = make_wav(np.stack([mono, mono], axis=1), sample_rate=16000, channels=2)
+
+    # テスト実行
+    result = service.preprocess(audio)
+
+    # 検証
+    channels, sample_rate, frames = read_wav(result.content)
+    assert result.applied is True
+    assert (channels, sample_rate, frames) == (1, 16000, len(mono))
+
+def test_preprocess_keeps_all_silent_audio():
+    """Test that audio judged entirely silent is not trimmed away."""
+    service = AudioPreprocessingService(target_sample_rate=16000)
+    audio = make_wav(np.zeros(16000, dtype=np.float32), sample_rate=16000)
+
+    # テスト実行
+    result = service.preprocess(audio)
+
+    # 検証（小さくならないのでそのまま返す）
+    assert result.applied is False
+    assert result.content == audio
+    assert result.original_seconds == pytest.approx(1.0)
+
+@pytest.mark.parametrize("audio", [b"\x1aE\xdf\xa3webm data", b"RIFF\x00\x00\x00\x00WAVEbroken"])
+def test_preprocess_passes_through_unsupported_audio(audio):
+    """Test that non-WAV or undecodable input is returned untouched."""
+    service = AudioPreprocessingService()
+
+    # テスト実行
+    result = service.preprocess(audio)
+
+    # 検証
+    assert result.applied is False
+    assert result.content == audio
+    assert result.bytes_saved == 0
+    assert result.seconds_saved is None
+
+def test_preprocess_disabled():
+    """Test that a disabled service never rewrites audio."""
+    service = AudioPreprocessingService(enabled=False)
+    audio = make_wav(speech_with_silence())
+
+    # テスト実行
+    result = service.preprocess(audio)
+
+    # 検証
+    assert result.applied is False
+    assert result.content == audio
+
+def test_stats_accumulate_savings():
+    """Test that per-turn savings are summed in get_stats."""
+    service = AudioPreprocessingService(target_sample_rate=16000)
+    audio = make_wav(speech_with_silence())
+
+    # テスト実行
+    first = service.preprocess(audio)
+    service.preprocess(b"not wav")
+
+    # 検証
+    stats = service.get_stats()
+    assert stats["turns"] == 2
+    assert stats["applied"] == 1
+    assert stats["bytes_saved"] == first.bytes_saved
+    assert stats["seconds_saved"] == pytest.approx(first.seconds_saved)
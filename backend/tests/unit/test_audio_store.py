@@ -0,0 +1,44 @@
+import pytest
+from unittest.mock import patch
+from app.services.audio_store import AudioStore
+
+def test_put_and_get():
+    """Test that stored audio can be fetched by its ID."""
+    store = AudioStore()
+
+    # テスト実行
+    audio_id = store.put(b"mp3 data")
+
+    # 検証
+    stored = store.get(audio_id)
+    assert stored.content == b"mp3 data"
+    assert stored.media_type == "audio/mpeg"
+    assert store.get("unknown") is None
+
+def test_expired_audio_is_not_served():
+    """Test that audio is dropped once its TTL has passed."""
+    store = AudioStore(ttl_seconds=10)
+    with patch("app.services.audio_store.time.monotonic", return_value=100.0):
+        audio_id = store.put(b"mp3 data")
+
+    # テスト実行と検証
+    with patch("app.services.audio_store.time.monotonic", return_value=109.0):
+        assert store.get(audio_id) is not None
+    with patch("app.services.audio_store.time.monotonic", return_value=111.0):
+        assert store.get(audio_id) is None
+        assert store.get_stats() == {"items": 0, "bytes": 0}
+
+def test_store_is_bounded():
+    """Test that the oldest audio is evicted when the byte budget is exceeded."""
+    store = AudioStore(max_bytes=20)
+
+    # テスト実行
+    first = store.put(b"x" * 10)
+    second = store.put(b"y" * 10)
+    third = store.put(b"z" * 10)
+
+    # 検証
+    assert store.get(first) is None
+    assert store.get(second) is not None
+    assert store.get(third) is not None
+    assert store.get_stats()["bytes"] == 20
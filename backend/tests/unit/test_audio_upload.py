@@ -0,0 +1,99 @@
+import hashlib
+import io
+import wave
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.config.settings import Settings, get_settings
+from app.core.audio_upload import AudioUpload, AudioUploadAccumulator, UploadTooLargeError, ingest_audio_upload, probe_wav
+
+def make_wav(seconds: float, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(b"\x00\x00" * channels * int(sample_rate * seconds))
+    return buffer.getvalue()
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(audio: AudioUpload = Depends(ingest_audio_upload)):
+        return {
+            "size": audio.size,
+            "sha256": audio.sha256,
+            "filename": audio.filename,
+            "content_type": audio.content_type,
+            "duration_seconds": audio.duration_seconds,
+            "sample_rate": audio.sample_rate,
+        }
+
+    app.dependency_overrides[get_settings] = lambda: Settings(MAX_AUDIO_UPLOAD_BYTES=64 * 1024)
+    return TestClient(app)
+
+def test_probe_wav_reads_duration():
+    """Test that duration and format are computed from the WAV header."""
+    data = make_wav(1.5, sample_rate=8000, channels=2)
+
+    # テスト実行
+    sample_rate, channels, duration = probe_wav(data[:4096], len(data))
+
+    # 検証
+    assert sample_rate == 8000
+    assert channels == 2
+    assert duration == pytest.approx(1.5)
+
+def test_probe_wav_ignores_other_formats():
+    """Test that non-WAV uploads (e.g. WebM from MediaRecorder) have no duration."""
+    assert probe_wav(b"\x1aE\xdf\xa3" + b"\x00" * 100, 104) == (None, None, None)
+
+def test_accumulator_rejects_oversized_data():
+    """Test that the size cap is enforced while data is still arriving."""
+    accumulator = AudioUploadAccumulator(max_bytes=10)
+    accumulator.feed(b"x" * 6)
+
+    # テスト実行と検証
+    with pytest.raises(UploadTooLargeError):
+        accumulator.feed(b"x" * 6)
+
+def test_upload_is_ingested_with_hash_and_duration(client):
+    """Test that the multipart body is read once into memory with metadata."""
+    data = make_wav(1.0)
+
+    # テスト実行
+    response = client.post("/upload", files={"audio_file": ("turn.wav", data, "audio/wav")}, data={"note": "ignored"})
+
+    # 検証
+    assert response.status_code == 200
+    body = response.json()
+    assert body["size"] == len(data)
+    assert body["sha256"] == hashlib.sha256(data).hexdigest()
+    assert body["filename"] == "turn.wav"
+    assert body["content_type"] == "audio/wav"
+    assert body["duration_seconds"] == pytest.approx(1.0)
+    assert body["sample_rate"] == 16000
+
+def test_oversized_upload_is_rejected(client):
+    """Test that uploads above the configured cap get 413."""
+    data = make_wav(3.0)  # 約96KB
+
+    # テスト実行
+    response = client.post("/upload", files={"audio_file": ("turn.wav", data, "audio/wav")})
+
+    # 検証
+    assert response.status_code == 413
+
+@pytest.mark.parametrize("files, expected_detail", [
+    ({"other": ("x.wav", b"data", "audio/wav")}, "Missing 'audio_file' field"),
+    ({"audio_file": ("x.wav", b"", "audio/wav")}, "Empty audio data"),
+])
+def test_invalid_upload_is_rejected(client, files, expected_detail):
+    """Test that missing or empty audio fields get 400."""
+    response = client.post("/upload", files=files)
+
+    # 検証
+    assert response.status_code == 400
+    assert response.json()["detail"] == expected_detail
@@ -0,0 +1,64 @@
+from app.core.circuit_breaker import CircuitBreaker, CircuitState
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_breaker(clock):
+    return CircuitBreaker("database", failure_threshold=2, probe_interval=10.0, clock=clock)
+
+def test_opens_after_consecutive_failures():
+    """Test that the circuit opens only after the threshold of consecutive failures."""
+    breaker = make_breaker(FakeClock())
+
+    # テスト実行
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    still_closed = breaker.state
+    breaker.record_failure()
+
+    # 検証
+    assert still_closed is CircuitState.CLOSED
+    assert breaker.state is CircuitState.OPEN
+    assert not breaker.allow_request()
+
+def test_half_open_allows_single_probe():
+    """Test that after the probe interval exactly one request is let through."""
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 10.0
+
+    # テスト実行
+    first = breaker.allow_request()
+    second = breaker.allow_request()
+
+    # 検証
+    assert first and not second
+    assert breaker.state is CircuitState.HALF_OPEN
+    assert breaker.get_stats()["probes"] == 1
+
+def test_probe_result_closes_or_reopens():
+    clock = FakeClock()
+    breaker = make_breaker(clock)
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now = 10.0
+    breaker.allow_request()
+
+    # テスト実行
+    breaker.record_failure()
+
+    # 検証
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.get_stats()["retry_in_seconds"] == 10.0
+    clock.now = 20.0
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state is CircuitState.CLOSED
+    assert breaker.get_stats()["consecutive_failures"] == 0
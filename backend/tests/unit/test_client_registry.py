@@ -0,0 +1,114 @@
+import grpc
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.core.clients import ClientRegistry, GEMINI, TEXT_TO_SPEECH
+from app.services.gemini_audio_service import GeminiAudioServiceFactory
+from app.services.gemini_service import GeminiServiceFactory
+
+@pytest.fixture
+def mock_genai_client():
+    with patch('app.core.clients.genai.Client') as mock:
+        yield mock
+
+def test_client_is_created_once_per_process(mock_genai_client):
+    """Test that services built per request share one Gemini client."""
+    # テスト実行
+    first = GeminiAudioServiceFactory.create()
+    second = GeminiAudioServiceFactory.create()
+    third = GeminiServiceFactory.create()
+
+    # 検証
+    mock_genai_client.assert_called_once()
+    assert first.client is second.client is third.client
+
+def test_get_stats_reports_live_clients_and_channels(mock_genai_client):
+    """Test that stats count shared clients and only the gRPC channels they actually hold."""
+    registry = ClientRegistry()
+    assert registry.get_stats()["live_clients"] == 0
+    channel = grpc.insecure_channel("localhost:1")
+    tts_client = Mock()
+    tts_client.transport.grpc_channel = channel
+
+    # テスト実行
+    registry.get(GEMINI)
+    registry.get(GEMINI)
+    with patch('app.core.clients.texttospeech.TextToSpeechClient', return_value=tts_client):
+        registry.get(TEXT_TO_SPEECH)
+    stats = registry.get_stats()
+    channel.close()
+
+    # 検証
+    assert stats["live_clients"] == 2
+    assert stats["live_channels"] == 1
+    assert stats["clients"][GEMINI]["transport"] == "http"
+    assert stats["clients"][TEXT_TO_SPEECH]["transport"] == "grpc"
+    assert stats["clients"][GEMINI]["acquisitions"] == 2
+
+def test_warm_up_reports_failures():
+    """Test that a client failing to initialize does not abort warm-up."""
+    registry = ClientRegistry()
+
+    # モックの設定
+    with patch('app.core.clients.texttospeech.TextToSpeechClient', side_effect=Exception("No credentials")), \
+         patch('app.core.clients.genai.Client'):
+        # テスト実行
+        results = registry.warm_up(names=[GEMINI, TEXT_TO_SPEECH])
+
+    # 検証
+    assert results == {GEMINI: True, TEXT_TO_SPEECH: False}
+    assert registry.get_stats()["live_clients"] == 1
+    assert registry.get_stats()["clients"][GEMINI]["acquisitions"] == 0
+
+@pytest.mark.asyncio
+async def test_close_all_closes_grpc_transport():
+    """Test that closing the registry closes gRPC transports and forgets clients."""
+    registry = ClientRegistry()
+    mock_client = Mock()
+
+    # モックの設定
+    with patch('app.core.clients.texttospeech.TextToSpeechClient', return_value=mock_client):
+        registry.get(TEXT_TO_SPEECH)
+
+    # テスト実行
+    await registry.close_all()
+
+    # 検証
+    mock_client.transport.close.assert_called_once()
+    assert registry.get_stats()["live_clients"] == 0
+
+@pytest.mark.asyncio
+async def test_close_all_closes_gemini_async_client():
+    """Test that the Gemini client's async HTTP client is closed as well as the sync one."""
+    registry = ClientRegistry()
+    gemini_client = Mock(spec=["aio", "_api_client"])
+    gemini_client.aio = Mock(spec=[])
+    gemini_client._api_client._async_httpx_client.aclose = AsyncMock()
+
+    # モックの設定
+    with patch('app.core.clients.genai.Client', return_value=gemini_client):
+        registry.get(GEMINI)
+
+    # テスト実行
+    await registry.close_all()
+
+    # 検証
+    gemini_client._api_client._async_httpx_client.aclose.assert_awaited_once()
+    gemini_client._api_client._httpx_client.close.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_close_all_prefers_public_aclose():
+    """Test that SDK versions with aio.aclose() are closed through it."""
+    registry = ClientRegistry()
+    gemini_client = Mock(spec=["aio", "_api_client"])
+    gemini_client.aio.aclose = AsyncMock()
+
+    # モックの設定
+    with patch('app.core.clients.genai.Client', return_value=gemini_client):
+        registry.get(GEMINI)
+
+    # テスト実行
+    await registry.close_all()
+
+    # 検証
+    gemini_client.aio.aclose.assert_awaited_once()
+    gemini_client._api_client._async_httpx_client.aclose.assert_not_called()
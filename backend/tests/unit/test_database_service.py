@@ -0,0 +1,225 @@
+import uuid
+import zlib
+from datetime import datetime, timezone
+import pytest
+from unittest.mock import AsyncMock, Mock
+from sqlalchemy.dialects import postgresql
+from app.models.database_models import Conversation
+from app.services.database_service import DatabaseService
+
+SESSION_ID = str(uuid.uuid4())
+
+def compiled(statement):
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+@pytest.fixture
+def db():
+    session = Mock()
+    session.info = {}
+    session.execute = AsyncMock()
+    session.flush = AsyncMock()
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.refresh = AsyncMock()
+    return session
+
+def returning(value):
+    result = Mock()
+    result.scalar_one_or_none.return_value = value
+    return result
+
+@pytest.mark.asyncio
+async def test_next_conversation_number_uses_atomic_counter(db):
+    """Test that numbers are allocated with a single UPDATE ... RETURNING."""
+    db.execute.return_value = returning(7)
+
+    # テスト実行
+    number = await DatabaseService(db).get_next_conversation_number(SESSION_ID)
+
+    # 検証
+    assert number == 7
+    db.execute.assert_awaited_once()
+    sql = compiled(db.execute.await_args.args[0])
+    assert sql.startswith("UPDATE sessions SET")
+    assert "last_conversation_number=(sessions.last_conversation_number +" in sql
+    assert "RETURNING sessions.last_conversation_number" in sql
+    assert "conversations" not in sql, "Allocation must not scan conversations"
+    db.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_create_conversation_allocates_in_same_transaction(db):
+    """Test that omitting the number allocates it before the insert and commits once."""
+    db.execute.return_value = returning(3)
+
+    # テスト実行
+    conversation = await DatabaseService(db).create_conversation(SESSION_ID, transcription="hello")
+
+    # 検証
+    assert conversation.conversation_number == 3
+    db.add.assert_called_once()
+    assert isinstance(db.add.call_args.args[0], Conversation)
+    db.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_create_conversation_for_unknown_session(db):
+    """Test that allocation for a missing session fails instead of inventing a number."""
+    db.execute.return_value = returning(None)
+
+    # テスト実行と検証
+    with pytest.raises(ValueError):
+        await DatabaseService(db).create_conversation(SESSION_ID, transcription="hello")
+    db.rollback.assert_awaited_once()
+    db.add.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_upsert_conversation_analysis_is_single_statement(db):
+    """Test that saving an analysis is one INSERT ... ON CONFLICT DO UPDATE."""
+    db.execute.return_value = returning(Mock(spec=Conversation))
+
+    # テスト実行
+    await DatabaseService(db).upsert_conversation_analysis(
+        SESSION_ID, 4, "", "audio", {"advice": "Slow down", "suggestion": ["a"]}
+    )
+
+    # 検証
+    db.execute.assert_awaited_once()
+    sql = compiled(db.execute.await_args.args[0])
+    assert sql.startswith("INSERT INTO conversations")
+    assert "ON CONFLICT (session_id, conversation_number) DO UPDATE SET" in sql
+    assert "advice = excluded.advice" in sql
+    assert "suggestion = excluded.suggestion" in sql
+    assert "transcription = excluded" not in sql, "Existing transcriptions must be preserved"
+    assert "RETURNING" in sql
+    db.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_upsert_without_analysis_fields_does_nothing_on_conflict(db):
+    """Test that an empty analysis does not overwrite an existing row."""
+    db.execute.return_value = returning(None)
+
+    # テスト実行
+    await DatabaseService(db).upsert_conversation_analysis(SESSION_ID, 4, "hello", "transcript", {})
+
+    # 検証
+    assert "ON CONFLICT (session_id, conversation_number) DO NOTHING" in compiled(db.execute.await_args.args[0])
+
+@pytest.mark.asyncio
+async def test_get_conversation_by_number(db):
+    """Test that a conversation is looked up by (session_id, conversation_number) directly."""
+    db.execute.return_value = returning(None)
+
+    # テスト実行
+    await DatabaseService(db).get_conversation_by_number(SESSION_ID, 2)
+
+    # 検証
+    sql = compiled(db.execute.await_args.args[0])
+    assert "WHERE conversations.session_id = " in sql
+    assert "AND conversations.conversation_number = " in sql
+
+@pytest.mark.asyncio
+async def test_writes_inside_unit_of_work_only_flush(db):
+    """Test that writes are flushed and left for the unit of work to commit."""
+    db.info["unit_of_work"] = Mock()
+    db.execute.return_value = returning(7)
+
+    # テスト実行
+    await DatabaseService(db).get_next_conversation_number(SESSION_ID)
+
+    # 検証
+    db.flush.assert_awaited_once()
+    db.commit.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_next_conversation_number_for_missing_session(db):
+    """Test that no number is handed out for a session that does not exist."""
+    db.execute.return_value = returning(None)
+
+    # テスト実行と検証
+    with pytest.raises(ValueError):
+        await DatabaseService(db).get_next_conversation_number(SESSION_ID)
+    db.commit.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_errors_inside_unit_of_work_are_raised(db):
+    """Test that a caught error inside a unit of work rolls back and is re-raised instead of returning a default."""
+    uow = Mock()
+    db.info["unit_of_work"] = uow
+    db.execute.side_effect = RuntimeError("connection lost")
+
+    # テスト実行と検証
+    with pytest.raises(RuntimeError):
+        await DatabaseService(db).update_session(SESSION_ID, title="New title")
+    db.rollback.assert_awaited_once()
+    uow.discard_after_commit.assert_called_once()
+
+@pytest.mark.asyncio
+async def test_errors_outside_unit_of_work_return_default(db):
+    db.execute.side_effect = RuntimeError("connection lost")
+
+    # テスト実行と検証
+    assert await DatabaseService(db).get_session(SESSION_ID) is None
+    db.rollback.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_list_sessions_uses_keyset_predicate(db):
+    """Test that later pages seek past the cursor instead of using OFFSET."""
+    db.execute.return_value = Mock(mappings=Mock(return_value=[]))
+    after = (datetime(2026, 1, 1, tzinfo=timezone.utc), uuid.UUID(int=1))
+
+    # テスト実行
+    await DatabaseService(db).list_sessions(name="user1", limit=3, after=after, fields=("id", "title", "updated_at"))
+
+    # 検証
+    sql = compiled(db.execute.await_args.args[0])
+    assert sql.startswith("SELECT sessions.id, sessions.title, sessions.updated_at")
+    assert "(sessions.updated_at, sessions.id) < (" in sql
+    assert "ORDER BY sessions.updated_at DESC, sessions.id DESC" in sql
+    assert "OFFSET" not in sql
+
+@pytest.mark.asyncio
+async def test_list_conversations_can_skip_analysis_columns(db):
+    """Test that projected conversation listings do not select the JSONB columns."""
+    db.execute.return_value = Mock(mappings=Mock(return_value=[]))
+
+    # テスト実行
+    await DatabaseService(db).list_conversations(SESSION_ID, limit=10, after=4, fields=("id", "conversation_number"))
+
+    # 検証
+    sql = compiled(db.execute.await_args.args[0])
+    assert "nuanceinquiry" not in sql
+    assert "conversations.conversation_number >" in sql
+
+@pytest.mark.asyncio
+async def test_upsert_webpage_document_dedupes_by_content_hash(db):
+    """Test that identical page text is stored once and the existing id is returned."""
+    document_id = uuid.uuid4()
+    db.execute.return_value = Mock(scalar_one=Mock(return_value=document_id))
+
+    # テスト実行
+    result = await DatabaseService(db).upsert_webpage_document("https://example.com", "Example", "本文" * 100)
+
+    # 検証
+    assert result == document_id
+    statement = db.execute.await_args.args[0]
+    sql = compiled(statement)
+    assert "ON CONFLICT (content_hash) DO UPDATE" in sql
+    assert "RETURNING webpage_documents.id" in sql
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert len(params["content"]) < len(("本文" * 100).encode("utf-8"))
+    db.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_get_session_webpage_decompresses_content(db):
+    """Test that the session URL and the document text are read with one joined query."""
+    db.execute.return_value = Mock(one_or_none=Mock(return_value=Mock(
+        url="https://example.com", title="Example", content=zlib.compress("Hello".encode("utf-8"))
+    )))
+
+    # テスト実行
+    webpage = await DatabaseService(db).get_session_webpage(SESSION_ID)
+
+    # 検証
+    assert webpage == {"url": "https://example.com", "title": "Example", "content": "Hello"}
+    sql = compiled(db.execute.await_args.args[0])
+    assert "LEFT OUTER JOIN webpage_documents" in sql
+    db.execute.assert_awaited_once()
@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import Mock
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+from app.config.database import async_engine_options
+from app.config.settings import Settings
+from app.core.db_pool import InstrumentedAsyncPool, PoolMetrics, get_pool_metrics, get_pool_stats
+
+@pytest.fixture(autouse=True)
+def metrics():
+    get_pool_metrics().reset()
+    yield get_pool_metrics()
+    get_pool_metrics().reset()
+
+def test_pool_metrics_summarize_recent_waits():
+    """Test that checkout waits are summarized in milliseconds."""
+    metrics = PoolMetrics(window=3)
+
+    # テスト実行
+    for seconds in (0.5, 0.001, 0.002, 0.003):
+        metrics.record_checkout(seconds)
+    metrics.record_timeout()
+    stats = metrics.get_stats()
+
+    # 検証（平均とp95は直近3件、最大は累計）
+    assert stats["checkouts"] == 4
+    assert stats["timeouts"] == 1
+    assert stats["wait_ms_avg"] == 2.0
+    assert stats["wait_ms_p95"] == 3.0
+    assert stats["wait_ms_max"] == 500.0
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_reports_connections_and_timeouts(metrics):
+    """Test that checkouts, idle connections, overflow and timeouts are reported."""
+    pool = InstrumentedAsyncPool(lambda: Mock(), pool_size=1, max_overflow=1, timeout=0.01)
+
+    # テスト実行
+    first = await greenlet_spawn(pool.connect)
+    second = await greenlet_spawn(pool.connect)
+    with pytest.raises(PoolTimeoutError):
+        await greenlet_spawn(pool.connect)
+    busy = get_pool_stats(pool, max_overflow=1)
+    second.close()
+    idle = get_pool_stats(pool)
+    first.close()
+
+    # 検証
+    assert busy["checked_out"] == 2
+    assert busy["overflow"] == 1
+    assert busy["max_overflow"] == 1
+    assert busy["checkouts"] == 2
+    assert busy["timeouts"] == 1
+    assert idle["checked_out"] == 1
+    assert idle["idle"] == 1
+    assert idle["max_overflow"] == Settings().DB_MAX_OVERFLOW
+
+def test_engine_options_come_from_settings():
+    """Test that pool sizing and the asyncpg statement cache are configurable."""
+    settings = Settings(DB_POOL_SIZE=3, DB_MAX_OVERFLOW=0, DB_POOL_RECYCLE=-1, DB_STATEMENT_CACHE_SIZE=0)
+
+    # テスト実行
+    options = async_engine_options(settings)
+
+    # 検証
+    assert options["poolclass"] is InstrumentedAsyncPool
+    assert options["pool_size"] == 3
+    assert options["max_overflow"] == 0
+    assert options["pool_recycle"] == -1
+    assert options["connect_args"] == {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
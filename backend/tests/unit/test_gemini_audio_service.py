@@ -1,6 +1,10 @@
+import asyncio
+import time
 import pytest
-from app.services.gemini_audio_service import GeminiAudioService, GeminiAudioServiceFactory
-from unittest.mock import Mock, patch
+from app.core.concurrency import PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, ConcurrencyLimiter
+from app.services.gemini_audio_service import GeminiAudioService, GeminiAudioServiceFactory, ImmediateResponseStreamParser
+from app.services.history_builder import HistoryBuilder, HistorySummary
+from unittest.mock import AsyncMock, Mock, patch
 
 @pytest.fixture
 def mock_genai_client():
@@ -17,63 +21,291 @@ def test_gemini_audio_service_initialization(mock_genai_client):
     assert service is not None, "Service should be initialized"
     mock_genai_client.assert_called_once()
 
-def test_generate_text_success(gemini_audio_service, mock_genai_client):
+@pytest.mark.asyncio
+async def test_generate_text_success(gemini_audio_service, mock_genai_client):
     """Test successful text generation from audio."""
     # モックの設定
     mock_response = Mock()
     mock_response.parsed = [Mock(transcription="Hello", response="Hi there")]
-    mock_genai_client.return_value.models.generate_content.return_value = mock_response
+    mock_genai_client.return_value.aio.models.generate_content = AsyncMock(return_value=mock_response)
 
     # モックのセッション管理サービス
     mock_session_manager = Mock()
-    mock_session_manager.get_history.return_value = []
-    mock_session_manager.add_to_history = Mock()
+    mock_session_manager.get_history = AsyncMock(return_value=[])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
+    mock_session_manager.add_to_history = AsyncMock()
 
     # テスト実行
-    result = gemini_audio_service.generate_text(b"test audio", "test_session", mock_session_manager)
+    result = await gemini_audio_service.generate_text(b"test audio", "test_session", mock_session_manager)
     
     # 検証
     assert result is not None, "Should return the expected response"
-    mock_genai_client.return_value.models.generate_content.assert_called_once()
+    mock_genai_client.return_value.aio.models.generate_content.assert_awaited_once()
 
-def test_generate_text_error(gemini_audio_service, mock_genai_client):
+@pytest.mark.asyncio
+async def test_generate_text_error(gemini_audio_service, mock_genai_client):
     """Test error handling when API call fails."""
     # モックの設定
-    mock_genai_client.return_value.models.generate_content.side_effect = Exception("API Error")
+    mock_genai_client.return_value.aio.models.generate_content = AsyncMock(side_effect=Exception("API Error"))
 
     # モックのセッション管理サービス
     mock_session_manager = Mock()
-    mock_session_manager.get_history.return_value = []
+    mock_session_manager.get_history = AsyncMock(return_value=[])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
 
     # テスト実行と検証
     with pytest.raises(Exception) as exc_info:
-        gemini_audio_service.generate_text(b"test audio", "test_session", mock_session_manager)
+        await gemini_audio_service.generate_text(b"test audio", "test_session", mock_session_manager)
     
     assert "API Error" in str(exc_info.value), "Should raise the expected error"
 
-def test_generate_text_with_invalid_audio(gemini_audio_service, mock_genai_client):
+@pytest.mark.asyncio
+async def test_generate_text_with_invalid_audio(gemini_audio_service, mock_genai_client):
     """Test handling of invalid audio data."""
     # モックの設定
-    mock_genai_client.return_value.models.generate_content.side_effect = ValueError("Invalid audio format")
+    mock_genai_client.return_value.aio.models.generate_content = AsyncMock(side_effect=ValueError("Invalid audio format"))
 
     # モックのセッション管理サービス
     mock_session_manager = Mock()
-    mock_session_manager.get_history.return_value = []
+    mock_session_manager.get_history = AsyncMock(return_value=[])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
 
     # テスト実行と検証
     with pytest.raises(ValueError) as exc_info:
-        gemini_audio_service.generate_text(b"invalid audio data", "test_session", mock_session_manager)
+        await gemini_audio_service.generate_text(b"invalid audio data", "test_session", mock_session_manager)
     
     assert "Invalid audio format" in str(exc_info.value), "Should raise format error"
 
-def test_generate_text_with_empty_audio(gemini_audio_service, mock_genai_client):
+@pytest.mark.asyncio
+async def test_generate_text_with_empty_audio(gemini_audio_service, mock_genai_client):
     """Test handling of empty audio data."""
     # モックのセッション管理サービス
     mock_session_manager = Mock()
-    mock_session_manager.get_history.return_value = []
+    mock_session_manager.get_history = AsyncMock(return_value=[])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
 
     # テスト実行と検証
     with pytest.raises(ValueError) as exc_info:
-        gemini_audio_service.generate_text(b"", "test_session", mock_session_manager)
+        await gemini_audio_service.generate_text(b"", "test_session", mock_session_manager)
     
-    assert "Empty audio data" in str(exc_info.value), "Should raise empty data error"
\ No newline at end of file
+    assert "Empty audio data" in str(exc_info.value), "Should raise empty data error"
+
+@pytest.mark.asyncio
+async def test_concurrent_turns_overlap(gemini_audio_service, mock_genai_client):
+    """Test that two concurrent turns do not block each other on the event loop."""
+    intervals = []
+
+    async def slow_generate_content(**kwargs):
+        start = time.perf_counter()
+        await asyncio.sleep(0.2)
+        intervals.append((start, time.perf_counter()))
+        response = Mock()
+        response.parsed = [Mock(transcription="Hello", response="Hi there")]
+        return response
+
+    mock_genai_client.return_value.aio.models.generate_content = slow_generate_content
+
+    # モックのセッション管理サービス
+    mock_session_manager = Mock()
+    mock_session_manager.get_history = AsyncMock(return_value=[])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
+    mock_session_manager.get_webpage_data = AsyncMock(return_value=None)
+    mock_session_manager.add_to_history = AsyncMock()
+
+    # テスト実行
+    started = time.perf_counter()
+    await asyncio.gather(
+        gemini_audio_service.generate_immediate_response(b"audio 1", "session_1", mock_session_manager),
+        gemini_audio_service.generate_immediate_response(b"audio 2", "session_2", mock_session_manager),
+    )
+    elapsed = time.perf_counter() - started
+
+    # 検証: 2つ目の呼び出しは1つ目の完了前に開始している
+    (first_start, first_end), (second_start, second_end) = sorted(intervals)
+    assert second_start < first_end, "Concurrent turns should overlap in time"
+    assert elapsed < 0.35, "Two 0.2s turns should finish in roughly 0.2s"
+
+@pytest.mark.asyncio
+async def test_gemini_call_runs_outside_unit_of_work(gemini_audio_service, mock_genai_client):
+    """Test that the context is read in a unit of work that is committed before Gemini is called."""
+    from app.config.database import _current_unit_of_work
+    session = Mock(info={}, commit=AsyncMock(), rollback=AsyncMock())
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    observed = {}
+
+    async def get_history(session_id):
+        observed["read"] = _current_unit_of_work.get()
+        return []
+
+    async def generate_content(**kwargs):
+        observed["generate"] = _current_unit_of_work.get()
+        observed["committed"] = session.commit.await_count
+        response = Mock()
+        response.parsed = [Mock(transcription="Hello", response="Hi there")]
+        return response
+
+    mock_genai_client.return_value.aio.models.generate_content = generate_content
+    mock_session_manager = Mock()
+    mock_session_manager.get_history = get_history
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
+    mock_session_manager.get_webpage_data = AsyncMock(return_value=None)
+
+    # テスト実行
+    with patch("app.config.database.AsyncSessionLocal", return_value=session):
+        await gemini_audio_service.generate_immediate_response(b"audio", "s1", mock_session_manager, save_history=False)
+
+    # 検証
+    assert observed["read"] is not None
+    assert observed["generate"] is None
+    assert observed["committed"] == 1
+
+@pytest.mark.asyncio
+async def test_long_history_is_bounded_and_summarized(gemini_audio_service, mock_genai_client):
+    """Test that old turns are replaced by the summary and folded in the background."""
+    mock_response = Mock()
+    mock_response.parsed = [Mock(transcription="Hello", response="Hi there")]
+    generate_content = AsyncMock(return_value=mock_response)
+    mock_genai_client.return_value.aio.models.generate_content = generate_content
+    history = [[f'"user":turn {index}', '"model":""'] for index in range(40)]
+    mock_session_manager = Mock()
+    mock_session_manager.get_history = AsyncMock(return_value=history)
+    mock_session_manager.get_history_summary = AsyncMock(return_value=HistorySummary(text="Earlier summary", turns=10))
+    mock_session_manager.get_webpage_data = AsyncMock(return_value=None)
+    summarizer = Mock()
+    gemini_audio_service.history_builder = HistoryBuilder(max_turns=5, token_budget=1000, summary_batch_turns=5)
+    gemini_audio_service.history_summarizer = summarizer
+
+    # テスト実行
+    await gemini_audio_service.generate_immediate_response(b"audio", "s1", mock_session_manager, save_history=False)
+
+    # 検証
+    history_prompt = generate_content.await_args.kwargs["contents"][0]
+    assert "Earlier summary" in history_prompt
+    assert "turn 35" in history_prompt
+    assert "turn 10" in history_prompt, "Turns not yet covered by the summary must not be dropped"
+    assert "turn 9'" not in history_prompt
+    summarizer.schedule.assert_called_once_with("s1", mock_session_manager)
+
+@pytest.mark.asyncio
+async def test_gemini_concurrency_cap():
+    """Test that the limiter never admits more calls than its limit."""
+    limiter = ConcurrencyLimiter(limit=2)
+    peak = 0
+
+    async def task():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.05)
+
+    # テスト実行
+    await asyncio.gather(*(task() for _ in range(5)))
+
+    # 検証
+    assert peak == 2
+    assert limiter.in_flight == 0
+
+@pytest.mark.asyncio
+async def test_gemini_limiter_prefers_interactive_calls():
+    """Test that waiting interactive calls are admitted before waiting background calls."""
+    limiter = ConcurrencyLimiter(limit=1)
+    order = []
+    release = asyncio.Event()
+
+    async def holder():
+        async with limiter.slot():
+            await release.wait()
+
+    async def task(name, priority):
+        async with limiter.slot(priority=priority):
+            order.append(name)
+
+    # テスト実行（枠が埋まっている間にバックグラウンド→対話の順で待機させる）
+    holding = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    waiters = [
+        asyncio.create_task(task("analysis", PRIORITY_BACKGROUND)),
+        asyncio.create_task(task("turn", PRIORITY_INTERACTIVE)),
+    ]
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(holding, *waiters)
+
+    # 検証
+    assert order == ["turn", "analysis"]
+    assert limiter.in_flight == 0
+
+def test_stream_parser_emits_transcription_before_response():
+    """Test that the stream parser emits the transcription as soon as it is complete."""
+    parser = ImmediateResponseStreamParser()
+    chunks = ['[{"transcription": "Hel', 'lo there", "resp', 'onse": "Hi! How', ' are you\\u00', 'e9?"}]']
+
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.finish())
+
+    # 検証
+    assert events[0] == {"type": "transcription", "content": "Hello there"}
+    deltas = [event["content"] for event in events[1:]]
+    assert all(event["type"] == "response_delta" for event in events[1:])
+    assert "".join(deltas) == "Hi! How are youé?"
+    assert parser.response == "Hi! How are youé?"
+
+@pytest.mark.asyncio
+async def test_generate_immediate_response_stream(gemini_audio_service, mock_genai_client):
+    """Test streaming generation yields events and stores the turn in history."""
+    async def fake_stream():
+        for text in ['[{"transcription": "I like tea",', ' "response": "Me too."}]']:
+            yield Mock(text=text)
+
+    async def fake_generate_content_stream(**kwargs):
+        return fake_stream()
+
+    mock_genai_client.return_value.aio.models.generate_content_stream = fake_generate_content_stream
+
+    # モックのセッション管理サービス
+    mock_session_manager = Mock()
+    mock_session_manager.get_history = AsyncMock(return_value=[])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
+    mock_session_manager.get_webpage_data = AsyncMock(return_value=None)
+    mock_session_manager.add_to_history = AsyncMock()
+
+    # テスト実行
+    events = [event async for event in gemini_audio_service.generate_immediate_response_stream(
+        b"test audio", "test_session", mock_session_manager
+    )]
+
+    # 検証
+    assert events[0] == {"type": "transcription", "content": "I like tea"}
+    assert "".join(event["content"] for event in events[1:]) == "Me too."
+    mock_session_manager.add_to_history.assert_awaited_once_with(
+        "test_session", ['"user":I like tea', '"model":Me too.']
+    )
+
+@pytest.mark.asyncio
+async def test_long_webpage_is_replaced_by_relevant_excerpts(gemini_audio_service, mock_genai_client):
+    """Test that long pages send only the chunks retrieved for the recent conversation."""
+    mock_response = Mock()
+    mock_response.parsed = [Mock(transcription="Hello", response="Hi there")]
+    generate_content = AsyncMock(return_value=mock_response)
+    mock_genai_client.return_value.aio.models.generate_content = generate_content
+    mock_session_manager = Mock()
+    mock_session_manager.get_history = AsyncMock(return_value=[['"user":How long is the train ride?', '"model":""']])
+    mock_session_manager.get_history_summary = AsyncMock(return_value=None)
+    mock_session_manager.get_webpage_data = AsyncMock(return_value={
+        "url": "https://example.com", "title": "Kyoto", "content": "Intro. " * 1000
+    })
+    retriever = Mock()
+    retriever.retrieve = AsyncMock(return_value=["The train to Kyoto takes two hours."])
+    gemini_audio_service.webpage_retriever = retriever
+
+    # テスト実行
+    await gemini_audio_service.generate_immediate_response(b"audio", "s1", mock_session_manager, save_history=False)
+
+    # 検証
+    webpage_context = generate_content.await_args.kwargs["contents"][1]
+    assert "The train to Kyoto takes two hours." in webpage_context
+    assert "Intro." not in webpage_context
+    retriever.retrieve.assert_awaited_once_with("s1", "How long is the train ride?")
@@ -0,0 +1,191 @@
+import asyncio
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock
+from google.genai import errors
+from app.services.gemini_context_cache import GeminiContextCache
+
+SYSTEM_PROMPT = "You are an English tutor. " * 200
+WEBPAGE = "Reference Webpage: Kyoto travel guide. " * 200
+
+class FakeCaches:
+    """cachedContents APIの代わりに、作成・延長・削除とキャッシュを使ったリクエストを記録する"""
+
+    def __init__(self):
+        self.created = []
+        self.updated = []
+        self.deleted = []
+        self.hits = []
+
+    async def create(self, model, config):
+        name = f"cachedContents/{len(self.created)}"
+        self.created.append((name, config))
+        return SimpleNamespace(name=name)
+
+    async def update(self, name, config):
+        self.updated.append(name)
+
+    async def delete(self, name):
+        self.deleted.append(name)
+
+    async def generate_content(self, model, contents, config):
+        if "cached_content" in config:
+            self.hits.append(config["cached_content"])
+        return SimpleNamespace(parsed=[SimpleNamespace(transcription="Hello", response="Hi")], contents=contents)
+
+@pytest.fixture
+def fake_caches():
+    return FakeCaches()
+
+@pytest.fixture
+def context_cache(fake_caches):
+    client = SimpleNamespace(aio=SimpleNamespace(caches=fake_caches))
+    return GeminiContextCache(client=client, model_name="gemini-test", ttl_seconds=900, min_tokens=1024)
+
+@pytest.mark.asyncio
+async def test_prefix_is_created_once_and_reused(context_cache, fake_caches):
+    """Test that the same prefix is uploaded once and then served from the cache."""
+    # テスト実行
+    first = await context_cache.get("session:s1:audio_immediate", SYSTEM_PROMPT, [WEBPAGE])
+    second = await context_cache.get("session:s1:audio_immediate", SYSTEM_PROMPT, [WEBPAGE])
+
+    # 検証
+    assert first == second == "cachedContents/0"
+    assert len(fake_caches.created) == 1
+    assert fake_caches.created[0][1].system_instruction == SYSTEM_PROMPT
+    assert context_cache.get_stats()["hits"] == 1
+
+@pytest.mark.asyncio
+async def test_short_prefix_is_not_cached(context_cache, fake_caches):
+    """Test that prefixes below the model's minimum are sent as usual."""
+    assert await context_cache.get("template:audio", "Short prompt") is None
+    assert fake_caches.created == []
+
+@pytest.mark.asyncio
+async def test_changed_content_replaces_old_cache(context_cache, fake_caches):
+    """Test that a changed template creates a new cache and deletes the old one."""
+    await context_cache.get("template:audio", SYSTEM_PROMPT)
+
+    # テスト実行
+    name = await context_cache.get("template:audio", SYSTEM_PROMPT + "Be concise.")
+
+    # 検証
+    assert name == "cachedContents/1"
+    assert fake_caches.deleted == ["cachedContents/0"]
+
+@pytest.mark.asyncio
+async def test_cache_ttl_is_extended_when_used(context_cache, fake_caches):
+    """Test that a cache close to expiry is extended instead of recreated."""
+    await context_cache.get("template:audio", SYSTEM_PROMPT)
+    entry = next(iter(context_cache._entries.values()))
+    entry.expires_at = time.monotonic() + 60
+
+    # テスト実行
+    names = await asyncio.gather(*(context_cache.get("template:audio", SYSTEM_PROMPT) for _ in range(3)))
+    await asyncio.gather(*context_cache._extending.values())
+
+    # 検証
+    assert names == ["cachedContents/0"] * 3
+    assert fake_caches.updated == ["cachedContents/0"]  # 同時に使われても延長は1回
+    assert entry.expires_at > time.monotonic() + 800
+
+@pytest.mark.asyncio
+async def test_expired_cache_is_recreated(context_cache, fake_caches):
+    await context_cache.get("template:audio", SYSTEM_PROMPT)
+    next(iter(context_cache._entries.values())).expires_at = time.monotonic() - 1
+
+    # テスト実行
+    name = await context_cache.get("template:audio", SYSTEM_PROMPT)
+
+    # 検証
+    assert name == "cachedContents/1"
+
+@pytest.mark.asyncio
+async def test_invalidate_session(context_cache, fake_caches):
+    """Test that finishing a session deletes its caches but keeps the template caches."""
+    await context_cache.get("template:audio", SYSTEM_PROMPT)
+    await context_cache.get("session:s1:audio_immediate", SYSTEM_PROMPT, [WEBPAGE])
+
+    # テスト実行
+    removed = await context_cache.invalidate("session:s1:")
+
+    # 検証
+    assert removed == 1
+    assert fake_caches.deleted == ["cachedContents/1"]
+    assert context_cache.get_stats()["entries"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_creation_is_not_retried_every_turn(context_cache, fake_caches):
+    fake_caches.create = AsyncMock(side_effect=RuntimeError("too small"))
+
+    # テスト実行
+    first = await context_cache.get("template:audio", SYSTEM_PROMPT)
+    second = await context_cache.get("template:audio", SYSTEM_PROMPT)
+
+    # 検証
+    assert first is second is None
+    fake_caches.create.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_turns_use_cached_prefix(context_cache, fake_caches):
+    """Test that GeminiAudioService sends only the history and audio once the prefix is cached."""
+    from app.services.gemini_audio_service import GeminiAudioService
+    client = Mock()
+    client.aio.models.generate_content = fake_caches.generate_content
+    service = GeminiAudioService(client=client)
+    service.context_cache = context_cache
+    service.immediate_prompt = Mock(format=Mock(return_value=SYSTEM_PROMPT))
+    session_manager = Mock()
+    session_manager.get_history = AsyncMock(return_value=[])
+    session_manager.get_history_summary = AsyncMock(return_value=None)
+    session_manager.get_webpage_data = AsyncMock(return_value={"url": "https://example.com", "title": "Kyoto", "content": "Temples."})
+
+    # テスト実行
+    for _ in range(3):
+        await service.generate_immediate_response(b"audio", "s1", session_manager, save_history=False)
+
+    # 検証
+    assert fake_caches.hits == ["cachedContents/0"] * 3
+    assert len(fake_caches.created) == 1
+    assert "Temples." in str(fake_caches.created[0][1].contents[0])
+
+@pytest.mark.asyncio
+async def test_prompt_placement_does_not_depend_on_cache(context_cache, fake_caches):
+    """Test that the template is sent as the system instruction whether or not a cache is used."""
+    from app.services.gemini_audio_service import GeminiAudioService
+    client = Mock()
+    client.aio.models.generate_content = AsyncMock(return_value=SimpleNamespace(parsed=[]))
+    service = GeminiAudioService(client=client)
+    service.context_cache = context_cache
+
+    # テスト実行
+    await service._generate("template:short", "Short prompt", ["history", "audio"], config={})
+
+    # 検証
+    request = client.aio.models.generate_content.await_args.kwargs
+    assert request["config"]["system_instruction"] == "Short prompt"
+    assert request["contents"] == ["history", "audio"]
+
+@pytest.mark.asyncio
+async def test_unavailable_cache_falls_back_to_full_prompt(context_cache, fake_caches):
+    """Test that a cache deleted on the server is dropped and the full prompt is sent."""
+    from app.services.gemini_audio_service import GeminiAudioService
+    client = Mock()
+    client.aio.models.generate_content = AsyncMock(side_effect=[
+        errors.ClientError(404, {"error": {"message": "CachedContent not found"}}),
+        SimpleNamespace(parsed=[SimpleNamespace(advice="", speechflaws="", nuanceinquiry=[], alternativeexpressions=[], suggestion="")])
+    ])
+    service = GeminiAudioService(client=client)
+    service.context_cache = context_cache
+    service.audio_analysis_prompt = Mock(format=Mock(return_value=SYSTEM_PROMPT))
+
+    # テスト実行
+    await service.generate_audio_analysis(b"audio")
+
+    # 検証
+    full_request = client.aio.models.generate_content.await_args_list[1].kwargs
+    assert full_request["config"]["system_instruction"] == SYSTEM_PROMPT
+    assert SYSTEM_PROMPT not in full_request["contents"]
+    assert "cached_content" not in full_request["config"]
+    assert context_cache.get_stats()["entries"] == 0
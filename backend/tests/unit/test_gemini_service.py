@@ -1,6 +1,6 @@
 import pytest
 from app.services.gemini_service import GeminiService, GeminiServiceFactory
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, Mock, patch
 
 @pytest.fixture
 def mock_genai_client():
@@ -16,25 +16,27 @@ def test_gemini_service_initialization(mock_genai_client):
     assert service is not None
     mock_genai_client.assert_called_once()
 
-def test_generate_text_success(gemini_service, mock_genai_client):
+@pytest.mark.asyncio
+async def test_generate_text_success(gemini_service, mock_genai_client):
     # モックの設定
     mock_response = Mock()
     mock_response.text = "This is a test response"
-    mock_genai_client.return_value.models.generate_content.return_value = mock_response
+    mock_genai_client.return_value.aio.models.generate_content = AsyncMock(return_value=mock_response)
 
     # テスト実行
-    result = gemini_service.generate_text("Test prompt")
+    result = await gemini_service.generate_text("Test prompt")
     
     # 検証
     assert result == "This is a test response"
-    mock_genai_client.return_value.models.generate_content.assert_called_once()
+    mock_genai_client.return_value.aio.models.generate_content.assert_awaited_once()
 
-def test_generate_text_error(gemini_service, mock_genai_client):
+@pytest.mark.asyncio
+async def test_generate_text_error(gemini_service, mock_genai_client):
     # モックの設定
-    mock_genai_client.return_value.models.generate_content.side_effect = Exception("API Error")
+    mock_genai_client.return_value.aio.models.generate_content = AsyncMock(side_effect=Exception("API Error"))
 
     # テスト実行と検証
     with pytest.raises(Exception) as exc_info:
-        gemini_service.generate_text("Test prompt")
+        await gemini_service.generate_text("Test prompt")
     
     assert str(exc_info.value) == "API Error" 
\ No newline at end of file
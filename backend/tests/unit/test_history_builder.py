@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.services.history_builder import HistoryBuilder, HistorySummary, estimate_tokens
+from app.services.history_summarizer import HistorySummarizer
+
+def turns(count):
+    return [[f'"user":turn {index}', '"model":""'] for index in range(count)]
+
+def test_recent_turns_are_kept_within_max_turns():
+    """Test that only the last max_turns turns are sent verbatim."""
+    builder = HistoryBuilder(max_turns=3, token_budget=1000, summary_batch_turns=2)
+
+    # テスト実行
+    window = builder.build(turns(5))
+
+    # 検証（要約がないうちは古い会話も落とさずに送る）
+    assert window.turns == turns(5)
+    assert window.start == 0
+    assert window.unsummarized == 2
+    assert builder.needs_summary(window)
+    summarized = builder.build(turns(5), HistorySummary(text="Earlier", turns=2))
+    assert summarized.turns == turns(5)[2:]
+
+def test_token_budget_limits_the_window_but_keeps_the_latest_turn():
+    """Test that the verbatim window stops at the token budget."""
+    long_turn = ['"user":' + "word " * 100, '"model":""']
+    cost = estimate_tokens(" ".join(long_turn))
+    builder = HistoryBuilder(max_turns=10, token_budget=cost + 1)
+
+    # テスト実行
+    window = builder.build([long_turn, long_turn, long_turn], HistorySummary(text="Earlier", turns=2))
+    tiny = HistoryBuilder(max_turns=10, token_budget=1).build([long_turn])
+
+    # 検証
+    assert window.turns == [long_turn]
+    assert window.tokens == cost
+    assert tiny.turns == [long_turn]
+
+def test_summary_replaces_older_turns_in_the_prompt():
+    """Test that summarized turns are sent as the rolling summary."""
+    builder = HistoryBuilder(max_turns=2, token_budget=1000, summary_batch_turns=2)
+
+    # テスト実行
+    window = builder.build(turns(4), HistorySummary(text="They talked about travel.", turns=2))
+    prompt = window.to_prompt()
+
+    # 検証
+    assert window.unsummarized == 0
+    assert not builder.needs_summary(window)
+    assert prompt.startswith("Summary of the earlier conversation:\nThey talked about travel.")
+    assert prompt.endswith(str(turns(4)[2:]))
+
+def test_short_history_is_sent_as_before():
+    """Test that sessions within the budget keep the original prompt format."""
+    builder = HistoryBuilder()
+
+    # 検証
+    assert builder.build(turns(2)).to_prompt() == str(turns(2))
+    assert builder.build("").to_prompt() == ""
+
+@pytest.mark.asyncio
+async def test_summarizer_folds_only_unsummarized_turns():
+    """Test that the summary is updated incrementally with the turns that left the window."""
+    client = Mock()
+    client.aio.models.generate_content = AsyncMock(return_value=Mock(text="Updated summary"))
+    summarizer = HistorySummarizer(HistoryBuilder(max_turns=2, token_budget=1000), client=client, model_name="model")
+    session_manager = Mock()
+    session_manager.get_history = AsyncMock(return_value=turns(6))
+    session_manager.get_history_summary = AsyncMock(return_value=HistorySummary(text="Old summary", turns=2))
+    session_manager.save_history_summary = AsyncMock()
+
+    # テスト実行
+    updated = await summarizer.summarize("s1", session_manager)
+
+    # 検証
+    prompt = client.aio.models.generate_content.await_args.kwargs["contents"][0]
+    assert "Old summary" in prompt
+    assert "turn 2" in prompt and "turn 3" in prompt
+    assert "turn 1" not in prompt and "turn 4" not in prompt
+    assert updated == HistorySummary(text="Updated summary", turns=4)
+    session_manager.save_history_summary.assert_awaited_once_with("s1", updated)
+
+@pytest.mark.asyncio
+async def test_summarizer_runs_once_per_session_at_a_time():
+    """Test that a session already being summarized is not scheduled again."""
+    release = asyncio.Event()
+    summarizer = HistorySummarizer(HistoryBuilder(), client=Mock(), model_name="model")
+
+    async def summarize(session_id, session_manager):
+        await release.wait()
+
+    summarizer.summarize = summarize
+
+    # テスト実行
+    first = summarizer.schedule("s1", Mock())
+    second = summarizer.schedule("s1", Mock())
+    release.set()
+    await asyncio.sleep(0.01)
+
+    # 検証
+    assert first and not second
+    assert summarizer.get_stats()["running"] == 0
+
+def test_turns_between_summary_and_window_are_not_dropped():
+    """Test that turns the summary has not caught up with are sent verbatim, even over the budget."""
+    builder = HistoryBuilder(max_turns=2, token_budget=1000, summary_batch_turns=3)
+
+    # テスト実行
+    window = builder.build(turns(6), HistorySummary(text="Earlier", turns=2))
+
+    # 検証
+    assert window.turns == turns(6)[2:]
+    assert window.start == 2
+    assert window.unsummarized == 2
+    assert window.tokens == sum(estimate_tokens(" ".join(entry)) for entry in turns(6)[2:])
+    assert not builder.needs_summary(window)
+
+@pytest.mark.asyncio
+async def test_scheduled_summary_does_not_inherit_the_request_context():
+    """Test that the background summary starts from an empty context instead of the request's unit of work."""
+    from app.config.database import _current_unit_of_work
+    summarizer = HistorySummarizer(HistoryBuilder(), client=Mock(), model_name="model")
+    observed = {}
+
+    async def summarize(session_id, session_manager):
+        observed["unit_of_work"] = _current_unit_of_work.get()
+
+    summarizer.summarize = summarize
+    token = _current_unit_of_work.set(Mock(closed=False))
+
+    # テスト実行
+    try:
+        summarizer.schedule("s1", Mock())
+    finally:
+        _current_unit_of_work.reset(token)
+    await asyncio.sleep(0.01)
+
+    # 検証
+    assert observed == {"unit_of_work": None}
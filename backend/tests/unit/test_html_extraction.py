@@ -0,0 +1,72 @@
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from app.services.html_extraction import BeautifulSoupExtractor, HtmlExtractor, LxmlExtractor, get_html_extractor
+
+CORPUS_DIR = Path(__file__).resolve().parents[2] / "benchmarks" / "html_corpus"
+
+PAGE = """<html><head><title> Tea </title><script>var a = 1;</script></head>
+<body><nav>Home About</nav><main><h1>Green tea</h1>
+<!-- ad --><p>Green   tea is
+popular in <b>Japan</b>.</p><aside>Related</aside></main><footer>Footer</footer></body></html>""".encode("utf-8")
+
+def extractors():
+    yield BeautifulSoupExtractor()
+    try:
+        yield LxmlExtractor()
+    except ImportError:
+        pass
+
+@pytest.mark.parametrize("extractor", list(extractors()), ids=lambda extractor: extractor.name)
+def test_extract_main_content(extractor):
+    """Test that scripts, navigation and comments are removed and whitespace is normalized."""
+    # テスト実行
+    page = extractor.extract(PAGE)
+
+    # 検証
+    assert page.title == "Tea"
+    assert page.content == "Green tea Green tea is popular in Japan."
+    assert not page.truncated
+
+@pytest.mark.parametrize("extractor", list(extractors()), ids=lambda extractor: extractor.name)
+def test_extract_stops_at_byte_budget(extractor):
+    """Test that extraction stops once the content budget is reached."""
+    body = ("<html><body><main>" + "<p>日本語の文章です。</p>" * 1000 + "</main></body></html>").encode("utf-8")
+
+    # テスト実行
+    page = extractor.extract(body, max_bytes=1000)
+
+    # 検証
+    assert page.truncated
+    assert len(page.content.encode("utf-8")) <= 1000
+    assert page.content.startswith("日本語の文章です。")
+
+def test_lxml_matches_html_parser_on_corpus():
+    """Test that the fast path extracts the same text as html.parser for the benchmark corpus."""
+    pytest.importorskip("lxml")
+    for path in sorted(CORPUS_DIR.glob("*.html")):
+        body = path.read_bytes()
+
+        # テスト実行
+        fast = LxmlExtractor().extract(body)
+        reference = BeautifulSoupExtractor().extract(body)
+
+        # 検証
+        assert fast == reference, path.name
+
+def test_auto_falls_back_without_lxml():
+    """Test that auto selects html.parser when lxml is not installed."""
+    with patch("app.services.html_extraction.lxml_available", return_value=False):
+        assert get_html_extractor("auto").name == "html.parser"
+
+def test_unknown_extractor():
+    with pytest.raises(ValueError):
+        get_html_extractor("regex")
+
+def test_extractor_base_class_is_abstract():
+    """Test that an extractor without extract() cannot be instantiated."""
+    class Incomplete(HtmlExtractor):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
@@ -0,0 +1,312 @@
+import uuid
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from sqlalchemy.exc import IntegrityError, OperationalError
+from app.core.circuit_breaker import CircuitBreaker
+from app.services.hybrid_session_manager import HybridSessionManagerService, PendingWrite
+from app.services.postgres_session_manager import PostgresSessionManagerService
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeDatabase:
+    """PostgresSessionManagerServiceの代わりに、書き込みを順に記録し、停止中は接続エラーを返す"""
+
+    def __init__(self):
+        self.available = True
+        self.writes = []
+        self.history = {}
+        self.counters = {}
+        self.analyses = {}
+
+    def _check(self):
+        if not self.available:
+            raise OperationalError("SELECT 1", {}, ConnectionRefusedError("connection refused"))
+
+    async def ping(self):
+        self._check()
+
+    async def create_session(self, title, name=None, url=None, session_id=None):
+        self._check()
+        session_id = session_id or f"db-{len(self.writes)}"
+        self.writes.append(("create_session", session_id))
+        self.history[session_id] = []
+        self.counters[session_id] = 0
+        return session_id
+
+    async def add_to_history(self, session_id, content):
+        self._check()
+        if session_id not in self.history:
+            raise IntegrityError("INSERT", {}, Exception("foreign key violation"))
+        self.writes.append(("add_to_history", session_id, content[0]))
+        self.history[session_id].append(content)
+        # 実際のDBと同じく、書き起こしの追加でも会話番号を採番する
+        self.counters[session_id] += 1
+
+    async def get_next_conversation_id(self, session_id):
+        self._check()
+        self.counters[session_id] += 1
+        return str(self.counters[session_id])
+
+    async def save_analysis_result(self, session_id, conversation_id, transcription, analysis_result):
+        self._check()
+        self.analyses[(session_id, conversation_id)] = analysis_result
+
+    async def get_analysis_result(self, session_id, conversation_id):
+        self._check()
+        return self.analyses.get((session_id, conversation_id))
+
+    async def get_history(self, session_id):
+        self._check()
+        return self.history.get(session_id, [])
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def database():
+    return FakeDatabase()
+
+@pytest.fixture
+def manager(database, clock):
+    original = HybridSessionManagerService._instance
+    HybridSessionManagerService._instance = None
+    manager = HybridSessionManagerService()
+    manager._db_manager = database
+    manager._breaker = CircuitBreaker("database", failure_threshold=2, probe_interval=10.0, clock=clock)
+    yield manager
+    HybridSessionManagerService._instance = original
+
+async def fail_twice(manager, session_id):
+    """接続エラーを2回起こしてサーキットを開く"""
+    await manager.add_to_history(session_id, ['"user":first'])
+    await manager.add_to_history(session_id, ['"user":second'])
+
+@pytest.mark.asyncio
+async def test_memory_and_database_share_session_id(manager, database):
+    """Test that the session created in memory uses the database id."""
+    # テスト実行
+    session_id = await manager.create_session()
+    await manager.add_to_history(session_id, ['"user":hello'])
+
+    # 検証
+    assert session_id == "db-0"
+    assert manager._memory_manager.get_history(session_id) == [['"user":hello']]
+    assert database.writes[-1] == ("add_to_history", "db-0", '"user":hello')
+
+@pytest.mark.asyncio
+async def test_outage_queues_writes_and_serves_memory(manager, database):
+    """Test that writes during an outage are queued and reads fall back to memory."""
+    session_id = await manager.create_session()
+    database.available = False
+
+    # テスト実行
+    await fail_twice(manager, session_id)
+    history = await manager.get_history(session_id)
+
+    # 検証
+    status = manager.get_status()
+    assert status["circuit"]["state"] == "open"
+    assert status["write_behind"]["pending"] == 2
+    assert not status["use_database"]
+    assert history == [['"user":first'], ['"user":second']]
+
+@pytest.mark.asyncio
+async def test_recovery_replays_writes_in_order(manager, database, clock):
+    """Test that queued writes are replayed in order once the probe succeeds."""
+    session_id = await manager.create_session()
+    database.available = False
+    await fail_twice(manager, session_id)
+    offline_session_id = await manager.create_session()
+    await manager.add_to_history(offline_session_id, ['"user":offline'])
+    database.available = True
+
+    # テスト実行
+    before_probe = await manager.get_history(session_id)
+    clock.now = 10.0
+    after_probe = await manager.get_history(offline_session_id)
+
+    # 検証
+    assert before_probe == [['"user":first'], ['"user":second']]  # probe間隔まではメモリ
+    assert after_probe == [['"user":offline']]
+    assert database.writes[1:] == [
+        ("add_to_history", session_id, '"user":first'),
+        ("add_to_history", session_id, '"user":second'),
+        ("create_session", offline_session_id),
+        ("add_to_history", offline_session_id, '"user":offline'),
+    ]
+    status = manager.get_status()
+    assert status["circuit"]["state"] == "closed"
+    assert status["write_behind"]["pending"] == 0
+    assert status["write_behind"]["replayed"] == 4
+
+@pytest.mark.asyncio
+async def test_failed_probe_keeps_queue(manager, database, clock):
+    session_id = await manager.create_session()
+    database.available = False
+    await fail_twice(manager, session_id)
+
+    # テスト実行
+    clock.now = 10.0
+    await manager.add_to_history(session_id, ['"user":third'])
+
+    # 検証
+    status = manager.get_status()
+    assert status["circuit"]["state"] == "open"
+    assert status["circuit"]["probes"] == 1
+    assert status["write_behind"]["pending"] == 3
+
+@pytest.mark.asyncio
+async def test_rejected_write_is_not_queued(manager, database):
+    """Test that a write the database rejects does not open the circuit or block the queue."""
+    # テスト実行
+    await manager.add_to_history("unknown", ['"user":hello'])
+
+    # 検証
+    status = manager.get_status()
+    assert status["circuit"]["state"] == "closed"
+    assert status["circuit"]["consecutive_failures"] == 0
+    assert status["write_behind"]["pending"] == 0
+
+@pytest.mark.asyncio
+async def test_full_write_behind_log_drops_new_writes(manager, database):
+    manager._max_pending = 2
+    session_id = await manager.create_session()
+    database.available = False
+
+    # テスト実行
+    await fail_twice(manager, session_id)
+    await manager.add_to_history(session_id, ['"user":third'])
+
+    # 検証
+    status = manager.get_status()["write_behind"]
+    assert status["pending"] == 2
+    assert status["dropped"] == 1
+
+async def play_turn(manager, session_id, text):
+    """エンドポイントと同じ順序で1ターン分の履歴の追加と採番を行う"""
+    await manager.add_to_history(session_id, [f'"user":{text}', '"model":""'])
+    return await manager.get_next_conversation_id(session_id)
+
+@pytest.mark.asyncio
+async def test_outage_continues_conversation_ids_of_existing_session(manager, database, clock):
+    """Test that ids handed out during an outage continue the DB sequence and do not overwrite earlier analyses."""
+    session_id = await manager.create_session()
+    first_id = await play_turn(manager, session_id, "hello")
+    await manager.save_analysis_result(session_id, first_id, "", {"advice": "before outage"})
+    database.available = False
+    await fail_twice(manager, session_id)
+
+    # テスト実行
+    offline_id = await play_turn(manager, session_id, "offline")
+    await manager.save_analysis_result(session_id, offline_id, "", {"advice": "during outage"})
+    database.available = True
+    clock.now = 10.0
+    replayed = await manager.get_analysis_result(session_id, offline_id)
+
+    # 検証
+    assert first_id == "2"
+    assert offline_id == "6"  # first / second / offline の書き起こしで3、採番で1つ進む
+    assert database.analyses[(session_id, "2")] == {"advice": "before outage"}
+    assert replayed == {"advice": "during outage"}
+    assert database.counters[session_id] == 6
+    assert manager.get_status()["write_behind"]["remapped"] == 0
+
+@pytest.mark.asyncio
+async def test_outage_on_session_unknown_to_this_process(manager, database, clock):
+    """Test that a session with DB conversations this process never saw gets non-colliding ids that are remapped on replay."""
+    session_id = await manager.create_session()
+    database.counters[session_id] = 4  # 別のワーカーで4つ採番済み
+    database.analyses[(session_id, "4")] = {"advice": "existing"}
+    database.available = False
+    await fail_twice(manager, session_id)
+
+    # テスト実行
+    offline_id = await play_turn(manager, session_id, "offline")
+    await manager.save_analysis_result(session_id, offline_id, "", {"advice": "during outage"})
+    database.available = True
+    clock.now = 10.0
+    result = await manager.get_analysis_result(session_id, offline_id)
+
+    # 検証
+    assert int(offline_id) > 1_000_000_000
+    assert result == {"advice": "during outage"}
+    assert database.analyses[(session_id, "8")] == {"advice": "during outage"}
+    assert database.analyses[(session_id, "4")] == {"advice": "existing"}
+    assert all(int(conversation_id) <= 8 for _, conversation_id in database.analyses)
+    assert manager.get_status()["write_behind"]["remapped"] == 1
+
+def db_session_factory(execute):
+    """AsyncSessionLocal の代わりに、execute の結果（または例外）を指定したセッションを返す"""
+    def create():
+        session = Mock(info={}, execute=execute, flush=AsyncMock(), commit=AsyncMock(), rollback=AsyncMock())
+        session.__aenter__ = AsyncMock(return_value=session)
+        session.__aexit__ = AsyncMock(return_value=False)
+        return session
+    return create
+
+def connection_refused():
+    return AsyncMock(side_effect=OperationalError("SELECT", {}, ConnectionRefusedError("connection refused")))
+
+@pytest.fixture
+def postgres_manager(manager):
+    """実際の PostgresSessionManagerService を使うハイブリッド管理（DBのセッションだけを置き換える）"""
+    manager._db_manager = PostgresSessionManagerService()
+    with patch("app.services.postgres_session_manager.get_session_context_cache", return_value=None):
+        yield manager
+
+@pytest.mark.asyncio
+async def test_reads_against_failing_database_fall_back_to_memory(postgres_manager):
+    """Test that DB errors swallowed outside a unit of work still reach the breaker and the memory fallback."""
+    session_id = str(uuid.uuid4())
+    postgres_manager._memory_manager.create_session(session_id)
+    postgres_manager._memory_manager.add_to_history(session_id, ['"user":Hello', '"model":Hi'])
+    postgres_manager._memory_manager.save_webpage_data(session_id, {"url": "https://example.com"})
+
+    # テスト実行
+    with patch("app.config.database.AsyncSessionLocal", db_session_factory(connection_refused())):
+        history = await postgres_manager.get_history(session_id)
+        webpage = await postgres_manager.get_webpage_data(session_id)
+
+    # 検証
+    assert history == [['"user":Hello', '"model":Hi']]
+    assert webpage == {"url": "https://example.com"}
+    assert postgres_manager.get_status()["circuit"]["state"] == "open"
+
+@pytest.mark.asyncio
+async def test_writes_swallowed_by_database_service_are_queued_and_kept(postgres_manager):
+    """Test that delete and URL-only webpage writes are queued in an outage and survive a failed replay."""
+    session_id = str(uuid.uuid4())
+    postgres_manager._memory_manager.create_session(session_id)
+
+    with patch("app.config.database.AsyncSessionLocal", db_session_factory(connection_refused())):
+        # テスト実行
+        await postgres_manager.save_webpage_data(session_id, {"url": "https://example.com"})
+        await postgres_manager.delete_session(session_id)
+        await postgres_manager._replay_pending()
+
+    # 検証
+    status = postgres_manager.get_status()["write_behind"]
+    assert [entry.operation for entry in postgres_manager._pending] == ["save_webpage_data", "delete_session"]
+    assert status["replayed"] == 0
+
+@pytest.mark.asyncio
+async def test_replayed_write_matching_no_session_is_discarded(postgres_manager):
+    """Test that a replayed delete that affects no row is discarded instead of counted as replayed."""
+    session_id = str(uuid.uuid4())
+    postgres_manager._pending.append(PendingWrite("delete_session", (session_id,)))
+
+    # テスト実行
+    with patch("app.config.database.AsyncSessionLocal", db_session_factory(AsyncMock(return_value=Mock(rowcount=0)))):
+        await postgres_manager._replay_pending()
+
+    # 検証
+    status = postgres_manager.get_status()["write_behind"]
+    assert status["pending"] == 0
+    assert status["replayed"] == 0
+    assert status["discarded"] == 1
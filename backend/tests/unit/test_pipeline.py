@@ -0,0 +1,71 @@
+import asyncio
+import pytest
+from app.core.pipeline import StagePipeline
+
+@pytest.mark.asyncio
+async def test_independent_stages_run_concurrently():
+    """Test that stages sharing a dependency run in parallel after it completes."""
+    async def generate(_):
+        await asyncio.sleep(0.05)
+        return "text"
+
+    async def slow_branch(results):
+        await asyncio.sleep(0.1)
+        return f"{results['generate']}:a"
+
+    async def other_branch(results):
+        await asyncio.sleep(0.1)
+        return f"{results['generate']}:b"
+
+    pipeline = (
+        StagePipeline()
+        .add_stage("generate", generate)
+        .add_stage("a", slow_branch, depends_on=("generate",))
+        .add_stage("b", other_branch, depends_on=("generate",))
+    )
+
+    # テスト実行
+    results = await pipeline.run()
+
+    # 検証
+    assert results == {"generate": "text", "a": "text:a", "b": "text:b"}
+    timings = pipeline.timings
+    assert timings["a"]["start_ms"] >= timings["generate"]["end_ms"]
+    assert timings["b"]["start_ms"] < timings["a"]["end_ms"], "Branches should overlap"
+    assert timings["total"]["duration_ms"] < 250
+
+@pytest.mark.asyncio
+async def test_failure_cancels_remaining_stages():
+    """Test that a failing stage cancels stages that are still pending."""
+    executed = []
+
+    async def fail(_):
+        raise RuntimeError("boom")
+
+    async def never(_):
+        executed.append("never")
+
+    async def slow(_):
+        await asyncio.sleep(1)
+        executed.append("slow")
+
+    pipeline = (
+        StagePipeline()
+        .add_stage("fail", fail)
+        .add_stage("slow", slow)
+        .add_stage("never", never, depends_on=("fail",))
+    )
+
+    # テスト実行と検証
+    with pytest.raises(RuntimeError):
+        await pipeline.run()
+    assert executed == []
+
+def test_unknown_dependency_is_rejected():
+    """Test that stages can only depend on stages registered before them."""
+    async def stage(_):
+        return None
+
+    pipeline = StagePipeline()
+    with pytest.raises(ValueError):
+        pipeline.add_stage("b", stage, depends_on=("a",))
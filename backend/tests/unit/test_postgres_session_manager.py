@@ -0,0 +1,137 @@
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+from app.core.analysis_notifier import get_analysis_notifier
+from app.services.postgres_session_manager import PostgresSessionManagerService
+
+@pytest.fixture
+def db_service():
+    service = Mock()
+    service.get_conversations = AsyncMock(return_value=[
+        SimpleNamespace(conversation_number=1, transcription="hello"),
+        SimpleNamespace(conversation_number=2, transcription=""),
+    ])
+    service.get_session_webpage = AsyncMock(return_value={"url": "https://example.com"})
+    service.upsert_webpage_document = AsyncMock(return_value="doc-1")
+    service.get_next_conversation_number = AsyncMock(return_value=3)
+    service.create_conversation = AsyncMock()
+    service.update_session = AsyncMock(return_value=True)
+    service.delete_session = AsyncMock(return_value=True)
+    service.upsert_conversation_analysis = AsyncMock()
+    service.get_conversation_by_number = AsyncMock(return_value=SimpleNamespace(
+        advice="Nice", speechflaws="", nuanceinquiry=[], alternativeexpressions=[], suggestion=[]
+    ))
+    return service
+
+@pytest.fixture
+def manager(db_service):
+    @asynccontextmanager
+    async def fake_db():
+        yield Mock(info={})
+
+    with patch("app.services.postgres_session_manager.db_session", fake_db), \
+         patch("app.services.postgres_session_manager.DatabaseService", return_value=db_service):
+        yield PostgresSessionManagerService()
+
+@pytest.mark.asyncio
+async def test_history_is_loaded_once(manager, db_service):
+    """Test that repeated turns read the history from the cache."""
+    # テスト実行
+    first = await manager.get_history("s1")
+    second = await manager.get_history("s1")
+
+    # 検証
+    assert first == second == [['"user":hello', '"model":""']]
+    db_service.get_conversations.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_add_to_history_writes_through(manager, db_service):
+    """Test that a new turn is visible without reloading the history."""
+    await manager.get_history("s1")
+
+    # テスト実行
+    await manager.add_to_history("s1", ['"user":how are you', '"model":"fine"'])
+
+    # 検証
+    assert await manager.get_history("s1") == [['"user":hello', '"model":""'], ['"user":how are you', '"model":""']]
+    db_service.get_conversations.assert_awaited_once()
+    db_service.create_conversation.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_webpage_data_is_cached_and_written_through(manager, db_service):
+    """Test that webpage context is cached and updated by save_webpage_data."""
+    assert await manager.get_webpage_data("s1") == {"url": "https://example.com"}
+    assert await manager.get_webpage_data("s1") == {"url": "https://example.com"}
+    db_service.get_session_webpage.assert_awaited_once()
+
+    # テスト実行
+    await manager.save_webpage_data("s1", {"url": "https://example.org", "title": "Example", "content": "..."})
+
+    # 検証（本文は文書として保存され、セッションからはIDで参照される）
+    assert await manager.get_webpage_data("s1") == {"url": "https://example.org", "title": "Example", "content": "..."}
+    db_service.get_session_webpage.assert_awaited_once()
+    db_service.update_session.assert_awaited_once_with(
+        session_id="s1", url="https://example.org", webpage_document_id="doc-1"
+    )
+
+@pytest.mark.asyncio
+async def test_save_recent_webpage_reuses_document(manager, db_service):
+    """Test that a page found by find_recent_webpage is linked without storing it again."""
+    # テスト実行
+    await manager.save_webpage_data("s1", {"url": "https://example.org", "title": "Example", "content": "...", "document_id": "doc-2"})
+
+    # 検証
+    db_service.upsert_webpage_document.assert_not_awaited()
+    db_service.update_session.assert_awaited_once_with(
+        session_id="s1", url="https://example.org", webpage_document_id="doc-2"
+    )
+
+@pytest.mark.asyncio
+async def test_delete_session_invalidates_cache(manager, db_service):
+    """Test that a deleted session is reloaded from the database."""
+    await manager.get_history("s1")
+
+    # テスト実行
+    await manager.delete_session("s1")
+    db_service.get_conversations.return_value = []
+
+    # 検証
+    assert await manager.get_history("s1") == ""
+    assert db_service.get_conversations.await_count == 2
+
+@pytest.mark.asyncio
+async def test_save_analysis_result_upserts_by_number(manager, db_service):
+    """Test that numeric conversation IDs are saved without loading the session's conversations."""
+    # テスト実行
+    await manager.save_analysis_result("s1", "4", "", {"advice": "Nice"})
+
+    # 検証
+    db_service.upsert_conversation_analysis.assert_awaited_once_with(
+        session_id="s1", conversation_number=4, transcription="", analysis_type="audio", analysis_result={"advice": "Nice"}
+    )
+    db_service.get_conversations.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_get_analysis_result_looks_up_by_number(manager, db_service):
+    """Test that numeric conversation IDs are fetched directly."""
+    # テスト実行
+    result = await manager.get_analysis_result("s1", "4")
+
+    # 検証
+    assert result["advice"] == "Nice"
+    db_service.get_conversation_by_number.assert_awaited_once_with("s1", 4)
+    db_service.get_conversations.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_save_analysis_result_notifies_waiters(manager):
+    """Test that saving an analysis wakes requests waiting for it."""
+    notifier = get_analysis_notifier()
+
+    # テスト実行
+    with notifier.subscribe("s1", "4") as ready:
+        await manager.save_analysis_result("s1", "4", "", {"advice": "Nice"})
+
+        # 検証
+        await asyncio.wait_for(ready, timeout=1)
@@ -0,0 +1,98 @@
+import dataclasses
+import os
+import pytest
+from app.prompts.registry import PromptRegistry
+from app.prompts.audio_prompts import AudioImmediatePrompt, HistorySummaryPrompt, TranscriptAnalysisPrompt
+
+@pytest.fixture
+def templates_dir(tmp_path):
+    (tmp_path / "audio_immediate.txt").write_text('Reply as JSON: {{"response": "..."}}', encoding="utf-8")
+    (tmp_path / "history_summary.txt").write_text("Summary: {summary}\nTurns: {turns}\n{{json}}", encoding="utf-8")
+    (tmp_path / "transcript_analysis.txt").write_text("Analyze: {transcription}", encoding="utf-8")
+    return tmp_path
+
+def touch(path, text):
+    """更新時刻の分解能に関係なく変更が検出されるよう、更新時刻を進めて書き換える"""
+    mtime_ns = os.stat(path).st_mtime_ns
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(mtime_ns + 1_000_000_000, mtime_ns + 1_000_000_000))
+
+def test_load_all_parses_fields(templates_dir):
+    """Test that all templates are loaded once with their format fields parsed."""
+    registry = PromptRegistry(templates_dir)
+
+    # テスト実行
+    registry.load_all()
+
+    # 検証
+    assert registry.get_stats()["templates"] == 3
+    assert registry.get("history_summary").fields == ("summary", "turns")
+    assert registry.get("audio_immediate").fields == ()
+    assert registry.get_stats()["loads"] == 3
+
+def test_templates_are_immutable(templates_dir):
+    registry = PromptRegistry(templates_dir)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        registry.get("audio_immediate").text = "changed"
+
+def test_raw_template_is_served_as_is(templates_dir):
+    """Test that templates without fields are returned without str.format."""
+    prompt = AudioImmediatePrompt(PromptRegistry(templates_dir))
+    assert prompt.format() == 'Reply as JSON: {{"response": "..."}}'
+
+def test_format_fills_fields(templates_dir):
+    prompt = HistorySummaryPrompt(PromptRegistry(templates_dir))
+
+    # テスト実行
+    result = prompt.format(summary="", turns="user: Hello")
+
+    # 検証
+    assert result == "Summary: (none)\nTurns: user: Hello\n{json}"
+
+def test_missing_field_raises(templates_dir):
+    registry = PromptRegistry(templates_dir)
+    with pytest.raises(ValueError):
+        registry.get("history_summary").format(summary="s")
+    with pytest.raises(ValueError):
+        TranscriptAnalysisPrompt(registry).format(transcription="")
+
+def test_unknown_template(templates_dir):
+    with pytest.raises(FileNotFoundError):
+        PromptRegistry(templates_dir).get("missing")
+
+def test_hot_reload_picks_up_modified_template(templates_dir):
+    """Test that a modified template is reloaded when hot reload is enabled."""
+    registry = PromptRegistry(templates_dir, hot_reload=True)
+    registry.load_all()
+    prompt = TranscriptAnalysisPrompt(registry)
+
+    # テスト実行
+    touch(templates_dir / "transcript_analysis.txt", "Check the grammar of: {transcription}")
+
+    # 検証
+    assert prompt.format(transcription="I goed") == "Check the grammar of: I goed"
+    assert registry.get_stats()["reloads"] == 1
+
+def test_templates_are_not_reloaded_without_hot_reload(templates_dir):
+    """Test that edits are ignored in production mode and the loaded template keeps being served."""
+    registry = PromptRegistry(templates_dir)
+    registry.load_all()
+    loaded = registry.get("transcript_analysis")
+
+    # テスト実行
+    touch(templates_dir / "transcript_analysis.txt", "Check the grammar of: {transcription}")
+
+    # 検証
+    assert registry.get("transcript_analysis") is loaded
+    assert registry.get_stats()["reloads"] == 0
+
+def test_bundled_templates_load():
+    """Test that every bundled template loads and the formatted ones have the expected fields."""
+    registry = PromptRegistry()
+
+    # テスト実行
+    registry.load_all()
+
+    # 検証
+    assert registry.get("transcript_analysis").fields == ("transcription",)
+    assert registry.get("history_summary").fields == ("summary", "turns")
@@ -0,0 +1,128 @@
+import pytest
+from unittest.mock import patch
+from app.services.history_builder import HistorySummary
+from app.services.session_context_cache import SessionContextCache
+
+def test_history_round_trip_and_append():
+    """Test that a loaded history is served from cache and extended by appends."""
+    cache = SessionContextCache()
+    assert cache.get_history("s1") is None
+
+    # テスト実行
+    cache.set_history("s1", [['"user":hello', '"model":""']], cache.version("s1"))
+    cache.append_history("s1", ['"user":again', '"model":""'])
+
+    # 検証
+    assert cache.get_history("s1") == [['"user":hello', '"model":""'], ['"user":again', '"model":""']]
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+def test_append_without_loaded_history_is_ignored():
+    """Test that appends do not create a partial history for an unloaded session."""
+    cache = SessionContextCache()
+
+    # テスト実行
+    cache.append_history("s1", ['"user":hello', '"model":""'])
+
+    # 検証
+    assert cache.get_history("s1") is None
+
+def test_stale_load_is_not_stored():
+    """Test that a history read before a concurrent write does not overwrite the cache."""
+    cache = SessionContextCache()
+    version = cache.version("s1")
+
+    # テスト実行（読み込み中に書き込みが入る）
+    cache.append_history("s1", ['"user":new', '"model":""'])
+    cache.set_history("s1", [], version)
+
+    # 検証
+    assert cache.get_history("s1") is None
+
+def test_webpage_data_distinguishes_missing_from_none():
+    """Test that a cached 'no webpage' result is a hit."""
+    cache = SessionContextCache()
+    assert cache.get_webpage_data("s1") == (False, None)
+
+    # テスト実行
+    cache.set_webpage_data("s1", None, cache.version("s1"))
+
+    # 検証
+    assert cache.get_webpage_data("s1") == (True, None)
+    cache.set_webpage_data("s1", {"url": "https://example.com"})
+    assert cache.get_webpage_data("s1") == (True, {"url": "https://example.com"})
+
+def test_invalidate_drops_session():
+    """Test that invalidation removes the session and rejects in-flight loads."""
+    cache = SessionContextCache()
+    cache.set_history("s1", [['"user":hello', '"model":""']], 0)
+    version = cache.version("s1")
+
+    # テスト実行
+    cache.invalidate("s1")
+    cache.set_history("s1", [['"user":hello', '"model":""']], version)
+
+    # 検証
+    assert cache.get_history("s1") is None
+    assert cache.get_stats()["sessions"] == 0
+    assert cache.get_stats()["bytes"] == 0
+
+def test_lru_eviction_by_count_and_size():
+    """Test that the least recently used sessions are evicted first."""
+    cache = SessionContextCache(max_sessions=2, max_bytes=30)
+    cache.set_history("s1", [["a" * 10]], 0)
+    cache.set_history("s2", [["b" * 10]], 0)
+    cache.get_history("s1")
+
+    # テスト実行
+    cache.set_history("s3", [["c" * 10]], 0)
+
+    # 検証（s2が最も古い）
+    assert cache.get_history("s2") is None
+    assert cache.get_history("s1") is not None
+
+    cache.append_history("s3", ["d" * 15])
+    assert cache.get_history("s1") is None, "Exceeding the byte budget should evict"
+    assert cache.get_stats()["bytes"] == 25
+
+def test_entries_expire_after_ttl():
+    """Test that idle sessions expire."""
+    cache = SessionContextCache(ttl_seconds=10)
+    with patch("app.services.session_context_cache.time.monotonic", return_value=100.0):
+        cache.set_history("s1", [], 0)
+
+    # テスト実行と検証
+    with patch("app.services.session_context_cache.time.monotonic", return_value=105.0):
+        assert cache.get_history("s1") == []
+    with patch("app.services.session_context_cache.time.monotonic", return_value=116.0):
+        assert cache.get_history("s1") is None
+
+def test_summary_is_cached_with_its_size():
+    """Test that the history summary is cached and counted towards the byte budget."""
+    cache = SessionContextCache()
+    assert cache.get_summary("s1") == (False, None)
+
+    # テスト実行
+    cache.set_summary("s1", None, cache.version("s1"))
+    cache.set_summary("s1", HistorySummary(text="abcd", turns=3))
+
+    # 検証
+    assert cache.get_summary("s1") == (True, HistorySummary(text="abcd", turns=3))
+    assert cache.get_stats()["bytes"] == 4
+
+def test_pruned_versions_do_not_accept_stale_reads():
+    """Test that a read started before a write stays stale after the session's version entry is pruned."""
+    cache = SessionContextCache(max_sessions=1)
+    version = cache.version("s1")
+    cache.append_history("s1", ["written while loading"])
+
+    # テスト実行（他のセッションへの書き込みでs1のバージョンの記録が間引かれる）
+    for i in range(5):
+        cache.invalidate(f"other-{i}")
+    assert "s1" not in cache._versions
+    cache.set_history("s1", [["stale"]], version)
+
+    # 検証
+    assert cache.get_history("s1") is None
+    cache.set_history("s1", [["fresh"]], cache.version("s1"))
+    assert cache.get_history("s1") == [["fresh"]]
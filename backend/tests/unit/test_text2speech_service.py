@@ -1,6 +1,6 @@
 import pytest
 from unittest.mock import Mock, patch
-from app.services.text2speech_service import TextToSpeechService, TextToSpeechServiceFactory
+from app.services.text2speech_service import TextToSpeechService, TextToSpeechServiceFactory, SentenceSplitter
 from google.cloud import texttospeech
 
 @pytest.fixture
@@ -79,3 +79,49 @@ def test_text_to_speech_with_custom_voice(text_to_speech_service, mock_text_to_s
     assert result == b"test audio content", "Should return the expected audio content"
     mock_text_to_speech_client.return_value.synthesize_speech.assert_called_once()
 
+
+def test_sentence_splitter_yields_complete_sentences():
+    """Test that streamed text is split into sentences for incremental synthesis."""
+    splitter = SentenceSplitter(min_length=5)
+
+    # テスト実行
+    sentences = []
+    for chunk in ["Hello there", ". How are", " you today? I am ", "fine"]:
+        sentences.extend(splitter.feed(chunk))
+
+    # 検証
+    assert sentences == ["Hello there.", "How are you today?"]
+    assert splitter.flush() == "I am fine"
+    assert splitter.flush() is None
+
+def test_text_to_speech_uses_cache(text_to_speech_service, mock_text_to_speech_client):
+    """Test that identical requests are served from the cache."""
+    # モックの設定
+    mock_response = Mock()
+    mock_response.audio_content = b"test audio content"
+    mock_text_to_speech_client.return_value.synthesize_speech.return_value = mock_response
+
+    # テスト実行
+    first = text_to_speech_service.text_to_speech("Nice to meet you!", "en-US")
+    second = text_to_speech_service.text_to_speech("Nice to meet you!", "en-US")
+    other_language = text_to_speech_service.text_to_speech("Nice to meet you!", "en-GB")
+
+    # 検証
+    assert first == second == other_language == b"test audio content"
+    assert mock_text_to_speech_client.return_value.synthesize_speech.call_count == 2
+    assert text_to_speech_service.cache.get_stats()["memory_hits"] == 1
+
+def test_prewarm_populates_cache(text_to_speech_service, mock_text_to_speech_client):
+    """Test that prewarmed phrases are synthesized once and then cached."""
+    # モックの設定
+    mock_response = Mock()
+    mock_response.audio_content = b"greeting"
+    mock_text_to_speech_client.return_value.synthesize_speech.return_value = mock_response
+
+    # テスト実行
+    warmed = text_to_speech_service.prewarm(["Hello!", "Good job!"], "en-US")
+    text_to_speech_service.text_to_speech("Hello!", "en-US")
+
+    # 検証
+    assert warmed == 2
+    assert mock_text_to_speech_client.return_value.synthesize_speech.call_count == 2
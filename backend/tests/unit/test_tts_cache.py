@@ -0,0 +1,132 @@
+import os
+import pytest
+from pathlib import Path
+from unittest.mock import Mock
+from app.services.tts_cache import TTSCache
+
+def test_make_key_depends_on_all_parameters():
+    """Test that every synthesis parameter is part of the cache key."""
+    base = TTSCache.make_key("Hello", "en-US", "gender:NEUTRAL", "MP3")
+
+    # 検証
+    assert base == TTSCache.make_key("Hello", "en-US", "gender:NEUTRAL", "MP3")
+    assert base != TTSCache.make_key("Hello!", "en-US", "gender:NEUTRAL", "MP3")
+    assert base != TTSCache.make_key("Hello", "en-GB", "gender:NEUTRAL", "MP3")
+    assert base != TTSCache.make_key("Hello", "en-US", "en-US-Neural2-A", "MP3")
+    assert base != TTSCache.make_key("Hello", "en-US", "gender:NEUTRAL", "LINEAR16")
+
+def test_memory_tier_is_bounded_lru():
+    """Test that the memory tier evicts the least recently used entry."""
+    cache = TTSCache(memory_max_items=2)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+
+    # テスト実行
+    cache.put("c", b"3")
+
+    # 検証
+    assert cache.get("a") == b"1"
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+    stats = cache.get_stats()
+    assert stats["memory_items"] == 2
+    assert stats["memory_hits"] == 3
+    assert stats["misses"] == 1
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Test that entries persist on disk and are promoted back to memory."""
+    TTSCache(disk_dir=str(tmp_path)).put("key", b"audio bytes")
+
+    # テスト実行
+    cache = TTSCache(disk_dir=str(tmp_path))
+    first = cache.get("key")
+    second = cache.get("key")
+
+    # 検証
+    assert first == second == b"audio bytes"
+    stats = cache.get_stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+def test_disk_tier_is_size_capped(tmp_path):
+    """Test that the disk tier evicts the oldest files once it exceeds its cap."""
+    cache = TTSCache(memory_max_items=1, disk_dir=str(tmp_path), disk_max_bytes=25)
+
+    # テスト実行
+    for key in ["a", "b", "c"]:
+        cache.put(key, b"x" * 10)
+
+    # 検証
+    stats = cache.get_stats()
+    assert stats["disk_bytes"] <= 25
+    assert stats["disk_items"] == 2
+    assert len(list(tmp_path.glob("*/*.audio"))) == 2
+
+def test_clear_removes_disk_files(tmp_path):
+    """Test that clearing the cache removes files from the disk tier."""
+    cache = TTSCache(disk_dir=str(tmp_path))
+    cache.put("key", b"audio")
+
+    # テスト実行
+    cache.clear()
+
+    # 検証
+    assert cache.get("key") is None
+    assert list(tmp_path.glob("*/*.audio")) == []
+
+def test_disk_eviction_follows_access_order_without_scanning(tmp_path, monkeypatch):
+    """Test that disk eviction uses the in-memory index order instead of scanning the directory."""
+    cache = TTSCache(memory_max_items=1, disk_dir=str(tmp_path), disk_max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    assert cache.get("a") == b"x" * 10  # ディスク層から読まれ、aが最近使われた側になる
+
+    # テスト実行
+    monkeypatch.setattr(Path, "glob", Mock(side_effect=AssertionError("directory scanned")))
+    cache.put("c", b"x" * 10)
+    monkeypatch.undo()
+
+    # 検証
+    assert sorted(path.stem for path in tmp_path.glob("*/*.audio")) == ["a", "c"]
+    assert cache.get_stats()["disk_bytes"] == 20
+
+def test_disk_io_runs_outside_lock(tmp_path, monkeypatch):
+    """Test that disk reads and writes do not hold the cache lock."""
+    cache = TTSCache(memory_max_items=1, disk_dir=str(tmp_path))
+    locked_during_io = []
+    read_bytes, replace = Path.read_bytes, os.replace
+
+    def checked_read_bytes(path):
+        locked_during_io.append(cache._lock.locked())
+        return read_bytes(path)
+
+    def checked_replace(src, dst):
+        locked_during_io.append(cache._lock.locked())
+        return replace(src, dst)
+
+    monkeypatch.setattr(Path, "read_bytes", checked_read_bytes)
+    monkeypatch.setattr(os, "replace", checked_replace)
+
+    # テスト実行
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    audio = cache.get("a")
+
+    # 検証
+    assert audio == b"1"
+    assert locked_during_io == [False, False, False]
+
+def test_missing_disk_file_is_treated_as_miss(tmp_path):
+    """Test that a file removed behind the cache's back is dropped from the index."""
+    cache = TTSCache(memory_max_items=1, disk_dir=str(tmp_path))
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache._disk_path("a").unlink()
+
+    # テスト実行
+    audio = cache.get("a")
+
+    # 検証
+    assert audio is None
+    assert cache.get_stats()["disk_items"] == 1
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.config.database import after_commit, db_session, unit_of_work
+from app.core.analysis_notifier import get_analysis_notifier
+from app.services.postgres_session_manager import PostgresSessionManagerService
+
+class FakeSession:
+    def __init__(self):
+        self.info = {}
+        self.commit = AsyncMock()
+        self.rollback = AsyncMock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+@pytest.fixture
+def sessions():
+    created = []
+
+    def factory():
+        created.append(FakeSession())
+        return created[-1]
+
+    with patch("app.config.database.AsyncSessionLocal", side_effect=factory):
+        yield created
+
+@pytest.mark.asyncio
+async def test_calls_share_one_session_and_commit_once(sessions):
+    """Test that every call inside a unit of work, including child tasks, uses the same session."""
+    async def use():
+        async with db_session() as db:
+            return db
+
+    # テスト実行
+    async with unit_of_work() as session:
+        first = await use()
+        second, third = await asyncio.gather(use(), asyncio.create_task(use()))
+        async with unit_of_work() as nested:
+            pass
+
+    # 検証
+    assert first is second is third is nested is session
+    assert len(sessions) == 1
+    session.commit.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_after_commit_callbacks_run_only_after_commit(sessions):
+    """Test that callbacks are deferred until the commit and dropped on rollback."""
+    called = []
+
+    # テスト実行
+    async with unit_of_work() as session:
+        after_commit(session, lambda: called.append("committed"))
+        assert called == []
+    with pytest.raises(RuntimeError):
+        async with unit_of_work() as session:
+            after_commit(session, lambda: called.append("rolled back"))
+            raise RuntimeError("boom")
+
+    # 検証
+    assert called == ["committed"]
+    sessions[1].rollback.assert_awaited_once()
+    sessions[1].commit.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_tasks_outliving_the_unit_get_their_own_session(sessions):
+    """Test that a task started inside a unit of work does not reuse it after the commit."""
+    release = asyncio.Event()
+
+    async def background():
+        await release.wait()
+        async with db_session() as db:
+            return db
+
+    # テスト実行
+    async with unit_of_work() as session:
+        task = asyncio.create_task(background())
+    release.set()
+
+    # 検証
+    assert await task is not session
+    assert len(sessions) == 2
+
+@pytest.mark.asyncio
+async def test_analysis_waiters_are_notified_after_commit(sessions):
+    """Test that the session manager notifies waiters only once the analysis is committed."""
+    db_service = Mock()
+    db_service.upsert_conversation_analysis = AsyncMock()
+    manager = PostgresSessionManagerService()
+    notifier = get_analysis_notifier()
+
+    with patch("app.services.postgres_session_manager.DatabaseService", return_value=db_service), \
+         notifier.subscribe("s1", "4") as ready:
+        # テスト実行
+        async with unit_of_work():
+            await manager.save_analysis_result("s1", "4", "", {"advice": "Nice"})
+            await asyncio.sleep(0)
+            assert not ready.done()
+
+        # 検証
+        await asyncio.wait_for(ready, timeout=1)
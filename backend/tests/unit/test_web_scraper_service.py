@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from app.services.web_scraper_service import WebScraperService
+
+ARTICLE = b"<html><head><title>Tea</title></head><body><main>" + b"Green tea is popular in Japan. " * 10 + b"</main></body></html>"
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_GET(self):
+        Handler.requests.append((self.path, dict(self.headers)))
+        if self.path == "/slow":
+            time.sleep(0.2)
+        if self.path == "/article" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = ARTICLE if self.path != "/large" else b"<html><body><main>" + b"a " * 100000 + b"</main></body></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/article":
+            self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    Handler.requests = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+@pytest.fixture
+def scraper():
+    return WebScraperService(max_bytes=64 * 1024)
+
+@pytest.mark.asyncio
+async def test_scrape_url_extracts_content(scraper, server):
+    """Test that the page is fetched asynchronously and its headers are kept."""
+    # テスト実行
+    result = await scraper.scrape_url(f"{server}/article")
+
+    # 検証
+    assert result["title"] == "Tea"
+    assert result["content"].startswith("Green tea is popular in Japan.")
+    assert result["etag"] == '"v1"'
+    assert result["content_type"] == "text/html; charset=utf-8"
+
+@pytest.mark.asyncio
+async def test_scrape_url_revalidates_with_etag(scraper, server):
+    """Test that a cached page is revalidated with a conditional GET."""
+    first = await scraper.scrape_url(f"{server}/article")
+
+    # テスト実行
+    second = await scraper.scrape_url(f"{server}/article")
+
+    # 検証
+    assert second == first
+    assert Handler.requests[1][1].get("If-None-Match") == '"v1"'
+    assert scraper.get_stats()["not_modified"] == 1
+
+@pytest.mark.asyncio
+async def test_scrape_url_caps_body_size(scraper, server):
+    """Test that bodies larger than max_bytes are truncated while streaming."""
+    # テスト実行
+    result = await scraper.scrape_url(f"{server}/large")
+
+    # 検証
+    assert len(result["content"]) < 64 * 1024
+    assert scraper.get_stats()["truncated"] == 1
+
+@pytest.mark.asyncio
+async def test_slow_pages_do_not_block_each_other(scraper, server):
+    """Test that two slow fetches share the event loop instead of running one after another."""
+    # テスト実行
+    started = time.perf_counter()
+    results = await asyncio.gather(scraper.scrape_url(f"{server}/slow"), scraper.scrape_url(f"{server}/slow"))
+    elapsed = time.perf_counter() - started
+
+    # 検証
+    assert all(results)
+    assert elapsed < 0.35, "Two 0.2s fetches should finish in roughly 0.2s"
@@ -0,0 +1,124 @@
+import pytest
+from app.services.webpage_retrieval import WebpageRetriever, chunk_text
+
+VOCABULARY = ["tea", "coffee", "train", "weather"]
+
+class FakeEmbedder:
+    """単語の出現回数を埋め込みとして返す"""
+
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, batch_size, normalize_embeddings):
+        self.calls.append(len(texts))
+        return [[text.lower().count(word) for word in VOCABULARY] for text in texts]
+
+class FakeCollection:
+    def __init__(self):
+        self.items = {}
+
+    def add(self, ids, embeddings, documents, metadatas):
+        for item in zip(ids, embeddings, documents, metadatas):
+            self.items[item[0]] = item[1:]
+
+    def count(self):
+        return len(self.items)
+
+    def query(self, query_embeddings, n_results, include):
+        query = query_embeddings[0]
+        ranked = sorted(self.items.values(), key=lambda item: -sum(a * b for a, b in zip(item[0], query)))[:n_results]
+        return {"documents": [[item[1] for item in ranked]], "metadatas": [[item[2] for item in ranked]]}
+
+    def get(self, ids, include):
+        items = [self.items[item_id] for item_id in ids]
+        return {"documents": [item[1] for item in items], "metadatas": [item[2] for item in items]}
+
+class FakeClient:
+    def __init__(self):
+        self.collections = {}
+
+    def create_collection(self, name, metadata, embedding_function):
+        self.collections[name] = FakeCollection()
+        return self.collections[name]
+
+    def get_collection(self, name, embedding_function):
+        return self.collections[name]
+
+    def delete_collection(self, name):
+        del self.collections[name]
+
+ARTICLE = (
+    "Green tea is grown in Shizuoka. Many people drink tea every morning. "
+    "The weather in spring is mild. Cherry blossoms bloom when the weather warms. "
+    "The train to Kyoto takes two hours. Most visitors take the train from Tokyo. "
+    "Coffee shops are also popular. Some cafes roast their own coffee."
+)
+
+@pytest.fixture
+def retriever():
+    return WebpageRetriever(chunk_chars=80, overlap_chars=0, top_k=2, batch_size=2, client=FakeClient(), embedder=FakeEmbedder())
+
+def test_chunk_text_overlaps_sentences():
+    """Test that chunks respect the size limit and repeat the previous sentence."""
+    text = " ".join(f"Sentence number {index} is here." for index in range(20))
+
+    # テスト実行
+    chunks = chunk_text(text, chunk_chars=120, overlap_chars=40)
+
+    # 検証
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    assert chunks[1].startswith(chunks[0].split(". ")[-1])
+    assert "Sentence number 19 is here." in chunks[-1]
+
+def test_chunk_text_splits_long_sentences():
+    assert chunk_text("x" * 250, chunk_chars=100, overlap_chars=0) == ["x" * 100, "x" * 100, "x" * 50]
+
+@pytest.mark.asyncio
+async def test_ingest_embeds_in_batches(retriever):
+    """Test that chunks are embedded and stored batch by batch."""
+    # テスト実行
+    count = await retriever.ingest("s1", ARTICLE)
+
+    # 検証
+    assert count == 4
+    assert retriever.embedder.calls == [2, 2]
+    assert retriever.client.collections["session-s1"].count() == 4
+
+@pytest.mark.asyncio
+async def test_retrieve_returns_relevant_chunks_in_page_order(retriever):
+    """Test that only the chunks related to the query are returned, in their original order."""
+    await retriever.ingest("s1", ARTICLE)
+
+    # テスト実行
+    excerpts = await retriever.retrieve("s1", "Which train should I take, and is the coffee good?")
+
+    # 検証
+    assert len(excerpts) == 2
+    assert "train" in excerpts[0]
+    assert "Coffee" in excerpts[1]
+
+@pytest.mark.asyncio
+async def test_retrieve_without_query_returns_first_chunks(retriever):
+    await retriever.ingest("s1", ARTICLE)
+
+    # テスト実行
+    excerpts = await retriever.retrieve("s1", "")
+
+    # 検証
+    assert excerpts[0].startswith("Green tea is grown in Shizuoka.")
+
+@pytest.mark.asyncio
+async def test_retrieve_unknown_session(retriever):
+    assert await retriever.retrieve("missing", "tea") is None
+
+@pytest.mark.asyncio
+async def test_ingest_replaces_previous_page(retriever):
+    """Test that loading another page removes the chunks of the previous one."""
+    await retriever.ingest("s1", ARTICLE)
+
+    # テスト実行
+    await retriever.ingest("s1", "Tea ceremonies are quiet. Guests bow before drinking tea.")
+
+    # 検証
+    excerpts = await retriever.retrieve("s1", "train")
+    assert all("train" not in excerpt for excerpt in excerpts)
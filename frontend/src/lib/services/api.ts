@@ -39,9 +39,14 @@ export interface AnalysisResult {
 }
 
 export interface AnalysisResultResponse {
+  status?: 'completed' | 'queued' | 'running' | 'failed' | 'pending';
   analysis_result: AnalysisResult;
 }
 
+// 分析結果のロングポーリング（1回あたりの待機秒数と最大回数）
+const ANALYSIS_WAIT_SECONDS = 25;
+const ANALYSIS_WAIT_ATTEMPTS = 4;
+
 
 
 export class AudioService {
@@ -92,7 +97,17 @@ export class AudioService {
   }
 
   static async getAnalysisResult(sessionId: string, conversationId: string): Promise<AnalysisResultResponse> {
-    const response = await fetch(`${API_BASE_URL}/get_analysis_result/${sessionId}/${conversationId}`);
-    return response.json();
+    // 分析が完了するまでサーバー側で待機し、タイムアウトした場合は再接続する
+    let result!: AnalysisResultResponse;
+    for (let attempt = 0; attempt < ANALYSIS_WAIT_ATTEMPTS; attempt++) {
+      const response = await fetch(
+        `${API_BASE_URL}/analysis/${sessionId}/${conversationId}/wait?timeout=${ANALYSIS_WAIT_SECONDS}`
+      );
+      result = await response.json();
+      if (result.status === 'completed' || result.status === 'failed') {
+        break;
+      }
+    }
+    return result;
   }
 } 